@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+
+import gspread
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.http_client import HTTPClient
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Cliente de Google Sheets compartido por todos los pasos del pipeline ---
+# Se autoriza una sola vez por proceso, reutiliza la sesión HTTP (conexiones persistentes) y guarda las planillas
+# y hojas ya abiertas. Todas las llamadas pasan por un mismo limitador de tasa y se reintentan ante cuotas (429)
+# y errores transitorios. Este módulo importa gspread: se importa dentro de las funciones que lo usan.
+RUTA_CREDENCIALES = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS",
+                                   "G:/Mi unidad/Proyecto_Data/1. pythonProject/Proyeccion_Demanda/forecast-459600-d8ffd029be68.json")
+SCOPE_GOOGLE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# --- Límite de tasa (cubeta de tokens): la cuota de Sheets es de 60 solicitudes por minuto por usuario ---
+SOLICITUDES_POR_SEGUNDO = 1.0
+RAFAGA_MAXIMA = 10
+
+# --- Reintentos con espera exponencial (se respeta Retry-After si la API lo envía) ---
+MAX_REINTENTOS = 6
+ESPERA_BASE_SEGUNDOS = 2.0
+ESPERA_MAXIMA_SEGUNDOS = 64.0
+CODIGOS_REINTENTABLES = {408, 429, 500, 502, 503, 504}
+RAZONES_CUOTA = {'rateLimitExceeded', 'userRateLimitExceeded', 'quotaExceeded'}  # Drive responde 403 por cuota
+
+CONEXIONES_POR_HOST = 10
+TIEMPO_ESPERA_HTTP = (10, 120)  # segundos: (conexión, lectura)
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+class CubetaTokens:
+    """
+    Limitador de tasa compartido por todos los hilos: 'tasa' solicitudes por segundo, con ráfagas de hasta
+    'capacidad'. Tras una respuesta 429 se pausa a todos, no solo al hilo que la recibió.
+    """
+
+    def __init__(self, tasa=SOLICITUDES_POR_SEGUNDO, capacidad=RAFAGA_MAXIMA):
+        self.tasa, self.capacidad = tasa, capacidad
+        self._tokens = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._bloqueo = threading.Lock()
+
+    def tomar(self):
+        """Espera hasta que haya un token disponible y lo consume."""
+        while True:
+            with self._bloqueo:
+                ahora = time.monotonic()
+                if ahora >= self._pausa_hasta:
+                    self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+                    self._ultimo = ahora
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    espera = (1 - self._tokens) / self.tasa
+                else:
+                    espera = self._pausa_hasta - ahora
+            time.sleep(espera)
+
+    def pausar(self, segundos):
+        """Detiene todas las solicitudes durante 'segundos' y vacía la cubeta."""
+        with self._bloqueo:
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+            self._ultimo = self._pausa_hasta
+            self._tokens = 0.0
+
+
+_CUBETA = CubetaTokens()
+
+
+def _es_reintentable(error):
+    """True si el APIError es de cuota o transitorio."""
+    if error.code in CODIGOS_REINTENTABLES:
+        return True
+    razones = {detalle.get('reason') for detalle in error.error.get('errors', []) if isinstance(detalle, dict)}
+    return error.code == 403 and bool(razones & RAZONES_CUOTA)
+
+
+def _segundos_espera(intento, retry_after=None):
+    """Espera exponencial con jitter; si la API indica Retry-After (en segundos) se usa el mayor de los dos."""
+    espera = min(ESPERA_MAXIMA_SEGUNDOS, ESPERA_BASE_SEGUNDOS * 2 ** intento) * random.uniform(0.5, 1.0)
+    try:
+        return max(espera, float(retry_after)) if retry_after else espera
+    except ValueError:
+        return espera
+
+
+class ClienteHTTPLimitado(HTTPClient):
+    """
+    Cliente HTTP de gspread con conexiones persistentes, el limitador de tasa compartido y reintentos.
+    Cuenta las solicitudes y los reintentos del proceso para el resumen final (los hilos de la exportación en
+    segundo plano comparten el cliente: los contadores se actualizan con _BLOQUEO).
+    """
+
+    def __init__(self, auth, session=None):
+        super().__init__(auth, session)
+        adaptador = HTTPAdapter(pool_connections=CONEXIONES_POR_HOST, pool_maxsize=CONEXIONES_POR_HOST)
+        self.session.mount('https://', adaptador)
+        self.set_timeout(TIEMPO_ESPERA_HTTP)
+        self.solicitudes = 0
+        self.reintentos = 0
+
+    def request(self, *args, **kwargs):
+        for intento in range(MAX_REINTENTOS + 1):
+            _CUBETA.tomar()
+            with _BLOQUEO:
+                self.solicitudes += 1
+            try:
+                return super().request(*args, **kwargs)
+            except APIError as e:
+                if intento == MAX_REINTENTOS or not _es_reintentable(e):
+                    raise
+                espera = _segundos_espera(intento, e.response.headers.get('Retry-After'))
+                if e.code in (429, 403):
+                    _CUBETA.pausar(espera)
+                motivo = f"HTTP {e.code}"
+            except (ConnectionError, Timeout) as e:
+                if intento == MAX_REINTENTOS:
+                    raise
+                espera = _segundos_espera(intento)
+                motivo = type(e).__name__
+            with _BLOQUEO:
+                self.reintentos += 1
+            logging.warning(f"⚠️ Google API respondió {motivo}; reintento {intento + 1}/{MAX_REINTENTOS} "
+                            f"en {espera:.1f} s.")
+            time.sleep(espera)
+
+
+def credenciales_google():
+    """Credenciales de la cuenta de servicio: del secreto GSPREAD_CREDENTIALS (GitHub Actions) o del archivo local."""
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    gspread_creds_json = os.environ.get("GSPREAD_CREDENTIALS")
+    if gspread_creds_json:
+        logging.info("Usando credenciales desde GitHub Secrets.")
+        return ServiceAccountCredentials.from_json_keyfile_dict(json.loads(gspread_creds_json), SCOPE_GOOGLE)
+    logging.info("Usando archivo de credenciales local.")
+    return ServiceAccountCredentials.from_json_keyfile_name(RUTA_CREDENCIALES, SCOPE_GOOGLE)
+
+
+# Reentrante: abrir_planilla y obtener_hoja hacen solicitudes (que cuentan con el mismo bloqueo) mientras lo tienen
+_BLOQUEO = threading.RLock()
+_CLIENTE = {}
+_PLANILLAS = {}
+_HOJAS = {}
+
+
+def cliente_google():
+    """Cliente de gspread del proceso: se autoriza en la primera llamada y las siguientes lo reutilizan."""
+    with _BLOQUEO:
+        if 'cliente' not in _CLIENTE:
+            try:
+                _CLIENTE['cliente'] = gspread.authorize(credenciales_google(), http_client=ClienteHTTPLimitado)
+                logging.info("✅ Autorización con Google exitosa.")
+            except Exception as e:
+                logging.error(f"❌ Error al autorizar con Google: {e}")
+                raise
+        return _CLIENTE['cliente']
+
+
+def abrir_planilla(nombre):
+    """Planilla por nombre; se abre una sola vez por proceso (abrir cuesta una búsqueda en Drive y los metadatos)."""
+    cliente = cliente_google()
+    with _BLOQUEO:
+        if nombre not in _PLANILLAS:
+            planilla = cliente.open(nombre)
+            _PLANILLAS[nombre] = planilla
+            _HOJAS[planilla.id] = {hoja.title: hoja for hoja in planilla.worksheets()}
+        return _PLANILLAS[nombre]
+
+
+def obtener_hoja(planilla, nombre, crear=False, filas=1000, columnas=26):
+    """
+    Hoja de la planilla desde la caché de hojas (sin volver a pedir los metadatos). Con 'crear' se agrega si no
+    existe; si no, se lanza WorksheetNotFound como en gspread.
+    """
+    with _BLOQUEO:
+        hojas = _HOJAS.setdefault(planilla.id, {})
+        if nombre not in hojas:
+            if not crear:
+                raise WorksheetNotFound(nombre)
+            logging.info(f"Hoja '{nombre}' no encontrada. Creándola...")
+            hojas[nombre] = planilla.add_worksheet(title=nombre, rows=max(filas, 1), cols=max(columnas, 1))
+        return hojas[nombre]
+
+
+def leer_hoja(planilla, nombre):
+    """Contenido de una hoja como DataFrame (encabezados en la primera fila)."""
+    import pandas as pd
+
+    return pd.DataFrame(obtener_hoja(planilla, nombre).get_all_records())
+
+
+def escribir_hoja(planilla, nombre, df, **opciones):
+    """
+    Reemplaza el contenido de una hoja con el DataFrame (la crea con el tamaño justo si no existe).
+    'opciones' se pasan a set_with_dataframe (p. ej. include_index=False, allow_formulas=False).
+    """
+    from gspread_dataframe import set_with_dataframe
+
+    hoja = obtener_hoja(planilla, nombre, crear=True, filas=len(df) + 1, columnas=len(df.columns))
+    hoja.clear()
+    set_with_dataframe(hoja, df, **opciones)
+    return hoja
+
+
+class EscrituraIncremental:
+    """
+    Escribe una hoja por lotes: el primer agregar() la limpia y escribe encabezado y filas; los siguientes agregan
+    filas a continuación (la hoja crece sola). Sirve para exportar mientras el resultado todavía se calcula.
+    """
+
+    def __init__(self, planilla, nombre, columnas, **opciones):
+        self.planilla, self.nombre, self.columnas, self.opciones = planilla, nombre, list(columnas), opciones
+        self.hoja = None
+        self.filas = 0
+
+    def agregar(self, df):
+        from gspread_dataframe import set_with_dataframe
+
+        df = df.reindex(columns=self.columnas)
+        if self.hoja is None:
+            self.hoja = escribir_hoja(self.planilla, self.nombre, df, **self.opciones)
+        elif not df.empty:
+            set_with_dataframe(self.hoja, df, row=self.filas + 2, include_column_header=False, **self.opciones)
+        self.filas += len(df)
+
+
+def resumen_llamadas():
+    """Solicitudes y reintentos hechos a la API en este proceso (None si nunca se autorizó)."""
+    cliente = _CLIENTE.get('cliente')
+    if cliente is None:
+        return None
+    with _BLOQUEO:
+        return {'solicitudes': cliente.http_client.solicitudes, 'reintentos': cliente.http_client.reintentos}
@@ -0,0 +1,122 @@
+import time
+import queue
+import logging
+import threading
+
+import pandas as pd
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Escritura continua: exportar los resultados mientras se siguen calculando ---
+# El productor (p. ej. el ciclo de entrenamiento) entrega cada resultado con agregar(); cada SERIES_POR_LOTE se
+# arma un lote y un hilo escritor lo procesa (desglose, archivo, hoja) en paralelo. La cola es acotada: si el
+# escritor se atrasa, el productor espera en lugar de acumular lotes en memoria.
+SERIES_POR_LOTE = 25
+LOTES_EN_COLA = 4
+
+_FIN = object()
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+class Etapa:
+    """Un destino de la escritura continua: procesar(datos) por lote, cerrar() al final y descartar() si falla."""
+
+    def __init__(self, procesar, cerrar=None, descartar=None):
+        self.procesar = procesar
+        self.cerrar = cerrar or (lambda: None)
+        self.descartar = descartar or (lambda: None)
+
+
+class EscritorEnSegundoPlano:
+    """
+    Procesa en un hilo aparte los lotes que arma el productor. 'etapas' es {nombre: Etapa}; 'preparar' (opcional)
+    transforma cada lote una sola vez antes de pasarlo a todas las etapas.
+    Si una etapa falla se descarta lo que llevaba y las demás siguen; cerrar() espera al escritor y devuelve
+    {nombre: True si terminó}, para que el llamador rehaga al final solo las que fallaron.
+    """
+
+    def __init__(self, etapas, preparar=None, tamano_lote=SERIES_POR_LOTE, lotes_en_cola=LOTES_EN_COLA):
+        self.etapas = dict(etapas)
+        self.preparar = preparar
+        self.tamano_lote = tamano_lote
+        self.lotes, self.segundos = 0, 0.0
+        self._pendiente = []
+        self._fallidas = set()
+        self._cancelado = False
+        self._cola = queue.Queue(maxsize=lotes_en_cola)
+        self._hilo = threading.Thread(target=self._trabajar, name='escritura-continua', daemon=True)
+        self._hilo.start()
+
+    def agregar(self, df):
+        """Entrega un resultado; se envía al escritor al completar un lote."""
+        self._pendiente.append(df)
+        if len(self._pendiente) >= self.tamano_lote:
+            self._enviar()
+
+    def _enviar(self):
+        if self._pendiente:
+            self._cola.put(pd.concat(self._pendiente, ignore_index=True))
+            self._pendiente = []
+
+    def _fallar(self, nombre, error):
+        logging.error(f"❌ Falló la escritura continua de '{nombre}': {error}")
+        self._fallidas.add(nombre)
+        try:
+            self.etapas[nombre].descartar()
+        except Exception as e:
+            logging.error(f"❌ No se pudo descartar lo escrito por '{nombre}': {e}")
+
+    def _trabajar(self):
+        while True:
+            lote = self._cola.get()
+            if lote is _FIN:
+                break
+            activas = [nombre for nombre in self.etapas if nombre not in self._fallidas]
+            if self._cancelado or not activas:
+                continue
+            inicio = time.perf_counter()
+            try:
+                datos = self.preparar(lote) if self.preparar else lote
+            except Exception as e:
+                for nombre in activas:
+                    self._fallar(nombre, e)
+                continue
+            for nombre in activas:
+                try:
+                    self.etapas[nombre].procesar(datos)
+                except Exception as e:
+                    self._fallar(nombre, e)
+            self.lotes += 1
+            self.segundos += time.perf_counter() - inicio
+
+        for nombre, etapa in self.etapas.items():
+            if nombre in self._fallidas:
+                continue
+            if self._cancelado:
+                etapa.descartar()
+                continue
+            try:
+                etapa.cerrar()
+            except Exception as e:
+                self._fallar(nombre, e)
+
+    def cerrar(self):
+        """Envía el último lote, espera a que el escritor termine y devuelve {nombre: True si terminó}."""
+        self._enviar()
+        self._cola.put(_FIN)
+        self._hilo.join()
+        logging.info(f"📤 Escritura continua: {self.lotes} lotes procesados en {self.segundos:.1f} s "
+                     f"en paralelo con el productor.")
+        return {nombre: nombre not in self._fallidas for nombre in self.etapas}
+
+    def cancelar(self):
+        """Descarta lo escrito por todas las etapas (p. ej. si el productor falló a mitad de camino)."""
+        self._cancelado = True
+        self._pendiente = []
+        self._cola.put(_FIN)
+        self._hilo.join()
@@ -0,0 +1,269 @@
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Perfilado profundo (opcional, main.py --perfilar) ---
+# Cada etapa del pipeline y cada serie entrenada se mide con cProfile (tiempo por función) y tracemalloc (pico de
+# memoria y dónde se asignó). Solo se conservan los PERFILES_A_CONSERVAR más lentos y los que más memoria usaron de
+# cada tipo; al terminar se escriben en CARPETA_PERFILES:
+#   <tipo>_<nombre>.prof       estadísticas de pstats (snakeviz, python -m pstats)
+#   <tipo>_<nombre>.collapsed  pilas colapsadas para flamegraph.pl, speedscope o inferno
+#   perfiles.json              resumen: duración, pico de memoria, metadatos, funciones y asignaciones principales
+# Sin --perfilar, perfilar() no hace nada y no cuesta nada.
+CARPETA_PERFILES = os.path.join("resultados", "perfiles")
+PERFILES_A_CONSERVAR = 10
+FUNCIONES_EN_RESUMEN = 15
+ASIGNACIONES_EN_RESUMEN = 10
+PROFUNDIDAD_MAXIMA_PILA = 60
+FRACCION_MINIMA_PILA = 0.001  # Caminos con menos de esta fracción del tiempo total no se expanden
+
+_ESTADO = {'activo': False, 'carpeta': CARPETA_PERFILES, 'top_n': PERFILES_A_CONSERVAR, 'memoria': True}
+_PERFILES = {}  # tipo -> lista de perfiles conservados
+_BLOQUEO = threading.Lock()
+_PILA = threading.local()  # bloques abiertos del hilo (cProfile no admite perfiladores anidados)
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def activar_perfilado(carpeta=CARPETA_PERFILES, top_n=PERFILES_A_CONSERVAR, memoria=True):
+    """Activa el perfilado para el resto del proceso. Con 'memoria' se mide también con tracemalloc (más lento)."""
+    import tracemalloc
+
+    _ESTADO.update(activo=True, carpeta=carpeta, top_n=top_n, memoria=memoria)
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    logging.info(f"🔬 Perfilado activo: se conservarán los {top_n} bloques más lentos y de más memoria por tipo "
+                 f"en '{carpeta}'.")
+
+
+def perfilado_activo():
+    """True si se activó el perfilado en este proceso."""
+    return _ESTADO['activo']
+
+
+def _pila():
+    if not hasattr(_PILA, 'bloques'):
+        _PILA.bloques = []
+    return _PILA.bloques
+
+
+def _umbral(perfiles, criterio, top_n):
+    """Valor que hay que superar para entrar a los top_n de un criterio (None si aún hay lugar)."""
+    valores = sorted((p[criterio] for p in perfiles if p[criterio] is not None), reverse=True)
+    return valores[top_n - 1] if len(valores) >= top_n else None
+
+
+def _califica(tipo, segundos, pico):
+    """Indica si el bloque entra a los más lentos o a los de más memoria de su tipo: (por_tiempo, por_memoria)."""
+    with _BLOQUEO:
+        perfiles = _PERFILES.get(tipo, [])
+        top_n = _ESTADO['top_n']
+        umbral_tiempo, umbral_memoria = _umbral(perfiles, 'segundos', top_n), _umbral(perfiles, 'pico_mb', top_n)
+    return (umbral_tiempo is None or segundos > umbral_tiempo,
+            pico is not None and (umbral_memoria is None or pico > umbral_memoria))
+
+
+def _conservar(perfil):
+    """Agrega el perfil y descarta los que ya no están entre los top_n por tiempo ni por memoria."""
+    with _BLOQUEO:
+        perfiles = _PERFILES.setdefault(perfil['tipo'], [])
+        perfiles.append(perfil)
+        top_n = _ESTADO['top_n']
+        lentos = sorted(perfiles, key=lambda p: -p['segundos'])[:top_n]
+        pesados = sorted([p for p in perfiles if p['pico_mb'] is not None], key=lambda p: -p['pico_mb'])[:top_n]
+        conservar = {id(p) for p in lentos + pesados}
+        _PERFILES[perfil['tipo']] = [p for p in perfiles if id(p) in conservar]
+
+
+class _Bloque:
+    """Un bloque perfilado abierto: su perfilador, su pico de memoria y los perfiles de los bloques anidados."""
+
+    def __init__(self, tipo, nombre, metadatos):
+        import cProfile
+
+        self.tipo, self.nombre, self.metadatos = tipo, nombre, metadatos
+        self.perfilador = cProfile.Profile()
+        self.hijos = []
+        self.memoria_inicial, self.pico = None, 0
+
+    def pausar_memoria(self):
+        """Acumula el pico hasta ahora (un bloque anidado va a reiniciar el pico de tracemalloc)."""
+        import tracemalloc
+
+        if self.memoria_inicial is not None:
+            self.pico = max(self.pico, tracemalloc.get_traced_memory()[1])
+
+    def reanudar_memoria(self, pico_hijo=0):
+        import tracemalloc
+
+        if self.memoria_inicial is not None:
+            self.pico = max(self.pico, pico_hijo)
+            tracemalloc.reset_peak()
+
+
+def _asignaciones_principales():
+    """Líneas que más memoria tienen asignada ahora (tracemalloc), para el resumen."""
+    import tracemalloc
+
+    estadisticas = tracemalloc.take_snapshot().statistics('lineno')[:ASIGNACIONES_EN_RESUMEN]
+    return [{'lugar': f"{e.traceback[0].filename}:{e.traceback[0].lineno}", 'mb': round(e.size / 2 ** 20, 2),
+             'bloques': e.count} for e in estadisticas]
+
+
+@contextmanager
+def perfilar(tipo, nombre, metadatos=None):
+    """
+    Perfila el bloque si el perfilado está activo; si no, no hace nada. 'metadatos' (dict) se guarda con el perfil
+    y puede completarse dentro del bloque (p. ej. el motor usado). Un bloque anidado (una serie dentro de la etapa
+    de pronóstico) pausa el perfilador del bloque que lo contiene y sus estadísticas se suman a las de este.
+    """
+    if not _ESTADO['activo']:
+        yield
+        return
+
+    import tracemalloc
+
+    pila = _pila()
+    padre = pila[-1] if pila else None
+    bloque = _Bloque(tipo, nombre, metadatos if metadatos is not None else {})
+    if padre is not None:
+        padre.perfilador.disable()
+        padre.pausar_memoria()
+    if _ESTADO['memoria'] and tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        bloque.memoria_inicial = tracemalloc.get_traced_memory()[0]
+    pila.append(bloque)
+
+    inicio = time.perf_counter()
+    bloque.perfilador.enable()
+    try:
+        yield
+    finally:
+        bloque.perfilador.disable()
+        segundos = time.perf_counter() - inicio
+        pila.pop()
+        bloque.pausar_memoria()
+        pico_mb = None
+        if bloque.memoria_inicial is not None:
+            pico_mb = max(0, bloque.pico - bloque.memoria_inicial) / 2 ** 20
+        _registrar(bloque, segundos, pico_mb)
+        if padre is not None:
+            padre.hijos.append(bloque.perfilador)
+            padre.reanudar_memoria(bloque.pico)
+            padre.perfilador.enable()
+
+
+def _registrar(bloque, segundos, pico_mb):
+    """Guarda el perfil del bloque si entra a los top_n de su tipo (si no, se descarta sin procesarlo)."""
+    import pstats
+
+    por_tiempo, por_memoria = _califica(bloque.tipo, segundos, pico_mb)
+    if not (por_tiempo or por_memoria):
+        return
+    estadisticas = pstats.Stats(bloque.perfilador)
+    for hijo in bloque.hijos:
+        estadisticas.add(hijo)
+    _conservar({
+        'tipo': bloque.tipo, 'nombre': str(bloque.nombre), 'segundos': segundos,
+        'pico_mb': pico_mb, 'metadatos': dict(bloque.metadatos), 'estadisticas': estadisticas,
+        'asignaciones': _asignaciones_principales() if por_memoria else [],
+    })
+
+
+def _nombre_funcion(funcion):
+    """'funcion (archivo.py:linea)' a partir de la clave (archivo, linea, funcion) de pstats."""
+    archivo, linea, nombre = funcion
+    if archivo == '~':
+        return nombre
+    return f"{nombre} ({os.path.basename(archivo)}:{linea})"
+
+
+def pilas_colapsadas(estadisticas, profundidad_maxima=PROFUNDIDAD_MAXIMA_PILA, fraccion_minima=FRACCION_MINIMA_PILA):
+    """
+    Reconstruye pilas colapsadas ('a;b;c microsegundos') desde el grafo de llamadas de cProfile.
+    cProfile guarda aristas llamador→llamado y no pilas completas: el tiempo propio de cada función se reparte entre
+    sus caminos en proporción al tiempo acumulado de cada arista (la aproximación habitual de flameprof). Los caminos
+    con menos de 'fraccion_minima' del tiempo total no se expanden (su tiempo queda en el último marco).
+    """
+    datos = estadisticas.stats
+    llamados = {}
+    for funcion, (_, _, _, _, llamadores) in datos.items():
+        for llamador, (_, _, _, acumulado) in llamadores.items():
+            llamados.setdefault(llamador, []).append((funcion, acumulado))
+    raices = [funcion for funcion, (_, _, _, _, llamadores) in datos.items() if not llamadores]
+    minimo = fraccion_minima * sum(propio for _, _, propio, _, _ in datos.values())
+
+    pilas = {}
+
+    def recorrer(funcion, camino, fraccion):
+        _, _, propio, acumulado, _ = datos[funcion]
+        camino = camino + [_nombre_funcion(funcion)]
+        clave = ';'.join(camino)
+        expandidos = 0.0
+        hijos = llamados.get(funcion, [])
+        if len(camino) < profundidad_maxima and hijos and acumulado > 0:
+            # Con recursión mutua las aristas suman más que el acumulado: se escalan para no contar dos veces
+            total_aristas = sum(acumulado_arista for _, acumulado_arista in hijos)
+            escala = min(1.0, max(0.0, acumulado - propio) / total_aristas) if total_aristas > 0 else 0.0
+            for hijo, acumulado_arista in hijos:
+                tiempo_hijo = acumulado_arista * escala * fraccion
+                if tiempo_hijo < minimo or datos[hijo][3] <= 0 or _nombre_funcion(hijo) in camino:
+                    continue
+                recorrer(hijo, camino, min(1.0, tiempo_hijo / datos[hijo][3]))
+                expandidos += tiempo_hijo
+        # El tiempo propio más el de los llamados que no se expandieron queda en este marco
+        pilas[clave] = pilas.get(clave, 0.0) + max(propio * fraccion, acumulado * fraccion - expandidos)
+
+    for raiz in raices:
+        recorrer(raiz, [], 1.0)
+    return [f"{pila} {round(segundos * 1e6)}" for pila, segundos in sorted(pilas.items())
+            if round(segundos * 1e6) > 0]
+
+
+def _funciones_principales(estadisticas):
+    """Funciones con más tiempo acumulado, para el resumen."""
+    filas = sorted(estadisticas.stats.items(), key=lambda item: -item[1][3])[:FUNCIONES_EN_RESUMEN]
+    return [{'funcion': _nombre_funcion(funcion), 'llamadas': llamadas, 'propio_s': round(propio, 4),
+             'acumulado_s': round(acumulado, 4)}
+            for funcion, (_, llamadas, propio, acumulado, _) in filas]
+
+
+def guardar_perfiles():
+    """Escribe los perfiles conservados (.prof, .collapsed y perfiles.json). No hace nada sin --perfilar."""
+    if not _ESTADO['activo']:
+        return None
+    carpeta = _ESTADO['carpeta']
+    with _BLOQUEO:
+        perfiles = [p for tipo in sorted(_PERFILES) for p in sorted(_PERFILES[tipo], key=lambda p: -p['segundos'])]
+    if os.path.exists(carpeta):
+        shutil.rmtree(carpeta)
+    os.makedirs(carpeta)
+
+    resumen = []
+    for i, perfil in enumerate(perfiles):
+        base = f"{perfil['tipo']}_{i:03d}_{re.sub(r'[^0-9A-Za-z._-]+', '_', perfil['nombre'])[:80]}"
+        perfil['estadisticas'].dump_stats(os.path.join(carpeta, f"{base}.prof"))
+        with open(os.path.join(carpeta, f"{base}.collapsed"), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(pilas_colapsadas(perfil['estadisticas'])) + '\n')
+        resumen.append({
+            'tipo': perfil['tipo'], 'nombre': perfil['nombre'], 'segundos': round(perfil['segundos'], 3),
+            'pico_mb': None if perfil['pico_mb'] is None else round(perfil['pico_mb'], 2),
+            'metadatos': perfil['metadatos'], 'archivo': base,
+            'funciones': _funciones_principales(perfil['estadisticas']), 'asignaciones': perfil['asignaciones'],
+        })
+    with open(os.path.join(carpeta, 'perfiles.json'), 'w', encoding='utf-8') as f:
+        json.dump(resumen, f, ensure_ascii=False, indent=2, default=str)
+
+    logging.info(f"🔬 {len(resumen)} perfiles guardados en '{carpeta}' (ver perfiles.json).")
+    return carpeta
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Promociones ---
+# Cada promoción es una columna de regresor. 'fecha_fin' None = sigue vigente.
+# 'grupos', 'familias' y 'tiendas' limitan a qué series aplica (None = a todas).
+PROMOCIONES = [
+    {
+        "nombre_columna": "fuerza_promo_pastel_trozo",
+        "fecha_inicio": "2025-05-01",
+        "fecha_fin": None,
+        "fuerza": 0.17,
+        "grupos": ["Pastel Trozo"],
+        "familias": None,
+        "tiendas": None,
+    },
+]
+
+# Filtro de la configuración -> columna de la clave de serie que compara
+FILTROS_APLICABILIDAD = {
+    'tiendas': 'Location Name',
+    'grupos': 'Major Group Name',
+    'familias': 'Family Group Name',
+}
+CLAVES_SERIE = ['Location Name', 'Major Group Name', 'Family Group Name']
+
+# Series agregadas de toda la cadena: les aplica también una promoción limitada a algunas tiendas
+TIENDA_CADENA = 'Cadena'
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def columnas_promociones(promociones=PROMOCIONES):
+    """Nombres de las columnas de regresor de las promociones configuradas."""
+    return [promo['nombre_columna'] for promo in promociones]
+
+
+def matriz_promociones(fechas, promociones=PROMOCIONES, indicador=False, semanal=False):
+    """
+    Valor de cada promoción en cada fecha (fechas × promociones) en una sola pasada vectorizada.
+    Con 'indicador' vale 1 mientras está vigente (en lugar de su fuerza); con 'semanal' una promoción
+    cuenta desde el lunes de la semana en que empieza.
+    """
+    fechas = pd.DatetimeIndex(fechas).to_numpy()
+    inicio = pd.to_datetime([promo['fecha_inicio'] for promo in promociones])
+    fin = pd.to_datetime([promo.get('fecha_fin') for promo in promociones]).fillna(pd.Timestamp.max)
+    if semanal:
+        inicio = inicio - pd.to_timedelta(inicio.dayofweek, unit='D')
+
+    vigente = (fechas[:, None] >= inicio.to_numpy()[None, :]) & (fechas[:, None] <= fin.to_numpy()[None, :])
+    valores = np.ones(len(promociones)) if indicador else np.array([promo['fuerza'] for promo in promociones],
+                                                                  dtype=float)
+    return vigente * valores
+
+
+def tabla_promociones(fechas, promociones=PROMOCIONES, indicador=False, semanal=False):
+    """DataFrame 'fecha' + una columna por promoción."""
+    df = pd.DataFrame(matriz_promociones(fechas, promociones, indicador, semanal),
+                      columns=columnas_promociones(promociones))
+    df.insert(0, 'fecha', pd.DatetimeIndex(fechas))
+    return df
+
+
+def mascara_aplicabilidad(claves, promociones=PROMOCIONES):
+    """
+    Matriz booleana series × promociones: True si la promoción aplica a la serie (Tienda, Major Group, Familia).
+    Se calcula una vez para todas las series; el costo no depende de cuántas promociones se superponen en el tiempo.
+    """
+    df = pd.DataFrame(list(claves), columns=CLAVES_SERIE)
+    mascara = np.ones((len(df), len(promociones)), dtype=bool)
+    for k, promo in enumerate(promociones):
+        for campo, columna in FILTROS_APLICABILIDAD.items():
+            if promo.get(campo):
+                aplica = df[columna].isin(promo[campo])
+                if columna == 'Location Name':
+                    aplica |= df[columna] == TIENDA_CADENA
+                mascara[:, k] &= aplica.to_numpy()
+    return pd.DataFrame(mascara, index=pd.MultiIndex.from_frame(df), columns=columnas_promociones(promociones))
+
+
+def promociones_inactivas(mascara, clave, columnas):
+    """Columnas de promoción presentes en 'columnas' que no aplican a la serie 'clave' (se dejan en cero)."""
+    fila = mascara.loc[tuple(clave)]
+    return [columna for columna in columnas if columna in fila.index and not fila[columna]]
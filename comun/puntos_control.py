@@ -0,0 +1,133 @@
+import os
+import json
+import pickle
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Puntos de control de la ejecución ---
+# Cada ejecución guarda en su carpeta las etapas terminadas y los pronósticos de cada serie a medida que se
+# completan. Con --resume se saltan las etapas y series ya terminadas de la misma ejecución.
+CARPETA_EJECUCIONES = os.path.join("cache", "ejecuciones")
+
+# Estado de la ejecución en curso (lo configura main.py; los pasos lo consultan al ejecutarse)
+_EJECUCION = {'carpeta': None, 'reanudar': False}
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def iniciar_ejecucion(id_ejecucion=None, reanudar=False, carpeta_base=CARPETA_EJECUCIONES):
+    """
+    Prepara la carpeta de la ejecución (por defecto, la fecha de hoy). Sin 'reanudar' la carpeta se vacía
+    y la ejecución empieza de cero; con 'reanudar' se conservan sus puntos de control.
+    """
+    id_ejecucion = id_ejecucion or datetime.today().strftime('%Y-%m-%d')
+    carpeta = os.path.join(carpeta_base, id_ejecucion)
+    if not reanudar and os.path.exists(carpeta):
+        shutil.rmtree(carpeta)
+    os.makedirs(os.path.join(carpeta, 'series'), exist_ok=True)
+
+    _EJECUCION.update(carpeta=carpeta, reanudar=reanudar)
+    if reanudar:
+        logging.info(f"🔁 Reanudando la ejecución '{id_ejecucion}': etapas terminadas {sorted(_leer_etapas())}")
+    return carpeta
+
+
+def ejecucion_activa():
+    """Indica si hay una carpeta de ejecución configurada para guardar puntos de control."""
+    return _EJECUCION['carpeta'] is not None
+
+
+def _guardar_pickle(objeto, ruta):
+    """Serializa un objeto (pickle de la librería estándar: main.py importa este módulo sin cargar pandas)."""
+    with open(ruta, 'wb') as f:
+        pickle.dump(objeto, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _leer_pickle(ruta):
+    """Lee un objeto guardado con _guardar_pickle."""
+    with open(ruta, 'rb') as f:
+        return pickle.load(f)
+
+
+def _escribir_atomico(ruta, escribir):
+    """Escribe en un temporal y lo renombra, para no dejar archivos a medias si el proceso muere."""
+    temporal = f"{ruta}.tmp"
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+def _leer_etapas():
+    """Etapas terminadas de la ejecución en curso."""
+    ruta = os.path.join(_EJECUCION['carpeta'], 'etapas.json')
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def etapa_completa(nombre):
+    """True si se está reanudando y la etapa ya terminó en esta ejecución."""
+    return ejecucion_activa() and _EJECUCION['reanudar'] and nombre in _leer_etapas()
+
+
+def marcar_etapa(nombre, resultado=None):
+    """Registra una etapa como terminada y, si se entrega, guarda su resultado para reanudar."""
+    if not ejecucion_activa():
+        return
+    if resultado is not None:
+        ruta_resultado = os.path.join(_EJECUCION['carpeta'], f"{_nombre_archivo(nombre)}.pkl")
+        _escribir_atomico(ruta_resultado, lambda ruta: _guardar_pickle(resultado, ruta))
+
+    etapas = _leer_etapas()
+    etapas[nombre] = datetime.now().isoformat(timespec='seconds')
+    ruta_etapas = os.path.join(_EJECUCION['carpeta'], 'etapas.json')
+
+    def escribir(ruta):
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(etapas, f, indent=2, ensure_ascii=False)
+
+    _escribir_atomico(ruta_etapas, escribir)
+
+
+def resultado_etapa(nombre):
+    """Resultado guardado de una etapa terminada (None si no tiene)."""
+    ruta = os.path.join(_EJECUCION['carpeta'], f"{_nombre_archivo(nombre)}.pkl")
+    return _leer_pickle(ruta) if os.path.exists(ruta) else None
+
+
+def _nombre_archivo(clave):
+    """Nombre de archivo estable para una clave con caracteres arbitrarios."""
+    return hashlib.sha1(clave.encode()).hexdigest()[:16]
+
+
+def guardar_serie(clave, guardado):
+    """Guarda el pronóstico de una serie apenas termina (mismo formato que la caché de pronósticos)."""
+    if not ejecucion_activa():
+        return
+    ruta = os.path.join(_EJECUCION['carpeta'], 'series', f"{_nombre_archivo(clave)}.pkl")
+    _escribir_atomico(ruta, lambda destino: _guardar_pickle({'clave': clave, **guardado}, destino))
+
+
+def series_guardadas():
+    """Pronósticos por serie ya terminados en esta ejecución (solo al reanudar)."""
+    if not (ejecucion_activa() and _EJECUCION['reanudar']):
+        return {}
+    carpeta = os.path.join(_EJECUCION['carpeta'], 'series')
+    guardadas = {}
+    for archivo in os.listdir(carpeta):
+        if not archivo.endswith('.pkl'):
+            continue
+        try:
+            guardado = _leer_pickle(os.path.join(carpeta, archivo))
+            guardadas[guardado.pop('clave')] = guardado
+        except Exception as e:
+            logging.warning(f"⚠️ Punto de control ilegible '{archivo}', la serie se recalculará: {e}")
+    return guardadas
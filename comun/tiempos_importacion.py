@@ -0,0 +1,94 @@
+import os
+import re
+import sys
+import logging
+import subprocess
+
+# --- Configuración de Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --- Presupuesto de importación por punto de entrada (milisegundos) ---
+# Importar un punto de entrada solo debe cargar pandas/numpy; las dependencias pesadas
+# se importan dentro de las funciones que las usan.
+PRESUPUESTOS_MS = {
+    'main': 200,
+    'generadores.generar_holidays': 1000,
+    'generadores.generar_clima': 1000,
+    'generadores.generar_promociones': 1000,
+    'modelo.pronostico_demanda': 1200,
+    'modelo.pronostico_demanda_semanal': 1000,
+    'modelo.backtest': 1200,
+    'modelo.ajuste_hiperparametros': 1200,
+    'modelo.benchmark_ventana': 1200,
+    'modelo.escenarios': 1200,
+    'modelo.servicio_consultas': 800,
+}
+
+# --- Módulos que ningún punto de entrada debe cargar al importarse ---
+MODULOS_PESADOS = ['prophet', 'cmdstanpy', 'matplotlib', 'gspread', 'gspread_dataframe', 'oauth2client',
+                   'requests', 'scipy']
+
+PATRON_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def medir_importacion(modulo):
+    """
+    Importa un módulo en un proceso limpio con '-X importtime'.
+    Devuelve (ms acumulados, módulos pesados cargados, las 5 importaciones más costosas).
+    """
+    codigo = (f"import sys; import {modulo}; "
+              f"print(','.join(m for m in {MODULOS_PESADOS!r} if m in sys.modules))")
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True)
+    if resultado.returncode != 0:
+        raise RuntimeError(f"No se pudo importar '{modulo}': {resultado.stderr.strip().splitlines()[-1]}")
+
+    tiempos = {}
+    for linea in resultado.stderr.splitlines():
+        coincidencia = PATRON_IMPORTTIME.match(linea)
+        if coincidencia:
+            _, acumulado_us, sangria, nombre = coincidencia.groups()
+            tiempos[nombre] = (int(acumulado_us), len(sangria))
+
+    total_ms = tiempos.get(modulo, (0, 0))[0] / 1000
+    # Importaciones directas del módulo (un nivel de sangría bajo él)
+    raices = sorted(((nombre, us / 1000) for nombre, (us, nivel) in tiempos.items() if nivel == 3),
+                    key=lambda x: x[1], reverse=True)
+    pesados = [m for m in resultado.stdout.strip().split(',') if m]
+    return total_ms, pesados, raices[:5]
+
+
+def verificar_presupuestos(presupuestos=PRESUPUESTOS_MS):
+    """Mide cada punto de entrada y verifica su presupuesto; devuelve True si todos lo cumplen."""
+    todo_ok = True
+    for modulo, presupuesto in presupuestos.items():
+        try:
+            total_ms, pesados, principales = medir_importacion(modulo)
+        except RuntimeError as e:
+            logging.error(f"❌ {e}")
+            todo_ok = False
+            continue
+
+        ok = total_ms <= presupuesto and not pesados
+        todo_ok &= ok
+        detalle = ", ".join(f"{nombre} {ms:.0f} ms" for nombre, ms in principales)
+        if ok:
+            logging.info(f"✅ {modulo}: {total_ms:.0f} ms (presupuesto {presupuesto} ms) — {detalle}")
+        else:
+            logging.error(f"❌ {modulo}: {total_ms:.0f} ms (presupuesto {presupuesto} ms), "
+                          f"módulos pesados cargados: {pesados or 'ninguno'} — {detalle}")
+    return todo_ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verificar_presupuestos() else 1)
@@ -0,0 +1,180 @@
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Vigilancia de la carpeta de ventas: re-ejecutar el pronóstico cuando llegan CSV nuevos ---
+# En Linux se usa inotify (vía ctypes, sin dependencias); si no está disponible se compara periódicamente
+# nombre, tamaño y fecha de los archivos. Los CSV suelen llegar en tandas: se espera a que la carpeta quede
+# SEGUNDOS_CALMA sin cambios antes de disparar, para procesar la tanda completa una sola vez.
+EXTENSION_VIGILADA = '.csv'
+SEGUNDOS_CALMA = 30.0
+SEGUNDOS_SONDEO = 10.0  # Solo para la alternativa sin inotify
+
+# --- Constantes de inotify (linux/inotify.h) ---
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+MASCARA_EVENTOS = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+_ENCABEZADO_EVENTO = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def _es_vigilado(nombre, extension=EXTENSION_VIGILADA):
+    """Solo cuentan los archivos con la extensión vigilada (no los temporales ni los ocultos)."""
+    return nombre.endswith(extension) and not nombre.startswith('.')
+
+
+class VigilanteInotify:
+    """
+    Recibe del kernel los archivos que terminaron de escribirse (IN_CLOSE_WRITE), se movieron o se borraron
+    en la carpeta. esperar(timeout) devuelve los nombres vigilados que cambiaron o un conjunto vacío si no llegó
+    ninguno antes del límite.
+    """
+
+    def __init__(self, carpeta, extension=EXTENSION_VIGILADA):
+        self.carpeta, self.extension = carpeta, extension
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "inotify no está disponible en esta plataforma")
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falló")
+        if libc.inotify_add_watch(self._fd, os.fsencode(carpeta), MASCARA_EVENTOS) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, f"inotify_add_watch falló para '{carpeta}'")
+
+    def esperar(self, timeout=None):
+        # Los eventos de otros archivos (temporales, ocultos) no cuentan: se sigue esperando hasta el límite,
+        # como en VigilanteSondeo, para no cortar antes de tiempo la calma de esperar_tanda
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            restante = None if limite is None else max(0.0, limite - time.monotonic())
+            cambios = self._leer_eventos(restante)
+            if cambios or (limite is not None and time.monotonic() >= limite):
+                return cambios
+
+    def _leer_eventos(self, timeout):
+        listos, _, _ = select.select([self._fd], [], [], timeout)
+        if not listos:
+            return set()
+        try:
+            datos = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        cambios, posicion = set(), 0
+        while posicion < len(datos):
+            _, mascara, _, largo = _ENCABEZADO_EVENTO.unpack_from(datos, posicion)
+            posicion += _ENCABEZADO_EVENTO.size
+            nombre = os.fsdecode(datos[posicion:posicion + largo].rstrip(b'\0'))
+            posicion += largo
+            if mascara & IN_Q_OVERFLOW:
+                cambios.add('*')  # Se perdieron eventos: hay que suponer que cambió algo
+            elif mascara & IN_IGNORED:
+                raise OSError(errno.ENOENT, f"La carpeta '{self.carpeta}' dejó de existir")
+            elif _es_vigilado(nombre, self.extension):
+                cambios.add(nombre)
+        return cambios
+
+    def cerrar(self):
+        os.close(self._fd)
+
+
+class VigilanteSondeo:
+    """Alternativa portátil: compara cada 'intervalo' segundos el nombre, tamaño y fecha de los archivos."""
+
+    def __init__(self, carpeta, extension=EXTENSION_VIGILADA, intervalo=SEGUNDOS_SONDEO):
+        self.carpeta, self.extension, self.intervalo = carpeta, extension, intervalo
+        self._foto = self._fotografiar()
+
+    def _fotografiar(self):
+        foto = {}
+        with os.scandir(self.carpeta) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and _es_vigilado(entrada.name, self.extension):
+                    stat = entrada.stat()
+                    foto[entrada.name] = (stat.st_size, stat.st_mtime_ns)
+        return foto
+
+    def esperar(self, timeout=None):
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            espera = self.intervalo if limite is None else min(self.intervalo, max(0.0, limite - time.monotonic()))
+            time.sleep(espera)
+            foto = self._fotografiar()
+            cambios = {nombre for nombre in foto.keys() | self._foto.keys()
+                       if foto.get(nombre) != self._foto.get(nombre)}
+            self._foto = foto
+            if cambios or (limite is not None and time.monotonic() >= limite):
+                return cambios
+
+    def cerrar(self):
+        pass
+
+
+def crear_vigilante(carpeta, extension=EXTENSION_VIGILADA, intervalo=SEGUNDOS_SONDEO):
+    """Vigilante con inotify si el sistema lo permite; si no, por sondeo periódico."""
+    try:
+        vigilante = VigilanteInotify(carpeta, extension)
+        logging.info(f"👀 Vigilando '{carpeta}' con inotify.")
+        return vigilante
+    except (OSError, AttributeError) as e:
+        logging.info(f"👀 Vigilando '{carpeta}' por sondeo cada {intervalo:g} s (inotify no disponible: {e}).")
+        return VigilanteSondeo(carpeta, extension, intervalo)
+
+
+def esperar_tanda(vigilante, segundos_calma=SEGUNDOS_CALMA):
+    """
+    Bloquea hasta que llegue al menos un cambio y luego hasta que pasen 'segundos_calma' sin cambios nuevos.
+    Devuelve todos los nombres que cambiaron en la tanda.
+    """
+    tanda = set()
+    while not tanda:
+        tanda |= vigilante.esperar(None)
+    while True:
+        nuevos = vigilante.esperar(segundos_calma)
+        if not nuevos:
+            return tanda
+        tanda |= nuevos
+
+
+def vigilar(carpeta, al_cambiar, segundos_calma=SEGUNDOS_CALMA, intervalo=SEGUNDOS_SONDEO,
+            extension=EXTENSION_VIGILADA, max_tandas=None):
+    """
+    Llama a al_cambiar(nombres) cada vez que llega una tanda de archivos a la carpeta, hasta Ctrl+C
+    (o 'max_tandas'). Los archivos que llegan mientras al_cambiar se ejecuta forman la tanda siguiente.
+    Un error en al_cambiar se registra y la vigilancia continúa.
+    """
+    vigilante = crear_vigilante(carpeta, extension, intervalo)
+    tandas = 0
+    try:
+        while max_tandas is None or tandas < max_tandas:
+            tanda = esperar_tanda(vigilante, segundos_calma)
+            tandas += 1
+            archivos = sorted(tanda - {'*'})
+            logging.info(f"📥 Llegaron {len(archivos)} archivo(s) a '{carpeta}': {', '.join(archivos[:5])}"
+                         f"{' …' if len(archivos) > 5 else ''}")
+            try:
+                al_cambiar(archivos)
+            except Exception as e:
+                logging.error(f"❌ Falló el proceso disparado por la vigilancia: {e}", exc_info=True)
+    except KeyboardInterrupt:
+        logging.info("🛑 Vigilancia detenida.")
+    finally:
+        vigilante.cerrar()
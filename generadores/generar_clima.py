@@ -1,12 +1,12 @@
 import os
 import pandas as pd
-import requests
 from datetime import datetime, timedelta
-import gspread
-from gspread_dataframe import set_with_dataframe
-from oauth2client.service_account import ServiceAccountCredentials
+from concurrent.futures import ThreadPoolExecutor
 import logging
-import json
+import sys
+
+# --- Permite ejecutar el módulo directamente (python generadores/generar_clima.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # --- Configuración de Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -15,24 +15,45 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
 # =============================================================================
 
-# --- Google Sheets ---
-try:
-    RUTA_CREDENCIALES = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS",
-                                       "G:/Mi unidad/Proyecto_Data/1. pythonProject/Proyeccion_Demanda/forecast-459600-d8ffd029be68.json")
-    SCOPE_GOOGLE = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
-except Exception as e:
-    logging.error(f"❌ Error al definir la ruta de credenciales: {e}")
-    raise
-
+# --- Google Sheets (credenciales y cliente en comun/cliente_google.py) ---
 SPREADSHEET_NAME = "1. Forecast_Diario"
 WORKSHEET_NAME = "TempHistorico"
 
-# --- API, Ubicación y Umbrales de Clima ---
+# --- API y Ubicación por defecto ---
+# LATITUDE/LONGITUDE es la ubicación por defecto (centro de Santiago): da las columnas generales de clima, que usan
+# las tiendas sin coordenadas propias y los modelos a nivel cadena.
 LATITUDE = -33.45
 LONGITUDE = -70.67
+
+# --- Clima por tienda: cada tienda agrega sus columnas '<columna>|<tienda>' (p. ej. 'dia_frio|Maipu') ---
+# El modelo diario reemplaza las columnas generales por las de la tienda de cada serie (ver SEPARADOR_TIENDA en
+# modelo/pronostico_demanda.py). Las tiendas con las mismas coordenadas se consultan una sola vez.
+UBICACIONES_TIENDAS = {
+    'Chicureo': (-33.284, -70.647),
+    'La Florida': (-33.522, -70.598),
+    'La Reina': (-33.444, -70.537),
+    'Lastarria': (-33.438, -70.641),
+    'Los Militares': (-33.413, -70.583),
+    'Luis Pasteur': (-33.396, -70.579),
+    'Maipu': (-33.510, -70.757),
+    'Nunoa': (-33.457, -70.597),
+    'Penalolen': (-33.485, -70.544),
+    'Pocuro': (-33.436, -70.599),
+    'Providencia': (-33.426, -70.617),
+    'San Miguel': (-33.497, -70.651),
+    'Tabancura': (-33.378, -70.548),
+}
+SEPARADOR_TIENDA = '|'
+
+# --- Consultas concurrentes y caché del histórico por ubicación ---
+# El histórico de días pasados no cambia: se guarda por ubicación y solo se piden los días nuevos (más los últimos
+# DIAS_REVISION_ARCHIVO, que el archivo de Open-Meteo publica con rezago y puede corregir). El pronóstico se pide
+# siempre completo.
+MAX_CONSULTAS_CLIMA = 8
+CARPETA_CACHE_CLIMA = os.path.join("cache", "clima")
+DIAS_REVISION_ARCHIVO = 7
+
+# --- Umbrales de Clima ---
 UMBRAL_FRIO = 18.0
 UMBRAL_CALUROSO = 25.0
 UMBRAL_LLUVIA = 0.1
@@ -46,112 +67,138 @@ FORECAST_DAYS = 14
 # ---------------------------- FUNCIONES MODULARES ----------------------------
 # =============================================================================
 
-def autorizar_gsheets():
-    """Autoriza el acceso a Google Sheets usando un secreto en GitHub Actions o un archivo local."""
+def _consultar_open_meteo(sesion, url_base, latitud, longitud, desde, hasta, timeout):
+    """Temperatura máxima y precipitación diarias de una ubicación entre dos fechas (inclusive)."""
+    url = (
+        f"{url_base}?latitude={latitud}&longitude={longitud}"
+        f"&start_date={desde.strftime('%Y-%m-%d')}&end_date={hasta.strftime('%Y-%m-%d')}"
+        "&daily=temperature_2m_max,precipitation_sum&timezone=America/Santiago"
+    )
+    resp = sesion.get(url, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.json().get("daily", {})
+    if not (data and "time" in data and "temperature_2m_max" in data):
+        return pd.DataFrame(columns=['fecha', 'temperatura_max_c', 'precipitacion_mm'])
+    return pd.DataFrame({
+        'fecha': pd.to_datetime(data['time']),
+        'temperatura_max_c': data['temperature_2m_max'],
+        'precipitacion_mm': data.get('precipitation_sum', 0)
+    })
+
+
+def _historico_con_cache(sesion, latitud, longitud, historical_start_date, carpeta_cache):
+    """
+    Histórico de una ubicación: lo guardado en la caché más los días que faltan hasta ayer.
+    Solo se guardan los días con dato, así los que el archivo aún no publica se vuelven a pedir.
+    """
+    import requests
+
+    ruta = os.path.join(carpeta_cache, f"{latitud:.3f}_{longitud:.3f}.pkl")
+    inicio = pd.Timestamp(historical_start_date)
+    ayer = pd.Timestamp(datetime.today().date() - timedelta(days=1))
+    guardado = pd.read_pickle(ruta) if os.path.exists(ruta) else pd.DataFrame()
+    guardado = guardado[guardado['fecha'] >= inicio] if not guardado.empty else guardado
+
+    desde = inicio
+    if not guardado.empty and guardado['fecha'].min() <= inicio:
+        desde = max(inicio, guardado['fecha'].max() - pd.Timedelta(days=DIAS_REVISION_ARCHIVO - 1))
+    if desde > ayer:
+        return guardado
+
     try:
-        # Intenta leer el secreto desde la variable de entorno de GitHub Actions
-        gspread_creds_json = os.environ.get("GSPREAD_CREDENTIALS")
-
-        if gspread_creds_json:
-            logging.info("Usando credenciales desde GitHub Secrets.")
-            # Cargar las credenciales desde el string JSON
-            creds_dict = json.loads(gspread_creds_json)
-            creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE_GOOGLE)
-        else:
-            # Si no está en GitHub, busca el archivo local
-            logging.info("Usando archivo de credenciales local.")
-            local_path = "G:/Mi unidad/Proyecto_Data/1. pythonProject/Proyeccion_Demanda/forecast-459600-d8ffd029be68.json"
-            creds = ServiceAccountCredentials.from_json_keyfile_name(local_path, SCOPE_GOOGLE)
-
-        client = gspread.authorize(creds)
-        logging.info("✅ Autorización con Google Sheets exitosa.")
-        return client
-    except Exception as e:
-        logging.error(f"❌ Error al autorizar con Google Sheets: {e}")
-        raise
+        nuevo = _consultar_open_meteo(sesion, "https://archive-api.open-meteo.com/v1/archive",
+                                      latitud, longitud, desde, ayer, timeout=30)
+    except requests.exceptions.RequestException as e:
+        logging.error(f"❌ Error al consultar la API de archivo de clima para ({latitud}, {longitud}): {e}")
+        return guardado
 
+    historico = pd.concat([guardado[guardado['fecha'] < desde] if not guardado.empty else guardado, nuevo],
+                          ignore_index=True)
+    completo = historico.dropna(subset=['temperatura_max_c'])
+    if not completo.empty:
+        os.makedirs(carpeta_cache, exist_ok=True)
+        completo.to_pickle(ruta)
+    return historico
 
-def fetch_weather_data(historical_start_date, forecast_days):
-    """Obtiene datos de temperatura y precipitación históricos y futuros de Open-Meteo."""
-    today = datetime.today().date()
-    historical_end_date = today - timedelta(days=1)
-    df_hist, df_future = pd.DataFrame(), pd.DataFrame()
 
-    logging.info(f"Obteniendo datos históricos de clima desde {historical_start_date}...")
-    try:
-        historical_url = (
-            f"https://archive-api.open-meteo.com/v1/archive?latitude={LATITUDE}&longitude={LONGITUDE}"
-            f"&start_date={historical_start_date}&end_date={historical_end_date.strftime('%Y-%m-%d')}"
-            "&daily=temperature_2m_max,precipitation_sum&timezone=America/Santiago"
-        )
-        resp = requests.get(historical_url, timeout=30)
-        resp.raise_for_status()
-        data = resp.json().get("daily", {})
-        if data and "time" in data and "temperature_2m_max" in data:
-            df_hist = pd.DataFrame({
-                'fecha': pd.to_datetime(data['time']),
-                'temperatura_max_c': data['temperature_2m_max'],
-                'precipitacion_mm': data.get('precipitation_sum', 0)
-            })
-            logging.info(f"✅ Se obtuvieron {len(df_hist)} registros históricos de clima.")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"❌ Error al consultar la API de archivo de clima: {e}")
+def _clima_ubicacion(sesion, latitud, longitud, historical_start_date, forecast_days, carpeta_cache):
+    """Histórico (con caché) y pronóstico de una ubicación, con las columnas indicadoras de clima."""
+    import requests
 
-    logging.info(f"Obteniendo pronóstico de clima para los próximos {forecast_days} días...")
+    df_hist = _historico_con_cache(sesion, latitud, longitud, historical_start_date, carpeta_cache)
+    df_future = pd.DataFrame()
     try:
-        forecast_start_date = today
-        forecast_end_date = today + timedelta(days=forecast_days)
-        forecast_url = (
-            f"https://api.open-meteo.com/v1/forecast?latitude={LATITUDE}&longitude={LONGITUDE}"
-            f"&start_date={forecast_start_date.strftime('%Y-%m-%d')}&end_date={forecast_end_date.strftime('%Y-%m-%d')}"
-            "&daily=temperature_2m_max,precipitation_sum&timezone=America/Santiago"
-        )
-        resp = requests.get(forecast_url, timeout=20)
-        resp.raise_for_status()
-        data = resp.json().get("daily", {})
-        if data and "time" in data and "temperature_2m_max" in data:
-            df_future = pd.DataFrame({
-                'fecha': pd.to_datetime(data['time']),
-                'temperatura_max_c': data['temperature_2m_max'],
-                'precipitacion_mm': data.get('precipitation_sum', 0)
-            })
-            logging.info(f"✅ Se obtuvieron {len(df_future)} días de pronóstico de clima.")
+        today = datetime.today().date()
+        df_future = _consultar_open_meteo(sesion, "https://api.open-meteo.com/v1/forecast", latitud, longitud,
+                                          today, today + timedelta(days=forecast_days), timeout=20)
     except requests.exceptions.RequestException as e:
-        logging.error(f"❌ Error al consultar la API de pronóstico de clima: {e}")
-
-    if not df_hist.empty or not df_future.empty:
-        df_total = pd.concat([df_hist, df_future], ignore_index=True).dropna(subset=['fecha'])
-        df_total['dia_frio'] = (df_total['temperatura_max_c'] <= UMBRAL_FRIO).astype(int)
-        df_total['dia_caluroso'] = (df_total['temperatura_max_c'] > UMBRAL_CALUROSO).astype(int)
-        df_total['dia_lluvioso'] = (df_total['precipitacion_mm'] > UMBRAL_LLUVIA).astype(int)
-        df_total['frio_y_lluvioso'] = ((df_total['dia_frio'] == 1) & (df_total['dia_lluvioso'] == 1)).astype(int)
-        df_final = df_total[
-            ['fecha', 'temperatura_max_c', 'dia_frio', 'dia_caluroso', 'dia_lluvioso', 'frio_y_lluvioso']]
-        logging.info(f"✅ Se procesaron los datos. Total de registros: {len(df_final)}.")
-        return df_final
-    else:
+        logging.error(f"❌ Error al consultar la API de pronóstico de clima para ({latitud}, {longitud}): {e}")
+
+    if df_hist.empty and df_future.empty:
+        return pd.DataFrame()
+    df_total = pd.concat([df_hist, df_future], ignore_index=True).dropna(subset=['fecha'])
+    df_total['dia_frio'] = (df_total['temperatura_max_c'] <= UMBRAL_FRIO).astype(int)
+    df_total['dia_caluroso'] = (df_total['temperatura_max_c'] > UMBRAL_CALUROSO).astype(int)
+    df_total['dia_lluvioso'] = (df_total['precipitacion_mm'] > UMBRAL_LLUVIA).astype(int)
+    df_total['frio_y_lluvioso'] = ((df_total['dia_frio'] == 1) & (df_total['dia_lluvioso'] == 1)).astype(int)
+    return df_total[['fecha', 'temperatura_max_c', 'dia_frio', 'dia_caluroso', 'dia_lluvioso', 'frio_y_lluvioso']]
+
+
+def fetch_weather_data(historical_start_date, forecast_days, ubicaciones=UBICACIONES_TIENDAS,
+                       carpeta_cache=CARPETA_CACHE_CLIMA):
+    """
+    Obtiene datos de temperatura y precipitación históricos y futuros de Open-Meteo para la ubicación por defecto
+    y para cada tienda de 'ubicaciones'. Las ubicaciones distintas se consultan en paralelo (MAX_CONSULTAS_CLIMA)
+    con una sesión HTTP compartida. Devuelve una fila por fecha: las columnas generales y las de cada tienda.
+    """
+    import requests
+
+    coordenadas = sorted({(LATITUDE, LONGITUDE)} | set(ubicaciones.values()))
+    logging.info(f"Obteniendo datos de clima desde {historical_start_date} y pronóstico de {forecast_days} días "
+                 f"para {len(coordenadas)} ubicaciones...")
+
+    with requests.Session() as sesion, \
+            ThreadPoolExecutor(max_workers=min(MAX_CONSULTAS_CLIMA, len(coordenadas))) as executor:
+        futuros = {coordenada: executor.submit(_clima_ubicacion, sesion, *coordenada, historical_start_date,
+                                               forecast_days, carpeta_cache)
+                   for coordenada in coordenadas}
+        clima = {coordenada: futuro.result() for coordenada, futuro in futuros.items()}
+
+    df_final = clima[(LATITUDE, LONGITUDE)]
+    if df_final.empty:
         logging.error("❌ No se pudo obtener ningún dato de clima.")
         return pd.DataFrame()
 
+    con_clima = 0
+    for tienda, coordenada in sorted(ubicaciones.items()):
+        df_tienda = clima[coordenada]
+        if df_tienda.empty:
+            logging.warning(f"⚠️ Sin datos de clima para '{tienda}', usará las columnas generales.")
+            continue
+        df_tienda = df_tienda.rename(columns={columna: f"{columna}{SEPARADOR_TIENDA}{tienda}"
+                                              for columna in df_tienda.columns if columna != 'fecha'})
+        df_final = pd.merge(df_final, df_tienda, on='fecha', how='left')
+        con_clima += 1
+
+    indicadores = [columna for columna in df_final.columns
+                   if columna != 'fecha' and not columna.startswith('temperatura_max_c')]
+    df_final[indicadores] = df_final[indicadores].fillna(0).astype(int)
+    logging.info(f"✅ Se procesaron los datos. Total de registros: {len(df_final)}, "
+                 f"{con_clima} tiendas con clima propio.")
+    return df_final
+
 
 def export_to_gsheets(df, spreadsheet, worksheet_name):
     """Limpia una hoja y la sobreescribe con el contenido de un DataFrame."""
+    from comun.cliente_google import escribir_hoja
+
     if df.empty:
         logging.warning("⚠️ El DataFrame está vacío, no se exportará nada.")
         return
 
     try:
         df['fecha'] = df['fecha'].dt.strftime('%Y-%m-%d')
-
-        try:
-            worksheet = spreadsheet.worksheet(worksheet_name)
-            logging.info(f"Hoja '{worksheet_name}' encontrada. Limpiando contenido...")
-            worksheet.clear()
-        except gspread.exceptions.WorksheetNotFound:
-            logging.info(f"Hoja '{worksheet_name}' no encontrada. Creándola...")
-            worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=len(df) + 1, cols=len(df.columns))
-
-        set_with_dataframe(worksheet, df)
+        escribir_hoja(spreadsheet, worksheet_name, df)
         logging.info(f"✅ Tabla '{worksheet_name}' exportada exitosamente con {len(df)} filas.")
 
     except Exception as e:
@@ -162,8 +209,9 @@ def main():
     """Función principal que orquesta la generación de la tabla de clima."""
     logging.info(f"🚀 Iniciando el proceso para generar la tabla de clima en '{WORKSHEET_NAME}'.")
 
-    client = autorizar_gsheets()
-    spreadsheet = client.open(SPREADSHEET_NAME)
+    from comun.cliente_google import abrir_planilla
+
+    spreadsheet = abrir_planilla(SPREADSHEET_NAME)
 
     df_weather = fetch_weather_data(START_DATE, FORECAST_DAYS)
 
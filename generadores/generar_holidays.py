@@ -1,14 +1,13 @@
 import os
 import pandas as pd
-import requests
 from datetime import datetime, timedelta
-import gspread
-from gspread_dataframe import set_with_dataframe
-from oauth2client.service_account import ServiceAccountCredentials
 import logging
 import time
 from calendar import monthrange
-import json
+import sys
+
+# --- Permite ejecutar el módulo directamente (python generadores/generar_holidays.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # --- Configuración de Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,18 +16,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
 # =============================================================================
 
-# --- Google Sheets ---
-try:
-    RUTA_CREDENCIALES = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS",
-                                       "G:/Mi unidad/Proyecto_Data/1. pythonProject/Proyeccion_Demanda/forecast-459600-d8ffd029be68.json")
-    SCOPE_GOOGLE = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
-except Exception as e:
-    logging.error(f"❌ Error al definir la ruta de credenciales: {e}")
-    raise
-
+# --- Google Sheets (credenciales y cliente en comun/cliente_google.py) ---
 SPREADSHEET_NAME = "1. Forecast_Diario"
 WORKSHEET_NAME = "Holidays"
 
@@ -43,33 +31,10 @@ anios = fechas.year.unique()
 # ---------------------------- FUNCIONES MODULARES ----------------------------
 # =============================================================================
 
-def autorizar_gsheets():
-    """Autoriza el acceso a Google Sheets usando un secreto en GitHub Actions o un archivo local."""
-    try:
-        # Intenta leer el secreto desde la variable de entorno de GitHub Actions
-        gspread_creds_json = os.environ.get("GSPREAD_CREDENTIALS")
-
-        if gspread_creds_json:
-            logging.info("Usando credenciales desde GitHub Secrets.")
-            # Cargar las credenciales desde el string JSON
-            creds_dict = json.loads(gspread_creds_json)
-            creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE_GOOGLE)
-        else:
-            # Si no está en GitHub, busca el archivo local
-            logging.info("Usando archivo de credenciales local.")
-            local_path = "G:/Mi unidad/Proyecto_Data/1. pythonProject/Proyeccion_Demanda/forecast-459600-d8ffd029be68.json"
-            creds = ServiceAccountCredentials.from_json_keyfile_name(local_path, SCOPE_GOOGLE)
-
-        client = gspread.authorize(creds)
-        logging.info("✅ Autorización con Google Sheets exitosa.")
-        return client
-    except Exception as e:
-        logging.error(f"❌ Error al autorizar con Google Sheets: {e}")
-        raise
-
-
 def obtener_feriados_boostr(anios):
     """Obtiene los feriados para una lista de años desde la API de Boostr, con un sistema de reintentos."""
+    import requests
+
     all_dates = []
     logging.info(f"Consultando feriados desde Boostr para los años: {anios}")
 
@@ -103,22 +68,15 @@ def obtener_feriados_boostr(anios):
 
 def export_to_gsheets(df, spreadsheet, worksheet_name):
     """Limpia una hoja y la sobreescribe con el contenido de un DataFrame."""
+    from comun.cliente_google import escribir_hoja
+
     if df.empty:
         logging.warning("⚠️ El DataFrame de feriados está vacío, no se exportará nada.")
         return
 
     try:
         df['fecha'] = df['fecha'].dt.strftime('%Y-%m-%d')
-
-        try:
-            worksheet = spreadsheet.worksheet(worksheet_name)
-            logging.info(f"Hoja '{worksheet_name}' encontrada. Limpiando contenido...")
-            worksheet.clear()
-        except gspread.exceptions.WorksheetNotFound:
-            logging.info(f"Hoja '{worksheet_name}' no encontrada. Creándola...")
-            worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=len(df) + 1, cols=len(df.columns))
-
-        set_with_dataframe(worksheet, df)
+        escribir_hoja(spreadsheet, worksheet_name, df)
         logging.info(f"✅ Tabla '{worksheet_name}' exportada exitosamente con {len(df)} filas.")
 
     except Exception as e:
@@ -187,8 +145,9 @@ def main():
     df_h['vacaciones_escolares'] = df_h['fecha'].isin(vacaciones_escolares).astype(int)
 
     # --- Exportación ---
-    client = autorizar_gsheets()
-    spreadsheet = client.open(SPREADSHEET_NAME)
+    from comun.cliente_google import abrir_planilla
+
+    spreadsheet = abrir_planilla(SPREADSHEET_NAME)
     export_to_gsheets(df_h, spreadsheet, WORKSHEET_NAME)
 
     logging.info("🏁 Proceso de generación de feriados finalizado.")
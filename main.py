@@ -1,6 +1,8 @@
 import logging
 import sys
 import os
+import argparse
+import importlib
 
 # --- Configuración de Logging ---
 # Asegura que los mensajes se muestren en la consola.
@@ -14,47 +16,130 @@ logging.basicConfig(
 
 # --- Añadir las carpetas del proyecto al path de Python ---
 # Esto permite que main.py encuentre e importe los módulos en las subcarpetas.
-try:
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    sys.path.append(project_root)
-    from generadores.generar_holidays import main as main_holidays
-    from generadores.generar_clima import main as main_clima
-    from generadores.generar_promociones import main as main_promociones
-    from modelo.pronostico_demanda import main as main_forecast
-except ImportError as e:
-    logging.critical(f"❌ Error de importación. Asegúrate de que la estructura de carpetas es correcta y que los archivos __init__.py existen. Error: {e}")
-    sys.exit(1)
-
-
-def run_pipeline():
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_root)
+
+from comun.puntos_control import iniciar_ejecucion, etapa_completa, marcar_etapa
+from comun.perfilado import activar_perfilado, perfilar, guardar_perfiles, PERFILES_A_CONSERVAR
+
+# --- Pasos del pipeline ---
+# Los módulos de cada paso se importan recién al ejecutarlo, para que las ejecuciones parciales
+# (solo generadores, --dry-run) no paguen la importación de Prophet, matplotlib o gspread.
+# (nombre, módulo, mensaje de inicio, mensaje de término)
+PASOS = [
+    ('feriados', 'generadores.generar_holidays',
+     "Iniciando generación de la tabla de Feriados y Eventos", "Tabla de Feriados y Eventos generada exitosamente"),
+    ('clima', 'generadores.generar_clima',
+     "Iniciando generación de la tabla de Clima", "Tabla de Clima generada exitosamente"),
+    ('promociones', 'generadores.generar_promociones',
+     "Iniciando generación de la tabla de Promociones", "Tabla de Promociones generada exitosamente"),
+    ('pronostico', 'modelo.pronostico_demanda',
+     "Iniciando rutina de Pronóstico de Demanda", "Rutina de Pronóstico de Demanda finalizada exitosamente"),
+]
+
+# --- Modo vigilancia (--vigilar): la carpeta de los CSV del POS y los pasos que se re-ejecutan al llegar archivos ---
+# Cada tanda re-ejecuta el paso completo, pero la ingesta solo parsea los CSV nuevos (caché por archivo), el
+# pronóstico solo reentrena las series cuyas entradas cambiaron (caché por huella) y las hojas cuyo contenido no
+# cambió no se reescriben. La reconciliación y el desglose a item sí se rehacen sobre todas las series, y con la
+# exportación continua la hoja por item se reescribe por lotes en cada tanda.
+CARPETA_DATOS = "data"
+PASOS_VIGILANCIA = ['pronostico']
+
+
+def cargar_paso(modulo):
+    """Importa el módulo de un paso y devuelve su función main."""
+    try:
+        return importlib.import_module(modulo).main
+    except ImportError as e:
+        logging.critical(f"❌ Error de importación. Asegúrate de que la estructura de carpetas es correcta y que los archivos __init__.py existen. Error: {e}")
+        raise
+
+
+def registrar_llamadas_google():
+    """Resume las llamadas a Google Sheets del pipeline (todos los pasos comparten el cliente de comun/cliente_google.py)."""
+    cliente_google = sys.modules.get('comun.cliente_google')  # Solo si algún paso lo usó: no se importa gspread aquí
+    resumen = cliente_google.resumen_llamadas() if cliente_google else None
+    if resumen:
+        logging.info(f"📡 Google Sheets: {resumen['solicitudes']} solicitudes, {resumen['reintentos']} reintentos.")
+
+
+def run_pipeline(pasos=None, dry_run=False, reanudar=False, id_ejecucion=None):
     """
     Ejecuta el pipeline completo de generación de datos y pronóstico en el orden correcto.
+    Con 'pasos' se ejecuta solo un subconjunto; con dry_run solo se listan los pasos, sin importarlos.
+    Con 'reanudar' se saltan los pasos (y las series del pronóstico) que ya terminaron en la misma ejecución.
+    Si se activó el perfilado (--perfilar), cada paso se perfila y al final se guardan los perfiles.
     """
+    seleccion = [paso for paso in PASOS if pasos is None or paso[0] in pasos]
+    total = len(PASOS)
+
+    if dry_run:
+        for nombre, modulo, _, _ in seleccion:
+            numero = [p[0] for p in PASOS].index(nombre) + 1
+            logging.info(f"--- PASO {numero}/{total}: '{nombre}' ({modulo}) se ejecutaría ---")
+        return
+
+    iniciar_ejecucion(id_ejecucion, reanudar=reanudar)
+
     try:
-        logging.info("======================================================================")
-        logging.info("--- PASO 1/4: Iniciando generación de la tabla de Feriados y Eventos ---")
-        main_holidays()
-        logging.info("--- PASO 1/4: Tabla de Feriados y Eventos generada exitosamente ---\n")
-
-        logging.info("======================================================================")
-        logging.info("--- PASO 2/4: Iniciando generación de la tabla de Clima ---")
-        main_clima()
-        logging.info("--- PASO 2/4: Tabla de Clima generada exitosamente ---\n")
-
-        logging.info("======================================================================")
-        logging.info("--- PASO 3/4: Iniciando generación de la tabla de Promociones ---")
-        main_promociones()
-        logging.info("--- PASO 3/4: Tabla de Promociones generada exitosamente ---\n")
-
-        logging.info("======================================================================")
-        logging.info("--- PASO 4/4: Iniciando rutina de Pronóstico de Demanda ---")
-        main_forecast()
-        logging.info("--- PASO 4/4: Rutina de Pronóstico de Demanda finalizada exitosamente ---\n")
+        for nombre, modulo, mensaje_inicio, mensaje_fin in seleccion:
+            numero = [p[0] for p in PASOS].index(nombre) + 1
+            logging.info("======================================================================")
+            if etapa_completa(f"paso:{nombre}"):
+                logging.info(f"--- PASO {numero}/{total}: '{nombre}' ya terminó en esta ejecución, se omite ---")
+                continue
+            logging.info(f"--- PASO {numero}/{total}: {mensaje_inicio} ---")
+            with perfilar('etapa', nombre):
+                cargar_paso(modulo)()
+            marcar_etapa(f"paso:{nombre}")
+            logging.info(f"--- PASO {numero}/{total}: {mensaje_fin} ---\n")
 
         logging.info("✅✅✅ PIPELINE COMPLETADO EXITOSAMENTE ✅✅✅")
+        registrar_llamadas_google()
 
     except Exception as e:
         logging.critical(f"❌❌❌ El pipeline falló en un paso crítico: {e}", exc_info=True)
 
+    guardar_perfiles()
+
+
+def vigilar_datos(pasos=None, carpeta=CARPETA_DATOS):
+    """Modo de larga duración: re-ejecuta los pasos cada vez que termina de llegar una tanda de CSV a la carpeta."""
+    from comun.vigilancia import vigilar
+
+    pasos = pasos or PASOS_VIGILANCIA
+    logging.info(f"👀 Modo vigilancia: se ejecutarán {pasos} al llegar archivos nuevos a '{carpeta}' "
+                 f"(Ctrl+C para salir).")
+    vigilar(carpeta, lambda archivos: run_pipeline(pasos=pasos))
+
+
+def parsear_argumentos(argv=None):
+    """Lee las opciones de línea de comandos del pipeline."""
+    parser = argparse.ArgumentParser(description="Pipeline de generación de datos y pronóstico de demanda.")
+    parser.add_argument('--pasos', nargs='+', choices=[p[0] for p in PASOS],
+                        help="Ejecuta solo los pasos indicados (por defecto, todos).")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Lista los pasos que se ejecutarían, sin importarlos ni ejecutarlos.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reanuda la ejecución interrumpida: salta los pasos y series ya terminados.")
+    parser.add_argument('--ejecucion',
+                        help="Identificador de la ejecución (por defecto, la fecha de hoy).")
+    parser.add_argument('--perfilar', nargs='?', type=int, const=PERFILES_A_CONSERVAR, metavar='N',
+                        help="Perfila cada paso y cada serie entrenada (cProfile + tracemalloc) y guarda los N más "
+                             f"lentos y de más memoria en resultados/perfiles (por defecto N={PERFILES_A_CONSERVAR}).")
+    parser.add_argument('--vigilar', action='store_true',
+                        help="Queda vigilando la carpeta de datos y re-ejecuta el pronóstico (o los --pasos "
+                             "indicados) cada vez que llegan CSV nuevos. Cada tanda corre el paso completo: solo se "
+                             "reentrenan las series con entradas nuevas y solo se reescriben las hojas que cambiaron, "
+                             "pero la reconciliación y el desglose se rehacen para todas las series.")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    run_pipeline()
+    args = parsear_argumentos()
+    if args.perfilar:
+        activar_perfilado(top_n=args.perfilar)
+    if args.vigilar:
+        vigilar_datos(pasos=args.pasos)
+    else:
+        run_pipeline(pasos=args.pasos, dry_run=args.dry_run, reanudar=args.resume, id_ejecucion=args.ejecucion)
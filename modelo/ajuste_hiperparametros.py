@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import math
+import random
+import hashlib
+import logging
+import itertools
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+# --- Permite ejecutar el módulo directamente (python modelo/ajuste_hiperparametros.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo.pronostico_demanda import (
+    CARPETA_VENTAS, CARPETA_CACHE, SPREADSHEET_NAME, MIN_DAYS_FOR_PROPHET, RUTA_PARAMETROS_SERIES, BACKEND_PROPHET,
+    VENTANA_ENTRENAMIENTO, cargar_ventas_con_cache, cargar_regresores_externos, huella_serie, regresores_de_tienda
+)
+from modelo.backtest import (
+    HORIZONTE_DIAS, MAX_WORKERS, generar_cortes, _inicializar_worker, _evaluar_serie
+)
+from modelo.panel_compartido import publicar_panel
+from modelo.panel_ventas import claves_series, dias_con_venta, dia_fin, huella_panel, serie_desde_panel
+from modelo.ventana_entrenamiento import recortar_ventana
+from comun.promociones import mascara_aplicabilidad, promociones_inactivas
+from modelo.particiones import (
+    argumentos_particion, filtrar_particion, cargar_tiempos, ruta_con_particion, guardar_parcial, cargar_parciales
+)
+
+# --- Configuración de Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Espacio de búsqueda ---
+ESPACIO_BUSQUEDA = {
+    'changepoint_prior_scale': [0.01, 0.05, 0.1, 0.5],
+    'cap_multiplicador': [1.5, 2.0, 2.5, 3.0],
+    'daily_seasonality': [True, False],
+}
+MODO_BUSQUEDA = 'grilla'  # 'grilla' o 'aleatoria'
+NUM_CANDIDATOS_ALEATORIOS = 12
+SEMILLA = 42
+
+# --- Nivel de ajuste: 'serie' (Tienda-Familia) o 'familia' (un ajuste compartido por todas las tiendas) ---
+NIVEL_AJUSTE = 'serie'
+
+# --- Terminación temprana (successive halving): tras cada corte sobrevive 1/ETA de los candidatos ---
+NUM_CORTES_AJUSTE = 3
+ETA = 3
+
+# --- Caché de evaluaciones para no reentrenar en ejecuciones repetidas ---
+# La clave combina la huella de las entradas de la serie hasta el corte (venta en la ventana de entrenamiento,
+# regresores, versión del modelo, backend y ventana, como huella_serie), la venta real del horizonte con que se
+# mide el error y los parámetros del candidato.
+# Al guardar se descartan las evaluaciones de cortes que ya no se usan.
+RUTA_CACHE_AJUSTE = os.path.join(CARPETA_CACHE, "ajuste_hiperparametros.pkl")
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def generar_candidatos(espacio=ESPACIO_BUSQUEDA, modo=MODO_BUSQUEDA, num_aleatorios=NUM_CANDIDATOS_ALEATORIOS,
+                       semilla=SEMILLA):
+    """Genera la lista de configuraciones candidatas (grilla completa o muestra aleatoria de la grilla)."""
+    claves = list(espacio)
+    grilla = [dict(zip(claves, valores)) for valores in itertools.product(*(espacio[c] for c in claves))]
+    if modo == 'aleatoria' and num_aleatorios < len(grilla):
+        return random.Random(semilla).sample(grilla, num_aleatorios)
+    return grilla
+
+
+def huella_evaluacion(panel, df_regressors, regressor_cols, clave, corte, horizonte_dias,
+                      backend=BACKEND_PROPHET, ventana=VENTANA_ENTRENAMIENTO):
+    """
+    Huella de las entradas de una serie en un corte, sin los parámetros del candidato: la misma que usa la caché
+    de pronósticos (huella_serie) sobre la historia hasta el corte, recortada a la ventana de entrenamiento, más
+    la venta real del horizonte (un CSV tardío o corregido dentro del horizonte cambia el error medido).
+    """
+    location, major_group, family_group = clave
+    hist = recortar_ventana(serie_desde_panel(panel, location, family_group, corte), ventana)
+    inactivas = promociones_inactivas(mascara_aplicabilidad([clave]), clave, regressor_cols)
+    huella = huella_serie(hist, regresores_de_tienda(df_regressors, location), regressor_cols, major_group, {},
+                          periodos=horizonte_dias, inactivas=inactivas, backend=backend, ventana=ventana)
+    desde = dia_fin(panel, corte)
+    real = np.ascontiguousarray(panel['ventas'][panel['pos_tienda'][location], panel['pos_familia'][family_group],
+                                                desde:desde + horizonte_dias], dtype=float)
+    return hashlib.sha1(huella.encode() + real.tobytes()).hexdigest()
+
+
+def _clave_cache(huella, corte, parametros):
+    """Clave estable de una evaluación (huella de las entradas de la serie, corte, parámetros)."""
+    texto = json.dumps([huella, str(corte.date()), parametros], sort_keys=True)
+    return hashlib.sha1(texto.encode()).hexdigest()
+
+
+def _cargar_cache(ruta=RUTA_CACHE_AJUSTE):
+    """Carga las evaluaciones guardadas ({clave: {'corte', 'resultado'}}); ignora las de formato anterior."""
+    cache = pd.read_pickle(ruta) if os.path.exists(ruta) else {}
+    return {clave: valor for clave, valor in cache.items() if isinstance(valor, dict) and 'corte' in valor}
+
+
+def _guardar_cache(cache, cortes, ruta=RUTA_CACHE_AJUSTE):
+    """Guarda las evaluaciones de los cortes actuales para reutilizarlas en la próxima búsqueda."""
+    vigentes = {str(corte.date()) for corte in cortes}
+    cache = {clave: valor for clave, valor in cache.items() if valor['corte'] in vigentes}
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    pd.to_pickle(cache, ruta)
+
+
+def _evaluar_candidato(clave, corte, horizonte_dias, parametros):
+    """Entrena una serie con un candidato en un corte y devuelve (error absoluto, venta real) del horizonte."""
+    df_cmp = _evaluar_serie('prophet', clave, corte, horizonte_dias, parametros=parametros)
+    if df_cmp.empty:
+        return None
+    return float((df_cmp['Pronostico'] - df_cmp['Real']).abs().sum()), float(df_cmp['Real'].sum())
+
+
+def _series_ajustables(panel, primer_corte):
+    """Series con historial suficiente para Prophet antes del primer corte (las demás usan el promedio)."""
+    dias = dias_con_venta(panel, primer_corte)
+    return [(location, major_group, family_group) for location, major_group, family_group in claves_series(panel)
+            if dias[panel['pos_tienda'][location], panel['pos_familia'][family_group]] >= MIN_DAYS_FOR_PROPHET]
+
+
+def _objetivo(clave, nivel):
+    """Clave de persistencia: 'Tienda|Familia' por serie o '*|Familia' por familia."""
+    location, _, family_group = clave
+    return f"*|{family_group}" if nivel == 'familia' else f"{location}|{family_group}"
+
+
+def ajustar_hiperparametros(panel, df_regressors, regressor_cols, candidatos=None, nivel=NIVEL_AJUSTE,
+                            cortes=None, horizonte_dias=HORIZONTE_DIAS, max_workers=MAX_WORKERS, eta=ETA,
+                            particion=None):
+    """
+    Busca la mejor configuración de Prophet por serie o por familia con successive halving:
+    todos los candidatos se evalúan en el primer corte y solo el mejor 1/ETA pasa al siguiente.
+    Con 'particion' (i, N) solo se ajustan los objetivos de esa partición.
+    Devuelve (df_evaluaciones, ganadores).
+    """
+    candidatos = candidatos or generar_candidatos()
+    if cortes is None:
+        cortes = generar_cortes(panel['fechas'][-1], num_cortes=NUM_CORTES_AJUSTE, horizonte_dias=horizonte_dias)
+
+    series = _series_ajustables(panel, cortes[0])
+    grupos = {}
+    for clave in series:
+        grupos.setdefault(_objetivo(clave, nivel), []).append(clave)
+    if particion:
+        tiempos = cargar_tiempos()
+        pesos = {objetivo: sum(tiempos.get('|'.join(clave), 0) for clave in claves)
+                 for objetivo, claves in grupos.items() if any('|'.join(clave) in tiempos for clave in claves)}
+        seleccion = filtrar_particion(grupos, particion, pesos, clave_texto=str)
+        grupos = {objetivo: grupos[objetivo] for objetivo in seleccion}
+    logging.info(f"Ajustando {len(candidatos)} candidatos para {len(grupos)} objetivos ({nivel}) "
+                 f"en {len(cortes)} cortes.")
+
+    ruta_cache = ruta_con_particion(RUTA_CACHE_AJUSTE, particion)
+    cache = _cargar_cache(ruta_cache)
+    sobrevivientes = {objetivo: list(range(len(candidatos))) for objetivo in grupos}
+    acumulado = {}  # (objetivo, idx) -> [error absoluto, venta real, cortes evaluados]
+
+    ruta_panel = publicar_panel(panel, df_regressors, regressor_cols)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_inicializar_worker,
+                             initargs=(ruta_panel,)) as executor:
+        for ronda, corte in enumerate(cortes):
+            huellas = {clave: huella_evaluacion(panel, df_regressors, regressor_cols, clave, corte, horizonte_dias)
+                       for objetivo in sobrevivientes for clave in grupos[objetivo]}
+            futuros = {}
+            for objetivo, indices in sobrevivientes.items():
+                for idx in indices:
+                    acumulado.setdefault((objetivo, idx), [0.0, 0.0, 0])[2] += 1
+                    for clave in grupos[objetivo]:
+                        clave_cache = _clave_cache(huellas[clave], corte, candidatos[idx])
+                        if clave_cache in cache:
+                            resultado = cache[clave_cache]['resultado']
+                            if resultado:
+                                acumulado[(objetivo, idx)][0] += resultado[0]
+                                acumulado[(objetivo, idx)][1] += resultado[1]
+                            continue
+                        futuro = executor.submit(_evaluar_candidato, clave, corte, horizonte_dias, candidatos[idx])
+                        futuros[futuro] = (objetivo, idx, clave_cache)
+
+            logging.info(f"🔁 Ronda {ronda + 1}/{len(cortes)} (corte {corte.date()}): {len(futuros)} entrenamientos.")
+            for futuro in as_completed(futuros):
+                objetivo, idx, clave_cache = futuros[futuro]
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    logging.error(f"❌ Falló una evaluación de '{objetivo}': {e}")
+                    resultado = None
+                cache[clave_cache] = {'corte': str(corte.date()), 'resultado': resultado}
+                if resultado:
+                    acumulado[(objetivo, idx)][0] += resultado[0]
+                    acumulado[(objetivo, idx)][1] += resultado[1]
+
+            if ronda < len(cortes) - 1:
+                for objetivo, indices in sobrevivientes.items():
+                    ordenados = sorted(indices, key=lambda i: _wape(acumulado[(objetivo, i)]))
+                    sobrevivientes[objetivo] = ordenados[:max(1, math.ceil(len(indices) / eta))]
+
+    _guardar_cache(cache, cortes, ruta_cache)
+
+    filas = [{'Objetivo': objetivo, 'Candidato': idx, **candidatos[idx], 'WAPE': _wape(valores),
+              'Cortes Evaluados': valores[2]}
+             for (objetivo, idx), valores in acumulado.items()]
+    df_evaluaciones = pd.DataFrame(filas)
+
+    ganadores = {}
+    for objetivo, indices in sobrevivientes.items():
+        mejor = min(indices, key=lambda i: _wape(acumulado[(objetivo, i)]))
+        wape = _wape(acumulado[(objetivo, mejor)])
+        if math.isfinite(wape):
+            ganadores[objetivo] = {**candidatos[mejor], 'wape': round(wape, 4)}
+    return df_evaluaciones, ganadores
+
+
+def _wape(valores):
+    """WAPE acumulado de un candidato; infinito si no hay venta real para evaluarlo."""
+    error_abs, real = valores[0], valores[1]
+    return error_abs / real if real > 0 else math.inf
+
+
+def guardar_parametros(ganadores, ruta=RUTA_PARAMETROS_SERIES):
+    """Combina los ganadores con la configuración existente para que entrenar_y_pronosticar los use."""
+    parametros = {}
+    if os.path.exists(ruta):
+        with open(ruta, encoding='utf-8') as f:
+            parametros = json.load(f)
+
+    fecha = datetime.today().strftime('%Y-%m-%d')
+    for objetivo, config in ganadores.items():
+        parametros[objetivo] = {**config, 'actualizado': fecha}
+
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(parametros, f, indent=2, ensure_ascii=False, sort_keys=True)
+    logging.info(f"✅ {len(ganadores)} configuraciones ganadoras guardadas en '{ruta}'.")
+
+
+# =============================================================================
+# ------------------------------ EJECUCIÓN PRINCIPAL --------------------------
+# =============================================================================
+
+def main(particion=None, combinar=None):
+    """
+    Función principal que orquesta la búsqueda de hiperparámetros del pronóstico diario.
+    Con 'particion' (i, N) ajusta solo esa partición; con 'combinar' (N) guarda los ganadores de todas.
+    """
+    logging.info("🚀 Iniciando el ajuste de hiperparámetros de Prophet por tienda y familia.")
+
+    _, _, _, panel = cargar_ventas_con_cache(CARPETA_VENTAS)
+    if panel is None:
+        logging.error("El ajuste no puede continuar sin datos de ventas.")
+        return
+
+    if combinar:
+        # Solo se combinan parciales calculados con los mismos datos de ventas
+        ganadores = {}
+        for parcial in cargar_parciales('ajuste', combinar, huella=huella_panel(panel)):
+            ganadores.update(parcial['ganadores'])
+        guardar_parametros(ganadores)
+        logging.info("🏁 Ajuste de hiperparámetros combinado.")
+        return
+
+    from comun.cliente_google import abrir_planilla
+
+    spreadsheet = abrir_planilla(SPREADSHEET_NAME)
+    df_regressors, regressor_cols = cargar_regresores_externos(spreadsheet)
+
+    df_evaluaciones, ganadores = ajustar_hiperparametros(panel, df_regressors, regressor_cols, particion=particion)
+    if particion:
+        guardar_parcial({'evaluaciones': df_evaluaciones, 'ganadores': ganadores}, 'ajuste', particion,
+                        huella=huella_panel(panel))
+        logging.info("🏁 Partición del ajuste terminada; los ganadores se guardan al combinar.")
+        return
+    guardar_parametros(ganadores)
+
+    logging.info("🏁 Ajuste de hiperparámetros finalizado.")
+
+
+if __name__ == "__main__":
+    args = argumentos_particion("Ajuste de hiperparámetros de Prophet del pronóstico diario.")
+    main(particion=args.shard, combinar=args.combinar)
@@ -0,0 +1,332 @@
+import os
+import sqlite3
+import logging
+from datetime import datetime
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from comun.promociones import TIENDA_CADENA
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Archivo histórico de pronósticos (solo se agrega, nunca se reescribe) ---
+# Cada ejecución deja un Parquet por nivel, fecha de ejecución y tienda:
+#   <nivel>/fecha_ejecucion=AAAA-MM-DD/tienda=<tienda>/<id_ejecucion>.parquet
+# y un índice SQLite por (nivel, tienda, familia, item, fecha objetivo) que apunta al archivo y la fila,
+# así una consulta lee solo los grupos de filas que necesita en lugar de recorrer todas las ejecuciones.
+CARPETA_ARCHIVO = os.path.join("resultados", "archivo_pronosticos")
+ARCHIVO_INDICE = "indice.sqlite"
+FILAS_POR_GRUPO = 2048  # Filas por row group del Parquet: la unidad mínima que se lee al consultar
+
+NIVELES = ('diario_familia', 'diario_item', 'semanal_familia', 'semanal_item')
+
+# --- Esquema fijo de cada nivel: todas las tiendas y lotes de una ejecución se escriben con los mismos tipos ---
+# (inferido lote a lote, una columna vacía quedaría como null y los números de item como texto o enteros)
+ESCENARIOS = ['Peor Escenario', 'Escenario Promedio', 'Mejor Escenario']
+COLUMNAS_NIVEL = {
+    'diario_familia': ['Fecha', 'Location Name', 'Major Group Name', 'Family Group Name', *ESCENARIOS, 'Motor'],
+    'diario_item': ['Fecha', 'Location Name', 'Major Group Name', 'Family Group Name', 'Menu Item Number',
+                    'Menu Item Name', 'Demanda', *ESCENARIOS, 'Motor Item'],
+    'semanal_familia': ['Fecha', 'Location Name', 'Major Group Name', 'Family Group Name', 'Demanda', *ESCENARIOS],
+    'semanal_item': ['Fecha', 'Location Name', 'Major Group Name', 'Family Group Name', 'Menu Item Number',
+                     'Menu Item Name', 'Demanda', *ESCENARIOS],
+}
+TIPOS_COLUMNAS = {
+    'Fecha': 'timestamp[ns]', 'Location Name': 'string', 'Major Group Name': 'string',
+    'Family Group Name': 'string', 'Menu Item Number': 'int64', 'Menu Item Name': 'string', 'Demanda': 'float64',
+    'Peor Escenario': 'float64', 'Escenario Promedio': 'float64', 'Mejor Escenario': 'float64', 'Motor': 'string',
+    'Motor Item': 'string',
+}
+COLUMNAS_INDICE = {'Location Name': 'tienda', 'Family Group Name': 'familia', 'Menu Item Number': 'item'}
+
+ESQUEMA_INDICE = """
+CREATE TABLE IF NOT EXISTS ejecuciones (
+    ejecucion TEXT NOT NULL,
+    nivel TEXT NOT NULL,
+    fecha_ejecucion TEXT NOT NULL,
+    filas INTEGER NOT NULL,
+    PRIMARY KEY (ejecucion, nivel)
+);
+CREATE TABLE IF NOT EXISTS archivos (
+    id INTEGER PRIMARY KEY,
+    ruta TEXT NOT NULL UNIQUE,
+    ejecucion TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pronosticos (
+    nivel TEXT NOT NULL,
+    tienda TEXT NOT NULL,
+    familia TEXT NOT NULL,
+    item TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    archivo INTEGER NOT NULL REFERENCES archivos (id),
+    fila INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pronosticos_clave ON pronosticos (nivel, tienda, familia, item, fecha);
+CREATE INDEX IF NOT EXISTS idx_pronosticos_fecha ON pronosticos (nivel, fecha);
+"""
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def _conectar(carpeta):
+    """Abre el índice del archivo (lo crea si no existe)."""
+    os.makedirs(carpeta, exist_ok=True)
+    conexion = sqlite3.connect(os.path.join(carpeta, ARCHIVO_INDICE))
+    conexion.executescript(ESQUEMA_INDICE)
+    return conexion
+
+
+def nuevo_id_ejecucion():
+    """Identificador de ejecución ordenable por fecha y hora (AAAAMMDDTHHMMSS)."""
+    return datetime.now().strftime('%Y%m%dT%H%M%S')
+
+
+def esquema_nivel(nivel):
+    """Esquema de pyarrow con las columnas y tipos fijos de un nivel del archivo."""
+    import pyarrow as pa
+
+    return pa.schema([(columna, pa.type_for_alias(TIPOS_COLUMNAS[columna])) for columna in COLUMNAS_NIVEL[nivel]])
+
+
+def _con_tipos(df, nivel):
+    """Lleva un lote a las columnas y tipos del nivel (las que falten quedan vacías; las demás se descartan)."""
+    df = df.reindex(columns=COLUMNAS_NIVEL[nivel])
+    for columna in df.columns:
+        tipo = TIPOS_COLUMNAS[columna]
+        if tipo == 'string':
+            df[columna] = df[columna].astype(object).map(lambda valor: None if pd.isna(valor) else str(valor))
+        elif tipo == 'int64':
+            df[columna] = pd.to_numeric(df[columna], errors='coerce').astype('Int64')
+        elif tipo == 'float64':
+            df[columna] = pd.to_numeric(df[columna], errors='coerce').astype(float)
+        else:
+            df[columna] = pd.to_datetime(df[columna])
+    return df
+
+
+def _texto_clave(serie):
+    """Texto de una columna de clave para el índice (los números de item se guardan sin decimales)."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype('Int64').astype(str)
+    return serie.astype(str)
+
+
+class ArchivoIncremental:
+    """
+    Escribe una ejecución en el archivo por partes: cada llamada a agregar() suma filas a los Parquet de sus tiendas
+    (row groups completos de FILAS_POR_GRUPO; el resto queda en memoria hasta completar el siguiente) y guarda sus
+    claves para el índice. Nada es visible para las consultas hasta cerrar(): ahí se cierran los Parquet, se
+    renombran a su ruta final y el índice se escribe en una sola transacción corta. descartar() borra lo escrito.
+    Todos los Parquet de un nivel usan su esquema fijo (esquema_nivel).
+    """
+
+    def __init__(self, nivel, id_ejecucion=None, carpeta=CARPETA_ARCHIVO):
+        if nivel not in NIVELES:
+            raise ValueError(f"Nivel de archivo desconocido: '{nivel}'. Opciones: {NIVELES}.")
+        self.nivel, self.carpeta = nivel, carpeta
+        self.id_ejecucion = id_ejecucion or nuevo_id_ejecucion()
+        self.fecha_ejecucion = datetime.strptime(self.id_ejecucion[:8], '%Y%m%d').strftime('%Y-%m-%d')
+        self.filas = 0
+        self._esquema = esquema_nivel(nivel)
+        self._tiendas = {}  # tienda -> {'relativa', 'ruta', 'escritor', 'pendiente': [DataFrame], 'filas', 'indice'}
+
+    def _tienda(self, tienda):
+        """Estado de escritura de una tienda (su Parquet se crea al completar el primer row group)."""
+        if tienda not in self._tiendas:
+            relativa = os.path.join(self.nivel, f"fecha_ejecucion={self.fecha_ejecucion}",
+                                    f"tienda={quote(str(tienda), safe='')}", f"{self.id_ejecucion}.parquet")
+            ruta = os.path.join(self.carpeta, relativa)
+            if os.path.exists(ruta):
+                raise FileExistsError(f"La ejecución '{self.id_ejecucion}' ya está archivada en '{ruta}'.")
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            self._tiendas[tienda] = {'relativa': relativa, 'ruta': ruta, 'escritor': None, 'pendiente': [],
+                                     'filas': 0, 'indice': []}
+        return self._tiendas[tienda]
+
+    def _escribir(self, estado, final=False):
+        """Escribe los row groups completos pendientes de una tienda (y el último incompleto si 'final')."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pendiente = pd.concat(estado['pendiente'], ignore_index=True) if estado['pendiente'] else pd.DataFrame()
+        completas = len(pendiente) if final else len(pendiente) // FILAS_POR_GRUPO * FILAS_POR_GRUPO
+        if completas == 0:
+            estado['pendiente'] = [pendiente] if len(pendiente) else []
+            return
+        if estado['escritor'] is None:
+            estado['escritor'] = pq.ParquetWriter(f"{estado['ruta']}.tmp", self._esquema)
+        tabla = pa.Table.from_pandas(pendiente.iloc[:completas], schema=self._esquema, preserve_index=False)
+        estado['escritor'].write_table(tabla, row_group_size=FILAS_POR_GRUPO)
+        resto = pendiente.iloc[completas:].reset_index(drop=True)
+        estado['pendiente'] = [resto] if len(resto) else []
+
+    def agregar(self, df):
+        """Agrega filas de la ejecución. 'df' debe tener 'Fecha' y 'Family Group Name' (ver archivar_pronosticos)."""
+        if df.empty:
+            return
+        df = df.copy()
+        if 'Location Name' not in df.columns:
+            df.insert(1, 'Location Name', TIENDA_CADENA)
+        df = _con_tipos(df, self.nivel)
+        orden = [c for c in ['Location Name', 'Family Group Name', 'Menu Item Number', 'Fecha'] if c in df.columns]
+        df = df.sort_values(orden, kind='stable').reset_index(drop=True)
+
+        for tienda, grupo in df.groupby('Location Name', sort=False):
+            estado = self._tienda(tienda)
+            grupo = grupo.reset_index(drop=True)
+            claves = {campo: (_texto_clave(grupo[columna]) if columna in grupo.columns
+                              else pd.Series('', index=grupo.index))
+                      for columna, campo in COLUMNAS_INDICE.items()}
+            estado['indice'].append(pd.DataFrame({
+                'nivel': self.nivel, **claves, 'fecha': grupo['Fecha'].dt.strftime('%Y-%m-%d'),
+                'fila': estado['filas'] + np.arange(len(grupo)),
+            }))
+            estado['pendiente'].append(grupo)
+            estado['filas'] += len(grupo)
+            self._escribir(estado)
+        self.filas += len(df)
+
+    def cerrar(self):
+        """Completa los Parquet y confirma el índice. Devuelve el id de la ejecución (None si no se agregó nada)."""
+        if not self._tiendas:
+            logging.warning(f"⚠️ No hay pronósticos '{self.nivel}' para archivar.")
+            return None
+        for estado in self._tiendas.values():
+            self._escribir(estado, final=True)
+            estado['escritor'].close()
+            os.replace(f"{estado['ruta']}.tmp", estado['ruta'])
+
+        with _conectar(self.carpeta) as conexion:
+            for estado in self._tiendas.values():
+                cursor = conexion.execute("INSERT INTO archivos (ruta, ejecucion) VALUES (?, ?)",
+                                          (estado['relativa'], self.id_ejecucion))
+                indice = pd.concat(estado['indice'], ignore_index=True)
+                indice['archivo'] = cursor.lastrowid
+                conexion.executemany(
+                    "INSERT INTO pronosticos (nivel, tienda, familia, item, fecha, archivo, fila) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    indice[['nivel', 'tienda', 'familia', 'item', 'fecha', 'archivo', 'fila']]
+                    .astype({'archivo': int, 'fila': int}).itertuples(index=False, name=None))
+            conexion.execute("INSERT INTO ejecuciones (ejecucion, nivel, fecha_ejecucion, filas) VALUES (?, ?, ?, ?)",
+                             (self.id_ejecucion, self.nivel, self.fecha_ejecucion, self.filas))
+        conexion.close()
+        logging.info(f"🗄️ {self.filas} pronósticos '{self.nivel}' archivados en '{self.carpeta}' "
+                     f"(ejecución {self.id_ejecucion}).")
+        return self.id_ejecucion
+
+    def descartar(self):
+        """Deshace la ejecución a medio escribir: borra los Parquet temporales (el índice aún no se tocó)."""
+        for estado in self._tiendas.values():
+            if estado['escritor'] is not None:
+                estado['escritor'].close()
+            if os.path.exists(f"{estado['ruta']}.tmp"):
+                os.remove(f"{estado['ruta']}.tmp")
+        self._tiendas = {}
+
+
+def archivar_pronosticos(df, nivel, id_ejecucion=None, carpeta=CARPETA_ARCHIVO):
+    """
+    Agrega los pronósticos de una ejecución al archivo: un Parquet por tienda y sus filas al índice.
+    'df' debe tener 'Fecha' y 'Family Group Name'; sin 'Location Name' se archiva como la cadena completa.
+    Se guardan las columnas del nivel (COLUMNAS_NIVEL) con sus tipos fijos.
+    Nunca reemplaza lo archivado; devuelve el id de la ejecución.
+    """
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel de archivo desconocido: '{nivel}'. Opciones: {NIVELES}.")
+    if df.empty:
+        logging.warning(f"⚠️ No hay pronósticos '{nivel}' para archivar.")
+        return None
+
+    archivo = ArchivoIncremental(nivel, id_ejecucion, carpeta)
+    try:
+        archivo.agregar(df)
+        return archivo.cerrar()
+    except Exception:
+        archivo.descartar()
+        raise
+
+
+def ejecuciones_archivadas(nivel=None, carpeta=CARPETA_ARCHIVO):
+    """Ejecuciones archivadas (más reciente primero), opcionalmente de un solo nivel."""
+    if not os.path.exists(os.path.join(carpeta, ARCHIVO_INDICE)):
+        return pd.DataFrame(columns=['ejecucion', 'nivel', 'fecha_ejecucion', 'filas'])
+    with _conectar(carpeta) as conexion:
+        consulta = "SELECT * FROM ejecuciones" + (" WHERE nivel = ?" if nivel else "") + " ORDER BY ejecucion DESC"
+        df = pd.read_sql_query(consulta, conexion, params=[nivel] if nivel else [])
+    conexion.close()
+    return df
+
+
+def _leer_filas(carpeta, archivo, filas):
+    """Lee solo los row groups del Parquet que contienen 'filas' y devuelve esas filas en orden."""
+    import pyarrow.parquet as pq
+
+    filas = np.asarray(filas)
+    grupos = np.unique(filas // FILAS_POR_GRUPO)
+    tabla = pq.ParquetFile(os.path.join(carpeta, archivo)).read_row_groups(grupos.tolist())
+    inicio_grupo = {g: k * FILAS_POR_GRUPO for k, g in enumerate(grupos)}
+    posiciones = [inicio_grupo[f // FILAS_POR_GRUPO] + f % FILAS_POR_GRUPO for f in filas]
+    return tabla.take(posiciones).to_pandas()
+
+
+def consultar_archivo(nivel='diario_item', tienda=None, familia=None, item=None, desde=None, hasta=None,
+                      ejecuciones=None, carpeta=CARPETA_ARCHIVO):
+    """
+    Pronósticos archivados que cumplen los filtros, de todas las ejecuciones (o solo de 'ejecuciones').
+    'desde' y 'hasta' filtran la fecha objetivo; p. ej. todos los pronósticos hechos para un item para el
+    próximo sábado: consultar_archivo(tienda=..., familia=..., item=..., desde=sabado, hasta=sabado).
+    El resultado agrega la columna 'Ejecucion'.
+    """
+    if not os.path.exists(os.path.join(carpeta, ARCHIVO_INDICE)):
+        return pd.DataFrame()
+
+    condiciones, parametros = ["p.nivel = ?"], [nivel]
+    for campo, valor in (('tienda', tienda), ('familia', familia), ('item', item)):
+        if valor is not None:
+            condiciones.append(f"p.{campo} = ?")
+            parametros.append(str(valor))
+    if desde is not None:
+        condiciones.append("p.fecha >= ?")
+        parametros.append(pd.Timestamp(desde).strftime('%Y-%m-%d'))
+    if hasta is not None:
+        condiciones.append("p.fecha <= ?")
+        parametros.append(pd.Timestamp(hasta).strftime('%Y-%m-%d'))
+    if ejecuciones is not None:
+        ejecuciones = [ejecuciones] if isinstance(ejecuciones, str) else list(ejecuciones)
+        condiciones.append(f"a.ejecucion IN ({', '.join('?' * len(ejecuciones))})")
+        parametros.extend(ejecuciones)
+
+    with _conectar(carpeta) as conexion:
+        df_indice = pd.read_sql_query(
+            f"SELECT a.ejecucion, a.ruta AS archivo, p.fila FROM pronosticos p JOIN archivos a ON a.id = p.archivo "
+            f"WHERE {' AND '.join(condiciones)} ORDER BY a.ejecucion, a.ruta, p.fila", conexion, params=parametros)
+    conexion.close()
+    if df_indice.empty:
+        return pd.DataFrame()
+
+    partes = []
+    for (ejecucion, archivo), filas in df_indice.groupby(['ejecucion', 'archivo'], sort=False):
+        df = _leer_filas(carpeta, archivo, filas['fila'].to_numpy())
+        df.insert(0, 'Ejecucion', ejecucion)
+        partes.append(df)
+    return pd.concat(partes, ignore_index=True)
+
+
+def leer_ejecucion(nivel, ejecucion, carpeta=CARPETA_ARCHIVO):
+    """Todos los pronósticos de un nivel de una ejecución, leyendo directo sus Parquet (uno por tienda)."""
+    import pyarrow.parquet as pq
+
+    with _conectar(carpeta) as conexion:
+        rutas = [ruta for (ruta,) in conexion.execute(
+            "SELECT ruta FROM archivos WHERE ejecucion = ? ORDER BY ruta", (ejecucion,))]
+    conexion.close()
+    rutas = [ruta for ruta in rutas if ruta.split(os.sep, 1)[0] == nivel]
+    if not rutas:
+        return pd.DataFrame()
+    return pd.concat([pq.read_table(os.path.join(carpeta, ruta)).to_pandas() for ruta in rutas], ignore_index=True)
@@ -0,0 +1,191 @@
+import logging
+
+import numpy as np
+from prophet import Prophet
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Backends de ajuste de Prophet ---
+# 'cmdstanpy': el de Prophet (escribe los datos en archivos temporales y ejecuta el binario de Stan por ajuste).
+# 'map': optimiza en el mismo proceso el mismo modelo de Stan (máximo a posteriori con L-BFGS-B y gradientes
+# analíticos), sin subprocesos ni archivos. Este módulo importa Prophet: se importa dentro de las funciones.
+BACKENDS = ('cmdstanpy', 'map')
+
+# --- Optimización MAP (mismos criterios de parada que el L-BFGS de Stan) ---
+MAX_ITERACIONES = 10_000
+TOLERANCIA_GRADIENTE = 1e-8
+TOLERANCIA_OBJETIVO = 1e-12
+SIGMA_MINIMO = 1e-10  # sigma_obs es real<lower=0> en el modelo de Stan
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def _tendencia(k, m, delta, datos):
+    """
+    Tendencia del modelo de Stan de Prophet (lineal, logística o plana) y una función que propaga hacia atrás
+    el gradiente respecto a la tendencia: devuelve (trend, retro) con retro(g) -> (dk, dm, ddelta).
+    """
+    t, A, t_change = datos['t'], datos['A'], datos['t_change']
+
+    if datos['trend_indicator'] == 0:
+        trend = (k + A @ delta) * t + (m + A @ (-t_change * delta))
+
+        def retro(g):
+            return (g * t).sum(), g.sum(), A.T @ (g * t) - t_change * (A.T @ g)
+        return trend, retro
+
+    if datos['trend_indicator'] == 2:
+        return np.full(len(t), m), lambda g: (0.0, g.sum(), np.zeros_like(delta))
+
+    # Logística: los desplazamientos gamma mantienen la tendencia continua en cada punto de cambio
+    num_cambios = len(t_change)
+    k_s = k + np.concatenate(([0.0], np.cumsum(delta)))
+    m_previo = np.empty(num_cambios)
+    gamma = np.empty(num_cambios)
+    m_pr = m
+    for i in range(num_cambios):
+        m_previo[i] = m_pr
+        gamma[i] = (t_change[i] - m_pr) * (1 - k_s[i] / k_s[i + 1])
+        m_pr += gamma[i]
+
+    tasa = k + A @ delta
+    desplazamiento = m + A @ gamma
+    sigmoide = 0.5 * (1 + np.tanh(0.5 * tasa * (t - desplazamiento)))
+    trend = datos['cap'] * sigmoide
+
+    def retro(g):
+        g_u = g * datos['cap'] * sigmoide * (1 - sigmoide)
+        g_tasa = g_u * (t - desplazamiento)
+        g_desplazamiento = -g_u * tasa
+        dk, dm = g_tasa.sum(), g_desplazamiento.sum()
+        ddelta = A.T @ g_tasa
+        g_gamma = A.T @ g_desplazamiento
+
+        # Recorrido inverso de la recursión de gamma
+        g_k_s = np.zeros(num_cambios + 1)
+        g_m_siguiente = 0.0
+        for i in reversed(range(num_cambios)):
+            g_i = g_gamma[i] + g_m_siguiente
+            distancia = t_change[i] - m_previo[i]
+            g_k_s[i] -= g_i * distancia / k_s[i + 1]
+            g_k_s[i + 1] += g_i * distancia * k_s[i] / k_s[i + 1] ** 2
+            g_m_siguiente -= g_i * (1 - k_s[i] / k_s[i + 1])
+        dm += g_m_siguiente
+        dk += g_k_s.sum()
+        ddelta = ddelta + np.cumsum(g_k_s[1:][::-1])[::-1]
+        return dk, dm, ddelta
+    return trend, retro
+
+
+def _separar(x, S, K):
+    """Separa el vector de la optimización: delta = delta⁺ − delta⁻ (ambos ≥ 0) para el prior de Laplace."""
+    return x[0], x[1], x[2:2 + S], x[2 + S:2 + 2 * S], x[2 + 2 * S], x[3 + 2 * S:3 + 2 * S + K]
+
+
+def log_posterior_negativo(x, datos):
+    """
+    Menos el log-posterior del modelo de Stan de Prophet (sin constantes, como el 'optimizing' de Stan) y su
+    gradiente analítico. Priors: k, m ~ N(0, 5); delta ~ Laplace(0, tau); sigma_obs ~ N⁺(0, 0.5);
+    beta ~ N(0, sigmas). Verosimilitud: y ~ N(trend · (1 + X_sm·beta) + X_sa·beta, sigma_obs).
+    """
+    S, K = len(datos['t_change']), datos['X'].shape[1]
+    k, m, delta_pos, delta_neg, sigma, beta = _separar(x, S, K)
+    trend, retro = _tendencia(k, m, delta_pos - delta_neg, datos)
+
+    multiplicativo = datos['X_sm'] @ beta
+    residuo = datos['y'] - trend * (1 + multiplicativo) - datos['X_sa'] @ beta
+    suma_cuadrados = residuo @ residuo
+    T = len(residuo)
+
+    lp = (-0.5 * suma_cuadrados / sigma ** 2 - T * np.log(sigma)
+          - (k ** 2 + m ** 2) / 50 - (delta_pos.sum() + delta_neg.sum()) / datos['tau']
+          - 2 * sigma ** 2 - 0.5 * np.sum((beta / datos['sigmas']) ** 2))
+
+    g = residuo / sigma ** 2
+    dk, dm, ddelta = retro(g * (1 + multiplicativo))
+    dbeta = datos['X_sa'].T @ g + datos['X_sm'].T @ (g * trend) - beta / datos['sigmas'] ** 2
+    dsigma = suma_cuadrados / sigma ** 3 - T / sigma - 4 * sigma
+    penalizacion_delta = 1 / datos['tau']
+    gradiente = np.concatenate(([dk - k / 25, dm - m / 25], ddelta - penalizacion_delta, -ddelta - penalizacion_delta,
+                                [dsigma], dbeta))
+    return -lp, -gradiente
+
+
+def preparar_datos(stan_data):
+    """Convierte los datos que Prophet entrega al backend en arreglos NumPy y arma la matriz de puntos de cambio."""
+    datos = {nombre: np.asarray(stan_data[nombre], dtype=float)
+             for nombre in ('y', 't', 'cap', 't_change', 's_a', 's_m', 'sigmas')}
+    datos['X'] = np.asarray(stan_data['X'], dtype=float).reshape(int(stan_data['T']), -1)
+    datos['tau'] = float(stan_data['tau'])
+    datos['trend_indicator'] = int(stan_data['trend_indicator'])
+    datos['A'] = (datos['t'][:, None] >= datos['t_change'][None, :]).astype(float)
+    datos['X_sa'] = datos['X'] * datos['s_a']
+    datos['X_sm'] = datos['X'] * datos['s_m']
+    return datos
+
+
+class BackendMAP:
+    """
+    Backend de Prophet que estima el máximo a posteriori en el mismo proceso, sin Stan ni archivos.
+    Prophet usa el backend por su interfaz (get_type, fit, stan_fit); no implementa el muestreo MCMC, por eso
+    crear_prophet no acepta mcmc_samples > 0 con este backend.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.stan_fit = None
+        self.newton_fallback = False
+
+    @staticmethod
+    def get_type():
+        return 'MAP'
+
+    def cleanup(self):
+        pass
+
+    def fit(self, stan_init, stan_data, **kwargs):
+        from scipy.optimize import minimize
+
+        datos = preparar_datos(stan_data)
+        S, K = len(datos['t_change']), datos['X'].shape[1]
+        delta = np.asarray(stan_init['delta'], dtype=float)
+        x0 = np.concatenate(([stan_init['k'], stan_init['m']], np.maximum(delta, 0), np.maximum(-delta, 0),
+                             [stan_init['sigma_obs']], np.asarray(stan_init['beta'], dtype=float)))
+        limites = [(None, None)] * 2 + [(0, None)] * (2 * S) + [(SIGMA_MINIMO, None)] + [(None, None)] * K
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            resultado = minimize(log_posterior_negativo, x0, args=(datos,), jac=True, method='L-BFGS-B',
+                                 bounds=limites, options={'maxiter': int(kwargs.get('iter', MAX_ITERACIONES)),
+                                                          'gtol': TOLERANCIA_GRADIENTE,
+                                                          'ftol': TOLERANCIA_OBJETIVO})
+        if not np.all(np.isfinite(resultado.x)):
+            raise RuntimeError(f"La optimización MAP no convergió: {resultado.message}")
+        if not resultado.success:
+            logging.debug(f"Optimización MAP terminada sin converger del todo: {resultado.message}")
+        self.stan_fit = resultado
+
+        k, m, delta_pos, delta_neg, sigma, beta = _separar(resultado.x, S, K)
+        trend, _ = _tendencia(k, m, delta_pos - delta_neg, datos)
+        params = {'k': k, 'm': m, 'delta': delta_pos - delta_neg, 'sigma_obs': sigma, 'beta': beta, 'trend': trend}
+        return {nombre: np.asarray(valor, dtype=float).reshape((1, -1)) for nombre, valor in params.items()}
+
+
+class ProphetMAP(Prophet):
+    """Prophet con el backend MAP: no carga cmdstanpy ni el binario de Stan al construirse."""
+
+    def _load_stan_backend(self, stan_backend):
+        self.stan_backend = BackendMAP()
+
+
+def crear_prophet(backend='cmdstanpy', **kwargs):
+    """Crea el modelo Prophet con el backend de ajuste elegido ('cmdstanpy' o 'map')."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de Prophet desconocido: '{backend}'. Opciones: {BACKENDS}.")
+    if backend == 'map' and kwargs.get('mcmc_samples', 0) > 0:
+        raise ValueError("El backend 'map' solo estima el máximo a posteriori: use mcmc_samples=0 o el backend "
+                         "'cmdstanpy' para muestrear.")
+    return ProphetMAP(**kwargs) if backend == 'map' else Prophet(**kwargs)
@@ -0,0 +1,468 @@
+import os
+import sys
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+
+# --- Permite ejecutar el módulo directamente (python modelo/backtest.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo.pronostico_demanda import (
+    CARPETA_VENTAS, SPREADSHEET_NAME, FORECAST_PERIOD_DAYS, DAYS_FOR_REPRESENTATIVENESS, VENTANA_ENTRENAMIENTO,
+    cargar_ventas_con_cache, cargar_regresores_externos, pronosticar_serie, cargar_parametros_series,
+    parametros_para_serie
+)
+from modelo.panel_compartido import publicar_panel, adjuntar_panel, regresores_desde_panel
+from modelo.panel_ventas import (
+    claves_series, dia_fin, serie_desde_panel, familia_desde_panel, ventas_ventana, huella_panel
+)
+from modelo.particiones import (
+    argumentos_particion, filtrar_particion, cargar_tiempos, peso_familia, guardar_parcial, cargar_parciales
+)
+
+# --- Configuración de Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Cortes (rolling origin) ---
+NUM_CORTES = 4
+ESPACIADO_CORTES_DIAS = 7
+HORIZONTE_DIAS = FORECAST_PERIOD_DAYS
+
+# --- Cortes del pronóstico semanal por familia (semanas que empiezan el lunes, como el modelo semanal) ---
+NUM_CORTES_SEMANALES = 4
+ESPACIADO_CORTES_SEMANAS = 4
+HORIZONTE_SEMANAS = 8
+
+# --- Motores a comparar ---
+# 'prophet': la misma lógica diaria (Prophet o promedio si hay poca data), con los parámetros ajustados de
+#            config/parametros_series.json, igual que en producción.
+# 'promedio': siempre el promedio de los últimos 7 días con venta.
+# 'agrupado': un modelo por Familia para toda la cadena, repartido a tiendas por participación reciente.
+# Los motores diarios se comparan sobre las mismas series y cortes (los que todos alcanzaron a evaluar).
+# 'semanal': el pronóstico semanal por familia de la cadena (modelo/pronostico_demanda_semanal.py), con sus
+#            propios cortes y horizonte en semanas; sus métricas se guardan aparte.
+MOTORES_DIARIOS = ['prophet', 'promedio', 'agrupado']
+MOTOR_SEMANAL = 'semanal'
+MOTORES = MOTORES_DIARIOS + [MOTOR_SEMANAL]
+
+# --- Ejecución ---
+MAX_WORKERS = os.cpu_count()
+# Presupuesto blando: al agotarse no se lanzan más tareas, pero las que ya corren terminan (a lo sumo una serie por
+# proceso) y el exceso queda registrado en la columna 'Exceso Segundos' del resumen.
+PRESUPUESTO_SEGUNDOS_POR_MOTOR = None  # None = sin límite; mismo presupuesto para todos los motores
+
+# --- Resultados ---
+CARPETA_RESULTADOS = os.path.join("resultados", "backtest")
+
+# Datos de cada proceso del pool: el panel compartido se adjunta una vez por worker y las tareas solo llevan claves
+_DATOS_WORKER = {}
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def generar_cortes(ultima_fecha, num_cortes=NUM_CORTES, espaciado_dias=ESPACIADO_CORTES_DIAS,
+                   horizonte_dias=HORIZONTE_DIAS):
+    """Genera las fechas de corte, la más reciente deja un horizonte completo de datos reales para evaluar."""
+    ultimo_corte = pd.Timestamp(ultima_fecha) - pd.Timedelta(days=horizonte_dias)
+    return [ultimo_corte - pd.Timedelta(days=espaciado_dias * i) for i in reversed(range(num_cortes))]
+
+
+def generar_cortes_semanales(ultima_fecha, num_cortes=NUM_CORTES_SEMANALES, espaciado_semanas=ESPACIADO_CORTES_SEMANAS,
+                             horizonte_semanas=HORIZONTE_SEMANAS):
+    """
+    Cortes del backtest semanal: el lunes de la última semana de entrenamiento. El más reciente deja un horizonte
+    de semanas completas (de lunes a domingo) con venta real.
+    """
+    ultima_fecha = pd.Timestamp(ultima_fecha)
+    ultimo_lunes_completo = ultima_fecha - pd.Timedelta(days=(ultima_fecha.dayofweek + 1) % 7 + 6)
+    ultimo_corte = ultimo_lunes_completo - pd.Timedelta(weeks=horizonte_semanas)
+    return [ultimo_corte - pd.Timedelta(weeks=espaciado_semanas * i) for i in reversed(range(num_cortes))]
+
+
+def _inicializar_worker(ruta_panel, parametros_series=None):
+    """
+    Adjunta el panel compartido de ventas y regresores en el proceso worker (memmap, sin copia).
+    'parametros_series' son los parámetros ajustados de producción que usa el motor 'prophet' por defecto.
+    """
+    panel = adjuntar_panel(ruta_panel)
+    _DATOS_WORKER['panel'] = panel
+    _DATOS_WORKER['df_regressors'] = regresores_desde_panel(panel)
+    _DATOS_WORKER['regressor_cols'] = panel['regressor_cols']
+    _DATOS_WORKER['parametros_series'] = parametros_series or {}
+
+
+def _real_en_horizonte(panel, location, family_group, corte, horizonte_dias):
+    """Devuelve la venta real diaria del horizonte (corte del panel, con cero en los días sin registro)."""
+    fechas = pd.date_range(start=corte, periods=horizonte_dias + 1, freq='D')[1:]
+    i, j = panel['pos_tienda'][location], panel['pos_familia'][family_group]
+    desde = dia_fin(panel, corte)
+    real = np.zeros(horizonte_dias)
+    tramo = np.asarray(panel['ventas'][i, j, desde:desde + horizonte_dias])
+    real[:len(tramo)] = tramo
+    return pd.DataFrame({'Fecha': fechas, 'Real': real})
+
+
+def _comparar(df_out, location, family_group, corte, horizonte_dias):
+    """Une el pronóstico con la venta real y agrega el horizonte (1..H) de cada fecha."""
+    df_real = _real_en_horizonte(_DATOS_WORKER['panel'], location, family_group, corte, horizonte_dias)
+    df_cmp = pd.merge(df_real, df_out[['Fecha', 'Escenario Promedio']], on='Fecha', how='inner')
+    df_cmp = df_cmp.rename(columns={'Escenario Promedio': 'Pronostico'})
+    df_cmp['Horizonte'] = (df_cmp['Fecha'] - corte).dt.days
+    df_cmp['Corte'] = corte
+    return df_cmp
+
+
+def _evaluar_serie(motor, clave, corte, horizonte_dias, parametros=None, ventana=VENTANA_ENTRENAMIENTO):
+    """
+    Evalúa una serie Tienda-Familia en un corte con el motor 'prophet' o 'promedio' y la ventana indicada.
+    Sin 'parametros' se usan los ajustados de la serie (o de su familia), como en el pronóstico diario.
+    """
+    location, major_group, family_group = clave
+    if parametros is None:
+        parametros = parametros_para_serie(_DATOS_WORKER.get('parametros_series', {}), location, family_group)
+    hist = serie_desde_panel(_DATOS_WORKER['panel'], location, family_group, corte)
+    df_out, motor_usado = pronosticar_serie(location, major_group, family_group, hist,
+                                            _DATOS_WORKER['df_regressors'], _DATOS_WORKER['regressor_cols'],
+                                            motor='auto' if motor == 'prophet' else motor,
+                                            periodos=horizonte_dias, parametros=parametros, ventana=ventana)
+    if df_out is None:
+        return pd.DataFrame()
+
+    df_cmp = _comparar(df_out, location, family_group, corte, horizonte_dias)
+    df_cmp['Location Name'] = location
+    df_cmp['Major Group Name'] = major_group
+    df_cmp['Family Group Name'] = family_group
+    df_cmp['Motor'] = motor
+    df_cmp['Motor Usado'] = motor_usado
+    return df_cmp
+
+
+def _evaluar_familia_agrupada(clave, corte, horizonte_dias):
+    """
+    Evalúa el motor 'agrupado': un pronóstico de cadena por Familia repartido a tiendas por participación.
+    Se evalúan todas las tiendas con historial de la familia (las sin venta reciente reciben 0), igual que los
+    motores por serie.
+    """
+    major_group, family_group = clave
+    panel = _DATOS_WORKER['panel']
+    hist = familia_desde_panel(panel, family_group, corte)
+    hist_cadena = hist.groupby('ds', as_index=False)['Venta Real'].sum()
+
+    parametros = parametros_para_serie(_DATOS_WORKER.get('parametros_series', {}), 'Cadena', family_group)
+    df_out, motor_usado = pronosticar_serie('Cadena', major_group, family_group, hist_cadena,
+                                            _DATOS_WORKER['df_regressors'], _DATOS_WORKER['regressor_cols'],
+                                            periodos=horizonte_dias, parametros=parametros)
+    if df_out is None:
+        return pd.DataFrame()
+
+    j = panel['pos_familia'][family_group]
+    ventas_recientes = ventas_ventana(panel, corte, DAYS_FOR_REPRESENTATIVENESS)[:, j]
+    total_reciente = ventas_recientes.sum()
+    participacion = {location: ventas_recientes[i] / total_reciente if total_reciente > 0 else 0.0
+                     for i, location in enumerate(panel['tiendas']) if panel['inicio'][i, j] >= 0}
+
+    resultados = []
+    for location, share in participacion.items():
+        df_tienda = df_out[['Fecha']].copy()
+        df_tienda['Escenario Promedio'] = (df_out['Escenario Promedio'] * share).round()
+        df_cmp = _comparar(df_tienda, location, family_group, corte, horizonte_dias)
+        df_cmp['Location Name'] = location
+        df_cmp['Major Group Name'] = major_group
+        df_cmp['Family Group Name'] = family_group
+        df_cmp['Motor'] = 'agrupado'
+        df_cmp['Motor Usado'] = motor_usado
+        resultados.append(df_cmp)
+    return pd.concat(resultados, ignore_index=True)
+
+
+def semanas_familia(panel, family_group, fin=None):
+    """
+    Venta semanal de la cadena de una familia hasta 'fin', en semanas que empiezan el lunes como en el pronóstico
+    semanal (con ceros en las semanas sin venta).
+    """
+    hasta = dia_fin(panel, fin)
+    diaria = pd.Series(np.asarray(panel['ventas'][:, panel['pos_familia'][family_group], :hasta]).sum(axis=0),
+                       index=panel['fechas'][:hasta])
+    semanal = diaria.groupby(diaria.index - pd.to_timedelta(diaria.index.dayofweek, unit='D')).sum()
+    return pd.DataFrame({'ds': semanal.index, 'Major Group Name': panel['major_por_familia'][family_group],
+                         'Family Group Name': family_group, 'Venta Real': semanal.to_numpy()})
+
+
+def _evaluar_familia_semanal(clave, corte, horizonte_semanas):
+    """
+    Evalúa el pronóstico semanal de una familia: entrena con las semanas hasta el lunes 'corte' (solo las que
+    tienen venta, como la agregación del pronóstico semanal) y compara las 'horizonte_semanas' siguientes.
+    """
+    from modelo.pronostico_demanda_semanal import entrenar_y_pronosticar as entrenar_semanal
+
+    _, family_group = clave
+    fin_horizonte = corte + pd.Timedelta(weeks=horizonte_semanas, days=6)
+    semanal = semanas_familia(_DATOS_WORKER['panel'], family_group, fin_horizonte)
+    entrenamiento = semanal[(semanal['ds'] <= corte) & (semanal['Venta Real'] > 0)]
+    if entrenamiento.empty:
+        return pd.DataFrame()
+    df_out = entrenar_semanal(entrenamiento)
+    if df_out.empty:
+        return pd.DataFrame()
+
+    fechas = pd.date_range(start=corte, periods=horizonte_semanas + 1, freq='W-MON')[1:]
+    real = semanal.set_index('ds')['Venta Real'].reindex(fechas, fill_value=0)
+    df_cmp = pd.merge(pd.DataFrame({'Fecha': fechas, 'Real': real.to_numpy()}),
+                      df_out[['Fecha', 'Escenario Promedio']], on='Fecha', how='inner')
+    df_cmp = df_cmp.rename(columns={'Escenario Promedio': 'Pronostico'})
+    df_cmp['Horizonte'] = (df_cmp['Fecha'] - corte).dt.days // 7
+    df_cmp['Corte'] = corte
+    df_cmp['Location Name'] = 'Cadena'
+    df_cmp['Major Group Name'] = semanal['Major Group Name'].iloc[0]
+    df_cmp['Family Group Name'] = family_group
+    df_cmp['Motor'] = MOTOR_SEMANAL
+    df_cmp['Motor Usado'] = 'prophet' if 'yhat' in df_out.columns and df_out['yhat'].notna().any() else 'promedio'
+    return df_cmp
+
+
+def _evaluar_tarea(motor, clave, corte, horizonte):
+    """Punto de entrada de cada tarea del pool ('horizonte' en semanas para el motor semanal, en días si no)."""
+    if motor == 'agrupado':
+        return _evaluar_familia_agrupada(clave, corte, horizonte)
+    if motor == MOTOR_SEMANAL:
+        return _evaluar_familia_semanal(clave, corte, horizonte)
+    return _evaluar_serie(motor, clave, corte, horizonte)
+
+
+def _tareas_por_motor(panel, motor, cortes, particion=None):
+    """
+    Lista las tareas (motor, clave, corte) de un motor: por serie, o por familia si es agrupado o semanal.
+    Con 'particion' (i, N) solo las de esa partición, repartidas por tiempo de ajuste histórico.
+    """
+    claves = claves_series(panel)
+    tiempos = cargar_tiempos() if particion else {}
+    if motor in ('agrupado', MOTOR_SEMANAL):
+        claves = sorted({(major_group, family_group) for _, major_group, family_group in claves})
+        claves = filtrar_particion(claves, particion, peso_familia(tiempos))
+    else:
+        claves = filtrar_particion(claves, particion, tiempos)
+    return [(motor, clave, corte) for clave in claves for corte in cortes]
+
+
+def ejecutar_backtest(panel, df_regressors, regressor_cols, motores=MOTORES, cortes=None,
+                      horizonte_dias=HORIZONTE_DIAS, max_workers=MAX_WORKERS,
+                      presupuesto_segundos=PRESUPUESTO_SEGUNDOS_POR_MOTOR, particion=None, parametros_series=None,
+                      cortes_semanales=None, horizonte_semanas=HORIZONTE_SEMANAS):
+    """
+    Ejecuta el backtest rolling-origin de cada motor en un pool de procesos (series × cortes).
+    Cada motor recibe el mismo presupuesto de tiempo. Es un presupuesto blando: al agotarse se cancelan las tareas
+    que aún no empezaron y se espera a las que están corriendo (sus resultados se cuentan); el exceso sobre el
+    presupuesto se informa en el log y en 'Exceso Segundos'.
+    Con 'particion' (i, N) solo se evalúan las series de esa partición.
+    'parametros_series' son los parámetros ajustados (por defecto los de config/parametros_series.json).
+    El motor semanal usa 'cortes_semanales' y 'horizonte_semanas'.
+    Devuelve (df_detalle, df_resumen_motores).
+    """
+    if cortes is None:
+        cortes = generar_cortes(panel['fechas'][-1], horizonte_dias=horizonte_dias)
+    if cortes_semanales is None:
+        cortes_semanales = generar_cortes_semanales(panel['fechas'][-1], horizonte_semanas=horizonte_semanas)
+    if parametros_series is None:
+        parametros_series = cargar_parametros_series()
+    logging.info(f"Cortes del backtest: {[c.strftime('%Y-%m-%d') for c in cortes]}")
+    if MOTOR_SEMANAL in motores:
+        logging.info(f"Cortes del backtest semanal: {[c.strftime('%Y-%m-%d') for c in cortes_semanales]}")
+
+    ruta_panel = publicar_panel(panel, df_regressors, regressor_cols)
+
+    detalle, resumen = [], []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_inicializar_worker,
+                             initargs=(ruta_panel, parametros_series)) as executor:
+        for motor in motores:
+            semanal = motor == MOTOR_SEMANAL
+            tareas = _tareas_por_motor(panel, motor, cortes_semanales if semanal else cortes, particion)
+            horizonte = horizonte_semanas if semanal else horizonte_dias
+            logging.info(f"🚀 Backtest del motor '{motor}': {len(tareas)} tareas en {max_workers} procesos.")
+            inicio = time.perf_counter()
+            limite = inicio + presupuesto_segundos if presupuesto_segundos else None
+
+            pendientes = {executor.submit(_evaluar_tarea, m, clave, corte, horizonte) for m, clave, corte in tareas}
+            completadas, fallidas = 0, 0
+            while pendientes:
+                timeout = max(0.0, limite - time.perf_counter()) if limite else None
+                listas, pendientes = wait(pendientes, timeout=timeout, return_when=FIRST_COMPLETED)
+                for futuro in listas:
+                    try:
+                        df_cmp = futuro.result()
+                        completadas += 1
+                        if not df_cmp.empty:
+                            detalle.append(df_cmp)
+                    except Exception as e:
+                        fallidas += 1
+                        logging.error(f"❌ Falló una tarea del backtest del motor '{motor}': {e}")
+                if limite and time.perf_counter() >= limite and pendientes:
+                    canceladas = {futuro for futuro in pendientes if futuro.cancel()}
+                    pendientes -= canceladas
+                    logging.warning(f"⏱️ Presupuesto agotado para '{motor}': {len(canceladas)} tareas sin evaluar; "
+                                    f"se espera a las {len(pendientes)} que ya estaban en curso.")
+                    limite = None
+
+            duracion = time.perf_counter() - inicio
+            exceso = max(0.0, duracion - presupuesto_segundos) if presupuesto_segundos else 0.0
+            if exceso > 0:
+                logging.warning(f"⏱️ El motor '{motor}' se pasó {exceso:.1f} s del presupuesto de "
+                                f"{presupuesto_segundos} s terminando las tareas en curso.")
+            resumen.append({'Motor': motor, 'Tareas': len(tareas), 'Completadas': completadas,
+                            'Fallidas': fallidas, 'Cobertura': completadas / len(tareas) if tareas else 0,
+                            'Segundos': round(duracion, 1), 'Exceso Segundos': round(exceso, 1)})
+            logging.info(f"✅ Motor '{motor}': {completadas}/{len(tareas)} tareas en {duracion:.1f} s.")
+
+    df_detalle = pd.concat(detalle, ignore_index=True) if detalle else pd.DataFrame()
+    return df_detalle, pd.DataFrame(resumen)
+
+
+def calcular_metricas(df_detalle, niveles):
+    """Calcula MAPE, WAPE y sesgo por motor y por los niveles indicados."""
+    df = df_detalle.assign(Error=df_detalle['Pronostico'] - df_detalle['Real'],
+                           ErrorAbs=(df_detalle['Pronostico'] - df_detalle['Real']).abs())
+    df['APE'] = np.where(df['Real'] > 0, df['ErrorAbs'] / df['Real'].where(df['Real'] > 0), np.nan)
+
+    agg = df.groupby(['Motor'] + niveles).agg(
+        Real=('Real', 'sum'), Error=('Error', 'sum'), ErrorAbs=('ErrorAbs', 'sum'),
+        MAPE=('APE', 'mean'), Observaciones=('Real', 'size')
+    ).reset_index()
+    agg['WAPE'] = np.where(agg['Real'] > 0, agg['ErrorAbs'] / agg['Real'], np.nan)
+    agg['Sesgo'] = np.where(agg['Real'] > 0, agg['Error'] / agg['Real'], np.nan)
+    return agg[['Motor'] + niveles + ['MAPE', 'WAPE', 'Sesgo', 'Observaciones']]
+
+
+def tabla_resultados(df_detalle):
+    """Arma la tabla compacta de métricas: global, por tienda, por familia y por horizonte."""
+    tablas = []
+    niveles = {
+        'Global': [],
+        'Tienda': ['Location Name'],
+        'Familia': ['Major Group Name', 'Family Group Name'],
+        'Horizonte': ['Horizonte'],
+    }
+    for nombre, columnas in niveles.items():
+        if columnas:
+            df_met = calcular_metricas(df_detalle, columnas)
+            df_met['Clave'] = df_met[columnas].astype(str).agg(' | '.join, axis=1)
+        else:
+            df_met = calcular_metricas(df_detalle.assign(_todo='Total'), ['_todo']).rename(columns={'_todo': 'Clave'})
+        df_met['Nivel'] = nombre
+        tablas.append(df_met[['Nivel', 'Clave', 'Motor', 'MAPE', 'WAPE', 'Sesgo', 'Observaciones']])
+    return pd.concat(tablas, ignore_index=True)
+
+
+def series_comunes(df_detalle, claves=('Location Name', 'Family Group Name', 'Corte')):
+    """
+    Deja solo las series y cortes que evaluaron todos los motores, para que las métricas se comparen sobre el
+    mismo conjunto (un motor puede no evaluar una serie por falta de historia, por fallar o por el presupuesto).
+    """
+    claves = list(claves)
+    motores = df_detalle['Motor'].unique()
+    evaluadas = df_detalle[claves + ['Motor']].drop_duplicates()
+    conteo = evaluadas.groupby(claves, observed=True)['Motor'].nunique()
+    comunes = conteo[conteo == len(motores)].index
+    descartadas = evaluadas[~pd.MultiIndex.from_frame(evaluadas[claves]).isin(comunes)]['Motor'].value_counts()
+    for motor, cantidad in descartadas.items():
+        logging.info(f"Motor '{motor}': {cantidad} series-corte fuera de la comparación (no las evaluaron todos "
+                     f"los motores).")
+    return df_detalle[pd.MultiIndex.from_frame(df_detalle[claves]).isin(comunes)]
+
+
+def guardar_resultados(df_detalle, df_resumen, carpeta=CARPETA_RESULTADOS):
+    """
+    Guarda la tabla compacta de métricas y el resumen de ejecución por motor. Los motores diarios se comparan
+    sobre las series y cortes comunes; el semanal (otro nivel y horizonte en semanas) va en su propio archivo.
+    """
+    if df_detalle.empty:
+        logging.warning("⚠️ El backtest no produjo resultados para guardar.")
+        return None
+
+    os.makedirs(carpeta, exist_ok=True)
+    es_semanal = df_detalle['Motor'] == MOTOR_SEMANAL
+    df_semanal = df_detalle[es_semanal]
+    if not df_semanal.empty:
+        ruta_semanal = os.path.join(carpeta, "metricas_backtest_semanal.csv")
+        tabla_resultados(df_semanal).round(4).to_csv(ruta_semanal, index=False)
+        logging.info(f"✅ Métricas del backtest semanal guardadas en: {ruta_semanal}")
+
+    df_resumen.to_csv(os.path.join(carpeta, "resumen_motores.csv"), index=False)
+    df_diario = series_comunes(df_detalle[~es_semanal]) if not es_semanal.all() else df_detalle.iloc[:0]
+    if df_diario.empty:
+        return tabla_resultados(df_semanal) if not df_semanal.empty else None
+    df_metricas = tabla_resultados(df_diario)
+    ruta_metricas = os.path.join(carpeta, "metricas_backtest.csv")
+    df_metricas.round(4).to_csv(ruta_metricas, index=False)
+    logging.info(f"✅ Métricas del backtest guardadas en: {ruta_metricas}")
+    return df_metricas
+
+
+# =============================================================================
+# ------------------------------ EJECUCIÓN PRINCIPAL --------------------------
+# =============================================================================
+
+def combinar_resumenes(resumenes):
+    """Suma las tareas de cada motor entre particiones; el tiempo y el exceso son los de la partición más lenta."""
+    df = pd.concat(resumenes, ignore_index=True).groupby('Motor', sort=False).agg(
+        Tareas=('Tareas', 'sum'), Completadas=('Completadas', 'sum'), Fallidas=('Fallidas', 'sum'),
+        Segundos=('Segundos', 'max'), Exceso_Segundos=('Exceso Segundos', 'max')).reset_index()
+    df['Cobertura'] = np.where(df['Tareas'] > 0, df['Completadas'] / df['Tareas'], 0)
+    df = df.rename(columns={'Exceso_Segundos': 'Exceso Segundos'})
+    return df[['Motor', 'Tareas', 'Completadas', 'Fallidas', 'Cobertura', 'Segundos', 'Exceso Segundos']]
+
+
+def main(particion=None, combinar=None):
+    """
+    Función principal que orquesta el backtest de los pronósticos diarios.
+    Con 'particion' (i, N) evalúa solo esa partición y guarda el parcial; con 'combinar' (N) une los parciales.
+    """
+    logging.info("🚀 Iniciando el backtest rolling-origin del pronóstico diario por tienda y familia y del semanal "
+                 "por familia.")
+
+    _, _, _, panel = cargar_ventas_con_cache(CARPETA_VENTAS)
+    if panel is None:
+        logging.error("El backtest no puede continuar sin datos de ventas.")
+        return
+
+    if combinar:
+        # Solo se combinan parciales calculados con los mismos datos de ventas
+        parciales = cargar_parciales('backtest', combinar, huella=huella_panel(panel))
+        detalles = [parcial['detalle'] for parcial in parciales if not parcial['detalle'].empty]
+        df_detalle = pd.concat(detalles, ignore_index=True) if detalles else pd.DataFrame()
+        df_metricas = guardar_resultados(df_detalle, combinar_resumenes([parcial['resumen'] for parcial in parciales]))
+        if df_metricas is not None:
+            logging.info("\n" + df_metricas[df_metricas['Nivel'] == 'Global'].to_string(index=False))
+        logging.info("🏁 Backtest combinado.")
+        return
+
+    from comun.cliente_google import abrir_planilla
+
+    spreadsheet = abrir_planilla(SPREADSHEET_NAME)
+    df_regressors, regressor_cols = cargar_regresores_externos(spreadsheet)
+
+    df_detalle, df_resumen = ejecutar_backtest(panel, df_regressors, regressor_cols, particion=particion)
+    if particion:
+        guardar_parcial({'detalle': df_detalle, 'resumen': df_resumen}, 'backtest', particion,
+                        huella=huella_panel(panel))
+        logging.info("🏁 Partición del backtest terminada; las métricas se calculan al combinar.")
+        return
+
+    df_metricas = guardar_resultados(df_detalle, df_resumen)
+
+    if df_metricas is not None:
+        logging.info("\n" + df_metricas[df_metricas['Nivel'] == 'Global'].to_string(index=False))
+
+    logging.info("🏁 Backtest finalizado.")
+
+
+if __name__ == "__main__":
+    args = argumentos_particion("Backtest rolling-origin del pronóstico diario.")
+    main(particion=args.shard, combinar=args.combinar)
@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+# --- Permite ejecutar el módulo directamente (python modelo/benchmark_ventana.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo.pronostico_demanda import (
+    CARPETA_VENTAS, SPREADSHEET_NAME, DAYS_FOR_REPRESENTATIVENESS, cargar_ventas_con_cache, cargar_regresores_externos
+)
+from modelo.backtest import (
+    HORIZONTE_DIAS, MAX_WORKERS, _DATOS_WORKER, generar_cortes, _inicializar_worker, _evaluar_serie, calcular_metricas
+)
+from modelo.ajuste_hiperparametros import _series_ajustables
+from modelo.panel_compartido import publicar_panel
+from modelo.panel_ventas import serie_desde_panel, ventas_ventana
+from modelo.ventana_entrenamiento import VENTANA_ADAPTATIVA, recortar_ventana, describir_ventana
+
+# --- Configuración de Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Ventanas a comparar (años, 'adaptativa' o None = todo el historial) ---
+# Cada ventana entrena las mismas series en los mismos cortes; se compara el tiempo de ajuste y predicción
+# contra la precisión del backtest, para elegir VENTANA_ENTRENAMIENTO en modelo/pronostico_demanda.py.
+VENTANAS_BENCHMARK = [1, 2, 3, 4, VENTANA_ADAPTATIVA, None]
+
+# --- Muestra: las series de mayor venta reciente con historial suficiente para Prophet ---
+MAX_SERIES_BENCHMARK = 40  # None = todas
+NUM_CORTES_BENCHMARK = 2
+
+# --- Resultados ---
+CARPETA_RESULTADOS = os.path.join("resultados", "benchmark_ventana")
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def _evaluar_con_ventana(clave, corte, horizonte_dias, ventana):
+    """Evalúa una serie con una ventana; devuelve (comparación con la venta real, segundos, días entrenados)."""
+    location, _, family_group = clave
+    hist = serie_desde_panel(_DATOS_WORKER['panel'], location, family_group, corte)
+    dias = len(recortar_ventana(hist, ventana))
+
+    inicio = time.perf_counter()
+    df_cmp = _evaluar_serie('prophet', clave, corte, horizonte_dias, ventana=ventana)
+    return df_cmp, time.perf_counter() - inicio, dias
+
+
+def seleccionar_series(panel, primer_corte, max_series=MAX_SERIES_BENCHMARK):
+    """Series ajustables con Prophet, de mayor a menor venta reciente (las 'max_series' primeras)."""
+    series = _series_ajustables(panel, primer_corte)
+    ventas = ventas_ventana(panel, primer_corte, DAYS_FOR_REPRESENTATIVENESS)
+    series = sorted(series, key=lambda clave: -ventas[panel['pos_tienda'][clave[0]], panel['pos_familia'][clave[2]]])
+    return series[:max_series] if max_series else series
+
+
+def ejecutar_benchmark(panel, df_regressors, regressor_cols, ventanas=VENTANAS_BENCHMARK, series=None, cortes=None,
+                       horizonte_dias=HORIZONTE_DIAS, max_workers=MAX_WORKERS):
+    """
+    Entrena las series con cada ventana en cada corte (pool de procesos sobre el panel compartido).
+    Las tareas de todas las ventanas se intercalan, así la carga de la máquina las afecta por igual.
+    Devuelve (df_detalle, df_costos): la comparación diaria con la venta real y el costo de cada entrenamiento.
+    """
+    if cortes is None:
+        cortes = generar_cortes(panel['fechas'][-1], num_cortes=NUM_CORTES_BENCHMARK, horizonte_dias=horizonte_dias)
+    if series is None:
+        series = seleccionar_series(panel, cortes[0])
+    tareas = [(clave, corte, ventana) for clave in series for corte in cortes for ventana in ventanas]
+    logging.info(f"🚀 Benchmark de {len(ventanas)} ventanas: {len(series)} series × {len(cortes)} cortes "
+                 f"= {len(tareas)} entrenamientos en {max_workers} procesos.")
+
+    ruta_panel = publicar_panel(panel, df_regressors, regressor_cols)
+
+    detalle, costos = [], []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_inicializar_worker,
+                             initargs=(ruta_panel,)) as executor:
+        futuros = {executor.submit(_evaluar_con_ventana, clave, corte, horizonte_dias, ventana):
+                   (clave, corte, ventana) for clave, corte, ventana in tareas}
+        for futuro in as_completed(futuros):
+            clave, corte, ventana = futuros[futuro]
+            try:
+                df_cmp, segundos, dias = futuro.result()
+            except Exception as e:
+                logging.error(f"❌ Falló el entrenamiento de '{' - '.join(clave)}' con ventana "
+                              f"{describir_ventana(ventana)}: {e}")
+                continue
+            if df_cmp.empty:
+                continue
+            nombre = describir_ventana(ventana)
+            detalle.append(df_cmp.assign(Motor=nombre))
+            costos.append({'Ventana': nombre, 'Location Name': clave[0], 'Family Group Name': clave[2],
+                           'Corte': corte, 'Motor Usado': df_cmp['Motor Usado'].iloc[0],
+                           'Dias Entrenamiento': dias, 'Segundos': round(segundos, 3)})
+
+    df_detalle = pd.concat(detalle, ignore_index=True) if detalle else pd.DataFrame()
+    return df_detalle, pd.DataFrame(costos)
+
+
+def resumir_benchmark(df_detalle, df_costos, ventanas=VENTANAS_BENCHMARK):
+    """
+    Una fila por ventana: días entrenados, segundos por serie y totales, y las métricas del backtest.
+    Los tiempos y el WAPE se comparan con los de todo el historial, si está entre las ventanas.
+    """
+    costo = df_costos.groupby('Ventana').agg(
+        Entrenamientos=('Segundos', 'size'), Dias_Entrenamiento=('Dias Entrenamiento', 'mean'),
+        Segundos_por_Serie=('Segundos', 'mean'), Segundos_p95=('Segundos', lambda s: s.quantile(0.95)),
+        Segundos_Totales=('Segundos', 'sum'))
+    metricas = calcular_metricas(df_detalle, []).rename(columns={'Motor': 'Ventana'}).set_index('Ventana')
+    df = costo.join(metricas[['MAPE', 'WAPE', 'Sesgo']], how='left')
+    df = df.reindex([describir_ventana(v) for v in ventanas if describir_ventana(v) in df.index])
+    df.columns = [columna.replace('_', ' ') for columna in df.columns]
+
+    referencia = describir_ventana(None)
+    if referencia in df.index:
+        df['Costo Relativo'] = df['Segundos Totales'] / df.loc[referencia, 'Segundos Totales']
+        df['Delta WAPE'] = df['WAPE'] - df.loc[referencia, 'WAPE']
+    return df.reset_index()
+
+
+def guardar_resultados(df_resumen, df_costos, carpeta=CARPETA_RESULTADOS):
+    """Guarda el resumen por ventana y el costo de cada entrenamiento."""
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_resumen = os.path.join(carpeta, "resumen_ventanas.csv")
+    df_resumen.round(4).to_csv(ruta_resumen, index=False)
+    df_costos.to_csv(os.path.join(carpeta, "costos_ventanas.csv"), index=False)
+    logging.info(f"✅ Benchmark de ventanas guardado en: {ruta_resumen}")
+
+
+# =============================================================================
+# ------------------------------ EJECUCIÓN PRINCIPAL --------------------------
+# =============================================================================
+
+def main():
+    """Función principal que compara el costo y la precisión de las ventanas de entrenamiento."""
+    logging.info("🚀 Iniciando el benchmark de ventanas de entrenamiento del pronóstico diario.")
+
+    from comun.cliente_google import abrir_planilla
+
+    spreadsheet = abrir_planilla(SPREADSHEET_NAME)
+
+    _, _, _, panel = cargar_ventas_con_cache(CARPETA_VENTAS)
+    df_regressors, regressor_cols = cargar_regresores_externos(spreadsheet)
+
+    if panel is None:
+        logging.error("El benchmark no puede continuar sin datos de ventas.")
+        return
+
+    df_detalle, df_costos = ejecutar_benchmark(panel, df_regressors, regressor_cols)
+    if df_detalle.empty:
+        logging.warning("⚠️ El benchmark no produjo resultados.")
+        return
+
+    df_resumen = resumir_benchmark(df_detalle, df_costos)
+    guardar_resultados(df_resumen, df_costos)
+    logging.info("\n" + df_resumen.round(3).to_string(index=False))
+
+    logging.info("🏁 Benchmark de ventanas finalizado.")
+
+
+if __name__ == "__main__":
+    main()
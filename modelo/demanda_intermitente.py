@@ -0,0 +1,201 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Demanda intermitente por Tienda-Item ---
+# Los items de venta esporádica (tortas enteras, productos de temporada) se pronostican con Croston/SBA/TSB
+# sobre una matriz densa Tienda-Item × Día, todas las series a la vez. El resto sigue la representatividad.
+METODO_INTERMITENTE = 'sba'  # 'croston', 'sba' (Syntetos-Boylan) o 'tsb' (Teunter-Syntetos-Babai)
+ALFA_INTERMITENTE = 0.1  # Suavizamiento del tamaño de la demanda (y del intervalo en Croston/SBA)
+BETA_INTERMITENTE = 0.1  # Suavizamiento de la probabilidad de demanda (TSB)
+DIAS_HISTORIA_INTERMITENTE = 182
+# Croston y SBA solo actualizan la tasa en los días con venta: un item discontinuado la conservaría para siempre.
+# Los items sin venta en los últimos DIAS_OBSOLESCENCIA_INTERMITENTE días dejan de pronosticarse como intermitentes
+# (quedan con la representatividad, que ya es 0 porque no vendieron en la ventana de DAYS_FOR_REPRESENTATIVENESS).
+DIAS_OBSOLESCENCIA_INTERMITENTE = 56
+
+# --- Clasificación Syntetos-Boylan: intervalo medio entre demandas (ADI) y variabilidad del tamaño (CV²) ---
+UMBRAL_ADI = 1.32
+UMBRAL_CV2 = 0.49
+MIN_DEMANDAS_INTERMITENTE = 2
+
+CLAVES_ITEM = ['Location Name', 'Family Group Name', 'Menu Item Number', 'Menu Item Name']
+COLUMNAS_ESCENARIOS = ['Peor Escenario', 'Escenario Promedio', 'Mejor Escenario']
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def construir_matriz_items(df_location_item_daily, dias=DIAS_HISTORIA_INTERMITENTE):
+    """
+    Matriz densa Tienda-Item × Día de los últimos 'dias' (ceros en los días sin venta).
+    Devuelve (df_claves, Y, inicio): 'inicio' es el primer día de la ventana en que cada item ya existía.
+    """
+    df = df_location_item_daily
+    fin = df['ds'].max()
+    desde = fin - pd.Timedelta(days=dias - 1)
+    primera_venta = df.groupby(CLAVES_ITEM, observed=True)['ds'].min()
+
+    recientes = df[df['ds'] >= desde]
+    claves = recientes.groupby(CLAVES_ITEM, observed=True)['Venta Real'].sum().index
+    idx = claves.get_indexer(pd.MultiIndex.from_frame(recientes[CLAVES_ITEM]))
+    dia = (recientes['ds'] - desde).dt.days.to_numpy()
+
+    Y = np.zeros((len(claves), dias))
+    np.add.at(Y, (idx, dia), recientes['Venta Real'].to_numpy(dtype=float))
+    inicio = np.maximum((primera_venta.reindex(claves) - desde).dt.days.to_numpy(), 0)
+    return claves.to_frame(index=False), Y, inicio
+
+
+def clasificar_demanda(Y, inicio):
+    """
+    Clase Syntetos-Boylan de cada serie según su ADI (días activos / días con venta) y el CV² de los tamaños:
+    'suave', 'erratica', 'intermitente' o 'irregular' (lumpy). Devuelve (clase, adi, cv2).
+    """
+    activo = np.arange(Y.shape[1])[None, :] >= inicio[:, None]
+    con_venta = (Y > 0) & activo
+    demandas = con_venta.sum(axis=1)
+    adi = np.divide(activo.sum(axis=1), demandas, out=np.full(len(Y), np.inf), where=demandas > 0)
+
+    tamanos = np.where(con_venta, Y, 0.0)
+    media = np.divide(tamanos.sum(axis=1), demandas, out=np.zeros(len(Y)), where=demandas > 0)
+    varianza = np.divide((np.where(con_venta, Y - media[:, None], 0.0) ** 2).sum(axis=1), demandas,
+                         out=np.zeros(len(Y)), where=demandas > 0)
+    cv2 = np.divide(varianza, media ** 2, out=np.zeros(len(Y)), where=media > 0)
+
+    clase = np.select([(adi < UMBRAL_ADI) & (cv2 < UMBRAL_CV2), adi < UMBRAL_ADI, cv2 < UMBRAL_CV2],
+                      ['suave', 'erratica', 'intermitente'], default='irregular')
+    return clase, adi, cv2
+
+
+def tasa_intermitente(Y, inicio=None, metodo=METODO_INTERMITENTE, alfa=ALFA_INTERMITENTE, beta=BETA_INTERMITENTE):
+    """
+    Demanda esperada por día de cada serie con Croston, SBA o TSB, vectorizado sobre todas las series:
+    se recorre una vez el eje de días y cada paso actualiza todas las filas de Y a la vez.
+    - Croston: tamaño z e intervalo p suavizados solo en los días con venta; tasa = z / p.
+    - SBA: Croston con la corrección de sesgo (1 - alfa / 2).
+    - TSB: suaviza la probabilidad de venta todos los días (decae si el item deja de venderse); tasa = prob · z.
+    """
+    if metodo not in ('croston', 'sba', 'tsb'):
+        raise ValueError(f"Método de demanda intermitente desconocido: '{metodo}'.")
+    num_series, num_dias = Y.shape
+    inicio = np.zeros(num_series, dtype=np.int64) if inicio is None else np.asarray(inicio)
+
+    z = np.full(num_series, np.nan)
+    p = np.full(num_series, np.nan)
+    prob = np.full(num_series, np.nan)
+    desde_ultima = np.zeros(num_series)
+
+    for t in range(num_dias):
+        activo = t >= inicio
+        y = Y[:, t]
+        hay = activo & (y > 0)
+        desde_ultima += activo
+        primera = hay & np.isnan(z)
+        siguiente = hay & ~primera
+
+        if metodo == 'tsb':
+            prob = np.where(activo & ~np.isnan(prob), prob + beta * (hay - prob), prob)
+            prob[primera] = 1.0 / desde_ultima[primera]
+        z[primera] = y[primera]
+        p[primera] = desde_ultima[primera]
+        z[siguiente] += alfa * (y[siguiente] - z[siguiente])
+        p[siguiente] += alfa * (desde_ultima[siguiente] - p[siguiente])
+        desde_ultima[hay] = 0
+
+    if metodo == 'tsb':
+        tasa = prob * z
+    else:
+        tasa = z / p * (1 - alfa / 2 if metodo == 'sba' else 1)
+    return np.nan_to_num(tasa, nan=0.0)
+
+
+def dias_sin_venta(Y):
+    """Días desde la última venta de cada serie hasta el último día de la matriz (su largo si nunca vendió)."""
+    con_venta = Y > 0
+    ultima = Y.shape[1] - 1 - np.argmax(con_venta[:, ::-1], axis=1)
+    return np.where(con_venta.any(axis=1), Y.shape[1] - 1 - ultima, Y.shape[1])
+
+
+def pronosticar_items_intermitentes(df_location_item_daily, metodo=METODO_INTERMITENTE, dias=DIAS_HISTORIA_INTERMITENTE,
+                                    dias_obsolescencia=DIAS_OBSOLESCENCIA_INTERMITENTE):
+    """
+    Pronostica en una pasada todos los items Tienda-Item intermitentes o irregulares (ADI ≥ UMBRAL_ADI) que
+    vendieron en los últimos 'dias_obsolescencia' días.
+    Devuelve las claves del item con 'Clase', 'ADI', 'Tasa Intermitente' (demanda esperada por día) y
+    'Motor Item' (el método usado).
+    """
+    if df_location_item_daily.empty:
+        return pd.DataFrame(columns=CLAVES_ITEM + ['Clase', 'ADI', 'Tasa Intermitente', 'Motor Item'])
+
+    df_claves, Y, inicio = construir_matriz_items(df_location_item_daily, dias)
+    clase, adi, _ = clasificar_demanda(Y, inicio)
+    esporadico = (adi >= UMBRAL_ADI) & ((Y > 0).sum(axis=1) >= MIN_DEMANDAS_INTERMITENTE)
+    obsoleto = esporadico & (dias_sin_venta(Y) >= dias_obsolescencia)
+    esporadico &= ~obsoleto
+
+    tasa = tasa_intermitente(Y[esporadico], inicio[esporadico], metodo)
+    df = df_claves[esporadico].reset_index(drop=True)
+    df['Clase'] = clase[esporadico]
+    df['ADI'] = adi[esporadico]
+    df['Tasa Intermitente'] = tasa
+    df['Motor Item'] = metodo
+    logging.info(f"Demanda intermitente ({metodo}): {len(df)} de {len(df_claves)} items Tienda-Item "
+                 f"pronosticados con {Y.shape[1]} días de historia; {obsoleto.sum()} sin venta en "
+                 f"{dias_obsolescencia} días quedan fuera.")
+    return df
+
+
+def unidades_por_acumulado(df, columna, claves=CLAVES_ITEM, orden='Fecha'):
+    """
+    Convierte una demanda fraccionaria por día en unidades enteras sin perder el total: se redondea el acumulado
+    de cada item y se toma su diferencia (0.3 por día → 1 unidad cada 3 o 4 días, en lugar de 0 todos los días).
+    """
+    df = df.sort_values(list(claves) + [orden])
+    acumulado = df.groupby(list(claves), observed=True, sort=False)[columna].cumsum().round()
+    return acumulado - acumulado.groupby([df[c] for c in claves], observed=True, sort=False).shift(fill_value=0)
+
+
+def desglosar_items(df_forecast_family, df_rep, df_intermitente, columnas=COLUMNAS_ESCENARIOS, ultima_fecha=None):
+    """
+    Desglosa el pronóstico Tienda-Familia a item conciliando los dos motores: los items intermitentes reciben
+    su tasa Croston/SBA/TSB (recortada si supera el total de la familia) y los demás se reparten el resto según
+    su representatividad. Si una familia solo tiene items intermitentes, su total se reparte entre ellos.
+    'Motor Item' es el método con que se pronosticó cada item intermitente, o 'representatividad'.
+    La suma de los items coincide con el pronóstico de la familia antes de redondear.
+    Con 'ultima_fecha' (último día con venta) el redondeo acumulado de los intermitentes se hace por separado en
+    la historia y en el horizonte, así las unidades del horizonte no dependen del ajuste in-sample.
+    """
+    grupo = ['Fecha', 'Location Name', 'Family Group Name']
+    df_items = pd.merge(df_rep, df_intermitente[CLAVES_ITEM + ['Tasa Intermitente', 'Motor Item']], on=CLAVES_ITEM,
+                        how='outer')
+    df_items['Representatividad_%'] = df_items['Representatividad_%'].fillna(0)
+    df = pd.merge(df_forecast_family, df_items, on=['Location Name', 'Family Group Name'], how='left')
+
+    df['_horizonte'] = df['Fecha'] > ultima_fecha if ultima_fecha is not None else True
+    intermitente = df['Tasa Intermitente'].notna().to_numpy()
+    tasa = df['Tasa Intermitente'].fillna(0).to_numpy()
+    peso_suave = np.where(intermitente, 0.0, df['Representatividad_%'].fillna(0).to_numpy())
+    claves_grupo = [df[c] for c in grupo]
+    suma_tasa = pd.Series(tasa, index=df.index).groupby(claves_grupo).transform('sum').to_numpy()
+    suma_suave = pd.Series(peso_suave, index=df.index).groupby(claves_grupo).transform('sum').to_numpy()
+
+    for columna in columnas:
+        total = df[columna].to_numpy(dtype=float)
+        asignado = np.where(suma_suave > 0, np.minimum(suma_tasa, total), np.where(suma_tasa > 0, total, 0.0))
+        valor_intermitente = np.divide(tasa * asignado, suma_tasa, out=np.zeros_like(tasa), where=suma_tasa > 0)
+        valor_suave = np.divide(peso_suave * (total - asignado), suma_suave, out=np.zeros_like(tasa),
+                                where=suma_suave > 0)
+        df[columna] = np.where(intermitente, valor_intermitente, valor_suave)
+        df.loc[intermitente, columna] = unidades_por_acumulado(df[intermitente], columna,
+                                                               claves=CLAVES_ITEM + ['_horizonte'])
+        df.loc[~intermitente, columna] = df.loc[~intermitente, columna].round()
+
+    df['Motor Item'] = df['Motor Item'].where(intermitente, 'representatividad')
+    return df.drop(columns=['Tasa Intermitente', '_horizonte'])
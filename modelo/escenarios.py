@@ -0,0 +1,202 @@
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# --- Permite ejecutar el módulo directamente (python modelo/escenarios.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo.pronostico_demanda import RUTA_CACHE_PRONOSTICOS, FORECAST_PERIOD_DAYS, cargar_cache_pronosticos
+
+# --- Configuración de Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Escenarios what-if ---
+# Los regresores de Prophet son aditivos: cambiar un regresor desplaza yhat (y su intervalo) en coeficiente × cambio.
+# Con los coeficientes y la matriz de regresores guardados en la caché de pronósticos, un escenario se recalcula
+# para todas las series en una sola operación matricial, sin reentrenar. La matriz es por serie: cada una conserva
+# el clima de su tienda y las promociones que le aplican.
+CARPETA_ESCENARIOS = os.path.join("resultados", "escenarios")
+
+CLAVES_SERIE = ['Location Name', 'Major Group Name', 'Family Group Name']
+COLUMNAS_BASE = ['yhat', 'yhat_lower', 'yhat_upper']
+COLUMNAS_ESCENARIOS = {'yhat_lower': 'Peor Escenario', 'yhat': 'Escenario Promedio', 'yhat_upper': 'Mejor Escenario'}
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def preparar_caso_base(cache, periodos=FORECAST_PERIOD_DAYS):
+    """
+    Arma las matrices del caso base desde la caché de pronósticos (solo el horizonte):
+    X (series × fechas × regresores), C (series × regresores), 'aplica' (series × regresores, promociones activas)
+    y las columnas yhat/yhat_lower/yhat_upper (series × fechas). Las series con promedio simple tienen C = 0.
+    """
+    claves = sorted(cache)
+    columnas = sorted({c for guardado in cache.values() for c in guardado.get('componentes', {}).get('columnas', [])})
+    pronosticos = {clave: cache[clave]['pronostico'].tail(periodos) for clave in claves}
+    fechas = pd.DatetimeIndex(sorted({f for df in pronosticos.values() for f in df['Fecha']}))
+    pos_fecha = pd.Series(np.arange(len(fechas)), index=fechas)
+    pos_columna = {c: k for k, c in enumerate(columnas)}
+
+    X = np.zeros((len(claves), len(fechas), len(columnas)))
+    C = np.zeros((len(claves), len(columnas)))
+    aplica = np.ones((len(claves), len(columnas)), dtype=bool)
+    base = {columna: np.full((len(claves), len(fechas)), np.nan) for columna in COLUMNAS_BASE}
+
+    for s, clave in enumerate(claves):
+        df = pronosticos[clave]
+        t = pos_fecha[df['Fecha']].to_numpy()
+        for columna in COLUMNAS_BASE:
+            origen = columna if columna in df.columns else COLUMNAS_ESCENARIOS[columna]
+            base[columna][s, t] = df[origen].to_numpy(dtype=float)
+
+        componentes = cache[clave].get('componentes') or {}
+        if not componentes.get('columnas'):
+            continue
+        k = [pos_columna[c] for c in componentes['columnas']]
+        X[s, t[-len(componentes['regresores']):][:, None], k] = componentes['regresores']
+        C[s, k] = [componentes['coeficientes'].get(c, 0.0) for c in componentes['columnas']]
+        aplica[s, [pos_columna[c] for c in componentes['inactivas']]] = False
+
+    df_claves = pd.DataFrame([clave.split('|') for clave in claves], columns=CLAVES_SERIE)
+    logging.info(f"Caso base de escenarios: {len(claves)} series × {len(fechas)} fechas × {len(columnas)} regresores.")
+    return {'claves': df_claves, 'fechas': fechas, 'columnas': columnas, 'X': X, 'C': C, 'aplica': aplica, **base}
+
+
+def cargar_caso_base(ruta=RUTA_CACHE_PRONOSTICOS, periodos=FORECAST_PERIOD_DAYS):
+    """Carga la caché de la última ejecución diaria y arma el caso base de escenarios."""
+    cache = cargar_cache_pronosticos(ruta)
+    if not cache:
+        raise FileNotFoundError(f"No hay pronósticos en caché en '{ruta}'. Ejecuta primero el pronóstico diario.")
+    return preparar_caso_base(cache, periodos)
+
+
+def cambio_regresor(columna, valor, desde=None, hasta=None, solo_vigente=False, tiendas=None):
+    """
+    Describe un cambio de un regresor: pasa a 'valor' entre 'desde' y 'hasta' (todo el horizonte por defecto),
+    en las series de 'tiendas' (todas por defecto). Con 'solo_vigente' solo cambia en las series y días en que
+    el regresor ya era distinto de cero (p. ej. la fuerza de una promoción donde está vigente).
+    """
+    return {'columna': columna, 'valor': float(valor), 'desde': desde, 'hasta': hasta,
+            'solo_vigente': solo_vigente, 'tiendas': list(tiendas) if tiendas else None}
+
+
+def cambios_promocion(columna, fuerza, desde=None, hasta=None, activar=False, tiendas=None):
+    """
+    Cambio de una promoción: la fuerza pasa a 'fuerza' en los días en que ya estaba vigente en cada serie,
+    o en todos los días del rango si 'activar'.
+    """
+    return [cambio_regresor(columna, fuerza, desde, hasta, solo_vigente=not activar, tiendas=tiendas)]
+
+
+def cambios_regresores(desde=None, hasta=None, tiendas=None, **valores):
+    """Cambios con valores fijos de regresores en un rango de fechas (p. ej. dia_frio=1, dia_lluvioso=1)."""
+    return [cambio_regresor(columna, valor, desde, hasta, tiendas=tiendas) for columna, valor in valores.items()]
+
+
+def simular_escenario(base, *cambios):
+    """
+    Recalcula yhat y los escenarios de todas las series con los regresores modificados en una sola operación:
+    Δyhat = Σ_k C[s, k] · (X_nuevo − X_base)[s, t, k]. Cada cambio (cambio_regresor) se aplica sobre la matriz
+    de regresores de cada serie, que trae el clima de su propia tienda. Las promociones que no aplican a una
+    serie siguen en cero.
+    """
+    X_nuevo = base['X'].copy()
+    fechas = base['fechas']
+    tiendas_series = base['claves']['Location Name'].to_numpy()
+    for cambio in cambios:
+        columna = cambio['columna']
+        if columna not in base['columnas']:
+            logging.warning(f"⚠️ El regresor '{columna}' no está en los modelos guardados, se ignora.")
+            continue
+        k = base['columnas'].index(columna)
+        en_rango = np.ones(len(fechas), dtype=bool)
+        if cambio['desde'] is not None:
+            en_rango &= fechas >= pd.Timestamp(cambio['desde'])
+        if cambio['hasta'] is not None:
+            en_rango &= fechas <= pd.Timestamp(cambio['hasta'])
+        en_series = base['aplica'][:, k].copy()
+        if cambio['tiendas']:
+            en_series &= np.isin(tiendas_series, cambio['tiendas'])
+
+        mascara = en_series[:, None] & en_rango[None, :]
+        if cambio['solo_vigente']:
+            mascara &= base['X'][:, :, k] != 0
+        X_nuevo[:, :, k] = np.where(mascara, cambio['valor'], X_nuevo[:, :, k])
+
+    efecto = np.einsum('stk,sk->st', X_nuevo - base['X'], base['C'])
+
+    df = base['claves'].loc[base['claves'].index.repeat(len(base['fechas']))].reset_index(drop=True)
+    df['Fecha'] = np.tile(base['fechas'], len(base['claves']))
+    df['Efecto Escenario'] = efecto.reshape(-1)
+    for columna, escenario in COLUMNAS_ESCENARIOS.items():
+        df[f"{escenario} Base"] = np.maximum(0, base[columna]).round().reshape(-1)
+        df[escenario] = np.maximum(0, base[columna] + efecto).round().reshape(-1)
+    return df.dropna(subset=['Escenario Promedio Base']).reset_index(drop=True)
+
+
+def guardar_escenario(df_escenario, nombre, carpeta=CARPETA_ESCENARIOS):
+    """Guarda el resultado del escenario en un CSV con marca de tiempo."""
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"{nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    df_escenario.to_csv(ruta, index=False)
+    logging.info(f"✅ Escenario guardado en: {ruta}")
+    return ruta
+
+
+# =============================================================================
+# ------------------------------ EJECUCIÓN PRINCIPAL --------------------------
+# =============================================================================
+
+def _par(texto):
+    """Convierte 'nombre=valor' en (nombre, float(valor))."""
+    nombre, valor = texto.split('=', 1)
+    return nombre, float(valor)
+
+
+def parsear_argumentos(argv=None):
+    """Lee las opciones del escenario desde la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Escenarios what-if del pronóstico diario sin reentrenar.")
+    parser.add_argument('--promocion', action='append', type=_par, default=[], metavar='COLUMNA=FUERZA',
+                        help="Nueva fuerza de una promoción en los días en que está vigente.")
+    parser.add_argument('--activar', action='store_true',
+                        help="Aplica la fuerza de --promocion en todos los días del rango, aunque no esté vigente.")
+    parser.add_argument('--regresor', action='append', type=_par, default=[], metavar='COLUMNA=VALOR',
+                        help="Valor fijo de un regresor en el rango (p. ej. dia_frio=1).")
+    parser.add_argument('--desde', help="Fecha inicial del cambio (AAAA-MM-DD). Por defecto, todo el horizonte.")
+    parser.add_argument('--hasta', help="Fecha final del cambio (AAAA-MM-DD).")
+    parser.add_argument('--tienda', action='append', default=[], metavar='TIENDA',
+                        help="Aplica los cambios solo a las series de esta tienda (se puede repetir).")
+    parser.add_argument('--nombre', default='escenario', help="Prefijo del archivo de resultados.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Función principal: aplica el escenario pedido sobre los modelos de la última ejecución y lo guarda."""
+    args = parsear_argumentos(argv)
+    base = cargar_caso_base()
+
+    cambios = [cambio for columna, fuerza in args.promocion
+               for cambio in cambios_promocion(columna, fuerza, args.desde, args.hasta, activar=args.activar,
+                                               tiendas=args.tienda)]
+    cambios += cambios_regresores(args.desde, args.hasta, tiendas=args.tienda, **dict(args.regresor))
+
+    df_escenario = simular_escenario(base, *cambios)
+    diferencia = df_escenario['Escenario Promedio'].sum() - df_escenario['Escenario Promedio Base'].sum()
+    logging.info(f"📊 Demanda del horizonte: {df_escenario['Escenario Promedio Base'].sum():.0f} → "
+                 f"{df_escenario['Escenario Promedio'].sum():.0f} ({diferencia:+.0f}).")
+    guardar_escenario(df_escenario, args.nombre)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import os
+import pickle
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Esquema fijo de los CSV del POS (solo las columnas que usa el pronóstico) ---
+COLUMNAS_CATEGORICAS = ['Location Name', 'Order Type Name', 'Major Group Name', 'Family Group Name',
+                        'Menu Item Name']
+COLUMNAS_ENTERAS = ['Menu Item Number', 'Sales Count']
+COLUMNA_FECHA = 'Business Date'
+COLUMNAS_POS = [COLUMNA_FECHA] + COLUMNAS_CATEGORICAS + COLUMNAS_ENTERAS
+
+# "2025-06-15 00:00:00.0": solo se usa la fecha (primeros 10 caracteres)
+FORMATO_FECHA = '%Y-%m-%d'
+MOTIVOS_FECHA = ['fecha vacía', 'fecha no válida']
+
+# --- Filas mal formadas: se apartan a un archivo en lugar de descartarse en silencio ---
+RUTA_CUARENTENA = os.path.join("resultados", "cuarentena_pos.csv")
+
+MAX_HILOS_LECTURA = min(8, os.cpu_count() or 1)
+
+# --- Caché por archivo: cada CSV se parsea una sola vez mientras no cambie (nombre, tamaño y fecha) ---
+# Cuando llega un archivo nuevo solo se lee ese; los demás salen de su tabla ya parseada.
+CARPETA_CACHE_ARCHIVOS = os.path.join("cache", "pos_archivos")
+VERSION_LECTURA = 2  # Incrementar al cambiar el esquema o la lectura para invalidar la caché
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def _leer_archivo_pyarrow(ruta):
+    """
+    Lee un CSV con el motor de pyarrow y el esquema fijo.
+    Devuelve (tabla, filas en cuarentena); las filas con columnas de más o de menos van a cuarentena.
+    """
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    cuarentena = []
+
+    def manejar_fila_invalida(fila):
+        cuarentena.append({'Archivo': os.path.basename(ruta), 'Linea': fila.number,
+                           'Motivo': f"{fila.actual_columns} columnas (se esperaban {fila.expected_columns})",
+                           'Texto': fila.text})
+        return 'skip'
+
+    tipos = {columna: pa.dictionary(pa.int32(), pa.string()) for columna in COLUMNAS_CATEGORICAS}
+    tipos.update({columna: pa.int64() for columna in COLUMNAS_ENTERAS})
+    tipos[COLUMNA_FECHA] = pa.string()
+
+    try:
+        tabla = pa_csv.read_csv(
+            ruta,
+            parse_options=pa_csv.ParseOptions(invalid_row_handler=manejar_fila_invalida),
+            convert_options=pa_csv.ConvertOptions(column_types=tipos, include_columns=COLUMNAS_POS,
+                                                  strings_can_be_null=True),
+        )
+        return _apartar_fechas_invalidas(tabla, os.path.basename(ruta), cuarentena)
+    except pa.ArrowInvalid as e:
+        # Algún valor no convierte al tipo del esquema: se relee como texto y se apartan solo esas filas.
+        logging.warning(f"⚠️ '{os.path.basename(ruta)}' tiene valores fuera del esquema, se revisa fila a fila: {e}")
+        return _leer_archivo_tolerante(ruta)
+
+
+def _apartar_fechas_invalidas(tabla, nombre, cuarentena):
+    """Aparta a 'cuarentena' las filas de una tabla de pyarrow cuya fecha está vacía o no tiene el formato fijo."""
+    import pyarrow.compute as pc
+
+    texto = tabla.column(COLUMNA_FECHA)
+    fecha = pc.strptime(pc.utf8_slice_codeunits(texto, 0, 10), format=FORMATO_FECHA, unit='s', error_is_null=True)
+    invalidas = pc.is_null(fecha)
+    if not pc.any(invalidas).as_py():
+        return tabla, cuarentena
+    for fila in tabla.filter(invalidas).to_pylist():
+        cuarentena.append({'Archivo': nombre, 'Linea': None,
+                           'Motivo': MOTIVOS_FECHA[0] if fila[COLUMNA_FECHA] is None else MOTIVOS_FECHA[1],
+                           'Texto': ','.join('' if valor is None else str(valor) for valor in fila.values())})
+    return tabla.filter(pc.invert(invalidas)), cuarentena
+
+
+def _leer_archivo_texto(ruta):
+    """
+    Lee un CSV como texto con pandas y aparta las filas mal formadas: columnas de más, filas truncadas
+    (sin 'Sales Count'), campos enteros no válidos y fechas vacías o sin el formato fijo.
+    Devuelve (df con el esquema fijo, filas en cuarentena).
+    """
+    cuarentena = []
+    nombre = os.path.basename(ruta)
+
+    def manejar_fila_invalida(campos):
+        cuarentena.append({'Archivo': nombre, 'Linea': None, 'Motivo': f"{len(campos)} columnas",
+                           'Texto': ','.join(campos)})
+        return None
+
+    df = pd.read_csv(ruta, usecols=COLUMNAS_POS, dtype=str, engine='python', on_bad_lines=manejar_fila_invalida)
+    df = df[COLUMNAS_POS]
+    numericos = df[COLUMNAS_ENTERAS].apply(pd.to_numeric, errors='coerce')
+    truncadas = df['Sales Count'].isna()
+    no_enteras = numericos.isna() & df[COLUMNAS_ENTERAS].notna()
+    sin_fecha = df[COLUMNA_FECHA].isna()
+    fecha_invalida = pd.to_datetime(df[COLUMNA_FECHA].str.slice(0, 10), format=FORMATO_FECHA, errors='coerce').isna()
+    invalidas = truncadas | no_enteras.any(axis=1) | fecha_invalida
+    for numero, fila in df[invalidas].iterrows():
+        if truncadas[numero]:
+            motivo = 'fila truncada'
+        elif no_enteras.loc[numero].any():
+            motivo = 'valor no entero'
+        else:
+            motivo = MOTIVOS_FECHA[0] if sin_fecha[numero] else MOTIVOS_FECHA[1]
+        cuarentena.append({'Archivo': nombre, 'Linea': numero + 2, 'Motivo': motivo,
+                           'Texto': ','.join(map(str, fila.values))})
+
+    df = df[~invalidas].copy()
+    for columna in COLUMNAS_ENTERAS:
+        df[columna] = numericos.loc[~invalidas, columna].astype('Int64')
+    return df, cuarentena
+
+
+def _leer_archivo_tolerante(ruta):
+    """Relee con pandas un CSV que no cumple el esquema y lo convierte a una tabla de pyarrow equivalente."""
+    import pyarrow as pa
+
+    df, cuarentena = _leer_archivo_texto(ruta)
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    for columna in COLUMNAS_CATEGORICAS:
+        i = tabla.schema.get_field_index(columna)
+        tabla = tabla.set_column(i, columna, tabla.column(columna).dictionary_encode())
+    return tabla.replace_schema_metadata(None), cuarentena
+
+
+def _ruta_cache_archivo(ruta, carpeta_cache):
+    """Ruta de la tabla parseada de un CSV; la clave cambia si el archivo cambia de tamaño o de fecha."""
+    stat = os.stat(ruta)
+    nombre = os.path.basename(ruta)
+    clave = hashlib.sha1(f"{VERSION_LECTURA}|{nombre}|{stat.st_size}|{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+    return os.path.join(carpeta_cache, f"{nombre}.{clave}.pkl")
+
+
+def _leer_archivo_con_cache(ruta, carpeta_cache=None):
+    """
+    Devuelve (tabla, filas en cuarentena, True si salió de la caché). Si el CSV no está en la caché se lee con
+    pyarrow y se guarda; las versiones anteriores del mismo archivo se borran. Sin 'carpeta_cache' solo se lee.
+    """
+    if not carpeta_cache:
+        return (*_leer_archivo_pyarrow(ruta), False)
+
+    ruta_cache = _ruta_cache_archivo(ruta, carpeta_cache)
+    if os.path.exists(ruta_cache):
+        try:
+            with open(ruta_cache, 'rb') as f:
+                tabla, cuarentena = pickle.load(f)
+            return tabla, cuarentena, True
+        except Exception as e:
+            logging.warning(f"⚠️ Caché ilegible para '{os.path.basename(ruta)}', se vuelve a leer: {e}")
+
+    tabla, cuarentena = _leer_archivo_pyarrow(ruta)
+    try:
+        prefijo = f"{os.path.basename(ruta)}."
+        for anterior in os.listdir(carpeta_cache):
+            if anterior.startswith(prefijo) and anterior.endswith('.pkl'):
+                os.remove(os.path.join(carpeta_cache, anterior))
+        temporal = f"{ruta_cache}.tmp"
+        with open(temporal, 'wb') as f:
+            pickle.dump((tabla, cuarentena), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta_cache)
+    except OSError as e:
+        logging.warning(f"⚠️ No se pudo guardar en caché '{os.path.basename(ruta)}': {e}")
+    return tabla, cuarentena, False
+
+
+def _tabla_a_pandas(tablas):
+    """Concatena las tablas de cada archivo, parsea la fecha con formato fijo y convierte a pandas."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    tabla = pa.concat_tables(tablas).unify_dictionaries()
+    fecha = pc.strptime(pc.utf8_slice_codeunits(tabla.column(COLUMNA_FECHA), 0, 10),
+                        format=FORMATO_FECHA, unit='s', error_is_null=True)
+    tabla = tabla.set_column(tabla.schema.get_field_index(COLUMNA_FECHA), COLUMNA_FECHA, fecha)
+    df = tabla.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+    df[COLUMNA_FECHA] = df[COLUMNA_FECHA].astype('datetime64[ns]')
+    return df
+
+
+def _leer_con_pandas(archivos, cuarentena):
+    """Alternativa sin pyarrow: mismo esquema, cuarentena y formato de fecha con el lector de pandas."""
+    partes = []
+    for ruta in archivos:
+        df, filas = _leer_archivo_texto(ruta)
+        partes.append(df)
+        cuarentena.extend(filas)
+    df = pd.concat(partes, ignore_index=True)
+    for columna in COLUMNAS_CATEGORICAS:
+        df[columna] = df[columna].astype('category')
+    df[COLUMNA_FECHA] = pd.to_datetime(df[COLUMNA_FECHA].str.slice(0, 10), format=FORMATO_FECHA, errors='coerce')
+    return df
+
+
+def _quitar_espacios(df):
+    """
+    Quita los espacios al inicio y al final de los nombres categóricos: el POS exporta algunas tiendas como
+    'San Miguel ', que así no coinciden con las columnas de clima por tienda ni con los filtros por nombre.
+    """
+    for columna in COLUMNAS_CATEGORICAS:
+        categorias = df[columna].cat.categories
+        limpias = categorias.str.strip()
+        if not limpias.equals(categorias):
+            df[columna] = df[columna].map(dict(zip(categorias, limpias))).astype('category')
+    return df
+
+
+def guardar_cuarentena(cuarentena, ruta=RUTA_CUARENTENA):
+    """Escribe las filas mal formadas de la lectura en un archivo aparte."""
+    if not cuarentena:
+        return
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        pd.DataFrame(cuarentena).to_csv(ruta, index=False)
+        logging.warning(f"⚠️ {len(cuarentena)} filas mal formadas apartadas en '{ruta}'.")
+    except Exception as e:
+        logging.error(f"❌ No se pudo guardar el archivo de cuarentena: {e}")
+
+
+def leer_archivos_pos(archivos, ruta_cuarentena=RUTA_CUARENTENA, carpeta_cache=CARPETA_CACHE_ARCHIVOS):
+    """
+    Lee los CSV del POS con el esquema fijo: motor CSV de pyarrow (en paralelo por archivo), fecha con formato fijo,
+    columnas de nombres como categóricas y solo las columnas que usa el pronóstico.
+    Con 'carpeta_cache' solo se parsean los archivos nuevos o modificados; el resto sale de la caché por archivo.
+    Las filas mal formadas (incluidas las de fecha vacía o no válida) se apartan a 'ruta_cuarentena'.
+    Los nombres categóricos se devuelven sin espacios al inicio ni al final.
+    """
+    cuarentena = []
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        logging.warning("⚠️ pyarrow no está instalado, se usa el lector de pandas (más lento).")
+        df = _leer_con_pandas(archivos, cuarentena)
+    else:
+        if carpeta_cache:
+            os.makedirs(carpeta_cache, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=MAX_HILOS_LECTURA) as executor:
+            resultados = list(executor.map(_leer_archivo_con_cache, archivos, [carpeta_cache] * len(archivos)))
+        for _, filas, _ in resultados:
+            cuarentena.extend(filas)
+        if carpeta_cache:
+            nuevos = sum(not en_cache for _, _, en_cache in resultados)
+            logging.info(f"📂 {nuevos} de {len(resultados)} archivos del POS parseados; "
+                         f"el resto salió de la caché.")
+        df = _tabla_a_pandas([tabla for tabla, _, _ in resultados])
+    df = _quitar_espacios(df)
+
+    fechas_invalidas = sum(fila['Motivo'] in MOTIVOS_FECHA for fila in cuarentena)
+    if fechas_invalidas:
+        logging.warning(f"⚠️ {fechas_invalidas} filas con '{COLUMNA_FECHA}' vacía o no válida van a cuarentena.")
+    guardar_cuarentena(cuarentena, ruta_cuarentena)
+    return df
+
+
+def a_texto(df, columnas=COLUMNAS_CATEGORICAS):
+    """Convierte las columnas categóricas de un agregado a texto para el resto del pipeline."""
+    for columna in columnas:
+        if columna in df.columns and isinstance(df[columna].dtype, pd.CategoricalDtype):
+            df[columna] = df[columna].astype(object)
+    return df
+
+
+def enteros_sin_nulos(df, columnas=COLUMNAS_ENTERAS):
+    """Convierte las columnas enteras (nullable) a int64 una vez descartadas las filas sin valor."""
+    for columna in columnas:
+        if columna in df.columns:
+            df[columna] = df[columna].fillna(0).astype(np.int64)
+    return df
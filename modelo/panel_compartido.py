@@ -0,0 +1,117 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+from modelo.panel_ventas import completar_panel
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Panel publicado para los workers (archivos .npy que se abren como memmap, sin copiar) ---
+CARPETA_PANEL = os.path.join("cache", "panel")
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def _columnas_publicadas(df_regressors, regressor_cols):
+    """Regresores del modelo más sus versiones de clima por tienda, que cada serie toma según su tienda."""
+    from modelo.pronostico_demanda import SEPARADOR_TIENDA
+
+    return list(regressor_cols) + [col for col in df_regressors.columns if SEPARADOR_TIENDA in col
+                                   and col.split(SEPARADOR_TIENDA, 1)[0] in regressor_cols]
+
+
+def _huella_entradas(panel, df_regressors, regressor_cols):
+    """Huella del contenido de ventas y regresores, para reutilizar un panel ya publicado."""
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(panel['ventas']).tobytes())
+    h.update(np.ascontiguousarray(panel['inicio']).tobytes())
+    h.update(json.dumps([panel['tiendas'], panel['familias'], str(panel['fecha_inicio'].date())]).encode())
+    columnas = _columnas_publicadas(df_regressors, regressor_cols)
+    if not df_regressors.empty:
+        h.update(pd.util.hash_pandas_object(df_regressors[['ds'] + columnas], index=False).values.tobytes())
+    h.update(json.dumps(columnas).encode())
+    return h.hexdigest()[:16]
+
+
+def publicar_panel(panel, df_regressors, regressor_cols, carpeta=CARPETA_PANEL):
+    """
+    Escribe una sola vez por ejecución el panel de ventas y la matriz de regresores como archivos .npy.
+    Los workers los abren como memmap (adjuntar_panel): la memoria no crece con el número de workers
+    y las tareas solo transportan claves. Los paneles de entradas anteriores se borran. Devuelve la ruta del panel.
+    """
+    ruta = os.path.join(carpeta, _huella_entradas(panel, df_regressors, regressor_cols))
+    if os.path.exists(os.path.join(ruta, 'indices.json')):
+        logging.info(f"♻️ Panel compartido ya publicado en: {ruta}")
+        _limpiar_paneles_anteriores(carpeta, ruta)
+        return ruta
+
+    os.makedirs(ruta, exist_ok=True)
+    np.save(os.path.join(ruta, 'ventas.npy'), panel['ventas'])
+    np.save(os.path.join(ruta, 'inicio.npy'), panel['inicio'])
+
+    columnas = _columnas_publicadas(df_regressors, regressor_cols)
+    if df_regressors.empty:
+        regresores, fechas_regresores = np.zeros((0, len(columnas))), np.zeros(0, dtype='datetime64[ns]')
+    else:
+        df_reg = df_regressors.sort_values('ds')
+        regresores = df_reg[columnas].to_numpy(dtype=float)
+        fechas_regresores = df_reg['ds'].to_numpy(dtype='datetime64[ns]')
+    np.save(os.path.join(ruta, 'regresores.npy'), regresores)
+    np.save(os.path.join(ruta, 'fechas_regresores.npy'), fechas_regresores)
+
+    indices = {
+        'tiendas': list(panel['tiendas']),
+        'familias': list(panel['familias']),
+        'major_por_familia': panel['major_por_familia'],
+        'fecha_inicio': str(panel['fecha_inicio'].date()),
+        'regressor_cols': list(regressor_cols),
+        'columnas_regresores': columnas,
+    }
+    # indices.json se escribe al final: su presencia indica que el panel está completo
+    with open(os.path.join(ruta, 'indices.json'), 'w', encoding='utf-8') as f:
+        json.dump(indices, f, ensure_ascii=False)
+
+    ventas = panel['ventas']
+    logging.info(f"✅ Panel compartido publicado en {ruta}: {ventas.shape[0]} tiendas × {ventas.shape[1]} familias "
+                 f"× {ventas.shape[2]} días, {len(regressor_cols)} regresores.")
+    _limpiar_paneles_anteriores(carpeta, ruta)
+    return ruta
+
+
+def _limpiar_paneles_anteriores(carpeta, ruta_actual):
+    """Borra los paneles publicados con otras entradas (carpetas con nombre de huella), salvo el actual."""
+    for nombre in os.listdir(carpeta):
+        ruta = os.path.join(carpeta, nombre)
+        if ruta == ruta_actual or not os.path.isdir(ruta) or len(nombre) != 16:
+            continue
+        try:
+            shutil.rmtree(ruta)
+            logging.info(f"🧹 Panel compartido anterior eliminado: {ruta}")
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudo eliminar el panel anterior '{ruta}': {e}")
+
+
+def adjuntar_panel(ruta):
+    """Abre un panel publicado como memmap de solo lectura (sin copiar los datos al proceso)."""
+    with open(os.path.join(ruta, 'indices.json'), encoding='utf-8') as f:
+        panel = json.load(f)
+    for nombre in ['ventas', 'inicio', 'regresores', 'fechas_regresores']:
+        panel[nombre] = np.load(os.path.join(ruta, f"{nombre}.npy"), mmap_mode='r')
+    return completar_panel(panel)
+
+
+def regresores_desde_panel(panel):
+    """Reconstruye el DataFrame de regresores (ds + columnas, con el clima por tienda) desde la matriz compartida."""
+    columnas = panel.get('columnas_regresores', panel['regressor_cols'])
+    df = pd.DataFrame(np.asarray(panel['regresores']), columns=columnas)
+    df.insert(0, 'ds', pd.to_datetime(np.asarray(panel['fechas_regresores'])))
+    return df
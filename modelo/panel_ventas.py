@@ -0,0 +1,138 @@
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+CLAVES_SERIE = ['Location Name', 'Major Group Name', 'Family Group Name']
+
+# --- Promedio simple: últimos N días con venta de cada serie ---
+DIAS_PROMEDIO = 7
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def construir_panel_ventas(df_location_family_daily):
+    """
+    Construye el panel denso Tienda × Familia × Día de ventas, con ceros en los días sin registro.
+    Es la entrada canónica del modelo: las series, promedios y participaciones se obtienen como cortes del arreglo.
+    'inicio' guarda el primer día con registro de cada serie (-1 si la combinación no existe).
+    """
+    df = df_location_family_daily
+    tiendas = sorted(df['Location Name'].unique())
+    familias = sorted(df['Family Group Name'].unique())
+    fecha_inicio = df['ds'].min()
+    num_dias = (df['ds'].max() - fecha_inicio).days + 1
+
+    i = pd.Categorical(df['Location Name'], categories=tiendas).codes
+    j = pd.Categorical(df['Family Group Name'], categories=familias).codes
+    k = (df['ds'] - fecha_inicio).dt.days.to_numpy()
+
+    ventas = np.zeros((len(tiendas), len(familias), num_dias))
+    np.add.at(ventas, (i, j, k), df['Venta Real'].to_numpy(dtype=float))
+
+    inicio = np.full((len(tiendas), len(familias)), num_dias, dtype=np.int64)
+    np.minimum.at(inicio, (i, j), k)
+    inicio[inicio == num_dias] = -1
+
+    major_por_familia = (df[['Family Group Name', 'Major Group Name']].drop_duplicates('Family Group Name')
+                         .set_index('Family Group Name')['Major Group Name'].to_dict())
+    return completar_panel({
+        'ventas': ventas,
+        'inicio': inicio,
+        'tiendas': tiendas,
+        'familias': familias,
+        'major_por_familia': {f: major_por_familia[f] for f in familias},
+        'fecha_inicio': fecha_inicio,
+    })
+
+
+def completar_panel(panel):
+    """Agrega al panel los mapas de posición y el calendario derivados de sus índices."""
+    panel['fecha_inicio'] = pd.Timestamp(panel['fecha_inicio'])
+    panel['fechas'] = pd.date_range(panel['fecha_inicio'], periods=panel['ventas'].shape[2], freq='D')
+    panel['pos_tienda'] = {t: i for i, t in enumerate(panel['tiendas'])}
+    panel['pos_familia'] = {f: j for j, f in enumerate(panel['familias'])}
+    return panel
+
+
+def claves_series(panel):
+    """Combinaciones (Tienda, Major Group, Familia) con historial, en el mismo orden que un groupby."""
+    i, j = np.nonzero(np.asarray(panel['inicio']) >= 0)
+    claves = [(panel['tiendas'][a], panel['major_por_familia'][panel['familias'][b]], panel['familias'][b])
+              for a, b in zip(i, j)]
+    return sorted(claves)
+
+
+def dia_fin(panel, fecha=None):
+    """Índice (exclusivo) del último día del panel que entra hasta 'fecha' (todo el panel si es None)."""
+    num_dias = panel['ventas'].shape[2]
+    if fecha is None:
+        return num_dias
+    return int(np.clip((pd.Timestamp(fecha) - panel['fecha_inicio']).days + 1, 0, num_dias))
+
+
+def serie_desde_panel(panel, location, family_group, fin=None):
+    """Serie Tienda-Familia en formato largo, diaria y con ceros, desde su primer registro hasta 'fin'."""
+    i, j = panel['pos_tienda'][location], panel['pos_familia'][family_group]
+    desde, hasta = max(int(panel['inicio'][i, j]), 0), dia_fin(panel, fin)
+    if panel['inicio'][i, j] < 0:
+        hasta = desde
+    return pd.DataFrame({
+        'ds': panel['fechas'][desde:hasta],
+        'Location Name': location,
+        'Major Group Name': panel['major_por_familia'][family_group],
+        'Family Group Name': family_group,
+        'Venta Real': np.asarray(panel['ventas'][i, j, desde:hasta]),
+    })
+
+
+def familia_desde_panel(panel, family_group, fin=None):
+    """Todas las tiendas con historial de una familia hasta 'fin', en formato largo."""
+    j = panel['pos_familia'][family_group]
+    partes = [serie_desde_panel(panel, location, family_group, fin)
+              for i, location in enumerate(panel['tiendas']) if panel['inicio'][i, j] >= 0]
+    return pd.concat(partes, ignore_index=True)
+
+
+def ventas_ventana(panel, fin=None, dias=28):
+    """Venta total de cada Tienda-Familia en los últimos 'dias' hasta 'fin' (matriz tiendas × familias)."""
+    hasta = dia_fin(panel, fin)
+    return np.asarray(panel['ventas'][:, :, max(0, hasta - dias):hasta]).sum(axis=2)
+
+
+def promedio_dias_con_venta(panel, fin=None, n=DIAS_PROMEDIO):
+    """
+    Promedio redondeado de los últimos 'n' días con venta de todas las series a la vez (tiendas × familias).
+    Es el mismo promedio simple del pronóstico diario, sin recorrer las series una a una.
+    """
+    ventas = np.asarray(panel['ventas'][:, :, :dia_fin(panel, fin)])[:, :, ::-1]
+    con_venta = ventas > 0
+    seleccion = con_venta & (np.cumsum(con_venta, axis=2) <= n)
+    cantidad = seleccion.sum(axis=2)
+    suma = np.where(seleccion, ventas, 0).sum(axis=2)
+    promedio = np.divide(suma, cantidad, out=np.full(cantidad.shape, np.nan), where=cantidad > 0)
+    return np.round(promedio)
+
+
+def dias_con_venta(panel, fin=None):
+    """Cantidad de días con venta de cada Tienda-Familia hasta 'fin' (tiendas × familias)."""
+    return (np.asarray(panel['ventas'][:, :, :dia_fin(panel, fin)]) > 0).sum(axis=2)
+
+
+def huella_panel(panel):
+    """
+    Huella de los datos de un panel: su último día y un hash de las series y sus ventas.
+    Identifica la "cosecha" de datos con la que se calculó un resultado (p. ej. los parciales de una partición).
+    """
+    h = hashlib.sha1()
+    h.update(json.dumps([panel['tiendas'], panel['familias'], str(panel['fecha_inicio'].date())]).encode())
+    h.update(np.ascontiguousarray(panel['inicio']).tobytes())
+    h.update(np.ascontiguousarray(panel['ventas']).tobytes())
+    return f"{panel['fechas'][-1].strftime('%Y-%m-%d')}:{h.hexdigest()[:16]}"
@@ -0,0 +1,183 @@
+import os
+import glob
+import hashlib
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Ejecución particionada (--shard i/N) ---
+# Cada máquina procesa una partición de las series y deja su resultado parcial en una carpeta compartida;
+# un paso de combinación (--combinar N) las une antes de reconciliar y exportar.
+# Prueba local con N procesos:
+#   export ID_EJECUCION_PARTICIONES=$(date +%Y%m%dT%H%M%S)
+#   for i in 0 1 2 3; do python modelo/pronostico_demanda.py --shard $i/4 & done; wait
+#   python modelo/pronostico_demanda.py --combinar 4
+CARPETA_PARTICIONES = os.environ.get("CARPETA_PARTICIONES", os.path.join("resultados", "particiones"))
+
+# Tiempo de ajuste histórico por serie ("Tienda|Major Group|Familia" -> segundos), para equilibrar particiones.
+# Lo actualiza la combinación del pronóstico diario; todas las máquinas deben leer el mismo archivo.
+ARCHIVO_TIEMPOS = "tiempos_series.csv"
+PESO_MINIMO = 0.05  # segundos: las series reutilizadas de la caché también cuentan algo al repartir
+
+# Identificador de la ejecución distribuida: todas las particiones y la combinación deben compartirlo
+# (p. ej. el id de la ejecución del CI). Cada parcial guarda este id y la huella de los datos con que se calculó;
+# la combinación se niega a unir parciales de otra ejecución o de otros datos.
+ID_EJECUCION = os.environ.get("ID_EJECUCION_PARTICIONES")
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def parsear_particion(texto):
+    """Convierte 'i/N' (i de 0 a N-1) en la tupla (i, N)."""
+    try:
+        indice, total = (int(parte) for parte in texto.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Partición inválida '{texto}', se esperaba 'i/N'.")
+    if total < 1 or not 0 <= indice < total:
+        raise argparse.ArgumentTypeError(f"Partición inválida '{texto}': i debe estar entre 0 y N-1.")
+    return indice, total
+
+
+def ruta_con_particion(ruta, particion):
+    """Agrega '_iDeN' al nombre de un archivo local (caché, reporte) para que las particiones no se pisen."""
+    if particion is None:
+        return ruta
+    base, extension = os.path.splitext(ruta)
+    return f"{base}_{particion[0]}de{particion[1]}{extension}"
+
+
+def _hash_estable(clave):
+    """Hash estable entre máquinas y ejecuciones (hash() de Python cambia con cada proceso)."""
+    return int(hashlib.sha1(clave.encode()).hexdigest()[:12], 16)
+
+
+def cargar_tiempos(carpeta=CARPETA_PARTICIONES):
+    """Tiempos de ajuste históricos por serie; vacío si aún no hay una combinación previa."""
+    ruta = os.path.join(carpeta, ARCHIVO_TIEMPOS)
+    if not os.path.exists(ruta):
+        return {}
+    df = pd.read_csv(ruta)
+    return dict(zip(df['Clave'], df['Segundos']))
+
+
+def guardar_tiempos(df_reporte, carpeta=CARPETA_PARTICIONES):
+    """Guarda los tiempos de ajuste por serie del reporte de motores combinado."""
+    if df_reporte.empty:
+        return
+    claves = df_reporte[['Location Name', 'Major Group Name', 'Family Group Name']].astype(str).agg('|'.join, axis=1)
+    df = pd.DataFrame({'Clave': claves, 'Segundos': df_reporte['Segundos']})
+    os.makedirs(carpeta, exist_ok=True)
+    df.to_csv(os.path.join(carpeta, ARCHIVO_TIEMPOS), index=False)
+
+
+def asignar_particiones(claves, total, pesos=None):
+    """
+    Reparte las claves en 'total' particiones de forma determinista: de mayor a menor peso (tiempo de ajuste
+    histórico; la mediana si una clave no lo tiene), cada clave va a la partición con menos carga acumulada.
+    Sin pesos, equivale a un reparto balanceado por hash estable. Devuelve {clave: partición}.
+    """
+    pesos = pesos or {}
+    conocidos = [pesos[clave] for clave in claves if clave in pesos]
+    peso_defecto = float(np.median(conocidos)) if conocidos else 1.0
+    peso = {clave: max(pesos.get(clave, peso_defecto), PESO_MINIMO) for clave in claves}
+    orden = sorted(claves, key=lambda clave: (-peso[clave], _hash_estable(clave)))
+
+    carga = np.zeros(total)
+    asignacion = {}
+    for clave in orden:
+        destino = int(np.argmin(carga))
+        asignacion[clave] = destino
+        carga[destino] += peso[clave]
+    return asignacion
+
+
+def filtrar_particion(claves, particion, pesos=None, clave_texto='|'.join):
+    """Devuelve solo las claves de la partición (i, N); 'clave_texto' convierte cada clave en texto estable."""
+    if particion is None:
+        return list(claves)
+    indice, total = particion
+    claves = list(claves)
+    textos = [clave_texto(clave) for clave in claves]
+    asignacion = asignar_particiones(textos, total, pesos)
+    seleccion = [clave for clave, texto in zip(claves, textos) if asignacion[texto] == indice]
+    logging.info(f"🧩 Partición {indice}/{total}: {len(seleccion)} de {len(claves)} claves.")
+    return seleccion
+
+
+def peso_familia(pesos):
+    """Pesos agregados por Familia ('Major|Familia'), para particionar los motores que trabajan por familia."""
+    agregados = {}
+    for clave, segundos in pesos.items():
+        _, major_group, family_group = clave.split('|')
+        agregados[f"{major_group}|{family_group}"] = agregados.get(f"{major_group}|{family_group}", 0) + segundos
+    return agregados
+
+
+def guardar_parcial(objeto, nombre, particion, huella=None, carpeta=CARPETA_PARTICIONES, id_ejecucion=None):
+    """
+    Escribe el resultado parcial de una partición en la carpeta compartida (renombrado atómico).
+    Lo marca con el id de la ejecución (ID_EJECUCION si no se entrega) y la 'huella' de sus datos de entrada.
+    """
+    indice, total = particion
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"{nombre}_{indice}de{total}.pkl")
+    parcial = {'id_ejecucion': id_ejecucion or ID_EJECUCION, 'huella': huella, 'contenido': objeto}
+    pd.to_pickle(parcial, f"{ruta}.tmp")
+    os.replace(f"{ruta}.tmp", ruta)
+    logging.info(f"💾 Resultado parcial de la partición {indice}/{total} guardado en: {ruta}")
+    return ruta
+
+
+def _verificar_parciales(nombre, parciales, huella, id_ejecucion):
+    """Falla si los parciales no son todos de la misma ejecución y los mismos datos (y de la ejecución actual)."""
+    if any(not isinstance(p, dict) or 'contenido' not in p for p in parciales.values()):
+        raise ValueError(f"Hay parciales de '{nombre}' sin id de ejecución ni huella (formato anterior); "
+                         f"vuelve a ejecutar todas las particiones.")
+    for campo, etiqueta, esperado in (('id_ejecucion', 'id de ejecución', id_ejecucion),
+                                      ('huella', 'huella de datos', huella)):
+        grupos = {}
+        for i, parcial in parciales.items():
+            grupos.setdefault(parcial[campo], []).append(i)
+        if len(grupos) > 1:
+            detalle = '; '.join(f"{valor}: particiones {indices}" for valor, indices in grupos.items())
+            raise ValueError(f"Los parciales de '{nombre}' no son de la misma ejecución (distinto {etiqueta}: "
+                             f"{detalle}). Vuelve a ejecutar las particiones desactualizadas.")
+        if esperado is not None and esperado not in grupos:
+            raise ValueError(f"Los parciales de '{nombre}' tienen {etiqueta} '{next(iter(grupos))}' y la ejecución "
+                             f"actual '{esperado}'. Vuelve a ejecutar las particiones.")
+
+
+def cargar_parciales(nombre, total, huella=None, carpeta=CARPETA_PARTICIONES, id_ejecucion=None):
+    """
+    Lee los N resultados parciales de un paso; falla si falta alguna partición o si no son todos de la misma
+    ejecución (ID_EJECUCION) y de los mismos datos. Con 'huella' exige además que sean de los datos actuales.
+    """
+    rutas = {i: os.path.join(carpeta, f"{nombre}_{i}de{total}.pkl") for i in range(total)}
+    faltantes = [i for i, ruta in rutas.items() if not os.path.exists(ruta)]
+    if faltantes:
+        raise FileNotFoundError(f"Faltan las particiones {faltantes} de '{nombre}' en '{carpeta}'.")
+    otros = set(glob.glob(os.path.join(carpeta, f"{nombre}_*de*.pkl"))) - set(rutas.values())
+    if otros:
+        logging.warning(f"⚠️ Se ignoran parciales de otra cantidad de particiones: {sorted(otros)}")
+    parciales = {i: pd.read_pickle(rutas[i]) for i in range(total)}
+    _verificar_parciales(nombre, parciales, huella, id_ejecucion or ID_EJECUCION)
+    return [parciales[i]['contenido'] for i in range(total)]
+
+
+def argumentos_particion(descripcion, argv=None):
+    """Opciones comunes de línea de comandos: --shard i/N o --combinar N."""
+    parser = argparse.ArgumentParser(description=descripcion)
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument('--shard', type=parsear_particion, metavar='i/N',
+                       help="Procesa solo la partición i (0..N-1) de N y guarda el resultado parcial.")
+    grupo.add_argument('--combinar', type=int, metavar='N',
+                       help="Combina los N resultados parciales y continúa con los pasos finales.")
+    return parser.parse_args(argv)
@@ -0,0 +1,104 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Ventana móvil de participación por canal (Order Type Name) ---
+DIAS_PARTICIPACION_CANAL = 28
+
+CLAVES_SERIE = ['Location Name', 'Major Group Name', 'Family Group Name']
+COLUMNA_CANAL = 'Order Type Name'
+COLUMNAS_ESCENARIOS = ['Demanda', 'Peor Escenario', 'Escenario Promedio', 'Mejor Escenario']
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def _codificar(df, series, canales):
+    """Índices enteros de serie y canal de cada fila, extendiendo los catálogos con las claves nuevas."""
+    claves_serie = list(df[CLAVES_SERIE].itertuples(index=False, name=None))
+    for clave in claves_serie:
+        if clave not in series:
+            series[clave] = len(series)
+    for canal in df[COLUMNA_CANAL].unique():
+        if canal not in canales:
+            canales[canal] = len(canales)
+    idx_serie = np.fromiter((series[c] for c in claves_serie), dtype=np.int64, count=len(claves_serie))
+    idx_canal = df[COLUMNA_CANAL].map(canales).to_numpy(dtype=np.int64)
+    return idx_serie, idx_canal
+
+
+def construir_ventana_canal(df_canal, dias=DIAS_PARTICIPACION_CANAL):
+    """
+    Construye la ventana móvil densa (series × canales × días) de los últimos días de venta por canal.
+    Se rehace en cada ejecución desde la venta completa, así los CSV atrasados o corregidos siempre se reflejan.
+    """
+    ultima_fecha = df_canal['ds'].max()
+    inicio = ultima_fecha - pd.Timedelta(days=dias - 1)
+    recientes = df_canal[df_canal['ds'] >= inicio]
+
+    series, canales = {}, {}
+    idx_serie, idx_canal = _codificar(recientes, series, canales)
+    idx_dia = (recientes['ds'] - inicio).dt.days.to_numpy()
+
+    ventana = np.zeros((len(series), len(canales), dias))
+    np.add.at(ventana, (idx_serie, idx_canal, idx_dia), recientes['Venta Real'].to_numpy(dtype=float))
+    return {'ventana': ventana, 'series': series, 'canales': canales, 'ultima_fecha': ultima_fecha, 'dias': dias}
+
+
+def participacion_desde_ventana(ventana_canal):
+    """Calcula el % de participación de cada canal dentro de su Tienda-Familia en la ventana móvil."""
+    ventas_canal = ventana_canal['ventana'].sum(axis=2)
+    ventas_serie = ventas_canal.sum(axis=1, keepdims=True)
+    participacion = np.divide(ventas_canal, ventas_serie, out=np.zeros_like(ventas_canal), where=ventas_serie > 0)
+
+    df_series = pd.DataFrame(list(ventana_canal['series']), columns=CLAVES_SERIE)
+    canales = list(ventana_canal['canales'])
+    df = df_series.loc[df_series.index.repeat(len(canales))].reset_index(drop=True)
+    df[COLUMNA_CANAL] = np.tile(canales, len(df_series))
+    df['Participacion_Canal_%'] = participacion.reshape(-1) * 100
+    return df[df['Participacion_Canal_%'] > 0].reset_index(drop=True)
+
+
+def calcular_participacion_canal(df_canal, dias=DIAS_PARTICIPACION_CANAL):
+    """Devuelve la participación por canal de cada Tienda-Familia en los últimos 'dias' de venta."""
+    logging.info(f"Calculando participación por canal de los últimos {dias} días por tienda y familia...")
+    if df_canal.empty:
+        return pd.DataFrame()
+    return participacion_desde_ventana(construir_ventana_canal(df_canal, dias))
+
+
+def repartir_enteros(totales, fracciones, grupos):
+    """
+    Reparte totales enteros entre las filas de cada grupo por resto mayor: cada fila recibe la parte entera de
+    total · fracción y las unidades que faltan van a las filas con mayor resto. La suma del grupo es su total.
+    'totales' es el total del grupo repetido en cada fila y 'fracciones' suma 1 dentro de cada grupo.
+    """
+    exacto = np.asarray(totales, dtype=float) * np.asarray(fracciones, dtype=float)
+    base = np.floor(exacto)
+    resto = pd.Series(exacto - base)
+    faltantes = (pd.Series(np.round(totales), dtype=float) - pd.Series(base).groupby(grupos).transform('sum')).round()
+    orden = resto.groupby(grupos).rank(method='first', ascending=False)
+    return base + (orden <= faltantes).to_numpy()
+
+
+def desglosar_por_canal(df_forecast_family, df_participacion, columnas=COLUMNAS_ESCENARIOS):
+    """
+    Reparte el pronóstico Tienda-Familia entre canales según su participación reciente (sin modelos extra).
+    Los canales de una serie y fecha suman exactamente el pronóstico (redondeado) de la familia.
+    """
+    if df_forecast_family.empty or df_participacion.empty:
+        return pd.DataFrame()
+
+    df = pd.merge(df_forecast_family, df_participacion, on=CLAVES_SERIE, how='inner').reset_index(drop=True)
+    factor = df['Participacion_Canal_%'].to_numpy() / 100
+    grupos = df.groupby(CLAVES_SERIE + ['Fecha'], sort=False).ngroup().to_numpy()
+    for columna in columnas:
+        if columna in df.columns:
+            df[columna] = repartir_enteros(df[columna].to_numpy(dtype=float), factor, grupos)
+    return df
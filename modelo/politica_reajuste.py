@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Política de reajuste: reentrenar Prophet solo cuando el modelo dejó de seguir a la serie ---
+# Cada serie guarda su modelo ajustado. En las ejecuciones siguientes se evalúan solo los días nuevos contra ese
+# modelo: los residuos escalados alimentan un CUSUM de dos lados y el modelo se reajusta si el CUSUM supera
+# CUSUM_UMBRAL o si el modelo tiene más de EDAD_MAXIMA_MODELO_DIAS días; si no, solo se predice con él.
+# También se reajusta si cambió la configuración de la serie, su cap o alguna venta de los días ya ajustados.
+EDAD_MAXIMA_MODELO_DIAS = 28
+CUSUM_HOLGURA = 0.5   # k: desvío tolerado por día, en desviaciones estándar de los residuos
+CUSUM_UMBRAL = 5.0    # h: desvío acumulado que indica deriva
+ESCALA_MINIMA = 1.0   # unidades de venta: piso de la desviación de los residuos (series de poco volumen)
+FILAS_HISTORIAL_MODELO = 7  # El modelo guardado solo conserva la cola del historial (predict no necesita más)
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def _predecir_media(model, df):
+    """yhat del modelo sin muestrear los intervalos (basta para calcular residuos y es mucho más rápido)."""
+    muestras = model.uncertainty_samples
+    model.uncertainty_samples = 0
+    try:
+        return model.predict(df)['yhat'].to_numpy()
+    finally:
+        model.uncertainty_samples = muestras
+
+
+def _serializar(model):
+    """Modelo ajustado a JSON, con el historial recortado a su cola."""
+    from prophet.serialize import model_to_json
+
+    historial, fechas = model.history, model.history_dates
+    model.history, model.history_dates = historial.tail(FILAS_HISTORIAL_MODELO), fechas.tail(FILAS_HISTORIAL_MODELO)
+    try:
+        return model_to_json(model)
+    finally:
+        model.history, model.history_dates = historial, fechas
+
+
+def estado_tras_ajuste(model, df_prophet, forecast, cap, configuracion):
+    """
+    Estado que se guarda de una serie recién ajustada: el modelo, la venta con la que se ajustó, la escala de sus
+    residuos dentro de la muestra y el CUSUM en cero.
+    """
+    ajuste = pd.merge(df_prophet[['ds', 'y']], forecast[['ds', 'yhat']], on='ds', how='inner')
+    escala = float(np.std(ajuste['y'] - ajuste['yhat'])) if len(ajuste) > 1 else 0.0
+    ultimo_dia = df_prophet['ds'].max()
+    return {
+        'modelo': _serializar(model),
+        'configuracion': configuracion,
+        'cap': float(cap),
+        'primer_dia': df_prophet['ds'].min(),
+        'ventas': df_prophet['y'].to_numpy(dtype=np.float32),
+        'ultimo_dia_ajuste': ultimo_dia,
+        'ultimo_dia_evaluado': ultimo_dia,
+        'escala': max(escala, ESCALA_MINIMA),
+        'cusum_positivo': 0.0,
+        'cusum_negativo': 0.0,
+    }
+
+
+def _historial_cambio(estado, df_prophet):
+    """True si cambió la venta de algún día que el modelo ya había usado (p. ej. llegó un CSV atrasado)."""
+    dias = pd.date_range(estado['primer_dia'], estado['ultimo_dia_ajuste'], freq='D')
+    actuales = df_prophet.set_index('ds')['y'].reindex(dias)
+    desde = max(0, (df_prophet['ds'].min() - estado['primer_dia']).days)  # la ventana de entrenamiento pudo avanzar
+    actuales, guardadas = actuales.to_numpy(dtype=np.float32)[desde:], estado['ventas'][desde:]
+    return len(actuales) != len(guardadas) or not np.array_equal(actuales, guardadas)
+
+
+def actualizar_cusum(positivo, negativo, residuos_escalados, holgura=CUSUM_HOLGURA):
+    """CUSUM de dos lados; devuelve (positivo, negativo, máximo alcanzado) tras procesar los residuos en orden."""
+    maximo = max(positivo, negativo)
+    for z in residuos_escalados:
+        positivo = max(0.0, positivo + z - holgura)
+        negativo = max(0.0, negativo - z - holgura)
+        maximo = max(maximo, positivo, negativo)
+    return positivo, negativo, maximo
+
+
+def revisar_modelo(estado, df_prophet, cap, configuracion, edad_maxima=EDAD_MAXIMA_MODELO_DIAS,
+                   umbral=CUSUM_UMBRAL):
+    """
+    Decide si el modelo guardado de una serie sigue sirviendo. Devuelve (modelo, motivo, estado):
+    con motivo None el modelo cargado se usa solo para predecir y 'estado' trae el CUSUM actualizado con los días
+    nuevos; si no, modelo es None y 'motivo' explica por qué hay que reajustar.
+    """
+    from prophet.serialize import model_from_json
+
+    if not estado:
+        return None, 'sin modelo', None
+    if estado['configuracion'] != configuracion:
+        return None, 'configuración', None
+    if not np.isclose(estado['cap'], cap):
+        return None, 'cap', None
+    if _historial_cambio(estado, df_prophet):
+        return None, 'historial corregido', None
+    if (df_prophet['ds'].max() - estado['ultimo_dia_ajuste']).days > edad_maxima:
+        return None, 'edad', None
+
+    model = model_from_json(estado['modelo'])
+    nuevos = df_prophet[df_prophet['ds'] > estado['ultimo_dia_evaluado']]
+    positivo, negativo = estado['cusum_positivo'], estado['cusum_negativo']
+    if not nuevos.empty:
+        prediccion = _predecir_media(model, nuevos.assign(cap=estado['cap']))
+        residuos = (nuevos['y'].to_numpy() - prediccion) / estado['escala']
+        positivo, negativo, maximo = actualizar_cusum(positivo, negativo, residuos)
+        if maximo > umbral:
+            return None, 'deriva', None
+
+    return model, None, {**estado, 'cusum_positivo': positivo, 'cusum_negativo': negativo,
+                         'ultimo_dia_evaluado': df_prophet['ds'].max()}
@@ -1,16 +1,34 @@
 import os
+import sys
 import pandas as pd
 import numpy as np
-from prophet import Prophet
-import gspread
-from gspread_dataframe import set_with_dataframe
-from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime, timedelta
 import logging
-import matplotlib.pyplot as plt
 import json
+import hashlib
+import time
 import io  # Para leer datos en memoria
 
+# --- Permite ejecutar el módulo directamente (python modelo/pronostico_demanda.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo.participacion_canal import calcular_participacion_canal, desglosar_por_canal
+from modelo.demanda_intermitente import pronosticar_items_intermitentes, desglosar_items, COLUMNAS_ESCENARIOS
+from modelo.archivo_pronosticos import archivar_pronosticos, nuevo_id_ejecucion, ArchivoIncremental
+from modelo.lectura_pos import leer_archivos_pos, a_texto, enteros_sin_nulos
+from modelo.panel_ventas import (
+    construir_panel_ventas, claves_series, serie_desde_panel, ventas_ventana, promedio_dias_con_venta, huella_panel
+)
+from comun.promociones import mascara_aplicabilidad, promociones_inactivas
+from comun.puntos_control import etapa_completa, marcar_etapa, resultado_etapa, guardar_serie, series_guardadas
+from comun.perfilado import perfilar, perfilado_activo
+from modelo.politica_reajuste import revisar_modelo, estado_tras_ajuste
+from modelo.ventana_entrenamiento import recortar_ventana, describir_ventana
+from modelo.particiones import (
+    argumentos_particion, filtrar_particion, cargar_tiempos, guardar_tiempos, ruta_con_particion, guardar_parcial,
+    cargar_parciales
+)
+
 # --- Configuración de Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -18,36 +36,84 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
 # =============================================================================
 
-# --- Google Sheets ---
-try:
-    RUTA_CREDENCIALES = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS",
-                                       "G:/Mi unidad/Proyecto_Data/1. pythonProject/Proyeccion_Demanda/forecast-459600-d8ffd029be68.json")
-    SCOPE_GOOGLE = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
-except Exception as e:
-    logging.error(f"❌ Error al definir la ruta de credenciales: {e}")
-    raise
-
+# --- Google Sheets (credenciales y cliente en comun/cliente_google.py) ---
 SPREADSHEET_NAME = "1. Forecast_Diario"
 OUTPUT_SHEET_NAME = "Demanda Diaria por Tienda"
+CHANNEL_SHEET_NAME = "Demanda por Canal"
 HOLIDAYS_SHEET_NAME = "Holidays"
 TEMP_SHEET_NAME = "TempHistorico"
+SEPARADOR_TIENDA = '|'  # Clima por tienda en TempHistorico: 'dia_frio|Maipu' (ver generadores/generar_clima.py)
 PROMO_SHEET_NAME = "Promociones"
 
 # --- Archivos de Ventas ---
 # --- CAMBIO REALIZADO: Se revierte a una ruta relativa para que funcione en GitHub Actions ---
 CARPETA_VENTAS = "data"
 
+# --- Caché local de la ingesta (reutilizada por backtests y ejecuciones repetidas) ---
+CARPETA_CACHE = "cache"
+
+# --- Caché de pronósticos por serie: se reutiliza si la huella de sus entradas no cambió ---
+RUTA_CACHE_PRONOSTICOS = os.path.join(CARPETA_CACHE, "pronosticos_diarios.pkl")
+VERSION_MODELO = 2  # Incrementar al cambiar la lógica del modelo para invalidar la caché
+
+# --- Huellas de las hojas exportadas: una hoja cuyo contenido no cambió no se vuelve a escribir (modo vigilancia) ---
+RUTA_HUELLAS_EXPORTACION = os.path.join(CARPETA_CACHE, "huellas_exportacion.json")
+
+# --- Reconciliación jerárquica (Tienda-Familia → Familia → Major Group → Cadena) ---
+METODO_RECONCILIACION = 'bu'  # Ver modelo/reconciliacion.py: 'bu' o 'td'
+RUTA_PRONOSTICO_NIVELES = os.path.join("resultados", "pronostico_niveles.csv")
+
+# --- Columnas que se guardan en el archivo histórico de pronósticos (modelo/archivo_pronosticos.py) ---
+COLUMNAS_ARCHIVO_FAMILIA = ['Fecha', 'Location Name', 'Major Group Name', 'Family Group Name',
+                            'Peor Escenario', 'Escenario Promedio', 'Mejor Escenario', 'Motor']
+COLUMNAS_ARCHIVO_ITEM = ['Fecha', 'Location Name', 'Major Group Name', 'Family Group Name', 'Menu Item Number',
+                         'Menu Item Name', 'Demanda', 'Peor Escenario', 'Escenario Promedio', 'Mejor Escenario',
+                         'Motor Item']
+
+# --- Exportación continua: el desglose a item, el archivo y la hoja avanzan mientras se entrena ---
+# Solo con la reconciliación 'bu' (el pronóstico Tienda-Familia no cambia al reconciliar); con otros métodos se
+# exporta al final, cuando están todas las series. Ver comun/escritura_continua.py.
+EXPORTACION_CONTINUA = True
+
+# --- Columnas de la hoja de salida por item ---
+COLUMNAS_EXPORTACION = ['Fecha', 'Location Name', 'Major Group Name', 'Family Group Name', 'Menu Item Number',
+                        'Menu Item Name', 'Demanda', 'Venta Real', 'Peor Escenario', 'Escenario Promedio',
+                        'Mejor Escenario']
+
 # --- Parámetros del Modelo y Fechas ---
 FORECAST_PERIOD_DAYS = 14
 HISTORY_PERIOD_DAYS = 14
 
+# --- Plazo del entrenamiento diario ---
+# Las series se entrenan de mayor a menor venta; al agotarse el plazo, las restantes usan el promedio simple.
+PRESUPUESTO_ENTRENAMIENTO_SEGUNDOS = 40 * 60  # None = sin límite
+RUTA_REPORTE_MOTORES = os.path.join("resultados", "motores_por_serie.csv")
+
+# --- Política de reajuste: las series con datos nuevos reutilizan su modelo (solo predicción) mientras no haya ---
+# deriva de los residuos ni el modelo sea demasiado antiguo (ver modelo/politica_reajuste.py)
+REAJUSTE_POR_DERIVA = True
+
+# --- Ventana de entrenamiento: años de historia por serie, 'adaptativa' o None (todo el historial) ---
+# Acota el costo de ajuste y predicción (ver modelo/ventana_entrenamiento.py y modelo/benchmark_ventana.py).
+VENTANA_ENTRENAMIENTO = 3
+
 # --- Umbral para pronóstico simplificado ---
 MIN_DAYS_FOR_PROPHET = 30
 DAYS_FOR_REPRESENTATIVENESS = 28
 
+# --- Backend de ajuste de Prophet: 'cmdstanpy' (Stan en un subproceso) o 'map' (en proceso, sin archivos) ---
+# Ver modelo/backend_prophet.py. Se puede cambiar sin tocar el código con la variable de entorno BACKEND_PROPHET.
+BACKEND_PROPHET = os.environ.get("BACKEND_PROPHET", "cmdstanpy")
+
+# --- Parámetros de Prophet (por defecto y ajustados por serie) ---
+PARAMETROS_PROPHET_DEFECTO = {
+    'changepoint_prior_scale': 0.05,
+    'cap_multiplicador': 2.5,
+    'daily_seasonality': True,
+}
+# Generado por modelo/ajuste_hiperparametros.py. Claves "Tienda|Familia" o "*|Familia" (por familia).
+RUTA_PARAMETROS_SERIES = os.path.join("config", "parametros_series.json")
+
 # --- Filtros de Datos ---
 GRUPOS_INCLUIDOS = ["Delicias", "Pastel Grande", "Pastel Mediano", "Pastel Trozo"]
 ORDENES_EXCLUIDAS = ['Good Meal']
@@ -58,47 +124,30 @@ FAMILIas_EXCLUIDAS = ['Gift Box']
 # ---------------------------- FUNCIONES MODULARES ----------------------------
 # =============================================================================
 
-def autorizar_gsheets():
-    """Autoriza el acceso a Google Sheets y Drive usando un secreto en GitHub Actions o un archivo local."""
-    try:
-        gspread_creds_json = os.environ.get("GSPREAD_CREDENTIALS")
-        if gspread_creds_json:
-            logging.info("Usando credenciales desde GitHub Secrets.")
-            creds_dict = json.loads(gspread_creds_json)
-            creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE_GOOGLE)
-        else:
-            logging.info("Usando archivo de credenciales local.")
-            creds = ServiceAccountCredentials.from_json_keyfile_name(RUTA_CREDENCIALES, SCOPE_GOOGLE)
-
-        client = gspread.authorize(creds)
-        logging.info("✅ Autorización con Google exitosa.")
-        return client
-    except Exception as e:
-        logging.error(f"❌ Error al autorizar con Google: {e}")
-        raise
-
-
 def cargar_y_procesar_ventas(carpeta_ventas):
-    """Carga y procesa todos los archivos CSV desde una carpeta local."""
+    """
+    Carga y procesa todos los archivos CSV desde una carpeta local.
+    Además de los agregados en formato largo devuelve el panel denso Tienda × Familia × Día (entrada del modelo).
+    """
     logging.info(f"Cargando archivos de ventas desde la carpeta local: '{carpeta_ventas}'")
     try:
         files = [os.path.join(carpeta_ventas, f) for f in os.listdir(carpeta_ventas) if f.endswith('.csv')]
         if not files:
             logging.error("No se encontraron archivos .csv en la carpeta especificada.")
-            return pd.DataFrame(), pd.DataFrame()
+            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), None
 
-        df = pd.concat((pd.read_csv(f, on_bad_lines='skip') for f in files), ignore_index=True)
+        df = leer_archivos_pos(files)
 
     except FileNotFoundError:
         logging.error(
             f"❌ No se encontró la carpeta de datos '{carpeta_ventas}'. Asegúrate de que exista en la raíz del proyecto.")
-        return pd.DataFrame(), pd.DataFrame()
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), None
     except Exception as e:
         logging.error(f"Error al leer los archivos CSV: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), None
 
-    df['Business Date'] = pd.to_datetime(df['Business Date'], errors='coerce')
     df.dropna(subset=['Business Date', 'Location Name', 'Family Group Name', 'Menu Item Number'], inplace=True)
+    df = enteros_sin_nulos(df)
 
     mask = (
             df['Major Group Name'].isin(GRUPOS_INCLUIDOS) &
@@ -110,31 +159,86 @@ def cargar_y_procesar_ventas(carpeta_ventas):
     df_filtered['ds'] = df_filtered['Business Date']
 
     df_location_family_daily = (
-        df_filtered.groupby(['ds', 'Location Name', 'Major Group Name', 'Family Group Name'])
+        df_filtered.groupby(['ds', 'Location Name', 'Major Group Name', 'Family Group Name'], observed=True)
         ['Sales Count'].sum().reset_index().rename(columns={'Sales Count': 'Venta Real'})
-    )
+    ).pipe(a_texto)
     logging.info("Ventas agregadas a nivel diario por Tienda y Family Group.")
 
+    panel = construir_panel_ventas(df_location_family_daily)
+    logging.info(f"Panel de ventas: {len(panel['tiendas'])} tiendas × {len(panel['familias'])} familias "
+                 f"× {len(panel['fechas'])} días.")
+
     df_location_item_daily = (
         df_filtered.groupby(
-            ['ds', 'Location Name', 'Major Group Name', 'Family Group Name', 'Menu Item Number', 'Menu Item Name'])
+            ['ds', 'Location Name', 'Major Group Name', 'Family Group Name', 'Menu Item Number', 'Menu Item Name'],
+            observed=True)
         ['Sales Count'].sum().reset_index().rename(columns={'Sales Count': 'Venta Real'})
-    )
+    ).pipe(a_texto)
     logging.info("Ventas agregadas a nivel diario por Tienda y Menu Item.")
 
-    return df_location_family_daily, df_location_item_daily
+    df_location_family_channel_daily = (
+        df_filtered.groupby(['ds', 'Location Name', 'Major Group Name', 'Family Group Name', 'Order Type Name'],
+                            observed=True)
+        ['Sales Count'].sum().reset_index().rename(columns={'Sales Count': 'Venta Real'})
+    ).pipe(a_texto)
+    logging.info("Ventas agregadas a nivel diario por Tienda, Family Group y Canal (Order Type).")
+
+    return df_location_family_daily, df_location_item_daily, df_location_family_channel_daily, panel
+
+
+def huella_carpeta_ventas(carpeta_ventas):
+    """Calcula una huella de los CSV de la carpeta (nombre, tamaño y fecha de modificación)."""
+    h = hashlib.sha1()
+    for f in sorted(os.listdir(carpeta_ventas)):
+        if f.endswith('.csv'):
+            stat = os.stat(os.path.join(carpeta_ventas, f))
+            h.update(f"{f}|{stat.st_size}|{stat.st_mtime_ns};".encode())
+    return h.hexdigest()[:16]
+
+
+def cargar_ventas_con_cache(carpeta_ventas, carpeta_cache=CARPETA_CACHE):
+    """Devuelve la ingesta de ventas desde la caché local si los CSV no cambiaron; si no, la recalcula y la guarda."""
+    try:
+        huella = huella_carpeta_ventas(carpeta_ventas)
+    except FileNotFoundError:
+        return cargar_y_procesar_ventas(carpeta_ventas)
+
+    ruta_cache = os.path.join(carpeta_cache, f"ventas_v5_{huella}.pkl")
+    if os.path.exists(ruta_cache):
+        logging.info(f"♻️ Usando ingesta de ventas en caché: {ruta_cache}")
+        return pd.read_pickle(ruta_cache)
+
+    resultado = cargar_y_procesar_ventas(carpeta_ventas)
+    if not resultado[0].empty:
+        os.makedirs(carpeta_cache, exist_ok=True)
+        pd.to_pickle(resultado, ruta_cache)
+        logging.info(f"💾 Ingesta de ventas guardada en caché: {ruta_cache}")
+        _limpiar_cache_ventas(carpeta_cache, ruta_cache)
+    return resultado
+
+
+def _limpiar_cache_ventas(carpeta_cache, ruta_actual):
+    """Borra las ingestas en caché de datos anteriores: solo sirve la de la huella actual."""
+    for nombre in os.listdir(carpeta_cache):
+        ruta = os.path.join(carpeta_cache, nombre)
+        if nombre.startswith("ventas_v") and nombre.endswith(".pkl") and ruta != ruta_actual:
+            try:
+                os.remove(ruta)
+            except OSError as e:
+                logging.warning(f"⚠️ No se pudo borrar la caché de ventas anterior '{ruta}': {e}")
 
 
 def cargar_regresores_externos(spreadsheet):
     """Carga y combina las tablas de feriados, clima y promociones."""
+    from comun.cliente_google import leer_hoja
+
     logging.info("Cargando variables externas (feriados, clima, promociones)...")
 
     df_regressors_list = []
 
     # Cargar Feriados, Días de Pago y Vacaciones
     try:
-        holidays_ws = spreadsheet.worksheet(HOLIDAYS_SHEET_NAME)
-        df_holidays = pd.DataFrame(holidays_ws.get_all_records())
+        df_holidays = leer_hoja(spreadsheet, HOLIDAYS_SHEET_NAME)
         df_holidays['ds'] = pd.to_datetime(df_holidays['fecha'])
         df_regressors_list.append(df_holidays.drop(columns='fecha'))
     except Exception as e:
@@ -142,8 +246,7 @@ def cargar_regresores_externos(spreadsheet):
 
     # Cargar Clima
     try:
-        temp_ws = spreadsheet.worksheet(TEMP_SHEET_NAME)
-        df_weather = pd.DataFrame(temp_ws.get_all_records())
+        df_weather = leer_hoja(spreadsheet, TEMP_SHEET_NAME)
         df_weather['ds'] = pd.to_datetime(df_weather['fecha'])
         df_regressors_list.append(df_weather.drop(columns='fecha'))
     except Exception as e:
@@ -151,8 +254,7 @@ def cargar_regresores_externos(spreadsheet):
 
     # Cargar Promociones
     try:
-        promo_ws = spreadsheet.worksheet(PROMO_SHEET_NAME)
-        df_promos = pd.DataFrame(promo_ws.get_all_records())
+        df_promos = leer_hoja(spreadsheet, PROMO_SHEET_NAME)
         df_promos['ds'] = pd.to_datetime(df_promos['fecha'])
         df_regressors_list.append(df_promos.drop(columns='fecha'))
     except Exception as e:
@@ -165,14 +267,50 @@ def cargar_regresores_externos(spreadsheet):
     from functools import reduce
     df_regressors = reduce(lambda left, right: pd.merge(left, right, on='ds', how='outer'), df_regressors_list)
 
-    # Excluir columnas que no son regresores directos del modelo
+    # Excluir columnas que no son regresores directos del modelo; las de clima por tienda reemplazan a las
+    # generales en cada serie (regresores_de_tienda)
     cols_to_exclude = ['ds', 'temperatura_max_c']
-    regressor_cols = [col for col in df_regressors.columns if col not in cols_to_exclude]
+    regressor_cols = [col for col in df_regressors.columns
+                      if col not in cols_to_exclude and SEPARADOR_TIENDA not in col]
+    tiendas_clima = {col.split(SEPARADOR_TIENDA, 1)[1].strip()
+                     for col in df_regressors.columns if SEPARADOR_TIENDA in col}
     logging.info(f"✅ Regresores externos cargados: {regressor_cols}")
+    if tiendas_clima:
+        logging.info(f"🌦️ Clima propio para {len(tiendas_clima)} tiendas; el resto usa el clima general.")
 
     return df_regressors, regressor_cols
 
 
+def regresores_de_tienda(df_regressors, location):
+    """
+    Regresores de una tienda: las columnas generales con versión de la tienda ('dia_frio|Maipu') se reemplazan por
+    esa versión y se quitan las de las demás tiendas. Sin columnas por tienda se devuelve la misma tabla.
+    Los nombres se comparan sin espacios al inicio ni al final ('San Miguel ' usa 'dia_frio|San Miguel').
+    """
+    por_tienda = [col for col in df_regressors.columns if SEPARADOR_TIENDA in col]
+    if not por_tienda:
+        return df_regressors
+    tienda = str(location).strip()
+    propias = {col: col.split(SEPARADOR_TIENDA, 1)[0] for col in por_tienda
+               if col.split(SEPARADOR_TIENDA, 1)[1].strip() == tienda}
+    reemplazadas = [col for col in propias.values() if col in df_regressors.columns]
+    return df_regressors.drop(columns=[col for col in por_tienda if col not in propias] + reemplazadas) \
+        .rename(columns=propias)
+
+
+def avisar_clima_sin_serie(df_regressors, tiendas):
+    """
+    Avisa de las tiendas con clima propio (tienen coordenadas en generar_clima) cuyas columnas no coinciden con
+    ninguna tienda de las ventas: sus series usarían el clima general sin que nadie lo note.
+    """
+    con_clima = {col.split(SEPARADOR_TIENDA, 1)[1].strip() for col in df_regressors.columns if SEPARADOR_TIENDA in col}
+    sin_serie = sorted(con_clima - {str(tienda).strip() for tienda in tiendas})
+    if sin_serie:
+        logging.warning(f"⚠️ {len(sin_serie)} tienda(s) con clima propio no aparecen en las ventas y no reciben sus "
+                        f"columnas: {', '.join(sin_serie)}. Revisar el nombre en UBICACIONES_TIENDAS.")
+    return sin_serie
+
+
 def calcular_representatividad(df_location_item_daily):
     """Calcula el % de representatividad de cada item dentro de su Family Group, POR TIENDA."""
     logging.info(f"Calculando representatividad de los últimos {DAYS_FOR_REPRESENTATIVENESS} días por tienda...")
@@ -195,120 +333,394 @@ def calcular_representatividad(df_location_item_daily):
     return df_rep[['Location Name', 'Family Group Name', 'Menu Item Number', 'Menu Item Name', 'Representatividad_%']]
 
 
-def entrenar_y_pronosticar(df_model, df_regressors, regressor_cols):
-    """Itera sobre cada combinación de Tienda-Familia, entrena un modelo Prophet o usa un promedio simple."""
-    logging.info("Iniciando ciclo de entrenamiento y pronóstico diario por Tienda y Familia...")
+def cargar_parametros_series(ruta=RUTA_PARAMETROS_SERIES):
+    """Carga la configuración de Prophet ajustada por serie, si existe."""
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            parametros = json.load(f)
+        logging.info(f"✅ Parámetros ajustados cargados para {len(parametros)} series/familias desde '{ruta}'.")
+        return parametros
+    except Exception as e:
+        logging.error(f"❌ No se pudo leer '{ruta}', se usarán los parámetros por defecto: {e}")
+        return {}
+
+
+def parametros_para_serie(parametros_series, location, family_group):
+    """Devuelve los parámetros de Prophet de una serie: primero los de la serie, luego los de su familia."""
+    ajustados = parametros_series.get(f"{location}|{family_group}") or parametros_series.get(f"*|{family_group}") or {}
+    return {clave: ajustados.get(clave, valor) for clave, valor in PARAMETROS_PROPHET_DEFECTO.items()}
+
+
+def huella_serie(group, df_regressors, regressor_cols, major_group, parametros, periodos=FORECAST_PERIOD_DAYS,
+                 inactivas=(), backend=BACKEND_PROPHET, ventana=VENTANA_ENTRENAMIENTO):
+    """
+    Huella de las entradas de una serie: su historial (ya recortado a la ventana de entrenamiento), los regresores
+    del rango que usa (historial + horizonte) y la configuración del modelo.
+    """
+    h = hashlib.sha1()
+    historial = group[['ds', 'Venta Real']].sort_values('ds')
+    h.update(pd.util.hash_pandas_object(historial, index=False).values.tobytes())
+
+    if not df_regressors.empty:
+        fin = group['ds'].max() + pd.Timedelta(days=periodos)
+        rango = df_regressors[(df_regressors['ds'] >= group['ds'].min()) & (df_regressors['ds'] <= fin)]
+        rango = rango[['ds'] + list(regressor_cols)].sort_values('ds')
+        h.update(pd.util.hash_pandas_object(rango, index=False).values.tobytes())
+
+    config = configuracion_serie(regressor_cols, major_group, parametros, periodos, inactivas, backend, ventana)
+    h.update(json.dumps(config, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def configuracion_serie(regressor_cols, major_group, parametros, periodos=FORECAST_PERIOD_DAYS, inactivas=(),
+                        backend=BACKEND_PROPHET, ventana=VENTANA_ENTRENAMIENTO):
+    """Configuración del modelo de una serie (sin sus datos): si cambia, su modelo guardado ya no sirve."""
+    return {'version': VERSION_MODELO, 'major_group': major_group, 'periodos': periodos,
+            'regresores': list(regressor_cols), 'parametros': parametros, 'promociones_inactivas': list(inactivas),
+            'backend': backend, 'ventana': ventana}
+
+
+def metadatos_serie(group, regressor_cols, inactivas, parametros, backend):
+    """Datos de una serie que explican su costo de ajuste, para el perfilado (comun/perfilado.py)."""
+    return {'dias_historial': len(group), 'dias_con_venta': int((group['Venta Real'] > 0).sum()),
+            'regresores': len(regressor_cols) - len(inactivas),
+            'cap': float(group['Venta Real'].max() * parametros['cap_multiplicador']), 'backend': backend}
+
+
+def cargar_cache_pronosticos(ruta=RUTA_CACHE_PRONOSTICOS):
+    """Carga los pronósticos guardados de la última ejecución junto a la huella de sus entradas."""
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        return pd.read_pickle(ruta)
+    except Exception as e:
+        logging.warning(f"⚠️ No se pudo leer la caché de pronósticos '{ruta}', se recalculará todo: {e}")
+        return {}
+
+
+def guardar_cache_pronosticos(cache, ruta=RUTA_CACHE_PRONOSTICOS):
+    """Guarda los pronósticos por serie con sus huellas para la próxima ejecución."""
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        pd.to_pickle(cache, ruta)
+    except Exception as e:
+        logging.error(f"❌ No se pudo guardar la caché de pronósticos: {e}")
+
+
+def pronostico_promedio(sales_history, last_date, periodos=FORECAST_PERIOD_DAYS):
+    """Pronóstico simplificado: repite el promedio de los últimos 7 días con venta."""
+    demand_avg = np.round(sales_history['Venta Real'].tail(7).mean())
+    return pronostico_constante(demand_avg, last_date, periodos)
+
+
+def pronostico_constante(demand_avg, last_date, periodos=FORECAST_PERIOD_DAYS):
+    """Repite una demanda fija en todos los días del horizonte (los cuatro escenarios iguales)."""
+    future_dates = pd.date_range(start=last_date, periods=periodos + 1, freq='D')[1:]
+    df_out = pd.DataFrame({'Fecha': future_dates})
+    df_out['Demanda'] = demand_avg
+    df_out['Peor Escenario'] = demand_avg
+    df_out['Escenario Promedio'] = demand_avg
+    df_out['Mejor Escenario'] = demand_avg
+    return df_out
+
+
+def coeficientes_regresores(model):
+    """Efecto aditivo de una unidad de cada regresor sobre la venta (escala original), por regresor."""
+    if not model.extra_regressors:
+        return {}
+    from prophet.utilities import regressor_coefficients
+
+    df_coef = regressor_coefficients(model)
+    return dict(zip(df_coef['regressor'], df_coef['coef']))
+
+
+def pronosticar_serie(location, major_group, family_group, group, df_regressors, regressor_cols,
+                      plots_dir=None, motor='auto', periodos=FORECAST_PERIOD_DAYS, parametros=None, inactivas=None,
+                      componentes=None, backend=BACKEND_PROPHET, politica=None, ventana=VENTANA_ENTRENAMIENTO):
+    """
+    Pronostica una combinación Tienda-Familia con Prophet o con el promedio simple.
+    'backend' elige cómo se ajusta Prophet ('cmdstanpy' o 'map', ver modelo/backend_prophet.py).
+    'inactivas' son las columnas de promoción que no aplican a la serie (se calculan si no se entregan).
+    Si se entrega el dict 'componentes', se completa con los coeficientes de los regresores y la matriz de
+    regresores del horizonte, para recalcular escenarios sin reentrenar (modelo/escenarios.py).
+    Si 'df_regressors' trae clima por tienda se usa el de 'location' (regresores_de_tienda).
+    Prophet se ajusta solo con la 'ventana' de entrenamiento de la serie (modelo/ventana_entrenamiento.py); el cap,
+    los regresores y las fechas del pronóstico salen de la serie recortada.
+    Con 'politica' ({'estado': modelo guardado o None}) se reutiliza el modelo guardado si sigue sirviendo
+    (modelo/politica_reajuste.py); al volver, politica['motivo'] es None si solo se predijo o el motivo del
+    reajuste, y politica['estado'] trae el estado a guardar.
+    Devuelve (df_out, motor_usado) o (None, None) si la serie se omite o falla.
+    """
+    from modelo.backend_prophet import crear_prophet
+
+    df_regressors = regresores_de_tienda(df_regressors, location)
+
+    sales_history = group[group['Venta Real'] > 0]
+    num_sales_days = len(sales_history)
+
+    if num_sales_days < 1:
+        logging.warning(f"⚠️ Combinación '{location} - {family_group}' omitida, sin historial.")
+        return None, None
+
+    if motor == 'promedio' or num_sales_days < MIN_DAYS_FOR_PROPHET:
+        logging.info(f"🔹 Usando promedio para '{location} - {family_group}' (poca data)")
+        return pronostico_promedio(sales_history, group['ds'].max(), periodos), 'promedio'
+
+    parametros = {**PARAMETROS_PROPHET_DEFECTO, **(parametros or {})}
+    if inactivas is None:
+        clave = (location, major_group, family_group)
+        inactivas = promociones_inactivas(mascara_aplicabilidad([clave]), clave, regressor_cols)
+
+    try:
+        df_prophet = recortar_ventana(group[['ds', 'Venta Real']], ventana).rename(columns={'Venta Real': 'y'})
+
+        df_prophet = pd.merge(df_prophet, df_regressors, on='ds', how='left')
+        df_prophet[regressor_cols] = df_prophet[regressor_cols].fillna(0)
+        df_prophet[inactivas] = 0
+
+        max_sale = df_prophet['y'].max()
+        cap_limit = max_sale * parametros['cap_multiplicador']
+        df_prophet['cap'] = cap_limit
+
+        model = None
+        if politica is not None:
+            configuracion = configuracion_serie(regressor_cols, major_group, parametros, periodos, inactivas, backend,
+                                                ventana)
+            model, politica['motivo'], politica['estado'] = revisar_modelo(politica.get('estado'), df_prophet,
+                                                                          cap_limit, configuracion)
+
+        if model is None:
+            model = crear_prophet(backend,
+                                  growth='logistic',
+                                  seasonality_mode='additive',
+                                  yearly_seasonality=True,
+                                  weekly_seasonality=True,
+                                  daily_seasonality=parametros['daily_seasonality'],
+                                  changepoint_prior_scale=parametros['changepoint_prior_scale'])
+
+            for regressor in regressor_cols:
+                model.add_regressor(regressor)
+
+            model.fit(df_prophet)
+            future = model.make_future_dataframe(periods=periodos, freq='D')
+        else:
+            # El modelo guardado solo conserva la cola de su historial: las fechas salen de la serie actual
+            future = pd.DataFrame({'ds': pd.date_range(df_prophet['ds'].min(),
+                                                       df_prophet['ds'].max() + pd.Timedelta(days=periodos),
+                                                       freq='D')})
+        future['cap'] = cap_limit
+
+        future = pd.merge(future, df_regressors, on='ds', how='left')
+        future[regressor_cols] = future[regressor_cols].fillna(0)
+        future[inactivas] = 0
+
+        forecast = model.predict(future)
+
+        if componentes is not None:
+            componentes.update(coeficientes=coeficientes_regresores(model), columnas=list(regressor_cols),
+                               regresores=future[regressor_cols].tail(periodos).to_numpy(dtype=float),
+                               inactivas=list(inactivas))
+
+        df_out = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].rename(columns={'ds': 'Fecha'})
+        df_out['Peor Escenario'] = np.maximum(0, df_out['yhat_lower']).round()
+        df_out['Escenario Promedio'] = np.maximum(0, df_out['yhat']).round()
+        df_out['Mejor Escenario'] = np.maximum(0, df_out['yhat_upper']).round()
+
+        if politica is not None and politica['motivo'] is not None:
+            politica['estado'] = estado_tras_ajuste(model, df_prophet, forecast, cap_limit, configuracion)
+        reutilizado = politica is not None and politica['motivo'] is None
+        logging.info(f"✅ Pronóstico con Prophet generado para: '{location} - {family_group}'"
+                     f"{' (modelo reutilizado, sin reajuste)' if reutilizado else ''}")
+
+        if plots_dir and not reutilizado:
+            try:
+                import matplotlib.pyplot as plt
+
+                fig = model.plot_components(forecast)
+                safe_location = "".join(c for c in location if c.isalnum() or c in (' ', '_')).rstrip()
+                safe_family = "".join(c for c in family_group if c.isalnum() or c in (' ', '_')).rstrip()
+                plot_filename = os.path.join(plots_dir,
+                                             f"componentes_{safe_location}_{safe_family}.png".replace(" ", "_"))
+                fig.savefig(plot_filename)
+                plt.close(fig)
+                logging.info(f"📈 Gráfico de componentes guardado en: {plot_filename}")
+            except Exception as plot_e:
+                logging.error(
+                    f"❌ No se pudo generar el gráfico de componentes para '{location} - {family_group}': {plot_e}")
+
+        return df_out, 'prophet'
+
+    except Exception as e:
+        logging.error(f"❌ Falló el pronóstico para '{location} - {family_group}': {e}")
+        return None, None
+
+
+def entrenar_y_pronosticar(panel, df_regressors, regressor_cols, usar_cache=True,
+                           presupuesto_segundos=PRESUPUESTO_ENTRENAMIENTO_SEGUNDOS, particion=None,
+                           backend=BACKEND_PROPHET, destino=None, ventana=VENTANA_ENTRENAMIENTO):
+    """
+    Itera sobre cada combinación de Tienda-Familia del panel, entrena un modelo Prophet o usa un promedio simple.
+    Cada serie se toma del panel denso, diaria y con ceros en los días sin venta.
+    Si la huella de las entradas de una serie coincide con la de la última ejecución, reutiliza su pronóstico.
+
+    Las series se recorren de mayor a menor venta reciente. Con 'presupuesto_segundos', las que no alcanzan a
+    entrenarse antes del plazo usan el promedio vectorizado del panel, así todas tienen pronóstico a tiempo.
+    La columna 'Motor' del resultado indica el motor de cada serie y el detalle se guarda en RUTA_REPORTE_MOTORES.
+    Cada serie entrenada se guarda como punto de control de la ejecución; al reanudar se reutilizan por huella.
+    Con 'particion' (i, N) solo se procesan las series de esa partición (ver modelo/particiones.py).
+    'backend' es el backend de ajuste de Prophet; forma parte de la huella de cada serie.
+    Con 'destino' (p. ej. un EscritorEnSegundoPlano) cada pronóstico se le entrega con agregar() apenas está listo.
+    Con el perfilado activo (main.py --perfilar) cada serie entrenada se perfila con sus metadatos.
+    Con REAJUSTE_POR_DERIVA, las series con datos nuevos reutilizan el modelo guardado en la caché y solo predicen,
+    salvo deriva de los residuos o modelo demasiado antiguo (modelo/politica_reajuste.py).
+    Cada serie se recorta a la 'ventana' de entrenamiento antes de calcular su huella y entrenarla.
+    """
+    logging.info(f"Iniciando ciclo de entrenamiento y pronóstico diario por Tienda y Familia "
+                 f"(ventana de entrenamiento: {describir_ventana(ventana)})...")
+    inicio = time.perf_counter()
+    limite = inicio + presupuesto_segundos if presupuesto_segundos else None
+
     all_forecasts = []
+    reporte = []
+    parametros_series = cargar_parametros_series()
+    ruta_cache = ruta_con_particion(RUTA_CACHE_PRONOSTICOS, particion)
+    cache = cargar_cache_pronosticos(ruta_cache) if usar_cache else {}
+    reanudadas = series_guardadas()
+    if reanudadas:
+        logging.info(f"🔁 {len(reanudadas)} series terminadas antes de la interrupción, se reutilizan.")
+        cache.update(reanudadas)
+    cache_nueva = {}
+    reutilizadas, recalculadas, por_plazo = 0, 0, 0
+    motivos_reajuste, solo_prediccion = {}, 0
+    segundos_ajustes = []
 
     plots_dir = 'plots'
     if not os.path.exists(plots_dir):
         os.makedirs(plots_dir)
 
-    for (location, major_group, family_group), group in df_model.groupby(
-            ['Location Name', 'Major Group Name', 'Family Group Name']):
-        sales_history = group[group['Venta Real'] > 0]
-        num_sales_days = len(sales_history)
-
-        if num_sales_days < MIN_DAYS_FOR_PROPHET:
-            if num_sales_days < 1:
-                logging.warning(f"⚠️ Combinación '{location} - {family_group}' omitida, sin historial.")
+    claves = filtrar_particion(claves_series(panel), particion, cargar_tiempos())
+    mascara_promociones = mascara_aplicabilidad(claves)
+
+    # Prioridad por volumen: primero las series que más venden en la ventana reciente
+    ventas_recientes = ventas_ventana(panel, dias=DAYS_FOR_REPRESENTATIVENESS)
+    promedios = promedio_dias_con_venta(panel)
+    posiciones = {clave: (panel['pos_tienda'][clave[0]], panel['pos_familia'][clave[2]]) for clave in claves}
+    claves = sorted(claves, key=lambda clave: -ventas_recientes[posiciones[clave]])
+    avisar_clima_sin_serie(df_regressors, panel['tiendas'])
+    regresores_por_tienda = {location: regresores_de_tienda(df_regressors, location)
+                             for location in {clave[0] for clave in claves}}
+
+    for location, major_group, family_group in claves:
+        group = recortar_ventana(serie_desde_panel(panel, location, family_group), ventana)
+        df_reg_tienda = regresores_por_tienda[location]
+        parametros = parametros_para_serie(parametros_series, location, family_group)
+        inactivas = promociones_inactivas(mascara_promociones, (location, major_group, family_group), regressor_cols)
+        clave = f"{location}|{major_group}|{family_group}"
+        huella = huella_serie(group, df_reg_tienda, regressor_cols, major_group, parametros, inactivas=inactivas,
+                              backend=backend, ventana=ventana)
+        inicio_serie = time.perf_counter()
+
+        guardado = cache.get(clave)
+        if guardado and guardado['huella'] == huella:
+            df_out = guardado['pronostico'].copy()
+            motor_usado, origen = guardado['motor'], 'reanudada' if clave in reanudadas else 'caché'
+            reutilizadas += 1
+            cache_nueva[clave] = guardado
+            logging.info(f"♻️ Entradas sin cambios, se reutiliza el pronóstico de '{location} - {family_group}'")
+        elif limite and inicio_serie + (np.mean(segundos_ajustes) if segundos_ajustes else 0) > limite:
+            # No alcanza a entrenarse antes del plazo: promedio del panel. La entrada guardada conserva su huella
+            # anterior (se reentrena mañana) y su modelo, estado CUSUM y componentes para la próxima ejecución.
+            demanda = promedios[posiciones[(location, major_group, family_group)]]
+            if np.isnan(demanda):
                 continue
-            logging.info(f"🔹 Usando promedio para '{location} - {family_group}' (poca data)")
-            demand_avg = np.round(sales_history['Venta Real'].tail(7).mean())
-            last_date = group['ds'].max()
-            future_dates = pd.date_range(start=last_date, periods=FORECAST_PERIOD_DAYS + 1, freq='D')[1:]
-            df_out = pd.DataFrame({'Fecha': future_dates})
-            df_out['Demanda'] = demand_avg
-            df_out['Peor Escenario'] = demand_avg
-            df_out['Escenario Promedio'] = demand_avg
-            df_out['Mejor Escenario'] = demand_avg
-
+            df_out = pronostico_constante(demanda, panel['fechas'][-1])
+            motor_usado, origen = 'promedio', 'plazo'
+            por_plazo += 1
+            if guardado:
+                cache_nueva[clave] = {**guardado, 'pronostico': df_out.copy(), 'motor': motor_usado}
         else:
-            try:
-                df_prophet = group[['ds', 'Venta Real']].rename(columns={'Venta Real': 'y'})
-
-                df_prophet = pd.merge(df_prophet, df_regressors, on='ds', how='left')
-                df_prophet[regressor_cols] = df_prophet[regressor_cols].fillna(0)
-
-                if 'fuerza_promo_pastel_trozo' in df_prophet.columns and major_group != 'Pastel Trozo':
-                    df_prophet['fuerza_promo_pastel_trozo'] = 0
-
-                max_sale = df_prophet['y'].max()
-                cap_limit = max_sale * 2.5
-                df_prophet['cap'] = cap_limit
-
-                model = Prophet(growth='logistic',
-                                seasonality_mode='additive',
-                                yearly_seasonality=True,
-                                weekly_seasonality=True,
-                                daily_seasonality=True,
-                                changepoint_prior_scale=0.05)
-
-                for regressor in regressor_cols:
-                    model.add_regressor(regressor)
-
-                model.fit(df_prophet)
-                future = model.make_future_dataframe(periods=FORECAST_PERIOD_DAYS, freq='D')
-                future['cap'] = cap_limit
-
-                future = pd.merge(future, df_regressors, on='ds', how='left')
-                future[regressor_cols] = future[regressor_cols].fillna(0)
-
-                if 'fuerza_promo_pastel_trozo' in future.columns and major_group != 'Pastel Trozo':
-                    future['fuerza_promo_pastel_trozo'] = 0
-
-                forecast = model.predict(future)
-
-                df_out = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].rename(columns={'ds': 'Fecha'})
-                df_out['Peor Escenario'] = np.maximum(0, df_out['yhat_lower']).round()
-                df_out['Escenario Promedio'] = np.maximum(0, df_out['yhat']).round()
-                df_out['Mejor Escenario'] = np.maximum(0, df_out['yhat_upper']).round()
-
-                logging.info(f"✅ Pronóstico con Prophet generado para: '{location} - {family_group}'")
-
-                try:
-                    fig = model.plot_components(forecast)
-                    safe_location = "".join(c for c in location if c.isalnum() or c in (' ', '_')).rstrip()
-                    safe_family = "".join(c for c in family_group if c.isalnum() or c in (' ', '_')).rstrip()
-                    plot_filename = os.path.join(plots_dir,
-                                                 f"componentes_{safe_location}_{safe_family}.png".replace(" ", "_"))
-                    fig.savefig(plot_filename)
-                    plt.close(fig)
-                    logging.info(f"📈 Gráfico de componentes guardado en: {plot_filename}")
-                except Exception as plot_e:
-                    logging.error(
-                        f"❌ No se pudo generar el gráfico de componentes para '{location} - {family_group}': {plot_e}")
-
-            except Exception as e:
-                logging.error(f"❌ Falló el pronóstico para '{location} - {family_group}': {e}")
+            componentes = {}
+            politica = {'estado': guardado.get('modelo') if guardado else None} if REAJUSTE_POR_DERIVA else None
+            metadatos = metadatos_serie(group, regressor_cols, inactivas, parametros, backend) \
+                if perfilado_activo() else {}
+            with perfilar('serie', clave, metadatos):
+                df_out, motor_usado = pronosticar_serie(location, major_group, family_group, group, df_reg_tienda,
+                                                        regressor_cols, plots_dir=plots_dir, parametros=parametros,
+                                                        inactivas=inactivas, componentes=componentes,
+                                                        backend=backend, politica=politica, ventana=ventana)
+                metadatos['motor'] = motor_usado
+                metadatos['reajuste'] = politica.get('motivo') if politica is not None else None
+            if df_out is None:
                 continue
+            origen = 'entrenado'
+            recalculadas += 1
+            modelo = None
+            if motor_usado == 'prophet' and politica is not None:
+                modelo = politica['estado']
+                motivo = politica['motivo']
+                if motivo is None:
+                    origen = 'solo predicción'
+                    solo_prediccion += 1
+                else:
+                    motivos_reajuste[motivo] = motivos_reajuste.get(motivo, 0) + 1
+            if motor_usado == 'prophet' and origen == 'entrenado':
+                segundos_ajustes.append(time.perf_counter() - inicio_serie)
+            cache_nueva[clave] = {'huella': huella, 'pronostico': df_out.copy(), 'motor': motor_usado,
+                                  'componentes': componentes, 'modelo': modelo}
+            guardar_serie(clave, cache_nueva[clave])
 
         df_out['Location Name'] = location
         df_out['Family Group Name'] = family_group
-        df_out['Major Group Name'] = group['Major Group Name'].iloc[0]
+        df_out['Major Group Name'] = major_group
+        df_out['Motor'] = motor_usado
         all_forecasts.append(df_out)
+        if destino is not None:
+            destino.agregar(df_out)
+        reporte.append({'Location Name': location, 'Major Group Name': major_group, 'Family Group Name': family_group,
+                        'Venta Reciente': ventas_recientes[posiciones[(location, major_group, family_group)]],
+                        'Motor': motor_usado, 'Origen': origen,
+                        'Segundos': round(time.perf_counter() - inicio_serie, 2)})
+
+    total = reutilizadas + recalculadas + por_plazo
+    if total:
+        logging.info(f"📊 Caché de pronósticos: {reutilizadas}/{total} series reutilizadas "
+                     f"({reutilizadas / total:.0%}), {recalculadas} recalculadas.")
+    if motivos_reajuste or solo_prediccion:
+        logging.info(f"🔁 Política de reajuste: {sum(motivos_reajuste.values())} modelos reajustados "
+                     f"{motivos_reajuste}, {solo_prediccion} reutilizados solo para predecir.")
+    if por_plazo:
+        logging.warning(f"⏱️ Plazo de {presupuesto_segundos} s alcanzado: {por_plazo}/{total} series "
+                        f"(las de menor venta) usaron el promedio simple.")
+    logging.info(f"⏱️ Entrenamiento completado en {time.perf_counter() - inicio:.1f} s.")
+    if usar_cache:
+        guardar_cache_pronosticos(cache_nueva, ruta_cache)
+    guardar_reporte_motores(pd.DataFrame(reporte), ruta_con_particion(RUTA_REPORTE_MOTORES, particion))
 
     return pd.concat(all_forecasts, ignore_index=True) if all_forecasts else pd.DataFrame()
 
 
-def exportar_resultados(df_forecast_family, df_item_hist, spreadsheet):
-    """Desglosa el pronóstico de familia a item por tienda y lo exporta."""
-    if df_forecast_family.empty:
-        logging.warning("⚠️ No hay datos de pronóstico para exportar.")
-        return
-
-    df_rep = calcular_representatividad(df_item_hist)
-    if df_rep.empty:
-        logging.warning("⚠️ No se pudo calcular la representatividad.")
+def guardar_reporte_motores(df_reporte, ruta=RUTA_REPORTE_MOTORES):
+    """Guarda el motor usado por cada serie (y si vino de la caché, del entrenamiento o del plazo)."""
+    if df_reporte.empty:
         return
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        df_reporte.to_csv(ruta, index=False)
+        resumen = df_reporte.groupby(['Motor', 'Origen']).size().to_dict()
+        logging.info(f"✅ Reporte de motores guardado en '{ruta}': {resumen}")
+    except Exception as e:
+        logging.error(f"❌ No se pudo guardar el reporte de motores: {e}")
 
-    logging.info("Desglosando pronóstico de familia a item por tienda...")
-    df_exploded = pd.merge(df_forecast_family, df_rep, on=['Location Name', 'Family Group Name'], how='left')
 
-    df_exploded['Peor Escenario'] = (df_exploded['Peor Escenario'] * df_exploded['Representatividad_%'] / 100).round()
-    df_exploded['Escenario Promedio'] = (
-                df_exploded['Escenario Promedio'] * df_exploded['Representatividad_%'] / 100).round()
-    df_exploded['Mejor Escenario'] = (df_exploded['Mejor Escenario'] * df_exploded['Representatividad_%'] / 100).round()
+def aplicar_desglose(df_forecast_family, df_rep, df_intermitente, df_item_hist, ultima_fecha=None):
+    """
+    Desglose a item de un pronóstico de familia (todo o un lote de series), con la representatividad y los items
+    intermitentes ya calculados, la 'Demanda' del día y la venta real de 'df_item_hist'.
+    Con 'ultima_fecha' el redondeo acumulado de los items intermitentes parte de cero en el horizonte.
+    """
+    df_exploded = desglosar_items(df_forecast_family, df_rep, df_intermitente, ultima_fecha=ultima_fecha)
 
     df_exploded['Demanda'] = np.where(
         df_exploded['Fecha'].dt.weekday <= 3,  # Lunes (0) a Jueves (3)
@@ -316,7 +728,7 @@ def exportar_resultados(df_forecast_family, df_item_hist, spreadsheet):
         df_exploded['Mejor Escenario']
     )
 
-    df_export = pd.merge(
+    return pd.merge(
         df_exploded,
         df_item_hist[['ds', 'Location Name', 'Menu Item Number', 'Venta Real']],
         left_on=['Fecha', 'Location Name', 'Menu Item Number'],
@@ -324,44 +736,248 @@ def exportar_resultados(df_forecast_family, df_item_hist, spreadsheet):
         how='left'
     ).drop(columns='ds')
 
+
+def desglosar_pronostico_items(df_forecast_family, df_item_hist):
+    """
+    Desglosa el pronóstico de familia a item por tienda, con la 'Demanda' del día y la venta real.
+    Los items de venta esporádica usan el motor de demanda intermitente (modelo/demanda_intermitente.py).
+    Devuelve un DataFrame vacío si no hay pronóstico o representatividad.
+    """
+    if df_forecast_family.empty:
+        logging.warning("⚠️ No hay datos de pronóstico para desglosar.")
+        return pd.DataFrame()
+
+    df_rep = calcular_representatividad(df_item_hist)
+    if df_rep.empty:
+        logging.warning("⚠️ No se pudo calcular la representatividad.")
+        return pd.DataFrame()
+
+    logging.info("Desglosando pronóstico de familia a item por tienda...")
+    df_intermitente = pronosticar_items_intermitentes(df_item_hist)
+    return aplicar_desglose(df_forecast_family, df_rep, df_intermitente, df_item_hist,
+                            ultima_fecha=df_item_hist['ds'].max())
+
+
+def archivar_ejecucion_diaria(df_forecast_family, df_items, ultima_fecha):
+    """
+    Agrega al archivo histórico (modelo/archivo_pronosticos.py) los pronósticos de familia y de item de los días
+    posteriores a 'ultima_fecha', con el mismo id de ejecución. Devuelve True si se archivaron.
+    """
+    try:
+        id_ejecucion = nuevo_id_ejecucion()
+        familia = df_forecast_family[df_forecast_family['Fecha'] > ultima_fecha]
+        archivar_pronosticos(familia.reindex(columns=[c for c in COLUMNAS_ARCHIVO_FAMILIA if c in familia.columns]),
+                             'diario_familia', id_ejecucion)
+        if not df_items.empty:
+            items = df_items[df_items['Fecha'] > ultima_fecha]
+            archivar_pronosticos(items.reindex(columns=[c for c in COLUMNAS_ARCHIVO_ITEM if c in items.columns]),
+                                 'diario_item', id_ejecucion)
+        return True
+    except Exception as e:
+        logging.error(f"❌ No se pudo archivar el pronóstico de la ejecución: {e}")
+        return False
+
+
+def filas_exportacion(df_items):
+    """Filas y columnas del desglose por item que van a la hoja: desde HISTORY_PERIOD_DAYS atrás hasta el horizonte."""
     hoy = pd.Timestamp.today().normalize()
     inicio_rango = hoy - pd.Timedelta(days=HISTORY_PERIOD_DAYS)
     fin_rango = hoy + pd.Timedelta(days=FORECAST_PERIOD_DAYS)
-    df_export = df_export[(df_export['Fecha'] >= inicio_rango) & (df_export['Fecha'] <= fin_rango)]
+    df_items = df_items[(df_items['Fecha'] >= inicio_rango) & (df_items['Fecha'] <= fin_rango)]
+    return df_items.reindex(columns=COLUMNAS_EXPORTACION)
+
+
+def huella_exportacion(df_export):
+    """Huella del contenido de una hoja (columnas y valores, sin el índice)."""
+    valores = pd.util.hash_pandas_object(df_export, index=False).to_numpy()
+    return hashlib.sha1(json.dumps([str(c) for c in df_export.columns]).encode() + valores.tobytes()).hexdigest()
+
+
+def _cargar_huellas_exportacion(ruta=RUTA_HUELLAS_EXPORTACION):
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_huella_exportacion(hoja, huella, ruta=RUTA_HUELLAS_EXPORTACION):
+    """Guarda (o con huella None, olvida) la huella de la última escritura de la hoja."""
+    huellas = _cargar_huellas_exportacion(ruta)
+    if huella is None:
+        huellas.pop(hoja, None)
+    else:
+        huellas[hoja] = huella
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(huellas, f, indent=2)
+    except OSError as e:
+        logging.warning(f"⚠️ No se pudo guardar la huella de la hoja '{hoja}': {e}")
+
+
+def escribir_hoja_si_cambio(spreadsheet, hoja, df_export):
+    """
+    Escribe la hoja solo si su contenido cambió desde la última escritura de este equipo; si es idéntico, la
+    deja como está. Así una tanda del modo vigilancia que no mueve el pronóstico no reescribe Google Sheets.
+    """
+    from comun.cliente_google import escribir_hoja
+
+    huella = huella_exportacion(df_export)
+    if _cargar_huellas_exportacion().get(hoja) == huella:
+        logging.info(f"⏭️ La hoja '{hoja}' no cambió desde la última exportación, no se reescribe.")
+        return
+    _guardar_huella_exportacion(hoja, None)  # Si la escritura falla a medias, la próxima vez se reescribe
+    escribir_hoja(spreadsheet, hoja, df_export, include_index=False, allow_formulas=False)
+    _guardar_huella_exportacion(hoja, huella)
+    logging.info(f"✅ {len(df_export)} filas exportadas correctamente a la hoja '{hoja}'.")
+
+
+def exportar_resultados(df_forecast_family, df_item_hist, spreadsheet, df_items=None):
+    """
+    Exporta el pronóstico por item y tienda a Google Sheets. Devuelve True si la hoja se escribió.
+    'df_items' es el desglose ya calculado por desglosar_pronostico_items (se calcula si no se entrega).
+    """
+    df_export = desglosar_pronostico_items(df_forecast_family, df_item_hist) if df_items is None else df_items
+    if df_export.empty:
+        logging.warning("⚠️ No hay datos de pronóstico para exportar.")
+        return
+
+    df_export = filas_exportacion(df_export)
+
+    try:
+        escribir_hoja_si_cambio(spreadsheet, OUTPUT_SHEET_NAME, df_export)
+        return True
+    except Exception as e:
+        logging.error(f"❌ Error al exportar a Google Sheets: {e}")
+    return False
+
+
+def iniciar_exportacion_continua(df_item_hist, spreadsheet, ultima_fecha, etapas=('pronostico:archivo',
+                                                                                  'pronostico:exportacion')):
+    """
+    Escritor en segundo plano que, por cada lote de series entrenadas, redondea como la reconciliación 'bu',
+    desglosa a item y lo agrega al archivo de la ejecución y a la hoja de salida. 'etapas' son las etapas con
+    punto de control que se escriben así (las que fallen se rehacen al final). None si no hay representatividad.
+    """
+    from comun.cliente_google import EscrituraIncremental
+    from comun.escritura_continua import Etapa, EscritorEnSegundoPlano
+
+    df_rep = calcular_representatividad(df_item_hist)
+    if df_rep.empty:
+        return None
+    df_intermitente = pronosticar_items_intermitentes(df_item_hist)
+    # La venta real solo se muestra en la ventana de la hoja: no hace falta cruzar cada lote con toda la historia
+    df_venta_real = df_item_hist[df_item_hist['ds'] >= pd.Timestamp.today().normalize()
+                                 - pd.Timedelta(days=HISTORY_PERIOD_DAYS)]
+
+    def preparar(lote):
+        lote[COLUMNAS_ESCENARIOS] = np.maximum(0, lote[COLUMNAS_ESCENARIOS]).round()
+        return lote, aplicar_desglose(lote, df_rep, df_intermitente, df_venta_real, ultima_fecha=ultima_fecha)
+
+    id_ejecucion = nuevo_id_ejecucion()
+    archivo_familia = ArchivoIncremental('diario_familia', id_ejecucion)
+    archivo_item = ArchivoIncremental('diario_item', id_ejecucion)
+
+    def archivar(datos):
+        familia, items = datos
+        familia, items = familia[familia['Fecha'] > ultima_fecha], items[items['Fecha'] > ultima_fecha]
+        archivo_familia.agregar(familia.reindex(columns=[c for c in COLUMNAS_ARCHIVO_FAMILIA if c in familia.columns]))
+        archivo_item.agregar(items.reindex(columns=[c for c in COLUMNAS_ARCHIVO_ITEM if c in items.columns]))
+
+    def cerrar_archivo():
+        archivo_familia.cerrar()
+        archivo_item.cerrar()
+
+    def descartar_archivo():
+        archivo_familia.descartar()
+        archivo_item.descartar()
+
+    hoja = EscrituraIncremental(spreadsheet, OUTPUT_SHEET_NAME, COLUMNAS_EXPORTACION,
+                                include_index=False, allow_formulas=False)
+    if 'pronostico:exportacion' in etapas:
+        _guardar_huella_exportacion(OUTPUT_SHEET_NAME, None)  # La hoja se reescribe por lotes, sin huella
+
+    def cerrar_hoja():
+        if hoja.hoja is None:
+            raise RuntimeError("no se exportó ninguna fila")
+        logging.info(f"✅ {hoja.filas} filas exportadas correctamente a la hoja '{OUTPUT_SHEET_NAME}'.")
+
+    disponibles = {
+        'pronostico:archivo': Etapa(archivar, cerrar_archivo, descartar_archivo),
+        'pronostico:exportacion': Etapa(lambda datos: hoja.agregar(filas_exportacion(datos[1])), cerrar_hoja),
+    }
+    logging.info(f"📤 Exportación continua activada: {', '.join(etapas)}.")
+    return EscritorEnSegundoPlano({nombre: disponibles[nombre] for nombre in etapas}, preparar=preparar)
+
+
+def exportar_por_canal(df_forecast_family, df_channel_hist, spreadsheet):
+    """Reparte el pronóstico de familia entre canales (Order Type) por tienda y lo exporta (True si se escribió)."""
+    df_participacion = calcular_participacion_canal(df_channel_hist)
+    df_canal = desglosar_por_canal(df_forecast_family, df_participacion)
+    if df_canal.empty:
+        logging.warning("⚠️ No hay pronóstico por canal para exportar.")
+        return
+
+    df_canal['Demanda'] = np.where(
+        df_canal['Fecha'].dt.weekday <= 3,  # Lunes (0) a Jueves (3)
+        df_canal['Escenario Promedio'],
+        df_canal['Mejor Escenario']
+    )
+
+    hoy = pd.Timestamp.today().normalize()
+    df_canal = df_canal[(df_canal['Fecha'] > hoy - pd.Timedelta(days=1)) &
+                        (df_canal['Fecha'] <= hoy + pd.Timedelta(days=FORECAST_PERIOD_DAYS))]
 
     column_order = [
-        'Fecha', 'Location Name', 'Major Group Name', 'Family Group Name', 'Menu Item Number', 'Menu Item Name',
-        'Demanda', 'Venta Real', 'Peor Escenario', 'Escenario Promedio', 'Mejor Escenario'
+        'Fecha', 'Location Name', 'Major Group Name', 'Family Group Name', 'Order Type Name',
+        'Participacion_Canal_%', 'Demanda', 'Peor Escenario', 'Escenario Promedio', 'Mejor Escenario'
     ]
-    df_export = df_export.reindex(columns=column_order)
+    df_export = df_canal.reindex(columns=column_order)
+    df_export['Participacion_Canal_%'] = df_export['Participacion_Canal_%'].round(1)
 
     try:
-        worksheet = spreadsheet.worksheet(OUTPUT_SHEET_NAME)
-        worksheet.clear()
-        set_with_dataframe(worksheet, df_export, include_index=False, allow_formulas=False)
-        logging.info(f"✅ {len(df_export)} filas exportadas correctamente a la hoja '{OUTPUT_SHEET_NAME}'.")
-    except gspread.exceptions.WorksheetNotFound:
-        logging.warning(f"La hoja '{OUTPUT_SHEET_NAME}' no existe. Creándola...")
-        worksheet = spreadsheet.add_worksheet(title=OUTPUT_SHEET_NAME, rows=len(df_export) + 1, cols=len(column_order))
-        set_with_dataframe(worksheet, df_export, include_index=False, allow_formulas=False)
-        logging.info(f"✅ Hoja creada y datos exportados.")
+        escribir_hoja_si_cambio(spreadsheet, CHANNEL_SHEET_NAME, df_export)
+        return True
     except Exception as e:
         logging.error(f"❌ Error al exportar a Google Sheets: {e}")
+    return False
+
+
+def guardar_pronostico_niveles(df_niveles, ruta=RUTA_PRONOSTICO_NIVELES):
+    """Guarda el pronóstico reconciliado de los niveles agregados (Familia, Major Group, Tienda y Cadena)."""
+    if df_niveles.empty:
+        return
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        df_niveles[df_niveles['Nivel'] != 'Tienda-Familia'].to_csv(ruta, index=False)
+        logging.info(f"✅ Pronóstico por niveles guardado en: {ruta}")
+    except Exception as e:
+        logging.error(f"❌ No se pudo guardar el pronóstico por niveles: {e}")
 
 
 # =============================================================================
 # ------------------------------ EJECUCIÓN PRINCIPAL --------------------------
 # =============================================================================
 
-def main():
-    """Función principal que orquesta todo el proceso."""
+def main(particion=None, combinar=None):
+    """
+    Función principal que orquesta todo el proceso.
+    Con 'particion' (i, N) solo entrena esa partición y guarda el resultado parcial; con 'combinar' (N) une los
+    N parciales y sigue con la reconciliación y la exportación.
+    """
+    from modelo.reconciliacion import reconciliar_pronosticos
+    from comun.cliente_google import abrir_planilla
+
     logging.info("🚀 Iniciando el proceso de pronóstico de demanda diaria por tienda y familia.")
 
-    client = autorizar_gsheets()
-    spreadsheet = client.open(SPREADSHEET_NAME)
+    spreadsheet = abrir_planilla(SPREADSHEET_NAME)
 
     # --- CAMBIO REALIZADO: Se revierte la llamada a la función para que use la carpeta local ---
-    df_location_family_daily, df_location_item_daily = cargar_y_procesar_ventas(CARPETA_VENTAS)
+    df_location_family_daily, df_location_item_daily, df_location_family_channel_daily, panel = \
+        cargar_y_procesar_ventas(CARPETA_VENTAS)
     df_regressors, regressor_cols = cargar_regresores_externos(spreadsheet)
 
     if df_location_family_daily.empty:
@@ -371,12 +987,70 @@ def main():
     if df_regressors.empty:
         logging.warning("⚠️ No se cargaron datos de regresores externos. El pronóstico no los considerará.")
 
-    df_forecasts = entrenar_y_pronosticar(df_location_family_daily, df_regressors, regressor_cols)
-
-    exportar_resultados(df_forecasts, df_location_item_daily, spreadsheet)
+    # --- Etapas con punto de control: al reanudar (main.py --resume) se saltan las ya terminadas ---
+    continuas = set()  # Etapas que la exportación continua ya terminó durante el entrenamiento
+    if etapa_completa('pronostico:reconciliacion'):
+        logging.info("🔁 Se reutiliza el pronóstico reconciliado de la ejecución interrumpida.")
+        df_forecasts = resultado_etapa('pronostico:reconciliacion')
+    else:
+        if combinar:
+            parciales = cargar_parciales('pronostico', combinar, huella=huella_panel(panel))
+            df_forecasts = pd.concat([parcial['pronostico'] for parcial in parciales], ignore_index=True)
+            df_reporte = pd.concat([parcial['reporte'] for parcial in parciales], ignore_index=True)
+            guardar_reporte_motores(df_reporte)
+            guardar_tiempos(df_reporte)
+            logging.info(f"🧩 {combinar} particiones combinadas: {len(df_reporte)} series.")
+        else:
+            # Con la reconciliación 'bu' el desglose, el archivo y la hoja avanzan mientras se entrena
+            etapas = [etapa for etapa in ('pronostico:archivo', 'pronostico:exportacion') if not etapa_completa(etapa)]
+            escritor = None
+            if EXPORTACION_CONTINUA and METODO_RECONCILIACION == 'bu' and not particion and etapas:
+                escritor = iniciar_exportacion_continua(df_location_item_daily, spreadsheet, panel['fechas'][-1],
+                                                        etapas)
+            try:
+                df_forecasts = entrenar_y_pronosticar(panel, df_regressors, regressor_cols, particion=particion,
+                                                      destino=escritor)
+            except BaseException:
+                if escritor is not None:
+                    escritor.cancelar()
+                raise
+            if escritor is not None:
+                for etapa, terminada in escritor.cerrar().items():
+                    if terminada:
+                        continuas.add(etapa)
+                        marcar_etapa(etapa)
+            if particion:
+                ruta_reporte = ruta_con_particion(RUTA_REPORTE_MOTORES, particion)
+                df_reporte = pd.read_csv(ruta_reporte) if os.path.exists(ruta_reporte) else pd.DataFrame()
+                guardar_parcial({'pronostico': df_forecasts, 'reporte': df_reporte}, 'pronostico', particion,
+                                huella=huella_panel(panel))
+                logging.info("🏁 Partición terminada; la reconciliación y exportación se hacen al combinar.")
+                return
+        try:
+            df_forecasts, df_niveles = reconciliar_pronosticos(df_forecasts, METODO_RECONCILIACION, panel=panel,
+                                                               ultima_fecha=panel['fechas'][-1])
+            guardar_pronostico_niveles(df_niveles)
+        except Exception as e:
+            logging.error(f"❌ Falló la reconciliación jerárquica, se exporta el pronóstico sin reconciliar: {e}")
+        marcar_etapa('pronostico:reconciliacion', df_forecasts)
+
+    df_items = None
+    if 'pronostico:archivo' not in continuas and not etapa_completa('pronostico:archivo'):
+        df_items = desglosar_pronostico_items(df_forecasts, df_location_item_daily)
+        if archivar_ejecucion_diaria(df_forecasts, df_items, panel['fechas'][-1]):
+            marcar_etapa('pronostico:archivo')
+
+    if 'pronostico:exportacion' not in continuas and not etapa_completa('pronostico:exportacion'):
+        if exportar_resultados(df_forecasts, df_location_item_daily, spreadsheet, df_items=df_items):
+            marcar_etapa('pronostico:exportacion')
+
+    if not etapa_completa('pronostico:canal'):
+        if exportar_por_canal(df_forecasts, df_location_family_channel_daily, spreadsheet):
+            marcar_etapa('pronostico:canal')
 
     logging.info("🏁 Proceso de pronóstico de demanda finalizado.")
 
 
 if __name__ == "__main__":
-    main()
+    args = argumentos_particion("Pronóstico de demanda diaria por tienda y familia.")
+    main(particion=args.shard, combinar=args.combinar)
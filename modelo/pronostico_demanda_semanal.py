@@ -1,13 +1,19 @@
 import os
+import sys
 import pandas as pd
 import numpy as np
-from prophet import Prophet
-import gspread
-from gspread_dataframe import set_with_dataframe
-from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 import logging
-import json # ¡Nuevo! Importa la librería json
+
+# --- Permite ejecutar el módulo directamente (python modelo/pronostico_demanda_semanal.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo.lectura_pos import leer_archivos_pos, a_texto, enteros_sin_nulos
+from modelo.archivo_pronosticos import archivar_pronosticos, nuevo_id_ejecucion
+from modelo.ventana_entrenamiento import recortar_ventana, describir_ventana
+from comun.promociones import (
+    TIENDA_CADENA, columnas_promociones, tabla_promociones, mascara_aplicabilidad, promociones_inactivas
+)
 
 # --- Configuración de Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,13 +22,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
 # =============================================================================
 
-# --- Google Sheets ---
-SCOPE_GOOGLE = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive"
-]
-
-# RUTA_CREDENCIALES ya NO es una ruta de archivo fija. Se leerá desde una variable de entorno.
+# --- Google Sheets (credenciales y cliente en comun/cliente_google.py) ---
 SPREADSHEET_NAME = "1. Forecast_Semanal"
 OUTPUT_SHEET_NAME = "Demanda Total"
 
@@ -35,13 +35,28 @@ CARPETA_VENTAS = "data"
 FORECAST_PERIOD_WEEKS = 52
 HISTORY_PERIOD_WEEKS = 8
 
+# --- Backend de ajuste de Prophet: 'cmdstanpy' o 'map' (ver modelo/backend_prophet.py) ---
+BACKEND_PROPHET = os.environ.get("BACKEND_PROPHET", "cmdstanpy")
+
+# --- Ventana de entrenamiento: años de historia por familia, 'adaptativa' o None ---
+# Ver modelo/ventana_entrenamiento.py.
+VENTANA_ENTRENAMIENTO = 3
+
+# --- Techo del crecimiento logístico: cap = venta semanal máxima × multiplicador ---
+# Fijo: modelo/ajuste_hiperparametros.py solo ajusta el pronóstico diario (config/parametros_series.json).
+CAP_MULTIPLICADOR_SEMANAL = 1.5
+
 # --- Umbral para pronóstico simplificado ---
 MIN_WEEKS_FOR_PROPHET = 12
 WEEKS_FOR_REPRESENTATIVENESS = 4
 
 # --- Parámetros de Promoción ---
-PROMO_START_DATE = pd.to_datetime("2025-05-01")
-PROMO_CATEGORY = 'Pastel Trozo'
+# Las promociones (fechas y a qué grupos aplican) se configuran en comun/promociones.py.
+# En el modelo semanal cada promoción es un indicador 0/1 desde el lunes de la semana en que empieza.
+
+# --- Columnas que se guardan en el archivo histórico de pronósticos (modelo/archivo_pronosticos.py) ---
+COLUMNAS_ARCHIVO = ['Fecha', 'Major Group Name', 'Family Group Name', 'Menu Item Number', 'Menu Item Name',
+                    'Demanda', 'Peor Escenario', 'Escenario Promedio', 'Mejor Escenario']
 
 # --- Filtros de Datos ---
 GRUPOS_INCLUIDOS = ['Delicias', 'Pastel Grande', 'Pastel Mediano', 'Pastel Trozo']
@@ -53,20 +68,6 @@ FAMILIAS_EXCLUIDAS = ['Gift Box']
 # ---------------------------- FUNCIONES MODULARES ----------------------------
 # =============================================================================
 
-# ¡CAMBIO AQUÍ! Nueva función para autorizar usando el JSON de credenciales directamente
-def autorizar_gsheets_from_env(credentials_json_str, scope):
-    """Autoriza el acceso a Google Sheets usando el JSON de credenciales desde una cadena."""
-    try:
-        creds_dict = json.loads(credentials_json_str)
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-        logging.info("✅ Autorización con Google Sheets exitosa.")
-        return client
-    except Exception as e:
-        logging.error(f"❌ Error al autorizar con Google Sheets: {e}")
-        raise
-
-
 def cargar_y_procesar_ventas(carpeta_ventas):
     """Carga, concatena y preprocesa los archivos de ventas, devolviendo dos niveles de agregación."""
     logging.info(f"Cargando archivos de ventas desde: {carpeta_ventas}")
@@ -81,13 +82,13 @@ def cargar_y_procesar_ventas(carpeta_ventas):
             logging.error("No se encontraron archivos .csv en la carpeta especificada.")
             return pd.DataFrame(), pd.DataFrame()
 
-        df = pd.concat((pd.read_csv(f, on_bad_lines='skip') for f in files), ignore_index=True)
+        df = leer_archivos_pos(files)
     except Exception as e:
         logging.error(f"Error al leer los archivos CSV: {e}")
         return pd.DataFrame(), pd.DataFrame()
 
-    df['Business Date'] = pd.to_datetime(df['Business Date'], errors='coerce')
     df.dropna(subset=['Business Date'], inplace=True)
+    df = enteros_sin_nulos(df, ['Sales Count'])
 
     mask = (
             df['Major Group Name'].isin(GRUPOS_INCLUIDOS) &
@@ -100,16 +101,17 @@ def cargar_y_procesar_ventas(carpeta_ventas):
 
     # Agregación a nivel de Family Group (para Prophet)
     df_family_weekly = (
-        df_filtered.groupby(['ds', 'Major Group Name', 'Family Group Name'])
+        df_filtered.groupby(['ds', 'Major Group Name', 'Family Group Name'], observed=True)
         ['Sales Count'].sum().reset_index().rename(columns={'Sales Count': 'Venta Real'})
-    )
+    ).pipe(a_texto)
     logging.info("Ventas agregadas a nivel de Family Group.")
 
     # Agregación a nivel de Menu Item (para representatividad y reporte final)
     df_item_weekly = (
-        df_filtered.groupby(['ds', 'Major Group Name', 'Family Group Name', 'Menu Item Number', 'Menu Item Name'])
+        df_filtered.groupby(['ds', 'Major Group Name', 'Family Group Name', 'Menu Item Number', 'Menu Item Name'],
+                            observed=True)
         ['Sales Count'].sum().reset_index().rename(columns={'Sales Count': 'Venta Real'})
-    )
+    ).pipe(a_texto)
     logging.info("Ventas agregadas a nivel de Menu Item.")
 
     return df_family_weekly, df_item_weekly
@@ -142,12 +144,33 @@ def calcular_representatividad(df_item_weekly):
     return df_rep[['Family Group Name', 'Menu Item Number', 'Menu Item Name', 'Representatividad_%']]
 
 
-def entrenar_y_pronosticar(df_model):
-    """Itera sobre cada Family Group, entrena un modelo Prophet o usa un promedio simple si hay pocos datos."""
-    logging.info("Iniciando ciclo de entrenamiento y pronóstico por Family Group...")
+def agregar_promociones(df, inactivas):
+    """Agrega los indicadores semanales de promoción (vectorizados) y deja en cero los que no aplican."""
+    df_promos = tabla_promociones(df['ds'], indicador=True, semanal=True).drop(columns='fecha')
+    df_promos[inactivas] = 0
+    return pd.concat([df.reset_index(drop=True), df_promos], axis=1)
+
+
+def entrenar_y_pronosticar(df_model, backend=BACKEND_PROPHET, ventana=VENTANA_ENTRENAMIENTO):
+    """
+    Itera sobre cada Family Group, entrena un modelo Prophet o usa un promedio simple si hay pocos datos.
+    'backend' elige cómo se ajusta Prophet ('cmdstanpy' o 'map').
+    Cada familia se entrena solo con su 'ventana' de entrenamiento; el cap y las promociones salen de ella.
+    """
+    from modelo.backend_prophet import crear_prophet
+
+    logging.info(f"Iniciando ciclo de entrenamiento y pronóstico por Family Group "
+                 f"(ventana de entrenamiento: {describir_ventana(ventana)})...")
     all_forecasts = []
 
+    columnas_promo = columnas_promociones()
+    claves = df_model[['Major Group Name', 'Family Group Name']].drop_duplicates()
+    mascara_promociones = mascara_aplicabilidad(
+        (TIENDA_CADENA, major_group, family_group) for major_group, family_group in claves.itertuples(index=False))
+
     for (major_group, family_group), group in df_model.groupby(['Major Group Name', 'Family Group Name']):
+        inactivas = promociones_inactivas(mascara_promociones, (TIENDA_CADENA, major_group, family_group),
+                                          columnas_promo)
         sales_history = group[group['Venta Real'] > 0]
         num_sales_weeks = len(sales_history)
 
@@ -167,28 +190,21 @@ def entrenar_y_pronosticar(df_model):
 
         else:
             try:
-                df_prophet = group[['ds', 'Venta Real']].rename(columns={'Venta Real': 'y'})
-                promo_start_week = PROMO_START_DATE - pd.to_timedelta(PROMO_START_DATE.dayofweek, unit='D')
-
-                if major_group == PROMO_CATEGORY:
-                    df_prophet['Promo'] = df_prophet['ds'].apply(lambda d: 1 if d >= promo_start_week else 0)
-                else:
-                    df_prophet['Promo'] = 0
+                df_prophet = recortar_ventana(group[['ds', 'Venta Real']], ventana, periodos_por_anio=52)
+                df_prophet = df_prophet.rename(columns={'Venta Real': 'y'})
+                df_prophet = agregar_promociones(df_prophet, inactivas)
 
                 max_sale = df_prophet['y'].max()
-                cap_limit = max_sale * 1.5
+                cap_limit = max_sale * CAP_MULTIPLICADOR_SEMANAL
                 df_prophet['cap'] = cap_limit
-                model = Prophet(growth='logistic', seasonality_mode='additive', yearly_seasonality=True,
-                                weekly_seasonality=False, daily_seasonality=False, changepoint_prior_scale=0.05)
-                model.add_regressor('Promo')
+                model = crear_prophet(backend, growth='logistic', seasonality_mode='additive', yearly_seasonality=True,
+                                      weekly_seasonality=False, daily_seasonality=False, changepoint_prior_scale=0.05)
+                for columna in columnas_promo:
+                    model.add_regressor(columna)
                 model.fit(df_prophet)
                 future = model.make_future_dataframe(periods=FORECAST_PERIOD_WEEKS, freq='W-MON')
                 future['cap'] = cap_limit
-
-                if major_group == PROMO_CATEGORY:
-                    future['Promo'] = future['ds'].apply(lambda d: 1 if d >= promo_start_week else 0)
-                else:
-                    future['Promo'] = 0
+                future = agregar_promociones(future, inactivas)
 
                 forecast = model.predict(future)
                 df_out = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].rename(columns={'ds': 'Fecha'})
@@ -211,17 +227,17 @@ def entrenar_y_pronosticar(df_model):
     return pd.concat(all_forecasts, ignore_index=True) if all_forecasts else pd.DataFrame()
 
 
-def exportar_resultados(df_forecast_family, df_item_hist, spreadsheet):
-    """Desglosa el pronóstico de familia a item y lo exporta a Google Sheets."""
+def desglosar_pronostico_items(df_forecast_family, df_item_hist):
+    """Desglosa el pronóstico de familia a item (con la venta real); vacío si no hay datos para hacerlo."""
     if df_forecast_family.empty:
-        logging.warning("⚠️ No hay datos de pronóstico para exportar.")
-        return
+        logging.warning("⚠️ No hay datos de pronóstico para desglosar.")
+        return pd.DataFrame()
 
     # 1. Calcular representatividad
     df_rep = calcular_representatividad(df_item_hist)
     if df_rep.empty:
         logging.warning("⚠️ No se pudo calcular la representatividad. No se puede desglosar el pronóstico.")
-        return
+        return pd.DataFrame()
 
     # 2. Desglosar el pronóstico de familia a item
     logging.info("Desglosando pronóstico de familia a item...")
@@ -231,7 +247,7 @@ def exportar_resultados(df_forecast_family, df_item_hist, spreadsheet):
     df_exploded['Demanda'] = (df_exploded['Mejor Escenario'] * df_exploded['Representatividad_%'] / 100).round()
 
     # 3. Unir con ventas reales históricas a nivel de item
-    df_export = pd.merge(
+    return pd.merge(
         df_exploded,
         df_item_hist[['ds', 'Menu Item Number', 'Venta Real']],
         left_on=['Fecha', 'Menu Item Number'],
@@ -239,6 +255,31 @@ def exportar_resultados(df_forecast_family, df_item_hist, spreadsheet):
         how='left'
     ).drop(columns='ds')
 
+
+def archivar_ejecucion_semanal(df_forecast_family, df_items, ultima_fecha):
+    """Agrega al archivo histórico los pronósticos semanales de familia e item posteriores a 'ultima_fecha'."""
+    try:
+        id_ejecucion = nuevo_id_ejecucion()
+        familia = df_forecast_family[df_forecast_family['Fecha'] > ultima_fecha]
+        archivar_pronosticos(familia.reindex(columns=[c for c in COLUMNAS_ARCHIVO if c in familia.columns]),
+                             'semanal_familia', id_ejecucion)
+        if not df_items.empty:
+            items = df_items[df_items['Fecha'] > ultima_fecha]
+            archivar_pronosticos(items.reindex(columns=[c for c in COLUMNAS_ARCHIVO if c in items.columns]),
+                                 'semanal_item', id_ejecucion)
+    except Exception as e:
+        logging.error(f"❌ No se pudo archivar el pronóstico semanal: {e}")
+
+
+def exportar_resultados(df_forecast_family, df_item_hist, spreadsheet, df_items=None):
+    """Exporta a Google Sheets el pronóstico por item ('df_items' ya desglosado, o se desglosa aquí)."""
+    from comun.cliente_google import escribir_hoja
+
+    df_export = desglosar_pronostico_items(df_forecast_family, df_item_hist) if df_items is None else df_items
+    if df_export.empty:
+        logging.warning("⚠️ No hay datos de pronóstico para exportar.")
+        return
+
     # 4. Formatear y exportar
     hoy = pd.Timestamp.today().normalize()
     inicio_rango = hoy - pd.Timedelta(weeks=HISTORY_PERIOD_WEEKS)
@@ -253,15 +294,8 @@ def exportar_resultados(df_forecast_family, df_item_hist, spreadsheet):
     df_export = df_export.reindex(columns=column_order)
 
     try:
-        worksheet = spreadsheet.worksheet(OUTPUT_SHEET_NAME)
-        worksheet.clear()
-        set_with_dataframe(worksheet, df_export, include_index=False, allow_formulas=False)
+        escribir_hoja(spreadsheet, OUTPUT_SHEET_NAME, df_export, include_index=False, allow_formulas=False)
         logging.info(f"✅ {len(df_export)} filas exportadas correctamente a la hoja '{OUTPUT_SHEET_NAME}'.")
-    except gspread.exceptions.WorksheetNotFound:
-        logging.warning(f"La hoja '{OUTPUT_SHEET_NAME}' no existe. Creándola...")
-        worksheet = spreadsheet.add_worksheet(title=OUTPUT_SHEET_NAME, rows=len(df_export) + 1, cols=len(column_order))
-        set_with_dataframe(worksheet, df_export, include_index=False, allow_formulas=False)
-        logging.info(f"✅ Hoja creada y datos exportados.")
     except Exception as e:
         logging.error(f"❌ Error al exportar a Google Sheets: {e}")
 
@@ -274,16 +308,10 @@ def main():
     """Función principal que orquesta todo el proceso."""
     logging.info("🚀 Iniciando el proceso de pronóstico de demanda semanal.")
 
-    # ¡CAMBIO AQUÍ! Obtener credenciales de Google Sheets desde la variable de entorno
-    google_credentials_json = os.environ.get('GSPREAD_CREDENTIALS')
-    if not google_credentials_json:
-        logging.error("❌ La variable de entorno GSPREAD_CREDENTIALS no está configurada.")
-        logging.error("Asegúrate de haber añadido el secreto GSPREAD_CREDENTIALSS en tu repositorio de GitHub.")
-        return
+    from comun.cliente_google import abrir_planilla
 
     try:
-        client = autorizar_gsheets_from_env(google_credentials_json, SCOPE_GOOGLE)
-        spreadsheet = client.open(SPREADSHEET_NAME)
+        spreadsheet = abrir_planilla(SPREADSHEET_NAME)
     except Exception as e:
         logging.error(f"❌ No se pudo autorizar Google Sheets. Error: {e}")
         return
@@ -296,7 +324,9 @@ def main():
 
     df_forecasts = entrenar_y_pronosticar(df_family_weekly)
 
-    exportar_resultados(df_forecasts, df_item_weekly, spreadsheet)
+    df_items = desglosar_pronostico_items(df_forecasts, df_item_weekly)
+    archivar_ejecucion_semanal(df_forecasts, df_items, df_family_weekly['ds'].max())
+    exportar_resultados(df_forecasts, df_item_weekly, spreadsheet, df_items=df_items)
 
     logging.info("🏁 Proceso de pronóstico de demanda finalizado.")
 
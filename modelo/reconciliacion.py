@@ -0,0 +1,157 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from modelo.panel_ventas import ventas_ventana
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Métodos disponibles ---
+# 'bu': bottom-up (suma de Tienda-Familia).
+# 'td': top-down con proporciones históricas recientes de cada Tienda-Familia sobre la cadena.
+# El pipeline solo tiene pronósticos base Tienda-Familia: un método que combine pronósticos base de varios niveles
+# (MinT) se reduciría a 'bu' (G·S = I), así que no se ofrece.
+METODOS = ['bu', 'td']
+METODO_DEFECTO = 'bu'
+
+DIAS_PROPORCIONES_TD = 28
+
+CLAVES_SERIE = ['Location Name', 'Major Group Name', 'Family Group Name']
+COLUMNAS_ESCENARIOS = ['Peor Escenario', 'Escenario Promedio', 'Mejor Escenario']
+# Columnas del pronóstico base que no se reconcilian: con 'td' dejarían de coincidir con los escenarios
+COLUMNAS_SIN_RECONCILIAR = ['yhat', 'yhat_lower', 'yhat_upper', 'Demanda']
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def construir_jerarquia(df_series):
+    """
+    Construye la matriz de suma S (dispersa, nodos × series base) de la jerarquía
+    Tienda-Familia → Familia → Major Group → Cadena, más los totales por Tienda.
+    Devuelve (S, df_nodos, df_base); df_nodos tiene el Nivel y la Clave de cada fila de S.
+    """
+    df_base = df_series[CLAVES_SERIE].drop_duplicates().sort_values(CLAVES_SERIE).reset_index(drop=True)
+    m = len(df_base)
+    columnas = np.arange(m)
+
+    niveles = [
+        ('Cadena', pd.Series('Total', index=df_base.index)),
+        ('Major Group', df_base['Major Group Name']),
+        ('Familia', df_base['Family Group Name']),
+        ('Tienda', df_base['Location Name']),
+    ]
+
+    bloques, nodos = [], []
+    for nivel, claves in niveles:
+        codigos, unicos = pd.factorize(claves, sort=True)
+        bloques.append(sparse.csr_matrix((np.ones(m), (codigos, columnas)), shape=(len(unicos), m)))
+        nodos.append(pd.DataFrame({'Nivel': nivel, 'Clave': list(unicos)}))
+
+    bloques.append(sparse.identity(m, format='csr'))
+    nodos.append(pd.DataFrame({'Nivel': 'Tienda-Familia',
+                               'Clave': (df_base['Location Name'] + '|' + df_base['Family Group Name']).tolist()}))
+
+    S = sparse.vstack(bloques, format='csr')
+    df_nodos = pd.concat(nodos, ignore_index=True)
+    logging.info(f"Jerarquía construida: {S.shape[0]} nodos, {m} series base.")
+    return S, df_nodos, df_base
+
+
+def matriz_reconciliacion(S, metodo, proporciones=None):
+    """
+    Calcula la matriz G (series base × nodos) tal que las series base reconciliadas son G @ y_hat.
+    Para 'td' se usan las proporciones de cada serie base sobre el total.
+    """
+    n, m = S.shape
+    if metodo == 'bu':
+        return sparse.hstack([sparse.csr_matrix((m, n - m)), sparse.identity(m, format='csr')], format='csr')
+
+    if metodo == 'td':
+        if proporciones is None:
+            raise ValueError("El método 'td' requiere las proporciones históricas de cada serie base.")
+        G = np.zeros((m, n))
+        G[:, 0] = proporciones  # La fila 0 de S es el total de la cadena
+        return sparse.csr_matrix(G)
+
+    raise ValueError(f"Método de reconciliación desconocido: '{metodo}'. Opciones: {METODOS}")
+
+
+def proporciones_historicas(panel, df_base, dias=DIAS_PROPORCIONES_TD):
+    """Participación de cada serie base en la venta total de la cadena en los últimos días (corte del panel)."""
+    recientes = ventas_ventana(panel, dias=dias)
+    i = df_base['Location Name'].map(panel['pos_tienda'])
+    j = df_base['Family Group Name'].map(panel['pos_familia'])
+    conocidas = (i.notna() & j.notna()).to_numpy()
+    ventas = np.zeros(len(df_base))
+    ventas[conocidas] = recientes[i[conocidas].astype(int), j[conocidas].astype(int)]
+    total = ventas.sum()
+    return ventas / total if total > 0 else np.full(len(ventas), 1.0 / len(ventas))
+
+
+def reconciliar_pronosticos(df_forecast, metodo=METODO_DEFECTO, panel=None, ultima_fecha=None,
+                            columnas=COLUMNAS_ESCENARIOS):
+    """
+    Reconcilia el pronóstico Tienda-Familia con todos los niveles de la jerarquía en una sola operación matricial
+    por escenario (todas las fechas a la vez).
+
+    Con 'ultima_fecha' (último día con venta) solo se reconcilian las fechas del horizonte: en los días de
+    historia solo las series de Prophet traen el ajuste in-sample, así que sus totales sumarían un subconjunto
+    distinto de series cada día. Esas filas se devuelven sin cambios y no entran a df_niveles.
+
+    Con 'td' las columnas que no se reconcilian (COLUMNAS_SIN_RECONCILIAR) quedan vacías en el horizonte: sus
+    valores serían los previos a la reconciliación.
+    Devuelve (df_tienda_familia reconciliado, df_niveles con todos los nodos).
+    """
+    historia = df_forecast.iloc[:0]
+    if ultima_fecha is not None:
+        en_historia = df_forecast['Fecha'] <= ultima_fecha
+        historia, df_forecast = df_forecast[en_historia], df_forecast[~en_historia]
+    if df_forecast.empty:
+        return historia, pd.DataFrame()
+
+    S, df_nodos, df_base = construir_jerarquia(df_forecast)
+    indice_base = pd.MultiIndex.from_frame(df_base)
+    fechas = np.sort(df_forecast['Fecha'].unique())
+
+    proporciones = None
+    if metodo == 'td':
+        if panel is None:
+            raise ValueError("El método 'td' requiere el panel de ventas para calcular proporciones.")
+        proporciones = proporciones_historicas(panel, df_base)
+
+    G = matriz_reconciliacion(S, metodo, proporciones=proporciones)
+
+    resultados_base, resultados_nodos = {}, {}
+    for columna in columnas:
+        B = (df_forecast.pivot_table(index=CLAVES_SERIE, columns='Fecha', values=columna, aggfunc='sum')
+             .reindex(index=indice_base, columns=fechas).fillna(0).to_numpy())
+        Y = S @ B  # Pronóstico base de todos los nodos (suma de las series base)
+        B_rec = np.asarray(G @ Y)
+        resultados_base[columna] = B_rec
+        resultados_nodos[columna] = np.asarray(S @ B_rec)
+
+    df_rec = _a_formato_largo(df_base, fechas, resultados_base)
+    descartadas = list(columnas)
+    if metodo != 'bu':
+        descartadas += [columna for columna in COLUMNAS_SIN_RECONCILIAR if columna in df_forecast.columns]
+    df_rec = pd.merge(df_forecast.drop(columns=descartadas), df_rec, on=CLAVES_SERIE + ['Fecha'], how='left')
+    df_rec = pd.concat([historia, df_rec], ignore_index=True)
+    df_niveles = _a_formato_largo(df_nodos, fechas, resultados_nodos)
+    logging.info(f"✅ Pronósticos reconciliados con el método '{metodo}' para {len(df_nodos)} nodos.")
+    return df_rec, df_niveles
+
+
+def _a_formato_largo(df_filas, fechas, matrices):
+    """Convierte matrices (filas × fechas) por escenario a un DataFrame largo con una fila por nodo y fecha."""
+    n, h = len(df_filas), len(fechas)
+    df = df_filas.loc[df_filas.index.repeat(h)].reset_index(drop=True)
+    df['Fecha'] = np.tile(fechas, n)
+    for columna, matriz in matrices.items():
+        df[columna] = np.maximum(0, matriz.reshape(-1)).round()
+    return df
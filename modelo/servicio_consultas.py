@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+# --- Permite ejecutar el módulo directamente (python modelo/servicio_consultas.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo.archivo_pronosticos import (
+    CARPETA_ARCHIVO, ARCHIVO_INDICE, NIVELES, _texto_clave, ejecuciones_archivadas, leer_ejecucion
+)
+
+# --- Configuración de Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Servicio de consultas de solo lectura sobre la última ejecución archivada ---
+# Ejemplos:
+#   python modelo/servicio_consultas.py servir --puerto 8080
+#   curl 'localhost:8080/pronostico?tienda=Tienda%20Centro&familia=Torta%20Trozo&desde=2025-06-01&hasta=2025-06-07'
+#   python modelo/servicio_consultas.py consultar --tienda "Tienda Centro" --familia "Torta Trozo" --item 1234
+HOST_SERVICIO = "127.0.0.1"
+PUERTO_SERVICIO = 8080
+SEGUNDOS_RECARGA = 30  # Cada cuánto se revisa si llegó una ejecución nueva al archivo
+
+NIVEL_POR_DEFECTO = 'diario_item'
+COLUMNAS_CLAVE = ['Location Name', 'Family Group Name', 'Menu Item Number']
+FILTROS = {'tienda': 'Location Name', 'familia': 'Family Group Name', 'item': 'Menu Item Number'}
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+class IndicePronosticos:
+    """
+    Pronósticos de una ejecución en memoria, ordenados por Tienda, Familia, Item y Fecha, con los rangos de filas
+    de cada (Tienda, Familia, Item) y de cada (Tienda, Familia): una consulta es un corte del arreglo.
+    """
+
+    def __init__(self, df, nivel, ejecucion):
+        claves = [c for c in COLUMNAS_CLAVE if c in df.columns]
+        self.df = df.sort_values(claves + ['Fecha'], kind='stable').reset_index(drop=True)
+        self.nivel, self.ejecucion = nivel, ejecucion
+        self.fechas = self.df['Fecha'].to_numpy()
+        textos = {c: _texto_clave(self.df[c]).to_numpy() for c in claves}
+        vacio = np.full(len(self.df), '', dtype=object)
+        tienda = textos.get('Location Name', vacio)
+        familia = textos.get('Family Group Name', vacio)
+        item = textos.get('Menu Item Number', vacio)
+        self.rangos_item = self._rangos(list(zip(tienda, familia, item)))
+        self.rangos_familia = self._rangos(list(zip(tienda, familia)))
+        self.claves = textos
+
+    @staticmethod
+    def _rangos(claves):
+        """{clave: (inicio, fin)} de filas consecutivas con la misma clave."""
+        if not claves:
+            return {}
+        cambios = [0] + [fila for fila in range(1, len(claves)) if claves[fila] != claves[fila - 1]] + [len(claves)]
+        return {claves[inicio]: (inicio, fin) for inicio, fin in zip(cambios[:-1], cambios[1:])}
+
+    def consultar(self, tienda=None, familia=None, item=None, desde=None, hasta=None):
+        """Filas que cumplen los filtros; con tienda, familia (e item) solo se mira su rango de filas."""
+        if tienda is not None and familia is not None:
+            rango = (self.rangos_item.get((tienda, familia, str(item))) if item is not None
+                     else self.rangos_familia.get((tienda, familia)))
+            if rango is None:
+                return self.df.iloc[0:0]
+            inicio, fin = rango
+        else:
+            inicio, fin = 0, len(self.df)
+
+        seleccion = np.ones(fin - inicio, dtype=bool)
+        for nombre, valor in (('Location Name', tienda), ('Family Group Name', familia),
+                              ('Menu Item Number', item)):
+            if valor is not None and nombre in self.claves:
+                seleccion &= self.claves[nombre][inicio:fin] == str(valor)
+        fechas = self.fechas[inicio:fin]
+        if desde is not None:
+            seleccion &= fechas >= np.datetime64(pd.Timestamp(desde))
+        if hasta is not None:
+            seleccion &= fechas <= np.datetime64(pd.Timestamp(hasta))
+        return self.df.iloc[inicio:fin][seleccion]
+
+
+def cargar_ultima_ejecucion(nivel, carpeta=CARPETA_ARCHIVO):
+    """Índice en memoria de la última ejecución archivada del nivel (None si aún no hay ninguna)."""
+    ejecuciones = ejecuciones_archivadas(nivel, carpeta)
+    if ejecuciones.empty:
+        return None
+    ejecucion = ejecuciones['ejecucion'].iloc[0]
+    inicio = time.perf_counter()
+    indice = IndicePronosticos(leer_ejecucion(nivel, ejecucion, carpeta), nivel, ejecucion)
+    logging.info(f"📥 Ejecución {ejecucion} '{nivel}' cargada en memoria: {len(indice.df)} filas "
+                 f"en {time.perf_counter() - inicio:.2f} s.")
+    return indice
+
+
+class ServicioPronosticos:
+    """
+    Mantiene en memoria la última ejecución de cada nivel y la recarga en segundo plano cuando el archivo
+    recibe una nueva (se revisa la fecha de modificación del índice SQLite, sin leerlo si no cambió).
+    """
+
+    def __init__(self, carpeta=CARPETA_ARCHIVO, niveles=NIVELES, segundos_recarga=SEGUNDOS_RECARGA):
+        self.carpeta, self.niveles, self.segundos_recarga = carpeta, niveles, segundos_recarga
+        self.indices = {}
+        self._marca = None
+        self._detener = threading.Event()
+        self.recargar()
+
+    def recargar(self):
+        """
+        Carga los niveles cuya última ejecución cambió. Devuelve True si hubo cambios.
+        La marca del índice se guarda solo cuando todos los niveles cargaron: si alguno falla, se reintenta en la
+        próxima revisión aunque el índice no vuelva a cambiar.
+        """
+        ruta_indice = os.path.join(self.carpeta, ARCHIVO_INDICE)
+        marca = os.stat(ruta_indice).st_mtime_ns if os.path.exists(ruta_indice) else None
+        if marca == self._marca:
+            return False
+
+        cambios = False
+        for nivel in self.niveles:
+            ejecuciones = ejecuciones_archivadas(nivel, self.carpeta)
+            ultima = None if ejecuciones.empty else ejecuciones['ejecucion'].iloc[0]
+            actual = self.indices.get(nivel)
+            if ultima is not None and (actual is None or actual.ejecucion != ultima):
+                # Reemplazo atómico: las consultas en curso siguen usando el índice anterior
+                self.indices = {**self.indices, nivel: cargar_ultima_ejecucion(nivel, self.carpeta)}
+                cambios = True
+        self._marca = marca
+        return cambios
+
+    def _vigilar(self):
+        while not self._detener.wait(self.segundos_recarga):
+            try:
+                self.recargar()
+            except Exception as e:
+                logging.error(f"❌ No se pudo recargar el archivo de pronósticos: {e}")
+
+    def iniciar_recarga(self):
+        """Revisa el archivo cada 'segundos_recarga' en un hilo de fondo."""
+        threading.Thread(target=self._vigilar, name='recarga-pronosticos', daemon=True).start()
+
+    def detener(self):
+        self._detener.set()
+
+    def estado(self):
+        return {nivel: {'ejecucion': indice.ejecucion, 'filas': len(indice.df)}
+                for nivel, indice in self.indices.items()}
+
+
+def respuesta_json(df):
+    """Filas como JSON (lista de registros, fechas ISO)."""
+    return df.to_json(orient='records', date_format='iso', force_ascii=False).encode('utf-8')
+
+
+def crear_manejador(servicio):
+    """Manejador HTTP de solo lectura: GET /pronostico y GET /estado, con ETag por ejecución."""
+
+    class Manejador(BaseHTTPRequestHandler):
+        def _enviar(self, codigo, cuerpo=b'', etag=None):
+            self.send_response(codigo)
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+            if codigo != 304:
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            if codigo != 304:
+                self.wfile.write(cuerpo)
+
+        def _error(self, codigo, mensaje):
+            self._enviar(codigo, json.dumps({'error': mensaje}, ensure_ascii=False).encode('utf-8'))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parametros = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+
+            if url.path == '/estado':
+                self._enviar(200, json.dumps(servicio.estado()).encode('utf-8'))
+                return
+            if url.path != '/pronostico':
+                self._error(404, f"Ruta desconocida: {url.path}")
+                return
+
+            nivel = parametros.pop('nivel', NIVEL_POR_DEFECTO)
+            indice = servicio.indices.get(nivel)
+            if indice is None:
+                self._error(404, f"No hay ejecuciones archivadas del nivel '{nivel}'.")
+                return
+
+            # El contenido solo cambia con una ejecución nueva: la ejecución identifica la versión
+            etag = f'"{indice.ejecucion}"'
+            if self.headers.get('If-None-Match') == etag:
+                self._enviar(304, etag=etag)
+                return
+            try:
+                filtros = {nombre: parametros.get(nombre) for nombre in ('tienda', 'familia', 'item', 'desde', 'hasta')}
+                df = indice.consultar(**filtros)
+            except (ValueError, TypeError) as e:
+                self._error(400, str(e))
+                return
+            self._enviar(200, respuesta_json(df), etag=etag)
+
+        def log_message(self, formato, *args):
+            logging.debug(f"{self.address_string()} - {formato % args}")
+
+    return Manejador
+
+
+def servir(host=HOST_SERVICIO, puerto=PUERTO_SERVICIO, carpeta=CARPETA_ARCHIVO, segundos_recarga=SEGUNDOS_RECARGA):
+    """Levanta el servicio HTTP de consultas hasta que se interrumpa."""
+    servicio = ServicioPronosticos(carpeta, segundos_recarga=segundos_recarga)
+    servicio.iniciar_recarga()
+    servidor = ThreadingHTTPServer((host, puerto), crear_manejador(servicio))
+    logging.info(f"🌐 Servicio de consultas en http://{host}:{puerto} — {servicio.estado()}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servicio.detener()
+        servidor.server_close()
+
+
+# =============================================================================
+# ------------------------------ EJECUCIÓN PRINCIPAL --------------------------
+# =============================================================================
+
+def parsear_argumentos(argv=None):
+    """Opciones de línea de comandos: 'servir' (HTTP) o 'consultar' (una consulta por consola)."""
+    parser = argparse.ArgumentParser(description="Consultas de solo lectura sobre la última ejecución archivada.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    servir_parser = subparsers.add_parser('servir', help="Levanta el servicio HTTP.")
+    servir_parser.add_argument('--host', default=HOST_SERVICIO)
+    servir_parser.add_argument('--puerto', type=int, default=PUERTO_SERVICIO)
+    servir_parser.add_argument('--recarga', type=float, default=SEGUNDOS_RECARGA,
+                               help="Segundos entre revisiones del archivo.")
+
+    consultar_parser = subparsers.add_parser('consultar', help="Imprime el resultado de una consulta.")
+    consultar_parser.add_argument('--nivel', default=NIVEL_POR_DEFECTO, choices=NIVELES)
+    for nombre in ('tienda', 'familia', 'item', 'desde', 'hasta'):
+        consultar_parser.add_argument(f'--{nombre}')
+
+    for subparser in (servir_parser, consultar_parser):
+        subparser.add_argument('--carpeta', default=CARPETA_ARCHIVO, help="Carpeta del archivo de pronósticos.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Función principal: sirve las consultas por HTTP o responde una desde la consola."""
+    args = parsear_argumentos(argv)
+    if args.comando == 'servir':
+        servir(args.host, args.puerto, args.carpeta, args.recarga)
+        return
+
+    indice = cargar_ultima_ejecucion(args.nivel, args.carpeta)
+    if indice is None:
+        logging.error(f"No hay ejecuciones archivadas del nivel '{args.nivel}' en '{args.carpeta}'.")
+        return
+    df = indice.consultar(args.tienda, args.familia, args.item, args.desde, args.hasta)
+    print(df.to_string(index=False) if not df.empty else "Sin resultados.")
+
+
+if __name__ == "__main__":
+    main()
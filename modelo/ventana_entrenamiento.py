@@ -0,0 +1,62 @@
+import pandas as pd
+
+# =============================================================================
+# --------------------------- CONFIGURACIÓN GLOBAL ----------------------------
+# =============================================================================
+
+# --- Ventana de entrenamiento: cuánta historia usa cada serie para ajustar Prophet ---
+# La estacionalidad anual solo necesita unos pocos años; con todo el historial el costo de fit y predict crece
+# día a día. Una ventana es:
+#   - un número de años (p. ej. 3): los últimos N años de la serie,
+#   - 'adaptativa': por serie, la ventana más corta de ANIOS_CANDIDATOS_ADAPTATIVA que junta al menos
+#     ANIOS_CON_VENTA_ADAPTATIVA años de períodos con venta (las series intermitentes toman más historia),
+#   - None: todo el historial.
+# Se recorta la venta de la serie; los regresores, el cap y las fechas del horizonte salen de la serie recortada.
+ANIOS_CANDIDATOS_ADAPTATIVA = [2, 3, 4]
+ANIOS_CON_VENTA_ADAPTATIVA = 1.5
+VENTANA_ADAPTATIVA = 'adaptativa'
+
+
+# =============================================================================
+# ---------------------------- FUNCIONES MODULARES ----------------------------
+# =============================================================================
+
+def _inicio_anios(fin, anios):
+    """Primer día de una ventana de 'anios' años (admite fracciones) que termina en 'fin'."""
+    return fin - pd.Timedelta(days=round(anios * 365.25)) + pd.Timedelta(days=1)
+
+
+def anios_ventana(group, ventana, periodos_por_anio=365):
+    """Años de historia que corresponden a la serie según la ventana (None si usa todo el historial)."""
+    if ventana is None or group.empty:
+        return None
+    if ventana != VENTANA_ADAPTATIVA:
+        return float(ventana)
+
+    fin = group['ds'].max()
+    minimo = ANIOS_CON_VENTA_ADAPTATIVA * periodos_por_anio
+    for anios in ANIOS_CANDIDATOS_ADAPTATIVA:
+        en_ventana = group[group['ds'] >= _inicio_anios(fin, anios)]
+        if (en_ventana['Venta Real'] > 0).sum() >= minimo:
+            return float(anios)
+    return float(ANIOS_CANDIDATOS_ADAPTATIVA[-1])
+
+
+def recortar_ventana(group, ventana, periodos_por_anio=365):
+    """
+    Deja solo la parte de la serie ('ds', 'Venta Real') que cae en la ventana de entrenamiento.
+    'periodos_por_anio' es 365 para series diarias y 52 para semanales (solo lo usa la ventana adaptativa).
+    """
+    anios = anios_ventana(group, ventana, periodos_por_anio)
+    if anios is None:
+        return group
+    return group[group['ds'] >= _inicio_anios(group['ds'].max(), anios)]
+
+
+def describir_ventana(ventana):
+    """Texto corto de una ventana para logs y reportes."""
+    if ventana is None:
+        return 'completa'
+    if ventana == VENTANA_ADAPTATIVA:
+        return ventana
+    return f"{ventana:g} año" if ventana == 1 else f"{ventana:g} años"
@@ -0,0 +1,70 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modelo.ajuste_hiperparametros import (
+    generar_candidatos, huella_evaluacion, _clave_cache, _cargar_cache, _guardar_cache, _wape
+)
+from modelo.panel_ventas import construir_panel_ventas
+
+CLAVE = ('A', 'Pasteleria', 'Torta')
+CORTE = pd.Timestamp('2025-02-28')
+
+
+def _panel(cambios=None):
+    fechas = pd.date_range('2025-01-01', '2025-03-31')
+    venta = pd.Series(np.arange(len(fechas)) % 5, index=fechas, dtype=float)
+    for fecha, valor in (cambios or {}).items():
+        venta[pd.Timestamp(fecha)] = valor
+    df = pd.DataFrame({'ds': fechas, 'Location Name': 'A', 'Major Group Name': 'Pasteleria',
+                       'Family Group Name': 'Torta', 'Venta Real': venta.values})
+    return construir_panel_ventas(df)
+
+
+def _huella(panel, horizonte_dias=14):
+    regresores = pd.DataFrame({'ds': pd.date_range('2025-01-01', '2025-03-31'), 'dia_pago': 0})
+    return huella_evaluacion(panel, regresores, ['dia_pago'], CLAVE, CORTE, horizonte_dias, backend='map',
+                             ventana=None)
+
+
+def test_grilla_completa_y_muestra_aleatoria_reproducible():
+    espacio = {'a': [1, 2, 3], 'b': [0.1, 0.2]}
+    assert len(generar_candidatos(espacio, modo='grilla')) == 6
+    muestra = generar_candidatos(espacio, modo='aleatoria', num_aleatorios=4, semilla=7)
+    assert len(muestra) == 4 and muestra == generar_candidatos(espacio, modo='aleatoria', num_aleatorios=4, semilla=7)
+    # Si se piden más candidatos que la grilla, se usa la grilla completa
+    assert len(generar_candidatos(espacio, modo='aleatoria', num_aleatorios=10)) == 6
+
+
+@pytest.mark.parametrize('fecha, cambia', [
+    ('2025-02-10', True),   # Historia hasta el corte
+    ('2025-03-01', True),   # Primer día del horizonte
+    ('2025-03-14', True),   # Último día del horizonte
+    ('2025-03-15', False),  # Después del horizonte: no entra en la evaluación
+])
+def test_huella_evaluacion_cubre_historia_y_venta_real_del_horizonte(fecha, cambia):
+    base = _huella(_panel())
+    assert (_huella(_panel({fecha: 99.0})) != base) == cambia
+
+
+def test_clave_cache_depende_de_los_parametros_y_del_corte():
+    parametros = {'cap_multiplicador': 1.5}
+    clave = _clave_cache('h', CORTE, parametros)
+    assert clave == _clave_cache('h', CORTE, dict(parametros))
+    assert clave != _clave_cache('h', CORTE, {'cap_multiplicador': 2.0})
+    assert clave != _clave_cache('h', CORTE + pd.Timedelta(days=7), parametros)
+
+
+def test_la_cache_guarda_solo_los_cortes_vigentes(tmp_path):
+    ruta = str(tmp_path / 'cache' / 'ajuste.pkl')
+    cache = {'vieja': {'corte': '2025-01-31', 'resultado': (1.0, 2.0)},
+             'vigente': {'corte': '2025-02-28', 'resultado': (3.0, 4.0)}}
+    _guardar_cache(cache, [CORTE], ruta)
+    assert list(_cargar_cache(ruta)) == ['vigente']
+
+
+def test_wape_sin_venta_real_es_infinito():
+    assert _wape((2.0, 8.0)) == 0.25
+    assert _wape((2.0, 0.0)) == math.inf
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import modelo.archivo_pronosticos as archivo_pronosticos
+from modelo.archivo_pronosticos import (
+    ArchivoIncremental, archivar_pronosticos, consultar_archivo, ejecuciones_archivadas, esquema_nivel,
+    leer_ejecucion
+)
+
+FECHAS = pd.date_range('2025-07-01', periods=3)
+
+
+def _items(tienda, item, demanda=1.0):
+    return pd.DataFrame({'Fecha': FECHAS, 'Location Name': tienda, 'Major Group Name': 'Delicias',
+                         'Family Group Name': 'Torta', 'Menu Item Number': item, 'Menu Item Name': 'Torta Chocolate',
+                         'Demanda': demanda, 'Peor Escenario': 1.0, 'Escenario Promedio': 2.0,
+                         'Mejor Escenario': 3.0, 'Motor Item': 'familia'})
+
+
+def _esquemas(carpeta, nivel):
+    import pyarrow.parquet as pq
+
+    return [pq.read_schema(os.path.join(raiz, nombre)) for raiz, _, nombres in os.walk(os.path.join(carpeta, nivel))
+            for nombre in nombres if nombre.endswith('.parquet')]
+
+
+def test_todas_las_tiendas_y_lotes_usan_el_esquema_del_nivel(tmp_path, monkeypatch):
+    monkeypatch.setattr(archivo_pronosticos, 'FILAS_POR_GRUPO', 2)
+    carpeta = str(tmp_path)
+    archivo = ArchivoIncremental('diario_item', '20250630T080000', carpeta)
+    # Primer lote de A con 'Demanda' vacía y números de item como texto; luego lotes con otros tipos
+    archivo.agregar(_items('A', '101', demanda=np.nan))
+    archivo.agregar(_items('A', 102, demanda=4.0))
+    archivo.agregar(_items('B', 101.0).drop(columns='Motor Item'))
+    archivo.cerrar()
+
+    esquemas = _esquemas(carpeta, 'diario_item')
+    assert len(esquemas) == 2
+    assert all(esquema.remove_metadata().equals(esquema_nivel('diario_item')) for esquema in esquemas)
+    df = leer_ejecucion('diario_item', '20250630T080000', carpeta)
+    assert sorted(df['Menu Item Number'].unique()) == [101, 102]
+    assert df.loc[df['Location Name'] == 'B', 'Motor Item'].isna().all()
+
+
+def test_consulta_por_item_y_fecha_de_todas_las_ejecuciones(tmp_path):
+    carpeta = str(tmp_path)
+    archivar_pronosticos(_items('A', 101), 'diario_item', '20250629T080000', carpeta)
+    archivar_pronosticos(_items('A', 101, demanda=5.0), 'diario_item', '20250630T080000', carpeta)
+    df = consultar_archivo('diario_item', tienda='A', familia='Torta', item=101, desde=FECHAS[1], hasta=FECHAS[1],
+                           carpeta=carpeta)
+    assert df['Ejecucion'].tolist() == ['20250629T080000', '20250630T080000']
+    assert df['Demanda'].tolist() == [1.0, 5.0]
+    assert ejecuciones_archivadas('diario_item', carpeta)['ejecucion'].tolist() == ['20250630T080000',
+                                                                                     '20250629T080000']
+
+
+def test_sin_tienda_se_archiva_como_la_cadena(tmp_path):
+    familia = _items('A', 101).drop(columns=['Location Name', 'Menu Item Number', 'Menu Item Name', 'Motor Item'])
+    archivar_pronosticos(familia, 'semanal_familia', '20250630T080000', str(tmp_path))
+    df = leer_ejecucion('semanal_familia', '20250630T080000', str(tmp_path))
+    assert df['Location Name'].unique().tolist() == ['Cadena']
+
+
+def test_una_ejecucion_no_se_reescribe(tmp_path):
+    carpeta = str(tmp_path)
+    archivar_pronosticos(_items('A', 101), 'diario_item', '20250630T080000', carpeta)
+    with pytest.raises(FileExistsError):
+        archivar_pronosticos(_items('A', 101), 'diario_item', '20250630T080000', carpeta)
+    assert len(leer_ejecucion('diario_item', '20250630T080000', carpeta)) == len(FECHAS)
+
+
+def test_descartar_no_deja_archivos_ni_indice(tmp_path):
+    carpeta = str(tmp_path)
+    archivo = ArchivoIncremental('diario_item', '20250630T080000', carpeta)
+    archivo.agregar(_items('A', 101))
+    archivo.descartar()
+    assert _esquemas(carpeta, 'diario_item') == []
+    assert ejecuciones_archivadas(carpeta=carpeta).empty
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('prophet')
+
+from modelo.backend_prophet import log_posterior_negativo, preparar_datos, crear_prophet  # noqa: E402
+
+T, S, K = 60, 6, 4
+
+
+def _datos(trend_indicator, semilla=0):
+    """Datos con la forma que Prophet entrega al backend (t y y escalados, puntos de cambio y regresores)."""
+    rng = np.random.default_rng(semilla)
+    t = np.linspace(0, 1, T)
+    stan_data = {
+        'T': T, 'S': S, 'K': K, 'tau': 0.05, 'trend_indicator': trend_indicator,
+        'y': 0.4 + 0.2 * t + 0.05 * rng.standard_normal(T), 't': t, 'cap': np.full(T, 1.2),
+        't_change': np.linspace(0.1, 0.8, S), 'X': rng.standard_normal((T, K)),
+        's_a': np.array([1.0, 1.0, 0.0, 1.0]), 's_m': np.array([0.0, 0.0, 1.0, 0.0]), 'sigmas': np.full(K, 10.0),
+    }
+    x = np.concatenate(([1.3, 0.2], rng.uniform(0, 0.1, S), rng.uniform(0, 0.1, S), [0.3],
+                        0.1 * rng.standard_normal(K)))
+    return preparar_datos(stan_data), x
+
+
+@pytest.mark.parametrize('trend_indicator', [0, 1, 2])  # Lineal, logística y plana
+def test_gradiente_coincide_con_diferencias_finitas(trend_indicator):
+    datos, x = _datos(trend_indicator)
+    _, gradiente = log_posterior_negativo(x, datos)
+
+    paso = 1e-6
+    numerico = np.empty_like(x)
+    for i in range(len(x)):
+        e = np.zeros_like(x)
+        e[i] = paso
+        numerico[i] = (log_posterior_negativo(x + e, datos)[0] - log_posterior_negativo(x - e, datos)[0]) / (2 * paso)
+    assert gradiente == pytest.approx(numerico, rel=1e-5, abs=1e-5)
+
+
+def test_backend_map_rechaza_mcmc():
+    with pytest.raises(ValueError, match="mcmc_samples"):
+        crear_prophet('map', mcmc_samples=100)
+    with pytest.raises(ValueError, match="desconocido"):
+        crear_prophet('stan')
+
+
+def _cmdstan_disponible():
+    """True si el backend por defecto de Prophet carga su modelo compilado (CmdStan incluido en el paquete)."""
+    try:
+        from prophet.models import CmdStanPyBackend
+
+        CmdStanPyBackend()
+    except Exception:
+        return False
+    return True
+
+
+def _serie():
+    import pandas as pd
+
+    rng = np.random.default_rng(1)
+    ds = pd.date_range('2024-01-01', periods=120)
+    semanal = np.array([0, 1, 2, 3, 5, 8, 6])[ds.dayofweek]
+    return pd.DataFrame({'ds': ds, 'y': 20 + 0.05 * np.arange(len(ds)) + semanal + rng.normal(0, 1, len(ds)),
+                         'dia_pago': (ds.day == 1).astype(float)})
+
+
+@pytest.mark.skipif(not _cmdstan_disponible(), reason="CmdStan no está instalado")
+def test_backend_map_coincide_con_cmdstanpy():
+    resultados = {}
+    for backend in ('map', 'cmdstanpy'):
+        modelo = crear_prophet(backend, daily_seasonality=False, yearly_seasonality=False)
+        modelo.add_regressor('dia_pago')
+        modelo.fit(_serie())
+        futuro = modelo.make_future_dataframe(periods=14)
+        futuro['dia_pago'] = (futuro['ds'].dt.day == 1).astype(float)
+        resultados[backend] = (modelo.params, modelo.predict(futuro)['yhat'].to_numpy())
+
+    (params_map, yhat_map), (params_stan, yhat_stan) = resultados['map'], resultados['cmdstanpy']
+    for nombre in ('k', 'm', 'delta', 'beta'):
+        assert np.ravel(params_map[nombre]) == pytest.approx(np.ravel(params_stan[nombre]), abs=1e-2), nombre
+    assert yhat_map == pytest.approx(yhat_stan, rel=1e-2)
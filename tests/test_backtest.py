@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import modelo.pronostico_demanda as pronostico_demanda
+from modelo.backtest import (
+    generar_cortes, generar_cortes_semanales, semanas_familia, series_comunes, combinar_resumenes
+)
+from modelo.panel_ventas import construir_panel_ventas
+
+
+def _panel(dias=70):
+    fechas = pd.date_range('2025-01-06', periods=dias)  # Empieza un lunes
+    filas = [(fecha, tienda, 'Pasteleria', 'Torta', venta)
+             for fecha in fechas for tienda, venta in (('A', 2.0), ('B', 3.0))]
+    return construir_panel_ventas(pd.DataFrame(filas, columns=['ds', 'Location Name', 'Major Group Name',
+                                                              'Family Group Name', 'Venta Real']))
+
+
+def test_el_ultimo_corte_deja_un_horizonte_completo():
+    cortes = generar_cortes('2025-03-31', num_cortes=3, espaciado_dias=7, horizonte_dias=14)
+    assert cortes == [pd.Timestamp('2025-03-03'), pd.Timestamp('2025-03-10'), pd.Timestamp('2025-03-17')]
+
+
+@pytest.mark.parametrize('ultima_fecha', ['2025-06-29', '2025-06-30', '2025-07-05'])
+def test_cortes_semanales_solo_usan_semanas_completas(ultima_fecha):
+    cortes = generar_cortes_semanales(ultima_fecha, num_cortes=2, espaciado_semanas=4, horizonte_semanas=2)
+    assert all(corte.dayofweek == 0 for corte in cortes)
+    # La última semana del horizonte termina (domingo) a más tardar el último día con datos
+    assert cortes[-1] + pd.Timedelta(weeks=2, days=6) <= pd.Timestamp(ultima_fecha)
+    assert cortes[-1] + pd.Timedelta(weeks=3, days=6) > pd.Timestamp(ultima_fecha)
+    assert cortes[1] - cortes[0] == pd.Timedelta(weeks=4)
+
+
+def test_semanas_familia_suma_la_cadena_por_semana_desde_el_lunes():
+    semanal = semanas_familia(_panel(), 'Torta', fin=pd.Timestamp('2025-01-19'))
+    assert semanal['ds'].tolist() == [pd.Timestamp('2025-01-06'), pd.Timestamp('2025-01-13')]
+    assert semanal['Venta Real'].tolist() == [35.0, 35.0]  # 7 días × (2 + 3)
+    assert semanal['Major Group Name'].unique().tolist() == ['Pasteleria']
+
+
+def test_series_comunes_compara_todos_los_motores_sobre_las_mismas_series():
+    corte = pd.Timestamp('2025-03-01')
+    filas = [('prophet', 'A'), ('prophet', 'B'), ('promedio', 'A'), ('promedio', 'B'), ('agrupado', 'A')]
+    df = pd.DataFrame([{'Motor': motor, 'Location Name': tienda, 'Family Group Name': 'Torta', 'Corte': corte,
+                        'Fecha': corte + pd.Timedelta(days=h), 'Real': 1.0, 'Pronostico': 1.0}
+                       for motor, tienda in filas for h in (1, 2)])
+    comunes = series_comunes(df)
+    assert set(comunes['Location Name']) == {'A'}
+    assert comunes.groupby('Motor').size().to_dict() == {'agrupado': 2, 'promedio': 2, 'prophet': 2}
+
+
+def test_combinar_resumenes_suma_tareas_y_toma_la_particion_mas_lenta():
+    resumen = pd.DataFrame({'Motor': ['prophet'], 'Tareas': [10], 'Completadas': [8], 'Fallidas': [1],
+                            'Cobertura': [0.8], 'Segundos': [12.0], 'Exceso Segundos': [0.0]})
+    otro = resumen.assign(Completadas=10, Fallidas=0, Segundos=20.0, **{'Exceso Segundos': 3.5})
+    df = combinar_resumenes([resumen, otro])
+    fila = df.iloc[0]
+    assert (fila['Tareas'], fila['Completadas'], fila['Fallidas']) == (20, 18, 1)
+    assert fila['Cobertura'] == pytest.approx(0.9)
+    assert (fila['Segundos'], fila['Exceso Segundos']) == (20.0, 3.5)
+
+
+def test_la_cache_de_ventas_conserva_solo_la_ingesta_actual(tmp_path, monkeypatch):
+    carpeta_ventas, carpeta_cache = tmp_path / 'data', tmp_path / 'cache'
+    carpeta_ventas.mkdir()
+    (carpeta_ventas / 'ventas_1.csv').write_text('a')
+    resultado = (pd.DataFrame({'x': [1]}), None, None, None)
+    monkeypatch.setattr(pronostico_demanda, 'cargar_y_procesar_ventas', lambda carpeta: resultado)
+
+    pronostico_demanda.cargar_ventas_con_cache(str(carpeta_ventas), str(carpeta_cache))
+    (carpeta_ventas / 'ventas_2.csv').write_text('b')
+    pronostico_demanda.cargar_ventas_con_cache(str(carpeta_ventas), str(carpeta_cache))
+
+    huella = pronostico_demanda.huella_carpeta_ventas(str(carpeta_ventas))
+    assert sorted(p.name for p in carpeta_cache.iterdir()) == [f"ventas_v5_{huella}.pkl"]
+    assert np.array_equal(pd.read_pickle(carpeta_cache / f"ventas_v5_{huella}.pkl")[0]['x'], [1])
@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+
+import modelo.pronostico_demanda as pronostico_demanda
+from modelo.pronostico_demanda import huella_serie, entrenar_y_pronosticar, pronostico_constante
+from modelo.panel_ventas import construir_panel_ventas
+
+PARAMETROS = {'changepoint_prior_scale': 0.05, 'cap_multiplicador': 2.5, 'daily_seasonality': True}
+
+
+def _serie(dias=60, venta=3.0):
+    return pd.DataFrame({'ds': pd.date_range('2025-01-01', periods=dias), 'Venta Real': venta})
+
+
+def _regresores(valor_fuera=0):
+    df = pd.DataFrame({'ds': pd.date_range('2024-12-01', '2025-04-30'), 'dia_pago': 0})
+    df.loc[df['ds'] == '2025-04-30', 'dia_pago'] = valor_fuera
+    return df
+
+
+def _huella(serie=None, regresores=None, **kwargs):
+    serie = _serie() if serie is None else serie
+    regresores = _regresores() if regresores is None else regresores
+    return huella_serie(serie, regresores, ['dia_pago'], 'Pasteleria', kwargs.pop('parametros', PARAMETROS),
+                        backend='map', ventana=None, **kwargs)
+
+
+def test_huella_cambia_con_el_historial_y_la_configuracion():
+    base = _huella()
+    serie = _serie()
+    serie.loc[10, 'Venta Real'] = 9.0
+    assert _huella(serie) != base
+    assert _huella(parametros={**PARAMETROS, 'cap_multiplicador': 3.0}) != base
+    assert _huella(inactivas=['dia_pago']) != base
+    assert _huella() == base
+
+
+def test_huella_solo_mira_los_regresores_del_historial_y_el_horizonte():
+    # 2025-04-30 queda fuera de historial (hasta 2025-03-01) + 14 días de horizonte
+    assert _huella(regresores=_regresores(valor_fuera=1)) == _huella()
+    regresores = _regresores()
+    regresores.loc[regresores['ds'] == '2025-03-10', 'dia_pago'] = 1
+    assert _huella(regresores=regresores) != _huella()
+
+
+@pytest.fixture
+def entrenamientos(tmp_path, monkeypatch):
+    """Ejecuta en una carpeta temporal y reemplaza el ajuste por un pronóstico fijo que cuenta las llamadas."""
+    monkeypatch.chdir(tmp_path)
+    llamadas = []
+
+    def pronosticar_serie(location, major_group, family_group, group, *args, politica=None, **kwargs):
+        llamadas.append(location)
+        if politica is not None:
+            politica['motivo'], politica['estado'] = 'sin modelo', {'tienda': location}
+        return pronostico_constante(2.0, group['ds'].max()), 'prophet'
+
+    monkeypatch.setattr(pronostico_demanda, 'pronosticar_serie', pronosticar_serie)
+    return llamadas
+
+
+def _panel(venta_b=1.0):
+    filas = [(fecha, tienda, venta) for fecha in pd.date_range('2025-01-01', periods=60)
+             for tienda, venta in (('A', 5.0), ('B', venta_b))]
+    df = pd.DataFrame(filas, columns=['ds', 'Location Name', 'Venta Real'])
+    return construir_panel_ventas(df.assign(**{'Major Group Name': 'Pasteleria', 'Family Group Name': 'Torta'}))
+
+
+def _entrenar(panel, **kwargs):
+    return entrenar_y_pronosticar(panel, pd.DataFrame(), [], presupuesto_segundos=None, backend='map', ventana=None,
+                                  **kwargs)
+
+
+def test_reutiliza_el_pronostico_de_las_series_sin_cambios(entrenamientos):
+    _entrenar(_panel())
+    assert sorted(entrenamientos) == ['A', 'B']
+
+    entrenamientos.clear()
+    df = _entrenar(_panel(venta_b=4.0))
+    assert entrenamientos == ['B']
+    assert len(df) == 2 * pronostico_demanda.FORECAST_PERIOD_DAYS
+    reporte = pd.read_csv(pronostico_demanda.RUTA_REPORTE_MOTORES).set_index('Location Name')
+    assert reporte['Origen'].to_dict() == {'A': 'caché', 'B': 'entrenado'}
+
+
+def test_sin_cache_entrena_todas_las_series(entrenamientos):
+    _entrenar(_panel())
+    entrenamientos.clear()
+    _entrenar(_panel(), usar_cache=False)
+    assert sorted(entrenamientos) == ['A', 'B']
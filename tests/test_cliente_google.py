@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+pytest.importorskip('gspread')
+
+import requests  # noqa: E402
+from gspread.exceptions import APIError  # noqa: E402
+from gspread.http_client import HTTPClient  # noqa: E402
+
+import comun.cliente_google as cliente_google  # noqa: E402
+from comun.cliente_google import CubetaTokens, ClienteHTTPLimitado, _es_reintentable, _segundos_espera  # noqa: E402
+
+
+class _Respuesta:
+    """Respuesta mínima de la API con la forma que gspread espera para construir un APIError."""
+
+    def __init__(self, codigo, razon=None, retry_after=None):
+        self.status_code, self.text = codigo, ''
+        self.headers = {'Retry-After': retry_after} if retry_after else {}
+        self._error = {'code': codigo, 'message': 'error', 'status': 'ERROR'}
+        if razon:
+            self._error['errors'] = [{'reason': razon}]
+
+    def json(self):
+        return {'error': self._error}
+
+
+def test_errores_de_cuota_y_transitorios_se_reintentan():
+    assert _es_reintentable(APIError(_Respuesta(429)))
+    assert _es_reintentable(APIError(_Respuesta(503)))
+    assert _es_reintentable(APIError(_Respuesta(403, razon='userRateLimitExceeded')))
+    assert not _es_reintentable(APIError(_Respuesta(403, razon='forbidden')))
+    assert not _es_reintentable(APIError(_Respuesta(404)))
+
+
+def test_espera_exponencial_respeta_retry_after():
+    assert 1.0 <= _segundos_espera(0) <= 2.0
+    assert _segundos_espera(10) <= cliente_google.ESPERA_MAXIMA_SEGUNDOS
+    assert _segundos_espera(0, retry_after='30') == 30.0
+    assert _segundos_espera(0, retry_after='pronto') <= 2.0
+
+
+def test_cubeta_permite_rafagas_y_pausa_a_todos(monkeypatch):
+    reloj, esperas = [0.0], []
+
+    def dormir(segundos):
+        esperas.append(segundos)
+        reloj[0] += segundos
+
+    monkeypatch.setattr(cliente_google.time, 'monotonic', lambda: reloj[0])
+    monkeypatch.setattr(cliente_google.time, 'sleep', dormir)
+    cubeta = CubetaTokens(tasa=2.0, capacidad=3)
+    for _ in range(3):
+        cubeta.tomar()
+    assert esperas == []
+    cubeta.tomar()  # Cubeta vacía: espera un token (0.5 s a 2 por segundo)
+    assert sum(esperas) == pytest.approx(0.5)
+
+    cubeta.pausar(60)
+    cubeta.tomar()
+    assert reloj[0] == pytest.approx(0.5 + 60 + 0.5)
+
+
+def test_contadores_exactos_con_varios_hilos(monkeypatch):
+    intentos = threading.local()
+
+    def request(self, *args, **kwargs):
+        intentos.n = getattr(intentos, 'n', 0) + 1
+        if intentos.n % 2:
+            raise APIError(_Respuesta(503))
+        return 'ok'
+
+    monkeypatch.setattr(HTTPClient, 'request', request)
+    monkeypatch.setattr(cliente_google, '_CUBETA', CubetaTokens(tasa=1e9, capacidad=1e9))
+    monkeypatch.setattr(cliente_google.time, 'sleep', lambda segundos: None)
+    cliente = ClienteHTTPLimitado(None, session=requests.Session())
+
+    def trabajar():
+        for _ in range(200):
+            assert cliente.request('get', 'https://sheets.googleapis.com')
+
+    hilos = [threading.Thread(target=trabajar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert (cliente.solicitudes, cliente.reintentos) == (8 * 200 * 2, 8 * 200)
+
+
+def test_solicitudes_con_el_bloqueo_tomado_no_se_bloquean(monkeypatch):
+    # abrir_planilla y obtener_hoja llaman a la API mientras tienen _BLOQUEO
+    monkeypatch.setattr(HTTPClient, 'request', lambda self, *args, **kwargs: 'ok')
+    cliente = ClienteHTTPLimitado(None, session=requests.Session())
+
+    def con_bloqueo():
+        with cliente_google._BLOQUEO:
+            cliente.request('get', 'https://sheets.googleapis.com')
+
+    hilo = threading.Thread(target=con_bloqueo, daemon=True)
+    hilo.start()
+    hilo.join(timeout=5)
+    assert not hilo.is_alive() and cliente.solicitudes == 1
@@ -0,0 +1,37 @@
+import logging
+
+import pandas as pd
+
+from modelo.pronostico_demanda import avisar_clima_sin_serie, regresores_de_tienda
+
+FECHAS = pd.date_range('2025-07-01', periods=3)
+
+
+def _regresores():
+    return pd.DataFrame({'ds': FECHAS, 'feriado': [0, 1, 0], 'dia_frio': [0, 0, 0], 'dia_frio|Maipu': [1, 1, 0],
+                         'dia_frio|San Miguel': [0, 1, 1]})
+
+
+def test_la_tienda_usa_su_clima_y_no_el_de_las_demas():
+    df = regresores_de_tienda(_regresores(), 'Maipu')
+    assert list(df.columns) == ['ds', 'feriado', 'dia_frio']
+    assert df['dia_frio'].tolist() == [1, 1, 0]
+
+
+def test_nombres_con_espacios_encuentran_su_clima():
+    df = regresores_de_tienda(_regresores(), 'San Miguel ')
+    assert df['dia_frio'].tolist() == [0, 1, 1]
+
+
+def test_sin_clima_propio_se_usa_el_general():
+    df = regresores_de_tienda(_regresores(), 'Nunoa')
+    assert list(df.columns) == ['ds', 'feriado', 'dia_frio']
+    assert df['dia_frio'].tolist() == [0, 0, 0]
+
+
+def test_avisa_del_clima_que_no_llega_a_ninguna_tienda(caplog):
+    with caplog.at_level(logging.WARNING):
+        assert avisar_clima_sin_serie(_regresores(), ['Maipu', 'San Miguel ']) == []
+        assert not caplog.records
+        assert avisar_clima_sin_serie(_regresores(), ['Maipu', 'San Miguell']) == ['San Miguel']
+    assert 'San Miguel' in caplog.text
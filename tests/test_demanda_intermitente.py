@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modelo.demanda_intermitente import tasa_intermitente, unidades_por_acumulado, dias_sin_venta
+
+ALFA = 0.1
+
+
+def test_croston_serie_regular_da_tamano_sobre_intervalo():
+    # Vende 4 unidades cada 2 días: tamaño 4, intervalo 2 → 2 por día
+    Y = np.tile([0.0, 4.0], 20)[None, :]
+    assert tasa_intermitente(Y, metodo='croston', alfa=ALFA) == pytest.approx([2.0])
+
+
+def test_sba_aplica_la_correccion_de_sesgo():
+    Y = np.tile([0.0, 4.0], 20)[None, :]
+    croston = tasa_intermitente(Y, metodo='croston', alfa=ALFA)
+    sba = tasa_intermitente(Y, metodo='sba', alfa=ALFA)
+    assert sba == pytest.approx(croston * (1 - ALFA / 2))
+
+
+def test_tsb_decae_cuando_el_item_deja_de_venderse():
+    activo = np.tile([0.0, 4.0], 20)
+    Y = np.vstack([activo, np.concatenate([activo, np.zeros(30)])[-len(activo):]])
+    tasa = tasa_intermitente(Y, metodo='tsb', alfa=ALFA, beta=ALFA)
+    assert tasa[1] < tasa[0] / 2
+    # Croston no ve los días sin venta: ambas series quedan con la misma tasa
+    croston = tasa_intermitente(Y, metodo='croston', alfa=ALFA)
+    assert croston[1] == pytest.approx(croston[0])
+
+
+def test_series_sin_venta_o_antes_de_existir_dan_cero():
+    Y = np.array([[0.0] * 10, [5.0] * 5 + [0.0] * 5])
+    inicio = np.array([0, 10])  # La segunda serie aún no existe en la ventana
+    assert tasa_intermitente(Y, inicio, metodo='sba').tolist() == [0.0, 0.0]
+
+
+def test_metodo_desconocido():
+    with pytest.raises(ValueError, match="desconocido"):
+        tasa_intermitente(np.ones((1, 3)), metodo='ses')
+
+
+def test_dias_sin_venta():
+    Y = np.array([[0, 0, 1, 0, 0], [1, 0, 0, 0, 2], [0, 0, 0, 0, 0]], dtype=float)
+    assert dias_sin_venta(Y).tolist() == [2, 0, 5]
+
+
+def _demanda(valores, item='1'):
+    return pd.DataFrame({'Item': item, 'Fecha': pd.date_range('2025-01-01', periods=len(valores)), 'Tasa': valores})
+
+
+def test_unidades_por_acumulado_conserva_el_total():
+    df = _demanda([0.3] * 10)
+    unidades = unidades_por_acumulado(df, 'Tasa', claves=['Item'])
+    assert unidades.sum() == pytest.approx(round(0.3 * 10))
+    assert set(unidades.unique()) <= {0.0, 1.0}
+    assert (unidades > 0).sum() == 3  # Una unidad cada 3 o 4 días en vez de 0 todos los días
+
+
+def test_unidades_por_acumulado_separa_items_y_respeta_el_orden():
+    df = pd.concat([_demanda([0.5] * 4, '1'), _demanda([1.4] * 4, '2')], ignore_index=True)
+    df = df.sample(frac=1, random_state=0)
+    unidades = unidades_por_acumulado(df, 'Tasa', claves=['Item'])
+    totales = unidades.groupby(df.loc[unidades.index, 'Item']).sum()
+    assert totales.to_dict() == {'1': 2.0, '2': 6.0}
+    # El acumulado se redondea en orden de fecha aunque las filas lleguen desordenadas
+    ordenado = df.assign(Unidades=unidades).sort_values(['Item', 'Fecha'])
+    assert ordenado['Unidades'].tolist() == [0.0, 1.0, 1.0, 0.0, 1.0, 2.0, 1.0, 2.0]
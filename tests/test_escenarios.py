@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from modelo.escenarios import preparar_caso_base, simular_escenario, cambios_promocion, cambios_regresores
+
+FECHAS = pd.date_range('2025-06-01', periods=3)
+COLUMNAS = ['dia_frio', 'promo']
+
+
+def _guardado(yhat, regresores=None, inactivas=()):
+    pronostico = pd.DataFrame({'Fecha': FECHAS, 'yhat': yhat, 'yhat_lower': yhat - 2.0, 'yhat_upper': yhat + 2.0})
+    componentes = {}
+    if regresores is not None:
+        componentes = {'coeficientes': {'dia_frio': 3.0, 'promo': 10.0}, 'columnas': COLUMNAS,
+                       'regresores': np.asarray(regresores, dtype=float), 'inactivas': list(inactivas)}
+    return {'pronostico': pronostico, 'componentes': componentes}
+
+
+def _base():
+    cache = {
+        'A|Pasteleria|Torta': _guardado(np.array([10.0, 10.0, 10.0]), [[0, 0.5], [1, 0.5], [0, 0]]),
+        'B|Pasteleria|Torta': _guardado(np.array([20.0, 20.0, 20.0]), [[0, 0], [0, 0], [0, 0]], inactivas=['promo']),
+        'C|Pasteleria|Torta': {'pronostico': pd.DataFrame({'Fecha': FECHAS, 'Peor Escenario': 4.0,
+                                                           'Escenario Promedio': 4.0, 'Mejor Escenario': 4.0})},
+    }
+    return preparar_caso_base(cache, periodos=3)
+
+
+def _promedio(df, tienda):
+    return df.loc[df['Location Name'] == tienda, 'Escenario Promedio'].tolist()
+
+
+def test_sin_cambios_reproduce_el_caso_base():
+    df = simular_escenario(_base())
+    assert (df['Escenario Promedio'] == df['Escenario Promedio Base']).all()
+    assert _promedio(df, 'C') == [4.0, 4.0, 4.0]  # Promedio simple: sin coeficientes
+
+
+def test_promocion_cambia_la_fuerza_solo_donde_esta_vigente_y_aplica():
+    df = simular_escenario(_base(), *cambios_promocion('promo', 1.0))
+    assert _promedio(df, 'A') == [15.0, 15.0, 10.0]  # +10 × (1.0 − 0.5) los dos días vigentes
+    assert _promedio(df, 'B') == [20.0] * 3
+    activada = simular_escenario(_base(), *cambios_promocion('promo', 1.0, activar=True))
+    assert _promedio(activada, 'A') == [15.0, 15.0, 20.0]
+    assert _promedio(activada, 'B') == [20.0] * 3  # La promoción no aplica a B
+
+
+def test_regresor_fijo_en_un_rango_y_tiendas():
+    df = simular_escenario(_base(), *cambios_regresores(desde='2025-06-02', tiendas=['B'], dia_frio=1))
+    assert _promedio(df, 'A') == [10.0] * 3
+    assert _promedio(df, 'B') == [20.0, 23.0, 23.0]
+    assert df.loc[df['Location Name'] == 'B', 'Mejor Escenario'].tolist() == [22.0, 25.0, 25.0]
+
+
+def test_regresor_desconocido_se_ignora():
+    df = simular_escenario(_base(), *cambios_regresores(dia_lluvioso=1))
+    assert (df['Escenario Promedio'] == df['Escenario Promedio Base']).all()
@@ -0,0 +1,65 @@
+import threading
+
+import pandas as pd
+
+from comun.escritura_continua import Etapa, EscritorEnSegundoPlano
+
+
+def _registro():
+    """Etapa que guarda los lotes recibidos y si se cerró o descartó."""
+    estado = {'lotes': [], 'cerrada': False, 'descartada': False}
+    etapa = Etapa(estado['lotes'].append, lambda: estado.update(cerrada=True),
+                  lambda: estado.update(descartada=True))
+    return etapa, estado
+
+
+def _serie(n):
+    return pd.DataFrame({'serie': [n]})
+
+
+def test_lotes_completos_y_ultimo_parcial_al_cerrar():
+    etapa, estado = _registro()
+    escritor = EscritorEnSegundoPlano({'archivo': etapa}, preparar=lambda lote: lote.assign(doble=lote['serie'] * 2),
+                                      tamano_lote=3)
+    for n in range(7):
+        escritor.agregar(_serie(n))
+    assert escritor.cerrar() == {'archivo': True}
+    assert [len(lote) for lote in estado['lotes']] == [3, 3, 1]
+    assert pd.concat(estado['lotes'])['doble'].tolist() == [2 * n for n in range(7)]
+    assert estado['cerrada'] and not estado['descartada']
+
+
+def test_una_etapa_que_falla_se_descarta_y_las_demas_siguen():
+    etapa, estado = _registro()
+    descartes = []
+
+    def fallar(lote):
+        raise RuntimeError("cuota agotada")
+
+    escritor = EscritorEnSegundoPlano({'hoja': Etapa(fallar, descartar=lambda: descartes.append(1)),
+                                       'archivo': etapa}, tamano_lote=2)
+    for n in range(4):
+        escritor.agregar(_serie(n))
+    assert escritor.cerrar() == {'hoja': False, 'archivo': True}
+    assert descartes == [1] and len(estado['lotes']) == 2
+
+
+def test_cancelar_descarta_todas_las_etapas():
+    etapa, estado = _registro()
+    escritor = EscritorEnSegundoPlano({'archivo': etapa}, tamano_lote=1)
+    escritor.agregar(_serie(0))
+    escritor.cancelar()
+    assert estado['descartada'] and not estado['cerrada']
+
+
+def test_la_cola_acotada_frena_al_productor():
+    liberar = threading.Event()
+    escritor = EscritorEnSegundoPlano({'lenta': Etapa(lambda lote: liberar.wait())}, tamano_lote=1, lotes_en_cola=1)
+    productor = threading.Thread(target=lambda: [escritor.agregar(_serie(n)) for n in range(5)], daemon=True)
+    productor.start()
+    productor.join(timeout=0.5)
+    assert productor.is_alive()  # Un lote en proceso y otro en cola: el productor espera
+    liberar.set()
+    productor.join(timeout=5)
+    assert not productor.is_alive()
+    assert escritor.cerrar() == {'lenta': True}
@@ -0,0 +1,14 @@
+import pytest
+
+from comun.tiempos_importacion import PRESUPUESTOS_MS, medir_importacion
+
+
+@pytest.mark.parametrize('modulo', sorted(PRESUPUESTOS_MS))
+def test_importar_un_punto_de_entrada_no_carga_dependencias_pesadas(modulo):
+    _, pesados, _ = medir_importacion(modulo)
+    assert pesados == []
+
+
+def test_importacion_fallida_se_informa():
+    with pytest.raises(RuntimeError):
+        medir_importacion('modulo_que_no_existe')
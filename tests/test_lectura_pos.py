@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from modelo.lectura_pos import leer_archivos_pos, _leer_con_pandas, COLUMNAS_POS
+
+ENCABEZADO = ('"Business Date","Location Name","Order Type Name","Major Group Name","Family Group Name",'
+              '"Menu Item Number","Menu Item Name","Sales Count","Sales Total"')
+FILAS = [
+    '2025-06-15 00:00:00.0,"Maipu","Local","Delicias","Torta",101,"Torta Chocolate",3,100.0',
+    '2025-06-16 00:00:00.0,"Maipu","Uber","Delicias","Torta",101,"Torta Chocolate",2,100.0',
+    '16/06/2025,"Maipu","Local","Delicias","Torta",101,"Torta Chocolate",5,100.0',
+    ',"Maipu","Local","Delicias","Torta",101,"Torta Chocolate",7,100.0',
+]
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    ruta = tmp_path / 'ventas.csv'
+    ruta.write_text('\n'.join([ENCABEZADO] + FILAS) + '\n', encoding='utf-8')
+    return str(ruta)
+
+
+def test_esquema_fijo_y_fecha_sin_hora(tmp_path, archivo):
+    df = leer_archivos_pos([archivo], ruta_cuarentena=str(tmp_path / 'cuarentena.csv'), carpeta_cache=None)
+    assert list(df.columns) == COLUMNAS_POS
+    assert df['Business Date'].tolist() == [pd.Timestamp('2025-06-15'), pd.Timestamp('2025-06-16')]
+    assert isinstance(df['Location Name'].dtype, pd.CategoricalDtype)
+    assert df['Sales Count'].tolist() == [3, 2]
+
+
+def test_fechas_vacias_o_no_validas_van_a_cuarentena(tmp_path, archivo):
+    ruta_cuarentena = tmp_path / 'cuarentena.csv'
+    leer_archivos_pos([archivo], ruta_cuarentena=str(ruta_cuarentena), carpeta_cache=None)
+    cuarentena = pd.read_csv(ruta_cuarentena)
+    assert sorted(cuarentena['Motivo']) == ['fecha no válida', 'fecha vacía']
+    assert cuarentena['Archivo'].unique().tolist() == ['ventas.csv']
+
+
+def test_la_cache_por_archivo_conserva_la_cuarentena(tmp_path, archivo):
+    carpeta_cache = str(tmp_path / 'cache')
+    rutas = [str(tmp_path / f"cuarentena_{i}.csv") for i in range(2)]
+    primera = leer_archivos_pos([archivo], ruta_cuarentena=rutas[0], carpeta_cache=carpeta_cache)
+    segunda = leer_archivos_pos([archivo], ruta_cuarentena=rutas[1], carpeta_cache=carpeta_cache)
+    pd.testing.assert_frame_equal(primera, segunda)
+    assert len(pd.read_csv(rutas[1])) == 2
+
+
+def test_lector_de_pandas_aparta_las_mismas_filas(archivo):
+    cuarentena = []
+    df = _leer_con_pandas([archivo], cuarentena)
+    assert df['Business Date'].tolist() == [pd.Timestamp('2025-06-15'), pd.Timestamp('2025-06-16')]
+    assert sorted(fila['Motivo'] for fila in cuarentena) == ['fecha no válida', 'fecha vacía']
+
+
+def test_valores_fuera_del_esquema_se_revisan_fila_a_fila(tmp_path):
+    ruta = tmp_path / 'ventas.csv'
+    fila_no_entera = '2025-06-17 00:00:00.0,"Maipu","Local","Delicias","Torta",101,"Torta Chocolate",dos,100.0'
+    ruta.write_text('\n'.join([ENCABEZADO] + FILAS + [fila_no_entera]) + '\n', encoding='utf-8')
+    ruta_cuarentena = tmp_path / 'cuarentena.csv'
+    df = leer_archivos_pos([str(ruta)], ruta_cuarentena=str(ruta_cuarentena), carpeta_cache=None)
+    assert len(df) == 2
+    assert sorted(pd.read_csv(ruta_cuarentena)['Motivo']) == ['fecha no válida', 'fecha vacía', 'valor no entero']
+
+
+def test_nombres_sin_espacios_al_inicio_ni_al_final(tmp_path):
+    ruta = tmp_path / 'ventas.csv'
+    ruta.write_text('\n'.join([ENCABEZADO, FILAS[0], FILAS[1].replace('"Maipu"', '"Maipu "'),
+                               FILAS[0].replace('"Maipu"', '" San Miguel "')]) + '\n', encoding='utf-8')
+    df = leer_archivos_pos([str(ruta)], ruta_cuarentena=str(tmp_path / 'cuarentena.csv'), carpeta_cache=None)
+    assert sorted(df['Location Name'].cat.categories) == ['Maipu', 'San Miguel']
+    assert df['Location Name'].tolist() == ['Maipu', 'Maipu', 'San Miguel']
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from modelo.panel_compartido import publicar_panel, adjuntar_panel, regresores_desde_panel
+from modelo.panel_ventas import construir_panel_ventas, serie_desde_panel
+
+
+def _panel(venta=1.0):
+    filas = [(fecha, tienda, venta * (k + 1)) for fecha in pd.date_range('2025-01-01', periods=10)
+             for k, tienda in enumerate(['A', 'B'])]
+    df = pd.DataFrame(filas, columns=['ds', 'Location Name', 'Venta Real'])
+    return construir_panel_ventas(df.assign(**{'Major Group Name': 'Pasteleria', 'Family Group Name': 'Torta'}))
+
+
+def _regresores():
+    return pd.DataFrame({'ds': pd.date_range('2025-01-01', periods=24), 'dia_frio': 0.0, 'dia_frio|A': 1.0,
+                         'otro|A': 1.0})
+
+
+def test_el_panel_adjuntado_es_el_publicado(tmp_path):
+    panel = _panel()
+    adjunto = adjuntar_panel(publicar_panel(panel, _regresores(), ['dia_frio'], carpeta=str(tmp_path)))
+    assert isinstance(adjunto['ventas'], np.memmap)
+    pd.testing.assert_frame_equal(serie_desde_panel(adjunto, 'B', 'Torta'), serie_desde_panel(panel, 'B', 'Torta'))
+    # Solo se publican los regresores del modelo y sus versiones por tienda
+    assert list(regresores_desde_panel(adjunto).columns) == ['ds', 'dia_frio', 'dia_frio|A']
+
+
+def test_publicar_reutiliza_el_panel_y_borra_los_anteriores(tmp_path):
+    carpeta = str(tmp_path)
+    primera = publicar_panel(_panel(), _regresores(), ['dia_frio'], carpeta=carpeta)
+    assert publicar_panel(_panel(), _regresores(), ['dia_frio'], carpeta=carpeta) == primera
+
+    segunda = publicar_panel(_panel(venta=2.0), _regresores(), ['dia_frio'], carpeta=carpeta)
+    assert segunda != primera
+    assert os.listdir(carpeta) == [os.path.basename(segunda)]
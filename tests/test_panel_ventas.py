@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from modelo.panel_ventas import (
+    construir_panel_ventas, claves_series, dia_fin, serie_desde_panel, familia_desde_panel, ventas_ventana,
+    promedio_dias_con_venta, dias_con_venta, huella_panel
+)
+
+
+def _panel():
+    # A-Torta vende días alternos; B-Torta empieza el día 3; A-Pan sin registros de B
+    filas = [(f"2025-01-{d:02d}", 'A', 'Pasteleria', 'Torta', float(d)) for d in range(1, 11, 2)]
+    filas += [(f"2025-01-{d:02d}", 'B', 'Pasteleria', 'Torta', 2.0) for d in range(3, 11)]
+    filas += [('2025-01-05', 'A', 'Panaderia', 'Pan', 4.0), ('2025-01-05', 'A', 'Panaderia', 'Pan', 1.0)]
+    df = pd.DataFrame(filas, columns=['ds', 'Location Name', 'Major Group Name', 'Family Group Name', 'Venta Real'])
+    return construir_panel_ventas(df.assign(ds=pd.to_datetime(df['ds'])))
+
+
+def test_panel_denso_con_ceros_y_primer_dia_de_cada_serie():
+    panel = _panel()
+    assert panel['ventas'].shape == (2, 2, 10)
+    assert panel['tiendas'] == ['A', 'B'] and panel['familias'] == ['Pan', 'Torta']
+    assert panel['ventas'][0, 0, 4] == 5.0  # Registros duplicados del mismo día se suman
+    assert panel['inicio'].tolist() == [[4, 0], [-1, 2]]
+    assert claves_series(panel) == [('A', 'Panaderia', 'Pan'), ('A', 'Pasteleria', 'Torta'),
+                                    ('B', 'Pasteleria', 'Torta')]
+
+
+def test_serie_desde_su_primer_registro_hasta_el_corte():
+    panel = _panel()
+    serie = serie_desde_panel(panel, 'B', 'Torta', fin='2025-01-06')
+    assert serie['ds'].tolist() == list(pd.date_range('2025-01-03', '2025-01-06'))
+    assert serie['Venta Real'].tolist() == [2.0] * 4
+    assert serie_desde_panel(panel, 'B', 'Pan').empty
+    assert serie_desde_panel(panel, 'A', 'Torta')['Venta Real'].tolist()[:4] == [1.0, 0.0, 3.0, 0.0]
+    assert len(familia_desde_panel(panel, 'Torta')) == 10 + 8
+
+
+def test_dia_fin_se_limita_al_panel():
+    panel = _panel()
+    assert [dia_fin(panel, f) for f in (None, '2024-12-01', '2025-01-01', '2025-03-01')] == [10, 0, 1, 10]
+
+
+def test_agregados_vectorizados_coinciden_con_las_series():
+    panel = _panel()
+    assert ventas_ventana(panel, dias=4).tolist() == [[0.0, 16.0], [0.0, 8.0]]
+    assert dias_con_venta(panel, fin='2025-01-05').tolist() == [[1, 3], [0, 3]]
+    promedio = promedio_dias_con_venta(panel, n=2)
+    assert promedio[1, 1] == 2.0 and promedio[0, 1] == 8.0  # round((9 + 7) / 2)
+    assert np.isnan(promedio[1, 0])
+
+
+def test_huella_panel_cambia_con_las_ventas():
+    panel = _panel()
+    otro = _panel()
+    otro['ventas'][1, 1, 9] += 1
+    assert huella_panel(panel) == huella_panel(_panel())
+    assert huella_panel(otro) != huella_panel(panel)
+    assert huella_panel(panel).startswith('2025-01-10:')
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from modelo.particiones import guardar_parcial, cargar_parciales
+
+
+def _guardar_todas(carpeta, total=2, huella='2025-06-30:abc', id_ejecucion='ejec-1'):
+    for i in range(total):
+        guardar_parcial({'indice': i}, 'pronostico', (i, total), huella=huella, carpeta=carpeta,
+                        id_ejecucion=id_ejecucion)
+
+
+def test_combina_parciales_de_la_misma_ejecucion(tmp_path):
+    _guardar_todas(tmp_path)
+    parciales = cargar_parciales('pronostico', 2, huella='2025-06-30:abc', carpeta=tmp_path, id_ejecucion='ejec-1')
+    assert parciales == [{'indice': 0}, {'indice': 1}]
+
+
+def test_rechaza_una_particion_de_otra_ejecucion(tmp_path):
+    _guardar_todas(tmp_path)
+    guardar_parcial({'indice': 1}, 'pronostico', (1, 2), huella='2025-06-30:abc', carpeta=tmp_path,
+                    id_ejecucion='ejec-0')
+    with pytest.raises(ValueError, match="id de ejecución"):
+        cargar_parciales('pronostico', 2, carpeta=tmp_path, id_ejecucion='ejec-1')
+
+
+def test_rechaza_parciales_de_otros_datos(tmp_path):
+    _guardar_todas(tmp_path)
+    with pytest.raises(ValueError, match="huella de datos"):
+        cargar_parciales('pronostico', 2, huella='2025-07-01:def', carpeta=tmp_path, id_ejecucion='ejec-1')
+
+
+def test_rechaza_el_formato_anterior_y_las_particiones_faltantes(tmp_path):
+    _guardar_todas(tmp_path)
+    pd.to_pickle({'indice': 0}, tmp_path / "pronostico_0de2.pkl")
+    with pytest.raises(ValueError, match="formato anterior"):
+        cargar_parciales('pronostico', 2, carpeta=tmp_path)
+    with pytest.raises(FileNotFoundError):
+        cargar_parciales('pronostico', 3, carpeta=tmp_path)
+
+
+def _panel():
+    from modelo.panel_ventas import construir_panel_ventas
+
+    return construir_panel_ventas(pd.DataFrame({'ds': pd.date_range('2025-06-01', periods=30), 'Location Name': 'A',
+                                                'Major Group Name': 'Pasteleria', 'Family Group Name': 'Torta',
+                                                'Venta Real': 1.0}))
+
+
+@pytest.mark.parametrize('modulo, nombre', [('modelo.backtest', 'backtest'),
+                                            ('modelo.ajuste_hiperparametros', 'ajuste')])
+def test_combinar_rechaza_parciales_de_otra_cosecha_de_datos(tmp_path, monkeypatch, modulo, nombre):
+    import importlib
+
+    paso = importlib.import_module(modulo)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(paso, 'cargar_ventas_con_cache', lambda carpeta: (None, None, None, _panel()))
+    for i in range(2):
+        guardar_parcial({}, nombre, (i, 2), huella='2025-06-29:viejo')
+    with pytest.raises(ValueError, match="huella de datos"):
+        paso.main(combinar=2)
+
+
+def test_combinar_el_ajuste_guarda_los_ganadores_de_todas_las_particiones(tmp_path, monkeypatch):
+    import json
+    import modelo.ajuste_hiperparametros as ajuste
+    from modelo.panel_ventas import huella_panel
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ajuste, 'cargar_ventas_con_cache', lambda carpeta: (None, None, None, _panel()))
+    for i, tienda in enumerate(['A', 'B']):
+        guardar_parcial({'ganadores': {f"{tienda}|Torta": {'cap_multiplicador': 2.0}}}, 'ajuste', (i, 2),
+                        huella=huella_panel(_panel()))
+    ajuste.main(combinar=2)
+    with open(ajuste.RUTA_PARAMETROS_SERIES, encoding='utf-8') as f:
+        assert sorted(json.load(f)) == ['A|Torta', 'B|Torta']
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from modelo.participacion_canal import repartir_enteros
+
+
+def test_repartir_enteros_conserva_el_total_de_cada_grupo():
+    rng = np.random.default_rng(1)
+    grupos = np.repeat(np.arange(50), 3)
+    fracciones = rng.dirichlet(np.ones(3), size=50).ravel()
+    totales = np.repeat(rng.integers(0, 40, 50), 3).astype(float)
+
+    unidades = repartir_enteros(totales, fracciones, grupos)
+    assert np.array_equal(unidades, np.round(unidades))
+    sumas = pd.Series(unidades).groupby(grupos).sum().to_numpy()
+    assert np.array_equal(sumas, totales[::3])
+
+
+def test_repartir_enteros_da_las_unidades_sobrantes_al_mayor_resto():
+    # 10 · (0.45, 0.35, 0.20) = 4.5, 3.5, 2.0 → partes enteras 4, 3, 2; falta 1 y va al primer mayor resto
+    unidades = repartir_enteros([10.0] * 3, [0.45, 0.35, 0.20], [0, 0, 0])
+    assert unidades.sum() == 10
+    assert unidades.tolist() == [5.0, 3.0, 2.0]
+
+
+def test_repartir_enteros_no_se_aleja_mas_de_una_unidad_de_lo_exacto():
+    fracciones = [1 / 3] * 3
+    unidades = repartir_enteros([7.0] * 3, fracciones, [0, 0, 0])
+    assert np.all(np.abs(unidades - 7 / 3) < 1)
+    assert sorted(unidades.tolist()) == [2.0, 2.0, 3.0]
@@ -0,0 +1,92 @@
+import json
+import time
+import tracemalloc
+
+import pytest
+
+import comun.perfilado as perfilado
+from comun.perfilado import activar_perfilado, guardar_perfiles, perfilado_activo, perfilar, pilas_colapsadas
+
+
+@pytest.fixture(autouse=True)
+def sin_perfilado(monkeypatch):
+    """Cada prueba parte con el perfilado apagado y sin perfiles de las demás."""
+    monkeypatch.setattr(perfilado, '_ESTADO', dict(perfilado._ESTADO, activo=False))
+    monkeypatch.setattr(perfilado, '_PERFILES', {})
+    estaba_midiendo = tracemalloc.is_tracing()
+    yield
+    if not estaba_midiendo:
+        tracemalloc.stop()
+
+
+def _dormir(segundos):
+    time.sleep(segundos)
+
+
+def _hoja():
+    return sum(range(20000))
+
+
+def _rama():
+    return _hoja() + _hoja()
+
+
+def test_sin_activar_no_perfila_ni_guarda(tmp_path):
+    with perfilar('serie', 'A|Pasteleria|Torta'):
+        _dormir(0.01)
+    assert not perfilado_activo()
+    assert perfilado._PERFILES == {} and guardar_perfiles() is None
+
+
+def test_conserva_los_mas_lentos_de_cada_tipo(tmp_path):
+    carpeta = str(tmp_path / 'perfiles')
+    activar_perfilado(carpeta=carpeta, top_n=2, memoria=False)
+    for i, segundos in enumerate([0.01, 0.05, 0.02, 0.04]):
+        metadatos = {'filas': i}
+        with perfilar('serie', f"serie {i}", metadatos):
+            _dormir(segundos)
+            metadatos['motor'] = 'prophet'
+    assert guardar_perfiles() == carpeta
+
+    with open(tmp_path / 'perfiles' / 'perfiles.json', encoding='utf-8') as f:
+        resumen = json.load(f)
+    assert [p['nombre'] for p in resumen] == ['serie 1', 'serie 3']
+    assert resumen[0]['metadatos'] == {'filas': 1, 'motor': 'prophet'} and resumen[0]['pico_mb'] is None
+    assert any('_dormir' in funcion['funcion'] for funcion in resumen[0]['funciones'])
+    for perfil in resumen:
+        assert (tmp_path / 'perfiles' / f"{perfil['archivo']}.prof").exists()
+        assert (tmp_path / 'perfiles' / f"{perfil['archivo']}.collapsed").exists()
+
+
+def test_un_bloque_anidado_se_suma_a_la_etapa(tmp_path):
+    activar_perfilado(carpeta=str(tmp_path), top_n=5, memoria=False)
+    with perfilar('etapa', 'pronostico'):
+        with perfilar('serie', 'A|Pasteleria|Torta'):
+            _rama()
+    etapa, serie = perfilado._PERFILES['etapa'][0], perfilado._PERFILES['serie'][0]
+    assert etapa['segundos'] >= serie['segundos']
+    assert any(funcion[2] == '_rama' for funcion in etapa['estadisticas'].stats)
+
+
+def test_mide_el_pico_de_memoria_del_bloque(tmp_path):
+    activar_perfilado(carpeta=str(tmp_path), top_n=5, memoria=True)
+    with perfilar('serie', 'grande'):
+        datos = bytearray(20 * 2 ** 20)
+        del datos
+    with perfilar('serie', 'chica'):
+        datos = bytearray(2 ** 10)
+    picos = {p['nombre']: p['pico_mb'] for p in perfilado._PERFILES['serie']}
+    assert picos['grande'] >= 19 and picos['chica'] < 1
+    assert perfilado._PERFILES['serie'][0]['asignaciones']
+
+
+def test_pilas_colapsadas_siguen_las_llamadas():
+    import cProfile
+    import pstats
+
+    perfilador = cProfile.Profile()
+    perfilador.runcall(_rama)
+    pilas = pilas_colapsadas(pstats.Stats(perfilador), fraccion_minima=0)
+    caminos = [[marco.split(' ')[0] for marco in pila.rsplit(' ', 1)[0].split(';')] for pila in pilas]
+    assert any(camino[-2:] == ['_rama', '_hoja'] for camino in caminos)
+    assert all(int(pila.rsplit(' ', 1)[1]) > 0 for pila in pilas)
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+import modelo.pronostico_demanda as pronostico_demanda
+from modelo.pronostico_demanda import entrenar_y_pronosticar, cargar_cache_pronosticos, pronostico_constante
+from modelo.panel_ventas import construir_panel_ventas
+
+
+@pytest.fixture
+def estados_recibidos(tmp_path, monkeypatch):
+    """Ejecuta en una carpeta temporal; el ajuste falso guarda el modelo que recibe de la caché y uno nuevo."""
+    monkeypatch.chdir(tmp_path)
+    recibidos = {}
+
+    def pronosticar_serie(location, major_group, family_group, group, *args, politica=None, componentes=None,
+                          **kwargs):
+        recibidos[location] = politica.get('estado')
+        politica['motivo'], politica['estado'] = 'deriva', {'tienda': location, 'dias': len(group)}
+        componentes.update(coeficientes={'dia_pago': 1.0})
+        return pronostico_constante(2.0, group['ds'].max()), 'prophet'
+
+    monkeypatch.setattr(pronostico_demanda, 'pronosticar_serie', pronosticar_serie)
+    monkeypatch.setattr(pronostico_demanda, 'REAJUSTE_POR_DERIVA', True)
+    return recibidos
+
+
+def _panel(dias):
+    filas = [(fecha, tienda, venta) for fecha in pd.date_range('2025-01-01', periods=dias)
+             for tienda, venta in (('A', 5.0), ('B', 1.0))]
+    df = pd.DataFrame(filas, columns=['ds', 'Location Name', 'Venta Real'])
+    return construir_panel_ventas(df.assign(**{'Major Group Name': 'Pasteleria', 'Family Group Name': 'Torta'}))
+
+
+def _entrenar(panel, presupuesto_segundos=None):
+    return entrenar_y_pronosticar(panel, pd.DataFrame(), [], presupuesto_segundos=presupuesto_segundos,
+                                  backend='map', ventana=None)
+
+
+def test_serie_sin_plazo_conserva_su_modelo_para_la_proxima_ejecucion(estados_recibidos):
+    _entrenar(_panel(60))
+    anterior = cargar_cache_pronosticos(pronostico_demanda.RUTA_CACHE_PRONOSTICOS)
+
+    # Llegan datos nuevos pero el plazo ya se agotó: todas las series usan el promedio
+    df = _entrenar(_panel(61), presupuesto_segundos=1e-9)
+    assert set(df['Motor']) == {'promedio'}
+    cache = cargar_cache_pronosticos(pronostico_demanda.RUTA_CACHE_PRONOSTICOS)
+    assert sorted(cache) == sorted(anterior)
+    for clave, guardado in cache.items():
+        assert guardado['motor'] == 'promedio'
+        assert guardado['huella'] == anterior[clave]['huella']  # Mañana no se reutiliza: se reentrena
+        assert guardado['modelo'] == anterior[clave]['modelo']
+        assert guardado['componentes'] == {'coeficientes': {'dia_pago': 1.0}}
+
+    # La siguiente ejecución con tiempo recibe el modelo guardado antes del plazo
+    estados_recibidos.clear()
+    _entrenar(_panel(61))
+    assert estados_recibidos == {'A': {'tienda': 'A', 'dias': 60}, 'B': {'tienda': 'B', 'dias': 60}}
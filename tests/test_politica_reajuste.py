@@ -0,0 +1,30 @@
+import pytest
+
+from modelo.politica_reajuste import actualizar_cusum
+
+
+def test_cusum_sin_deriva_se_queda_en_cero():
+    assert actualizar_cusum(0.0, 0.0, [0.2, -0.3, 0.1, -0.4], holgura=0.5) == (0.0, 0.0, 0.0)
+
+
+def test_cusum_acumula_la_deriva_positiva_y_negativa():
+    positivo, negativo, maximo = actualizar_cusum(0.0, 0.0, [2.0, 2.0, 2.0], holgura=0.5)
+    assert (positivo, negativo, maximo) == pytest.approx((4.5, 0.0, 4.5))
+    positivo, negativo, maximo = actualizar_cusum(0.0, 0.0, [-1.5, -1.5], holgura=0.5)
+    assert (positivo, negativo, maximo) == pytest.approx((0.0, 2.0, 2.0))
+
+
+def test_cusum_guarda_el_maximo_aunque_despues_baje():
+    positivo, negativo, maximo = actualizar_cusum(0.0, 0.0, [3.0, 3.0, -3.0, -3.0], holgura=0.5)
+    assert maximo == pytest.approx(5.0)
+    assert positivo == pytest.approx(0.0)
+    assert negativo == pytest.approx(5.0)
+
+
+def test_cusum_continua_desde_el_estado_guardado():
+    residuos = [1.0, -0.2, 1.5, 0.7, -2.0]
+    completo = actualizar_cusum(0.0, 0.0, residuos, holgura=0.5)
+    parcial = actualizar_cusum(0.0, 0.0, residuos[:2], holgura=0.5)
+    en_dos_partes = actualizar_cusum(parcial[0], parcial[1], residuos[2:], holgura=0.5)
+    assert en_dos_partes[:2] == pytest.approx(completo[:2])
+    assert max(parcial[2], en_dos_partes[2]) == pytest.approx(completo[2])
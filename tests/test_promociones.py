@@ -0,0 +1,44 @@
+import pandas as pd
+
+from comun.promociones import (
+    TIENDA_CADENA, columnas_promociones, matriz_promociones, tabla_promociones, mascara_aplicabilidad,
+    promociones_inactivas
+)
+
+PROMOCIONES = [
+    {'nombre_columna': 'promo_trozo', 'fecha_inicio': '2025-05-07', 'fecha_fin': None, 'fuerza': 0.2,
+     'grupos': ['Pastel Trozo'], 'familias': None, 'tiendas': None},
+    {'nombre_columna': 'promo_maipu', 'fecha_inicio': '2025-05-01', 'fecha_fin': '2025-05-03', 'fuerza': 0.5,
+     'grupos': None, 'familias': ['Torta'], 'tiendas': ['Maipu']},
+]
+
+
+def test_valor_de_cada_promocion_en_su_vigencia():
+    fechas = pd.date_range('2025-04-30', '2025-05-08')
+    matriz = matriz_promociones(fechas, PROMOCIONES)
+    assert matriz[:, 1].tolist() == [0, 0.5, 0.5, 0.5, 0, 0, 0, 0, 0]
+    assert matriz[:, 0].tolist() == [0] * 7 + [0.2, 0.2]  # Sin fecha de fin: sigue vigente
+
+
+def test_indicador_semanal_cuenta_desde_el_lunes():
+    lunes = pd.date_range('2025-04-28', periods=3, freq='W-MON')
+    matriz = matriz_promociones(lunes, PROMOCIONES, indicador=True, semanal=True)
+    # promo_trozo empieza el miércoles 7 de mayo: cuenta desde el lunes 5
+    assert matriz[:, 0].tolist() == [0, 1, 1]
+    tabla = tabla_promociones(lunes, PROMOCIONES, indicador=True, semanal=True)
+    assert list(tabla.columns) == ['fecha'] + columnas_promociones(PROMOCIONES)
+
+
+def test_aplicabilidad_por_grupo_familia_y_tienda():
+    claves = [('Maipu', 'Pastel Trozo', 'Torta'), ('Centro', 'Pastel Trozo', 'Torta'),
+              ('Maipu', 'Delicias', 'Kuchen'), (TIENDA_CADENA, 'Delicias', 'Torta')]
+    mascara = mascara_aplicabilidad(claves, PROMOCIONES)
+    assert mascara['promo_trozo'].tolist() == [True, True, False, False]
+    # La serie de la cadena incluye a Maipu: le aplica la promoción de esa tienda
+    assert mascara['promo_maipu'].tolist() == [True, False, False, True]
+
+
+def test_promociones_inactivas_solo_entre_las_columnas_del_modelo():
+    claves = [('Centro', 'Delicias', 'Kuchen')]
+    mascara = mascara_aplicabilidad(claves, PROMOCIONES)
+    assert promociones_inactivas(mascara, claves[0], ['dia_pago', 'promo_maipu']) == ['promo_maipu']
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import comun.puntos_control as puntos_control
+from comun.puntos_control import (
+    iniciar_ejecucion, ejecucion_activa, etapa_completa, marcar_etapa, resultado_etapa, guardar_serie,
+    series_guardadas
+)
+
+
+@pytest.fixture(autouse=True)
+def sin_ejecucion(monkeypatch):
+    """Cada prueba parte sin ejecución configurada y no deja la suya a las demás."""
+    monkeypatch.setattr(puntos_control, '_EJECUCION', {'carpeta': None, 'reanudar': False})
+
+
+def test_sin_ejecucion_no_se_guarda_nada():
+    assert not ejecucion_activa()
+    marcar_etapa('pronostico:archivo', {'filas': 1})
+    guardar_serie('A|Pasteleria|Torta', {'huella': 'h'})
+    assert not etapa_completa('pronostico:archivo')
+    assert series_guardadas() == {}
+
+
+def test_reanudar_salta_etapas_y_series_terminadas(tmp_path):
+    iniciar_ejecucion('2025-06-30', carpeta_base=str(tmp_path))
+    marcar_etapa('pronostico:reconciliacion', {'filas': 3})
+    marcar_etapa('pronostico:archivo')
+    guardar_serie('A|Pasteleria|Torta', {'huella': 'h', 'motor': 'prophet'})
+    # Sin reanudar, la misma ejecución no se salta nada
+    assert not etapa_completa('pronostico:archivo')
+    assert series_guardadas() == {}
+
+    iniciar_ejecucion('2025-06-30', reanudar=True, carpeta_base=str(tmp_path))
+    assert etapa_completa('pronostico:archivo') and not etapa_completa('pronostico:exportacion')
+    assert resultado_etapa('pronostico:reconciliacion') == {'filas': 3}
+    assert resultado_etapa('pronostico:archivo') is None
+    assert series_guardadas() == {'A|Pasteleria|Torta': {'huella': 'h', 'motor': 'prophet'}}
+
+
+def test_empezar_de_nuevo_vacia_la_ejecucion(tmp_path):
+    iniciar_ejecucion('2025-06-30', carpeta_base=str(tmp_path))
+    marcar_etapa('pronostico:archivo')
+    iniciar_ejecucion('2025-06-30', carpeta_base=str(tmp_path))
+    iniciar_ejecucion('2025-06-30', reanudar=True, carpeta_base=str(tmp_path))
+    assert not etapa_completa('pronostico:archivo')
+
+
+def test_punto_de_control_ilegible_se_recalcula(tmp_path):
+    carpeta = iniciar_ejecucion('2025-06-30', reanudar=True, carpeta_base=str(tmp_path))
+    guardar_serie('A|Pasteleria|Torta', {'huella': 'h'})
+    with open(os.path.join(carpeta, 'series', 'roto.pkl'), 'wb') as f:
+        f.write(b'no es un pickle')
+    assert list(series_guardadas()) == ['A|Pasteleria|Torta']
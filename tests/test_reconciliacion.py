@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modelo.panel_ventas import construir_panel_ventas
+from modelo.reconciliacion import construir_jerarquia, matriz_reconciliacion, reconciliar_pronosticos
+
+ESCENARIOS = ['Peor Escenario', 'Escenario Promedio', 'Mejor Escenario']
+
+
+def _pronostico(fechas, semilla=0):
+    """Pronóstico Tienda-Familia con dos tiendas, dos Major Group y tres familias (valores enteros)."""
+    series = [('A', 'Pasteleria', 'Torta'), ('A', 'Pasteleria', 'Kuchen'), ('A', 'Panaderia', 'Pan'),
+              ('B', 'Pasteleria', 'Torta'), ('B', 'Panaderia', 'Pan')]
+    rng = np.random.default_rng(semilla)
+    filas = [(fecha, *serie) for fecha in fechas for serie in series]
+    df = pd.DataFrame(filas, columns=['Fecha', 'Location Name', 'Major Group Name', 'Family Group Name'])
+    for columna in ESCENARIOS:
+        df[columna] = rng.integers(0, 50, len(df)).astype(float)
+    return df
+
+
+def _panel(df):
+    """Panel de ventas históricas de las mismas series, con la venta de 'Escenario Promedio' como historia."""
+    historia = df.assign(ds=df['Fecha'] - pd.Timedelta(days=60), **{'Venta Real': df['Escenario Promedio']})
+    return construir_panel_ventas(historia.drop(columns=['Fecha']))
+
+
+def test_matriz_bottom_up_reproduce_pronosticos_coherentes():
+    S, _, _ = construir_jerarquia(_pronostico(pd.date_range('2025-01-01', periods=1)))
+    G = matriz_reconciliacion(S, 'bu')
+    # G·S = I: un pronóstico que ya es coherente no cambia al reconciliar
+    assert np.asarray(G @ S.toarray()) == pytest.approx(np.eye(S.shape[1]))
+
+
+def test_metodo_desconocido():
+    S, _, _ = construir_jerarquia(_pronostico(pd.date_range('2025-01-01', periods=1)))
+    with pytest.raises(ValueError):
+        matriz_reconciliacion(S, 'ols')
+
+
+def test_bottom_up_es_la_identidad_en_las_series_base():
+    df = _pronostico(pd.date_range('2025-01-01', periods=5))
+    df_rec, _ = reconciliar_pronosticos(df, 'bu')
+    combinado = df.merge(df_rec, on=['Fecha', 'Location Name', 'Major Group Name', 'Family Group Name'])
+    for columna in ESCENARIOS:
+        assert combinado[f"{columna}_x"].tolist() == combinado[f"{columna}_y"].tolist()
+
+
+@pytest.mark.parametrize('metodo', ['bu', 'td'])
+def test_niveles_suman_las_series_base(metodo):
+    df = _pronostico(pd.date_range('2025-01-01', periods=3))
+    df['Escenario Promedio'] *= 10  # Cambiar la escala para que el redondeo sea despreciable frente al total
+    _, df_niveles = reconciliar_pronosticos(df, metodo, panel=_panel(df))
+    base = df_niveles[df_niveles['Nivel'] == 'Tienda-Familia'].groupby('Fecha')['Escenario Promedio'].sum()
+    cadena = df_niveles[df_niveles['Nivel'] == 'Cadena'].set_index('Fecha')['Escenario Promedio']
+    assert cadena.to_numpy() == pytest.approx(base.to_numpy(), abs=len(df) / 3)
+    tiendas = df_niveles[df_niveles['Nivel'] == 'Tienda'].groupby('Fecha')['Escenario Promedio'].sum()
+    assert tiendas.to_numpy() == pytest.approx(cadena.to_numpy(), abs=2)
+
+
+def test_historia_no_se_reconcilia():
+    fechas = pd.date_range('2025-01-01', periods=6)
+    df = _pronostico(fechas)
+    historia = df[df['Fecha'] <= fechas[2]]
+    df_rec, df_niveles = reconciliar_pronosticos(df, 'td', panel=_panel(df), ultima_fecha=fechas[2])
+    assert len(df_rec) == len(df)
+    assert df_niveles['Fecha'].min() == fechas[3]
+    sin_cambios = df_rec[df_rec['Fecha'] <= fechas[2]].reset_index(drop=True)
+    pd.testing.assert_frame_equal(sin_cambios, historia.reset_index(drop=True))
+
+
+def test_top_down_reparte_el_total_y_vacia_las_columnas_sin_reconciliar():
+    fechas = pd.date_range('2025-01-01', periods=4)
+    df = _pronostico(fechas)
+    df['yhat'] = df['Escenario Promedio'] + 0.4
+    df['Demanda'] = df['Mejor Escenario']
+    df_rec, _ = reconciliar_pronosticos(df, 'td', panel=_panel(df), ultima_fecha=fechas[1])
+
+    horizonte = df_rec[df_rec['Fecha'] > fechas[1]]
+    assert horizonte[['yhat', 'Demanda']].isna().all().all()
+    assert df_rec.loc[df_rec['Fecha'] <= fechas[1], ['yhat', 'Demanda']].notna().all().all()
+    # El total de la cadena se conserva salvo el redondeo de las 5 series
+    total = df[df['Fecha'] > fechas[1]].groupby('Fecha')['Escenario Promedio'].sum()
+    assert horizonte.groupby('Fecha')['Escenario Promedio'].sum().to_numpy() == pytest.approx(total.to_numpy(), abs=3)
+
+
+def test_bottom_up_conserva_las_columnas_del_pronostico_base():
+    df = _pronostico(pd.date_range('2025-01-01', periods=2))
+    df['yhat'] = df['Escenario Promedio'] + 0.4
+    df_rec, _ = reconciliar_pronosticos(df, 'bu')
+    assert df_rec['yhat'].notna().all()
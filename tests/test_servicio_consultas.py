@@ -0,0 +1,80 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+import modelo.servicio_consultas as servicio_consultas
+from modelo.archivo_pronosticos import archivar_pronosticos
+from modelo.servicio_consultas import IndicePronosticos, ServicioPronosticos, crear_manejador
+
+FECHAS = pd.date_range('2025-07-01', periods=4)
+
+
+def _items(demanda=1.0):
+    filas = [(fecha, tienda, 'Delicias', 'Torta', item, f"Item {item}", demanda)
+             for tienda in ('A', 'B') for item in (101, 102) for fecha in FECHAS]
+    return pd.DataFrame(filas, columns=['Fecha', 'Location Name', 'Major Group Name', 'Family Group Name',
+                                        'Menu Item Number', 'Menu Item Name', 'Demanda'])
+
+
+def test_consulta_por_serie_item_y_rango_de_fechas():
+    indice = IndicePronosticos(_items().sample(frac=1, random_state=0), 'diario_item', 'e1')
+    df = indice.consultar(tienda='B', familia='Torta', item=102, desde=FECHAS[1], hasta=FECHAS[2])
+    assert df['Fecha'].tolist() == list(FECHAS[1:3])
+    assert set(df['Location Name']) == {'B'} and set(df['Menu Item Number']) == {102}
+    assert len(indice.consultar(tienda='A', familia='Torta')) == 2 * len(FECHAS)
+    assert len(indice.consultar(familia='Torta', item='101')) == 2 * len(FECHAS)
+    assert indice.consultar(tienda='C', familia='Torta').empty
+
+
+def test_recarga_la_ejecucion_nueva(tmp_path):
+    carpeta = str(tmp_path)
+    archivar_pronosticos(_items(), 'diario_item', '20250630T080000', carpeta)
+    servicio = ServicioPronosticos(carpeta, niveles=('diario_item',))
+    assert servicio.estado() == {'diario_item': {'ejecucion': '20250630T080000', 'filas': 16}}
+    assert not servicio.recargar()
+
+    archivar_pronosticos(_items(demanda=2.0), 'diario_item', '20250701T080000', carpeta)
+    assert servicio.recargar()
+    assert servicio.indices['diario_item'].ejecucion == '20250701T080000'
+
+
+def test_una_recarga_fallida_se_reintenta_aunque_el_indice_no_cambie(tmp_path, monkeypatch):
+    carpeta = str(tmp_path)
+    servicio = ServicioPronosticos(carpeta, niveles=('diario_item',))
+    archivar_pronosticos(_items(), 'diario_item', '20250630T080000', carpeta)
+
+    cargar = servicio_consultas.cargar_ultima_ejecucion
+
+    def falla(*args):
+        raise OSError("Parquet aún no visible")
+
+    monkeypatch.setattr(servicio_consultas, 'cargar_ultima_ejecucion', falla)
+    with pytest.raises(OSError):
+        servicio.recargar()
+    monkeypatch.setattr(servicio_consultas, 'cargar_ultima_ejecucion', cargar)
+    assert servicio.recargar()
+    assert servicio.indices['diario_item'].ejecucion == '20250630T080000'
+
+
+def test_http_responde_con_etag_por_ejecucion(tmp_path):
+    carpeta = str(tmp_path)
+    archivar_pronosticos(_items(), 'diario_item', '20250630T080000', carpeta)
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), crear_manejador(ServicioPronosticos(carpeta)))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/pronostico?tienda=A&familia=Torta&item=101"
+    try:
+        with urllib.request.urlopen(url) as respuesta:
+            filas = json.loads(respuesta.read())
+            etag = respuesta.headers['ETag']
+        assert len(filas) == len(FECHAS) and etag == '"20250630T080000"'
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(urllib.request.Request(url, headers={'If-None-Match': etag}))
+        assert error.value.code == 304
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modelo.ventana_entrenamiento import VENTANA_ADAPTATIVA, recortar_ventana, anios_ventana, describir_ventana
+
+
+def _serie(dias, venta=1.0, fin='2025-06-30'):
+    ds = pd.date_range(end=fin, periods=dias)
+    return pd.DataFrame({'ds': ds, 'Venta Real': venta})
+
+
+def test_sin_ventana_devuelve_toda_la_serie():
+    serie = _serie(2000)
+    assert recortar_ventana(serie, None) is serie
+
+
+@pytest.mark.parametrize('anios', [1, 2, 3])
+def test_ventana_en_anios_deja_los_ultimos_dias(anios):
+    recortada = recortar_ventana(_serie(2000), anios)
+    assert len(recortada) == round(anios * 365.25)
+    assert recortada['ds'].max() == pd.Timestamp('2025-06-30')
+
+
+def test_serie_mas_corta_que_la_ventana_queda_igual():
+    serie = _serie(200)
+    assert len(recortar_ventana(serie, 3)) == 200
+
+
+def test_ventana_adaptativa_toma_mas_historia_si_la_serie_es_intermitente():
+    dias = 5 * 365
+    assert anios_ventana(_serie(dias), VENTANA_ADAPTATIVA) == 2.0
+    # Vende un día de cada dos: necesita más años para juntar 1.5 años de días con venta
+    intermitente = _serie(dias, venta=np.tile([0.0, 1.0], dias)[:dias])
+    assert anios_ventana(intermitente, VENTANA_ADAPTATIVA) == 3.0
+    assert len(recortar_ventana(intermitente, VENTANA_ADAPTATIVA)) == round(3 * 365.25)
+
+
+def test_ventana_semanal_cuenta_semanas_con_venta():
+    semanas = pd.DataFrame({'ds': pd.date_range(end='2025-06-29', periods=5 * 52, freq='W'), 'Venta Real': 1.0})
+    assert anios_ventana(semanas, VENTANA_ADAPTATIVA, periodos_por_anio=52) == 2.0
+
+
+def test_describir_ventana():
+    assert [describir_ventana(v) for v in (None, 1, 2.5, VENTANA_ADAPTATIVA)] == \
+        ['completa', '1 año', '2.5 años', 'adaptativa']
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from comun.vigilancia import VigilanteInotify, VigilanteSondeo, esperar_tanda, vigilar
+
+
+def _inotify(carpeta):
+    try:
+        return VigilanteInotify(str(carpeta))
+    except OSError as e:
+        pytest.skip(f"inotify no disponible: {e}")
+
+
+def _escribir_luego(ruta, segundos):
+    temporizador = threading.Timer(segundos, ruta.write_text, args=('Fecha,Tienda\n',))
+    temporizador.start()
+    return temporizador
+
+
+def test_inotify_ignora_archivos_no_vigilados_sin_cortar_la_espera(tmp_path):
+    vigilante = _inotify(tmp_path)
+    try:
+        _escribir_luego(tmp_path / 'ventas.tmp', 0.1)
+        inicio = time.monotonic()
+        assert vigilante.esperar(0.5) == set()
+        assert time.monotonic() - inicio >= 0.45  # El .tmp no devolvió antes del límite
+
+        _escribir_luego(tmp_path / '.oculto.csv', 0.1)
+        _escribir_luego(tmp_path / 'ventas.csv', 0.2)
+        assert vigilante.esperar(5) == {'ventas.csv'}
+    finally:
+        vigilante.cerrar()
+
+
+def test_un_evento_ajeno_durante_la_calma_no_cierra_la_tanda(tmp_path):
+    vigilante = _inotify(tmp_path)
+    try:
+        (tmp_path / 'a.csv').write_text('Fecha\n')
+        # Durante la calma llega un temporal y después otro CSV de la misma tanda
+        _escribir_luego(tmp_path / 'b.csv.part', 0.2)
+        _escribir_luego(tmp_path / 'b.csv', 0.6)
+        assert esperar_tanda(vigilante, segundos_calma=1.0) == {'a.csv', 'b.csv'}
+    finally:
+        vigilante.cerrar()
+
+
+def test_sondeo_detecta_altas_cambios_y_bajas(tmp_path):
+    (tmp_path / 'viejo.csv').write_text('Fecha\n')
+    vigilante = VigilanteSondeo(str(tmp_path), intervalo=0.05)
+    (tmp_path / 'nuevo.csv').write_text('Fecha\n')
+    (tmp_path / 'viejo.csv').unlink()
+    (tmp_path / 'notas.txt').write_text('x')
+    assert vigilante.esperar(1) == {'nuevo.csv', 'viejo.csv'}
+    assert vigilante.esperar(0.1) == set()
+
+
+def test_vigilar_sigue_tras_un_error_en_el_proceso(tmp_path):
+    llamadas = []
+
+    def al_cambiar(archivos):
+        llamadas.append(archivos)
+        raise RuntimeError("falló el pronóstico")
+
+    hilo = threading.Thread(target=vigilar, args=(str(tmp_path), al_cambiar),
+                            kwargs={'segundos_calma': 0.2, 'intervalo': 0.05, 'max_tandas': 2}, daemon=True)
+    hilo.start()
+    time.sleep(0.3)
+    (tmp_path / 'ventas.csv').write_text('x')
+    time.sleep(0.5)
+    (tmp_path / 'otras.csv').write_text('x')
+    hilo.join(timeout=5)
+    assert not hilo.is_alive() and len(llamadas) == 2